@@ -0,0 +1,113 @@
+"""
+Test Adaptive Concurrency Limiter (AIMD)
+Kiểm tra window tăng khi site khỏe, giảm khi bị 429/503, tôn trọng Retry-After
+"""
+
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.adaptive_limiter import AdaptiveConcurrencyLimiter, get_host_limiter, parse_retry_after
+
+
+def test_additive_increase():
+    """Window tăng dần khi latency ổn định"""
+    print("=" * 60)
+    print("TEST 1: Additive increase")
+    print("=" * 60)
+
+    limiter = AdaptiveConcurrencyLimiter(host="fast.example", initial_window=2, max_window=10)
+    for _ in range(40):
+        limiter.on_success(0.2)
+
+    print(f"  window sau 40 success: {limiter.window}")
+    assert limiter.window > 2
+    assert limiter.window <= 10
+
+
+def test_multiplicative_decrease():
+    """429 cắt window một nửa và chặn theo Retry-After"""
+    print("\n" + "=" * 60)
+    print("TEST 2: Multiplicative decrease + Retry-After")
+    print("=" * 60)
+
+    limiter = AdaptiveConcurrencyLimiter(host="slow.example", initial_window=8)
+    limiter.record_response(429, 0.5, "2")
+
+    state = limiter.snapshot()
+    print(f"  window: {state['window']}, blocked_for: {state['blocked_for']:.1f}s")
+    assert state['window'] == 4
+    assert state['blocked_for'] > 1.0
+    assert not limiter.try_acquire()
+
+
+def test_client_errors_are_neutral():
+    """400/401/403/404 không tăng window (vòng lặp lỗi auth không được tăng tốc), 2xx/3xx thì có"""
+    print("\n" + "=" * 60)
+    print("TEST 2b: 4xx neutral")
+    print("=" * 60)
+
+    limiter = AdaptiveConcurrencyLimiter(host="auth-fail.example", initial_window=2, max_window=10)
+    for _ in range(40):
+        for status in (400, 401, 403, 404):
+            limiter.record_response(status, 0.2)
+    print(f"  window sau 160 lỗi 4xx: {limiter.window}")
+    assert limiter.window == 2
+
+    for _ in range(40):
+        limiter.record_response(200, 0.2)
+        limiter.record_response(304, 0.2)
+    assert limiter.window > 2
+
+
+def test_hosts_are_isolated():
+    """Site A bị 429 không ảnh hưởng site B"""
+    print("\n" + "=" * 60)
+    print("TEST 3: Per-host isolation")
+    print("=" * 60)
+
+    a = get_host_limiter("https://site-a.example/")
+    b = get_host_limiter("https://site-b.example")
+    a.on_congestion(retry_after=5, reason="test")
+
+    assert a is get_host_limiter("https://site-a.example/wp-admin")
+    assert b.try_acquire()
+    b.release()
+    print("  ✅ site-b vẫn upload được khi site-a bị chặn")
+
+
+def test_window_limits_in_flight():
+    """Không cho vượt quá window"""
+    limiter = AdaptiveConcurrencyLimiter(initial_window=2)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    limiter.release()
+    assert limiter.acquire(timeout=0.1)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("garbage") is None
+    http_date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+    assert 20 < parse_retry_after(http_date) <= 31
+
+
+if __name__ == "__main__":
+    print("\n🚀 ADAPTIVE LIMITER TEST")
+    try:
+        test_additive_increase()
+        test_multiplicative_decrease()
+        test_client_errors_are_neutral()
+        test_hosts_are_isolated()
+        test_window_limits_in_flight()
+        test_parse_retry_after()
+        print("\n🎉 ALL TESTS PASSED!")
+    except AssertionError as e:
+        print(f"\n❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
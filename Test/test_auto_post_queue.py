@@ -0,0 +1,98 @@
+"""
+Test Auto Post Queue (hàng chờ CHAY AUTO, không cần GUI)
+K bài song song, xong không theo thứ tự, xoá theo identity, K bị giới hạn bởi cửa sổ rate limiter
+"""
+
+import os
+import sys
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.auto_post_queue import AutoPostQueue, queue_concurrency
+
+
+def _queue(titles):
+    queue = AutoPostQueue()
+    queue.items = [{'title': t} for t in titles]
+    return queue
+
+
+def test_out_of_order_completion():
+    os.environ.pop("AUTO_POST_CONCURRENCY", None)
+    queue = _queue([f"Post {i}" for i in range(5)])
+    started = queue.start_next()
+    assert [item['title'] for _, item in started] == ["Post 0", "Post 1", "Post 2"]  # K = 3
+    assert queue.start_next() == []  # đủ K bài đang chạy
+
+    # Bài thứ 3 xong trước bài 1 và 2
+    token, item = started[2]
+    assert queue.finished_item(token) is item
+    queue.remove(item)
+    assert [i['title'] for i in queue.items] == ["Post 0", "Post 1", "Post 3", "Post 4"]
+    refill = queue.start_next()
+    assert [i['title'] for _, i in refill] == ["Post 3"]
+
+    for token, item in started[:2] + refill:
+        queue.remove(queue.finished_item(token))
+    assert [i['title'] for _, i in queue.start_next()] == ["Post 4"]
+    assert not queue.is_finished()
+    print("  ✅ completion out of order refills the freed slot")
+
+
+def test_remove_by_identity_with_equal_titles():
+    queue = _queue(["Ferrari", "Ferrari", "Lambo"])
+    first, second = queue.items[0], queue.items[1]
+    started = dict(queue.start_next())
+    token_second = next(t for t, item in started.items() if item is second)
+
+    done = queue.finished_item(token_second)
+    assert done is second and queue.remove(done)
+    assert queue.items[0] is first and len(queue.items) == 2
+    assert queue.finished_item(token_second) is None  # token đã dùng
+    print("  ✅ equal titles: the finished item is the one removed")
+
+
+def test_k_capped_by_limiter_window():
+    os.environ["AUTO_POST_CONCURRENCY"] = "5"
+    try:
+        assert queue_concurrency() == 5
+        assert queue_concurrency(window=2) == 2
+        assert queue_concurrency(window=0) == 1
+        queue = _queue([f"Post {i}" for i in range(6)])
+        assert len(queue.start_next(window=2)) == 2
+        assert queue.start_next(window=4) and len(queue.in_flight) == 4  # cửa sổ nới ra → thêm bài
+    finally:
+        os.environ.pop("AUTO_POST_CONCURRENCY", None)
+    print("  ✅ K capped by the limiter window")
+
+
+def test_content_pool_single_assignment():
+    queue = AutoPostQueue()
+    queue.content_pool = [{'filename': f"{i}.txt", 'content': str(i)} for i in range(50)]
+    taken = []
+
+    def worker():
+        while True:
+            item, _ = queue.take_content()
+            if item is None:
+                return
+            taken.append(item['filename'])
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(taken) == sorted(f"{i}.txt" for i in range(50))
+    print("  ✅ each pooled content goes to exactly one post")
+
+
+if __name__ == "__main__":
+    print("\n🚀 AUTO POST QUEUE TEST")
+    test_out_of_order_completion()
+    test_remove_by_identity_with_equal_titles()
+    test_k_capped_by_limiter_window()
+    test_content_pool_single_assignment()
+    print("\n🎉 ALL TESTS PASSED!")
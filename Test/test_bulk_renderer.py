@@ -0,0 +1,66 @@
+"""
+Test Bulk Offline Renderer
+CSV mẫu → HTML cho nhiều theme, song song, không cần WordPress
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from model.bulk_renderer import BulkRenderer, load_rows, print_summary
+
+
+def test_render_csv_to_jsonl():
+    rows = load_rows(os.path.join(ROOT, "sample_posts.csv")) * 20
+    output = os.path.join(tempfile.mkdtemp(), "rendered.jsonl")
+
+    summary = BulkRenderer(['supercar', 'news'], workers=2, chunk_size=10).render(rows, output)
+    print_summary(summary)
+
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == len(rows) * 2
+    assert {r['theme'] for r in records} == {'supercar', 'news'}
+    assert all(r['html'] for r in records)
+    assert summary['themes']['news']['renders'] == len(rows)
+    print("  ✅ CSV → JSONL OK")
+
+
+def test_render_to_directory():
+    rows = load_rows(os.path.join(ROOT, "sample_posts.csv"))
+    out_dir = tempfile.mkdtemp()
+    BulkRenderer(['minimal'], workers=1).render(rows, out_dir)
+    files = sorted(os.listdir(out_dir))
+    assert len(files) == len(rows)
+    assert files[0].startswith("00000_") and files[0].endswith("_minimal.html")
+    print("  ✅ 1 file .html / bài")
+
+
+def test_render_seo_theme_headless():
+    """renderer='seo' không kéo theo GUI (customtkinter/tkinter) - chạy được trong worker không có display"""
+    rows = [{'title': 'Ferrari SF90', 'video_url': '', 'image_url': 'https://x/sf90.jpg',
+             'content': '## Động cơ\nV8 **hybrid** 986 mã lực'}] * 3
+    output = os.path.join(tempfile.mkdtemp(), "seo.jsonl")
+    summary = BulkRenderer(renderer='seo', workers=2, chunk_size=1).render(rows, output)
+    with open(output, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 3 and summary['themes']['seo']['errors'] == 0
+    html = records[0]['html']
+    assert '<h2>Động cơ</h2>' in html and '<strong>hybrid</strong>' in html and 'application/ld+json' in html
+    assert summary['themes']['seo']['renders'] == 3
+    assert 'view.tabschuanseo' not in sys.modules and 'tkinter' not in sys.modules
+    print("  ✅ seo renderer works headless")
+
+
+if __name__ == "__main__":
+    print("\n🚀 BULK RENDERER TEST")
+    test_render_csv_to_jsonl()
+    test_render_to_directory()
+    test_render_seo_theme_headless()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,123 @@
+"""
+Test Derived Image Cache
+Cùng ảnh nguồn + cùng params → không xử lý lại; vượt dung lượng → xoá entry cũ nhất
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.derived_image_cache import DerivedImageCache
+
+
+def _write(folder, name, data):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_get_or_create_reuses_output():
+    work = tempfile.mkdtemp()
+    cache = DerivedImageCache(cache_dir=tempfile.mkdtemp())
+    source = _write(work, "a.jpg", b"source-bytes")
+    calls = []
+
+    def produce():
+        calls.append(1)
+        return _write(work, "a_optimized.jpg", b"optimized")
+
+    first = cache.get_or_create(source, 'upload', produce, max_height=180)
+    assert cache.owns(first) and not os.path.exists(os.path.join(work, "a_optimized.jpg"))
+    assert os.path.basename(first) == "a_optimized.jpg"  # tên upload giữ nguyên (SEO)
+
+    # Same bytes under another name → hit; different params → miss
+    copy = _write(work, "copy.jpg", b"source-bytes")
+    assert cache.get_or_create(copy, 'upload', produce, max_height=180) == first
+    assert len(calls) == 1
+    cache.get_or_create(source, 'upload', produce, max_height=240)
+    assert len(calls) == 2
+
+    # Index survives restart
+    reloaded = DerivedImageCache(cache_dir=str(cache.cache_dir))
+    assert reloaded.get(reloaded.key_for(source, 'upload', max_height=180)) == first
+    print("  ✅ cache hit by content hash + params")
+
+
+def test_lru_eviction():
+    work = tempfile.mkdtemp()
+    cache = DerivedImageCache(cache_dir=tempfile.mkdtemp(), max_bytes=250, protect_seconds=0)
+    keys = []
+    for i in range(3):
+        source = _write(work, f"s{i}.jpg", f"src{i}".encode())
+        key = cache.key_for(source, 'upload')
+        cache.put(key, _write(work, f"o{i}.jpg", b"x" * 100))
+        keys.append(key)
+        if i == 1:
+            cache.get(keys[0])  # touch → s1 is now the oldest
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) and cache.get(keys[2])
+    assert cache.stats()['bytes'] <= 250
+    print("  ✅ LRU eviction under size cap")
+
+
+def test_eviction_spares_new_and_in_use_entries():
+    work = tempfile.mkdtemp()
+    cache = DerivedImageCache(cache_dir=tempfile.mkdtemp(), max_bytes=150)
+    k0 = cache.key_for(_write(work, "s0.jpg", b"src0"), 'upload')
+    k1 = cache.key_for(_write(work, "s1.jpg", b"src1"), 'upload')
+    in_use = cache.put(k0, _write(work, "o0.jpg", b"x" * 100))
+    new = cache.put(k1, _write(work, "o1.jpg", b"x" * 100))
+    assert os.path.exists(in_use) and os.path.exists(new)  # k0 vừa dùng (đang upload) → không xoá
+
+    # Lớn hơn cả giới hạn → không cache, trả lại file gốc
+    big = _write(work, "big.jpg", b"x" * 200)
+    k2 = cache.key_for(_write(work, "s2.jpg", b"src2"), 'upload')
+    assert cache.put(k2, big) == big and os.path.exists(big) and cache.get(k2) is None
+    print("  ✅ eviction spares the new entry and recently used files")
+
+
+def test_put_existing_key_keeps_returned_file():
+    work = tempfile.mkdtemp()
+    cache = DerivedImageCache(cache_dir=tempfile.mkdtemp())
+    key = cache.key_for(_write(work, "s.jpg", b"src"), 'upload')
+    first = cache.put(key, _write(work, "fb_1.jpg", b"out-1"))
+    late = _write(work, "fb_2.jpg", b"out-2")  # lần xử lý song song thứ 2 của cùng nguồn
+    assert cache.put(key, late) == first
+    assert os.path.exists(first) and not os.path.exists(late)
+    print("  ✅ second put of a live key keeps the file already handed out")
+
+
+def test_hit_does_not_rewrite_index():
+    work = tempfile.mkdtemp()
+    cache = DerivedImageCache(cache_dir=tempfile.mkdtemp())
+    key = cache.key_for(_write(work, "s.jpg", b"src"), 'upload')
+    cache.put(key, _write(work, "o.jpg", b"out"))
+    before = cache.index_file.read_text()
+    for _ in range(5):
+        assert cache.get(key)
+    assert cache.index_file.read_text() == before
+    cache.flush()
+    assert cache.index_file.read_text() != before
+    print("  ✅ last_used flushed lazily")
+
+
+def test_url_source_not_cached():
+    cache = DerivedImageCache(cache_dir=tempfile.mkdtemp())
+    assert cache.key_for("https://example.com/a.jpg", 'upload') is None
+    print("  ✅ URL sources bypass cache")
+
+
+if __name__ == "__main__":
+    print("\n🚀 DERIVED IMAGE CACHE TEST")
+    test_get_or_create_reuses_output()
+    test_lru_eviction()
+    test_eviction_spares_new_and_in_use_entries()
+    test_put_existing_key_keeps_returned_file()
+    test_hit_does_not_rewrite_index()
+    test_url_source_not_cached()
+    print("\n🎉 ALL TESTS PASSED!")
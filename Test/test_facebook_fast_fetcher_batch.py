@@ -0,0 +1,107 @@
+"""
+Test FacebookFastFetcher batch song song + race mode (không cần mạng)
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model.video_metadata_cache as video_metadata_cache
+from model.facebook_fast_fetcher import FacebookFastFetcher, FetchCancelled, HostRateBudget
+
+# Kho metadata riêng cho test (không đọc/ghi .cache/ của app)
+video_metadata_cache._cache = video_metadata_cache.VideoMetadataCache(
+    db_path=os.path.join(tempfile.mkdtemp(), "meta.sqlite3"), legacy_dir=None)
+
+
+class SlowFetcher(FacebookFastFetcher):
+    """oEmbed chậm 0.2s / URL, các strategy khác luôn lỗi"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.peak = 0
+        self._count_lock = threading.Lock()
+
+    def fetch_via_oembed(self, url):
+        with self._count_lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.2)
+        with self._count_lock:
+            self.active -= 1
+        return {'success': True, 'title': url.rsplit('=', 1)[-1], 'thumbnail': '', 'method': 'oembed'}
+
+    def fetch_via_mobile_scrape(self, url):
+        return {'success': False, 'error': 'offline'}
+
+
+def test_concurrent_batch_keeps_order():
+    fetcher = SlowFetcher(max_workers=8)
+    urls = [f"https://www.facebook.com/watch/?v={i}" for i in range(24)]
+    start = time.time()
+    results = fetcher.batch_get_videos(urls)
+    elapsed = time.time() - start
+    assert [r['title'] for r in results] == [str(i) for i in range(24)]
+    assert 1 < fetcher.peak <= 8
+    assert elapsed < 24 * 0.2 / 3
+    print(f"  ✅ 24 URLs in {elapsed:.2f}s (sequential ≈ {24 * 0.2:.1f}s), peak {fetcher.peak} in flight")
+
+    # Lần 2: trả lời hoàn toàn từ cache
+    fetcher.peak = 0
+    again = fetcher.batch_get_videos(urls)
+    assert [r['title'] for r in again] == [str(i) for i in range(24)]
+    assert fetcher.peak == 0 and all(r.get('cached') for r in again)
+    print("  ✅ second batch answered from metadata cache")
+
+
+def test_race_takes_first_success():
+    class RaceFetcher(FacebookFastFetcher):
+        def fetch_via_oembed(self, url):
+            time.sleep(0.5)
+            # Next request of the losing strategy is never sent
+            self.loser_cancelled = self._local.cancel.is_set()
+            return {'success': True, 'title': 'slow', 'method': 'oembed'}
+
+        def fetch_via_mobile_scrape(self, url):
+            return {'success': True, 'title': 'fast', 'method': 'mobile_scrape'}
+
+    fetcher = RaceFetcher()
+    start = time.time()
+    result = fetcher.get_video_info("https://www.facebook.com/watch/?v=1", race=True, use_cache=False)
+    assert result['title'] == 'fast'
+    assert time.time() - start < 0.4
+    time.sleep(0.6)
+    assert fetcher.loser_cancelled
+    print("  ✅ race returns first success without waiting for the loser")
+
+
+def test_host_rate_budget():
+    budget = HostRateBudget(rate=20, burst=2)
+    start = time.time()
+    for _ in range(6):
+        budget.acquire("https://www.facebook.com/x")
+    budget.acquire("https://graph.facebook.com/x")  # other host: own bucket
+    elapsed = time.time() - start
+    assert 0.15 < elapsed < 0.5
+    cancel = threading.Event()
+    cancel.set()
+    try:
+        budget.acquire("https://www.facebook.com/x", cancel)
+        assert False, "expected FetchCancelled"
+    except FetchCancelled:
+        pass
+    print(f"  ✅ 6 requests at 20/s burst 2 → {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    print("\n🚀 FACEBOOK FAST FETCHER BATCH TEST")
+    test_concurrent_batch_keeps_order()
+    test_race_takes_first_success()
+    test_host_rate_budget()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,101 @@
+"""
+Test Facebook Thumbnail batch (process pool)
+- optimize_many giữ thứ tự, tên output không trùng
+- Ảnh JPEG lớn được draft-decode, kết quả vẫn 1920x1080
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from model.derived_image_cache import DerivedImageCache
+import model.facebook_thumbnail_optimizer as fb_optimizer
+from model.facebook_thumbnail_optimizer import FacebookThumbnailOptimizerUltra, optimize_many
+
+# Cache riêng cho test, không đụng .cache/ của app
+DerivedImageCache._shared = DerivedImageCache(cache_dir=tempfile.mkdtemp())
+
+
+def _make_jpeg(folder, name, size, color):
+    path = os.path.join(folder, name)
+    Image.new('RGB', size, color).save(path, 'JPEG', quality=90)
+    return path
+
+
+def test_optimize_many_keeps_order():
+    folder = tempfile.mkdtemp()
+    paths = [
+        _make_jpeg(folder, "portrait.jpg", (2000, 4000), (200, 30, 30)),
+        _make_jpeg(folder, "landscape.jpg", (5000, 3000), (30, 200, 30)),
+        _make_jpeg(folder, "small.jpg", (800, 600), (30, 30, 200)),
+    ]
+    outputs = optimize_many(paths, output_dir=folder)
+    assert len(outputs) == 3 and len(set(outputs)) == 3
+    for out in outputs:
+        assert out and Image.open(out).size == (1920, 1080)
+    # Thứ tự giữ nguyên: ảnh landscape xanh lá ở vị trí 2
+    r, g, b = Image.open(outputs[1]).convert('RGB').getpixel((960, 540))
+    assert g > r and g > b
+    assert optimize_many(paths, output_dir=folder) == outputs
+    print("  ✅ optimize_many: 3 ảnh, đúng thứ tự, 1920x1080, lần 2 lấy từ cache")
+
+
+def test_same_source_twice_in_batch():
+    folder = tempfile.mkdtemp()
+    avatar = _make_jpeg(folder, "avatar.jpg", (1200, 1200), (120, 80, 40))
+    outputs = optimize_many([avatar, avatar], output_dir=folder)
+    assert outputs[0] == outputs[1] and os.path.exists(outputs[0])
+    print("  ✅ same source twice → processed once, both posts get an existing file")
+
+
+def test_draft_decode_large_jpeg():
+    folder = tempfile.mkdtemp()
+    img = Image.open(_make_jpeg(folder, "big.jpg", (7680, 4320), (90, 90, 90)))
+    FacebookThumbnailOptimizerUltra._draft_for_target(img, 1920, 1080)
+    assert img.size[0] >= 1920 and img.size[1] >= 1080
+    assert img.size[0] < 7680
+    print(f"  ✅ draft decode 7680x4320 → {img.size}")
+
+
+def test_concurrent_posts_share_one_batch():
+    """Thumbnail của nhiều bài chuẩn bị song song → 1 lần optimize_many"""
+    calls = []
+    orig = fb_optimizer.optimize_many
+
+    def fake_optimize_many(paths, enhance=True, output_dir="thumbnails_optimized"):
+        calls.append(list(paths))
+        return [f"{p}.fb.jpg" for p in paths]
+
+    fb_optimizer.optimize_many = fake_optimize_many
+    try:
+        batcher = fb_optimizer._ThumbnailBatcher(window=0.3)
+        results = {}
+
+        def post(i):
+            results[i] = batcher.submit(f"post{i}.jpg").result(timeout=5)
+
+        threads = [threading.Thread(target=post, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        fb_optimizer.optimize_many = orig
+    assert len(calls) == 1 and sorted(calls[0]) == [f"post{i}.jpg" for i in range(4)]
+    assert all(results[i] == f"post{i}.jpg.fb.jpg" for i in range(4))
+    print("  ✅ 4 concurrent thumbnails → 1 optimize_many call")
+
+
+if __name__ == "__main__":
+    print("\n🚀 FACEBOOK THUMBNAIL BATCH TEST")
+    test_optimize_many_keeps_order()
+    test_same_source_twice_in_batch()
+    test_draft_decode_large_jpeg()
+    test_concurrent_posts_share_one_batch()
+    print("\n🎉 ALL TESTS PASSED!")
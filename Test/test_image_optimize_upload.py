@@ -0,0 +1,64 @@
+"""
+Test ImageAPI.optimize_image_for_upload
+- JPEG lớn: draft decode, kết quả đúng 180p
+- target_bytes: output không vượt ngân sách
+- Cùng nguồn + cùng params → dùng lại output (DerivedImageCache)
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw
+
+from model.derived_image_cache import DerivedImageCache
+from model.image_api import ImageAPI
+
+# Cache riêng cho test, không đụng .cache/ của app
+DerivedImageCache._shared = DerivedImageCache(cache_dir=tempfile.mkdtemp())
+
+
+def _make_jpeg(size=(4000, 3000)):
+    path = os.path.join(tempfile.mkdtemp(), "source.jpg")
+    img = Image.new('RGB', size, (40, 120, 200))
+    draw = ImageDraw.Draw(img)
+    for x in range(0, size[0], 50):
+        draw.line((x, 0, size[0] - x, size[1]), fill=(x % 255, 200, 90), width=7)
+    img.save(path, 'JPEG', quality=95)
+    return path
+
+
+def test_resize_to_180p():
+    out = ImageAPI().optimize_image_for_upload(_make_jpeg(), max_height=180, quality=55)
+    assert DerivedImageCache.shared().owns(out)
+    assert Image.open(out).size == (240, 180)
+    print("  ✅ 4000x3000 → 240x180")
+
+
+def test_target_bytes():
+    source = _make_jpeg()
+    out = ImageAPI().optimize_image_for_upload(source, max_width=1200, quality=90, target_bytes=120 * 1024)
+    assert os.path.getsize(out) <= 120 * 1024
+    assert Image.open(out).size == (1200, 900)
+    print(f"  ✅ target 120KB → {os.path.getsize(out) // 1024}KB")
+
+
+def test_reuses_cached_output():
+    source = _make_jpeg((1600, 1200))
+    api = ImageAPI()
+    first = api.optimize_image_for_upload(source, max_height=180, quality=55)
+    mtime = os.path.getmtime(first)
+    again = ImageAPI().optimize_image_for_upload(source, max_height=180, quality=55)
+    assert again == first and os.path.getmtime(again) == mtime
+    print("  ✅ cached output reused")
+
+
+if __name__ == "__main__":
+    print("\n🚀 IMAGE OPTIMIZE FOR UPLOAD TEST")
+    test_resize_to_180p()
+    test_target_bytes()
+    test_reuses_cached_output()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,185 @@
+"""
+Test Job Journal + BatchUploadManager resume
+Crash giữa chừng → chạy lại chỉ xử lý các bài chưa published
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from model.job_journal import JobJournal, post_fingerprint
+from model.batch_upload_manager import BatchUploadManager
+from model.wp_high_volume_uploader import WordPressHighVolumeUploader
+from model.wp_rest_api_fast import WordPressRESTClientFast
+
+
+def test_journal_replay():
+    """Trạng thái mới nhất được replay, dòng bị cắt dở bị bỏ qua"""
+    path = os.path.join(tempfile.mkdtemp(), "journal.jsonl")
+    journal = JobJournal(path)
+    journal.record("a", "media_uploaded", media_id=5)
+    journal.record("a", "draft_created", post_id=9)
+    journal.record("b", "published", result="https://x/b")
+    journal.close()
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"fp": "c", "state": "publ')  # torn write
+
+    journal = JobJournal(path)
+    assert journal.state_of("a") == {'state': 'draft_created', 'data': {'media_id': 5, 'post_id': 9}}
+    assert journal.is_done("b")
+    assert journal.state_of("c") is None
+    journal.close()
+    print("  ✅ replay OK")
+
+
+def test_fingerprint_is_stable():
+    post = {'title': 'Ferrari', 'video_url': 'https://vimeo.com/1'}
+    assert post_fingerprint(post) == post_fingerprint(dict(post))
+    assert post_fingerprint(post) != post_fingerprint({'title': 'Ferrari', 'video_url': 'https://vimeo.com/2'})
+    assert post_fingerprint({'id': 42, 'title': 'x'}) == "42"
+
+
+def test_resume_skips_published():
+    """Lần 2 chỉ chạy lại bài failed"""
+    tmp = tempfile.mkdtemp()
+    posts = [{'title': f'Post {i}'} for i in range(10)]
+    calls = []
+
+    def flaky_upload(post):
+        calls.append(post['title'])
+        return (post['title'] != 'Post 3'), "ok"
+
+    manager = BatchUploadManager(
+        batch_size=4, max_parallel_batches=2, max_workers_per_batch=2,
+        checkpoint_file=os.path.join(tmp, "cp.json"),
+        journal_file=os.path.join(tmp, "journal.jsonl"),
+    )
+    manager.retry_queue.put = lambda post: None  # no in-run retries for this test
+    manager.process_posts_batch([dict(p) for p in posts], flaky_upload)
+    manager.close()
+    assert len(calls) == 10
+
+    calls.clear()
+    manager = BatchUploadManager(
+        checkpoint_file=os.path.join(tmp, "cp.json"),
+        journal_file=os.path.join(tmp, "journal.jsonl"),
+    )
+    manager.process_posts_batch([dict(p) for p in posts], lambda post: (calls.append(post['title']) or True, "ok"))
+    manager.close()
+    assert calls == ['Post 3']
+    print("  ✅ resume OK")
+
+
+def test_resume_after_failure_keeps_stage():
+    """Bài lỗi sau khi đã tạo draft → lần sau publish draft cũ, không tạo draft / upload media lại"""
+    tmp = tempfile.mkdtemp()
+    posts = [{'title': 'Draft then fail'}, {'title': 'Fail early'}]
+
+    manager = BatchUploadManager(
+        checkpoint_file=os.path.join(tmp, "cp.json"),
+        journal_file=os.path.join(tmp, "journal.jsonl"),
+    )
+    manager.retry_queue.put = lambda post: None
+
+    def failing_upload(post):
+        if post['title'] == 'Draft then fail':
+            manager.mark_stage(post, 'media_uploaded', media_id=55)
+            manager.mark_stage(post, 'draft_created', post_id=12)
+        return False, "publish timeout"
+
+    manager.process_posts_batch([dict(p) for p in posts], failing_upload)
+    manager.close()
+
+    seen = {}
+    manager = BatchUploadManager(
+        checkpoint_file=os.path.join(tmp, "cp.json"),
+        journal_file=os.path.join(tmp, "journal.jsonl"),
+    )
+    manager.process_posts_batch([dict(p) for p in posts],
+                                lambda post: (seen.setdefault(post['title'], post['_job_state']) and True, "ok"))
+    manager.close()
+    draft = seen['Draft then fail']
+    assert draft['state'] == 'draft_created'
+    assert draft['data']['post_id'] == 12 and draft['data']['media_id'] == 55
+    assert draft['data']['error'] == "publish timeout"
+    assert seen['Fail early']['state'] == 'failed'
+    print("  ✅ failure keeps draft_created for resume")
+
+
+class _PublishSession:
+    def __init__(self, outcome):
+        self.outcome = outcome
+
+    def post(self, url, **kwargs):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        status = self.outcome
+
+        class _Resp:
+            status_code = status
+
+            def json(self):
+                return {'link': 'https://x/?p=12'}
+        return _Resp()
+
+
+def test_publish_post_states():
+    client = WordPressRESTClientFast("https://x", "u", "p", verbose=False)
+    for outcome, state in [(200, 'published'), (404, 'missing'), (403, 'failed'),
+                           (requests.exceptions.ReadTimeout(), 'no_reply'),
+                           (requests.exceptions.ConnectionError("reset"), 'failed')]:
+        client.session = _PublishSession(outcome)
+        assert client.publish_post(12)[0] == state, outcome
+    print("  ✅ publish_post: published / no_reply / missing / failed")
+
+
+class _FakeWP:
+    def __init__(self, publish_state):
+        self.publish_state = publish_state
+        self.created = []
+
+    def publish_post(self, post_id):
+        return self.publish_state
+
+    def post_article_fast(self, blog_post, on_stage=None):
+        self.created.append(blog_post)
+        return True, "https://x/?p=99"
+
+
+def test_resume_draft_publish_failure():
+    """Resume từ draft_created: publish lỗi → báo failed; draft đã bị xoá (404) → tạo lại bài"""
+    uploader = WordPressHighVolumeUploader.__new__(WordPressHighVolumeUploader)
+    uploader.batch_manager = BatchUploadManager.__new__(BatchUploadManager)
+
+    def job():
+        return {'blog_post': type('Post', (), {'title': 'T'})(),
+                '_job_state': {'state': 'draft_created', 'data': {'post_id': 12, 'post_url': 'https://x/?p=12'}}}
+
+    uploader.wp_client = _FakeWP(('failed', 'HTTP 403'))
+    ok, msg = uploader._upload_single_post(job())
+    assert not ok and '403' in msg and not uploader.wp_client.created
+
+    uploader.wp_client = _FakeWP(('no_reply', None))
+    assert uploader._upload_single_post(job()) == (True, 'https://x/?p=12')
+
+    uploader.wp_client = _FakeWP(('missing', 'HTTP 404'))
+    assert uploader._upload_single_post(job()) == (True, "https://x/?p=99")
+    assert len(uploader.wp_client.created) == 1
+    print("  ✅ resume: failed publish reported, missing draft re-created")
+
+
+if __name__ == "__main__":
+    print("\n🚀 JOB JOURNAL TEST")
+    test_journal_replay()
+    test_fingerprint_is_stable()
+    test_resume_skips_published()
+    test_resume_after_failure_keeps_stage()
+    test_publish_post_states()
+    test_resume_draft_publish_failure()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,64 @@
+"""
+Test Media Dedup Cache
+Cùng 1 ảnh (cùng bytes) chỉ upload 1 lần cho mỗi site
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.media_dedup_cache import MediaDedupCache, hash_file
+
+
+def _make_image(data):
+    fd, path = tempfile.mkstemp(suffix=".jpg")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return path
+
+
+def test_store_and_lookup_persists():
+    cache_dir = tempfile.mkdtemp()
+    path = _make_image(b"\xff\xd8fake-jpeg-bytes")
+    try:
+        cache = MediaDedupCache("https://site.example", cache_dir=cache_dir)
+        digest, cached = cache.lookup_file(path)
+        assert cached is None
+
+        cache.store(digest, 123, "https://site.example/wp-content/uploads/a.jpg")
+
+        # New instance reads the index from disk
+        reloaded = MediaDedupCache("https://site.example", cache_dir=cache_dir)
+        assert reloaded.lookup(hash_file(path)) == (123, "https://site.example/wp-content/uploads/a.jpg")
+
+        # Other sites never see it
+        other = MediaDedupCache("https://other.example", cache_dir=cache_dir)
+        assert other.lookup(digest) is None
+        print("  ✅ store/lookup OK")
+    finally:
+        os.remove(path)
+
+
+def test_stale_entry_is_verified():
+    cache = MediaDedupCache("https://site.example", cache_dir=tempfile.mkdtemp(), ttl=0)
+    cache.store("abc", 7, "https://site.example/x.jpg")
+    calls = []
+
+    def gone(media_id, url):
+        calls.append(media_id)
+        return False
+
+    assert cache.lookup("abc", verify_func=gone) is None
+    assert calls == [7]
+    assert cache.lookup("abc") is None
+    print("  ✅ stale entry verified + dropped")
+
+
+if __name__ == "__main__":
+    print("\n🚀 MEDIA DEDUP CACHE TEST")
+    test_store_and_lookup_persists()
+    test_stale_entry_is_verified()
+    print("\n🎉 ALL TESTS PASSED!")
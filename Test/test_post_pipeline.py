@@ -0,0 +1,84 @@
+"""
+Test Post Pipeline
+Các stage chạy chồng lên nhau: bài N+1 optimize trong khi bài N đang đăng
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.post_pipeline import PipelineJob, StagedPipeline
+
+
+def test_stages_overlap():
+    """3 stage x 0.1s, 6 bài: tuần tự = 1.8s, pipeline ≈ 0.8s"""
+    active = set()
+    overlaps = []
+    lock = threading.Lock()
+
+    def stage(name):
+        def run(job):
+            with lock:
+                active.add(name)
+                if len(active) > 1:
+                    overlaps.append(tuple(sorted(active)))
+            time.sleep(0.1)
+            with lock:
+                active.discard(name)
+            job.trail = getattr(job, 'trail', []) + [name]
+            return job
+        return run
+
+    done = []
+    pipeline = StagedPipeline(
+        [('prepare', stage('prepare'), 1), ('upload', stage('upload'), 1), ('publish', stage('publish'), 1)],
+        on_done=done.append, queue_size=2
+    )
+    start = time.time()
+    for i in range(6):
+        pipeline.submit(PipelineJob(i))
+    assert pipeline.wait_idle(timeout=5)
+    elapsed = time.time() - start
+    pipeline.close()
+
+    assert sorted(job.data for job in done) == list(range(6))
+    assert all(job.trail == ['prepare', 'upload', 'publish'] for job in done)
+    assert overlaps, "stages never ran concurrently"
+    assert elapsed < 1.5, f"no pipelining: {elapsed:.2f}s"
+
+    stats = pipeline.stats()
+    assert [s['processed'] for s in stats] == [6, 6, 6]
+    print(f"  ✅ overlap OK ({elapsed:.2f}s) - {pipeline.format_stats()}")
+
+
+def test_failed_stage_stops_job():
+    def boom(job):
+        if job.data == 1:
+            raise ValueError("upload failed")
+        return job
+
+    done = []
+    pipeline = StagedPipeline(
+        [('upload', boom, 2), ('publish', lambda job: setattr(job, 'result', 'ok'), 1)],
+        on_done=done.append
+    )
+    for i in range(3):
+        pipeline.submit(PipelineJob(i))
+    pipeline.close()
+
+    failed = [job for job in done if job.error]
+    assert len(done) == 3 and len(failed) == 1
+    assert failed[0].failed_stage == 'upload' and failed[0].result is None
+    assert pipeline.stats()[0]['failed'] == 1
+    print("  ✅ failed job stops at its stage")
+
+
+if __name__ == "__main__":
+    print("\n🚀 POST PIPELINE TEST")
+    test_stages_overlap()
+    test_failed_stage_stops_job()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,90 @@
+"""
+Test compiled theme templates
+- Render 1 lượt cho kết quả giống chuỗi str.replace + regex cũ
+- Template chỉ đọc từ đĩa 1 lần, đọc lại khi file thay đổi
+"""
+
+import os
+import re
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.theme_manager import CompiledTemplate, ThemeManager, load_compiled_template
+
+
+def _legacy_render(template, values):
+    html = template
+    for name, value in values.items():
+        html = html.replace('{{' + name + '}}', value)
+    return re.sub(r'<div class="[^"]*">\s*</div>', '', html)
+
+
+def test_matches_legacy_output():
+    manager = ThemeManager()
+    for theme_id, info in manager.themes.items():
+        with open(info['file'], encoding='utf-8') as f:
+            raw = f.read()
+        for video in ('', '[embed]https://vimeo.com/1[/embed]'):
+            values = {
+                'POST_TITLE': 'Ferrari SF90', 'VIDEO_EMBED': video, 'FEATURED_IMAGE': '',
+                'EXCERPT': 'Excerpt', 'MAIN_CONTENT': '<p>Body</p><div class="x"> </div>',
+                'CONTENT_IMAGES': '', 'PUBLISH_DATE': 'May 1, 2025', 'READ_TIME': '1',
+                'VIEW_COUNT': '1,234', 'TAGS': '', 'SPECIFICATIONS': '', 'RELATED_POSTS': '',
+            }
+            assert CompiledTemplate(raw).render(values) == _legacy_render(raw, values), theme_id
+    print("  ✅ compiled render == legacy replace chain (all themes)")
+
+
+def test_reload_on_change():
+    path = os.path.join(tempfile.mkdtemp(), "t.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<h1>{{POST_TITLE}}</h1>")
+    _, first = load_compiled_template(path)
+    _, again = load_compiled_template(path)
+    assert first is again
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<h2>{{POST_TITLE}}</h2>!")
+    os.utime(path, (time.time() + 5, time.time() + 5))
+    _, changed = load_compiled_template(path)
+    assert changed is not first
+    assert changed.render({'POST_TITLE': 'x'}) == "<h2>x</h2>!"
+    print("  ✅ reloaded after file change")
+
+
+def test_render_speed():
+    """Cùng input được bấm giờ: kết quả compiled == legacy, và compiled không chậm hơn legacy"""
+    manager = ThemeManager()
+    with open(manager.themes['supercar']['file'], encoding='utf-8') as f:
+        raw = f.read()
+    compiled = CompiledTemplate(raw)
+    inputs = [{
+        'POST_TITLE': f'Post {i}', 'VIDEO_EMBED': '' if i % 2 else f'[embed]https://vimeo.com/{i}[/embed]',
+        'FEATURED_IMAGE': '', 'EXCERPT': f'Excerpt {i}', 'MAIN_CONTENT': f'<p>Body {i}</p>',
+        'CONTENT_IMAGES': '', 'PUBLISH_DATE': 'May 1, 2025', 'READ_TIME': '1',
+        'VIEW_COUNT': str(i), 'TAGS': '', 'SPECIFICATIONS': '', 'RELATED_POSTS': '',
+    } for i in range(1000)]
+
+    start = time.perf_counter()
+    new = [compiled.render(values) for values in inputs]
+    compiled_s = time.perf_counter() - start
+    start = time.perf_counter()
+    old = [_legacy_render(raw, values) for values in inputs]
+    legacy_s = time.perf_counter() - start
+
+    assert new == old
+    assert compiled_s <= legacy_s * 1.2, (compiled_s, legacy_s)
+    print(f"  ⏱️ 1000 renders: compiled {compiled_s * 1000:.0f} ms vs legacy {legacy_s * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    print("\n🚀 THEME TEMPLATE CACHE TEST")
+    test_matches_legacy_output()
+    test_reload_on_change()
+    test_render_speed()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,66 @@
+"""
+Test streaming upload bodies
+Verify FileUploadBody / MultipartFileBody gửi đúng bytes và rewind được khi retry
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.upload_body import FileUploadBody, MultipartFileBody
+
+
+def _make_file(size):
+    fd, path = tempfile.mkstemp(suffix=".jpg")
+    with os.fdopen(fd, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+def test_file_body_rewind():
+    """Body đọc hết rồi rewind vẫn trả đúng nội dung"""
+    path = _make_file(200_000)
+    try:
+        with open(path, "rb") as f:
+            expected = f.read()
+        with FileUploadBody(path, chunk_size=8192) as body:
+            assert len(body) == len(expected)
+            assert b"".join(body.iter_chunks()) == expected
+            body.rewind()
+            assert body.read() == expected
+        print("  ✅ FileUploadBody OK")
+    finally:
+        os.remove(path)
+
+
+def test_multipart_body_matches_length():
+    """Multipart body: Content-Length khớp, file nằm nguyên vẹn giữa preamble/epilogue"""
+    path = _make_file(50_000)
+    try:
+        with open(path, "rb") as f:
+            expected = f.read()
+        fields = {"action": "upload-attachment", "_wpnonce": "abc123"}
+        with MultipartFileBody(fields, "async-upload", path) as body:
+            first = b"".join(iter(lambda: body.read(1000), b""))
+            body.rewind()
+            second = b"".join(body.iter_chunks())
+
+            assert first == second
+            assert len(first) == len(body)
+            assert b'name="_wpnonce"\r\n\r\nabc123\r\n' in first
+            assert b'filename="' + os.path.basename(path).encode() + b'"' in first
+            assert expected in first
+            assert first.endswith(f"--{body.boundary}--\r\n".encode())
+        print("  ✅ MultipartFileBody OK")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    print("\n🚀 UPLOAD BODY TEST")
+    test_file_body_rewind()
+    test_multipart_body_matches_length()
+    print("\n🎉 ALL TESTS PASSED!")
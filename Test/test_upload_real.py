@@ -89,7 +89,8 @@ def test_upload():
         title=f"Test Upload - {filename}",
         description="Test upload from WprTool using Vimeo API",
         privacy="nobody",  # Private video
-        log_callback=log_callback
+        log_callback=log_callback,
+        wait=True  # đợi Vimeo xử lý xong để in thumbnail
     )
     
     print()
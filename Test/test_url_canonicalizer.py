@@ -0,0 +1,87 @@
+"""
+Test URL Canonicalizer
+Mọi dạng link của 1 video → cùng (platform, id); batch import gộp link trùng
+"""
+
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.batch_import import BatchImporter
+from model.url_canonicalizer import canonical_key, canonicalize, dedupe
+
+
+def test_same_video_same_identity():
+    groups = [
+        ('youtube', 'dQw4w9WgXcQ', [
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10",
+            "https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+            "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+            "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+        ]),
+        ('vimeo', '76979871', [
+            "https://vimeo.com/76979871",
+            "https://vimeo.com/channels/staffpicks/76979871",
+            "https://player.vimeo.com/video/76979871?h=abc",
+        ]),
+        ('facebook', '1234567890', [
+            "https://www.facebook.com/watch/?v=1234567890",
+            "https://m.facebook.com/somepage/videos/1234567890/",
+            "https://web.facebook.com/somepage/videos/some-title/1234567890",
+            "https://www.facebook.com/video.php?v=1234567890",
+            "https://www.facebook.com/reel/1234567890",
+        ]),
+        ('fbwatch', 'AbC_12', ["https://fb.watch/AbC_12/"]),
+        ('tiktok', '7301234567890', [
+            "https://www.tiktok.com/@user/video/7301234567890?lang=en",
+            "https://m.tiktok.com/v/7301234567890.html",
+        ]),
+        ('tiktok_short', 'ZMabc123', ["https://vm.tiktok.com/ZMabc123/"]),
+    ]
+    for platform, video_id, urls in groups:
+        for url in urls:
+            assert canonicalize(url) == (platform, video_id), url
+    assert canonicalize("https://example.com/page") is None
+    assert canonical_key("https://www.example.com/a/") == canonical_key("example.com/a")
+    print("  ✅ all URL forms → same identity")
+
+
+def test_dedupe_keeps_first_and_order():
+    links = [
+        ("https://youtu.be/dQw4w9WgXcQ", None),
+        ("https://vimeo.com/1", "Title"),
+        ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10", "Dup"),
+        ('<iframe src="x"></iframe>', None),
+        ('<iframe src="x"></iframe>', None),
+    ]
+    unique, dups = dedupe(links, key=lambda item: item[0])
+    assert dups == 2
+    assert [u for u, _ in unique] == ["https://youtu.be/dQw4w9WgXcQ", "https://vimeo.com/1", '<iframe src="x"></iframe>']
+    print("  ✅ dedupe: first occurrence kept, duplicates counted")
+
+
+def test_batch_importer_collapses_duplicates():
+    path = os.path.join(tempfile.mkdtemp(), "links.txt")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("https://youtu.be/dQw4w9WgXcQ\n"
+                "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10\n"
+                "https://m.facebook.com/p/videos/123/\n"
+                "https://www.facebook.com/watch/?v=123\n"
+                "https://vimeo.com/5\n")
+    importer = BatchImporter()
+    ok, msg = importer.import_file(path)
+    assert ok and len(importer.get_videos()) == 3 and importer.duplicates == 2
+    assert "2 link trùng" in msg
+    print(f"  ✅ BatchImporter: {msg}")
+
+
+if __name__ == "__main__":
+    print("\n🚀 URL CANONICALIZER TEST")
+    test_same_video_same_identity()
+    test_dedupe_keeps_first_and_order()
+    test_batch_importer_collapses_duplicates()
+    print("\n🎉 ALL TESTS PASSED!")
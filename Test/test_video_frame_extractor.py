@@ -0,0 +1,143 @@
+"""
+Test Video Frame Extractor (cần ffmpeg trong PATH)
+1 lần ffmpeg → N frame nét nhất; thumbnail Vimeo + Facebook của cùng video dùng chung 1 lần decode
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+
+import model.video_frame_extractor as video_frame_extractor
+from model.facebook_thumbnail_optimizer import FacebookThumbnailOptimizerUltra
+from model.video_frame_extractor import extract_best_frames
+from model.vimeo_api import VimeoAPIUploader
+
+HAS_FFMPEG = shutil.which('ffmpeg') is not None
+SHARP_FRAMES = range(38, 43)  # 1.52s - 1.68s @ 25 fps
+
+
+def _make_video(frames=100, size=(1280, 720)):
+    path = os.path.join(tempfile.mkdtemp(), "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, size)
+    rng = np.random.default_rng(1)
+    base = (rng.random((size[1] // 16, size[0] // 16, 3)) * 200 + 30).astype(np.uint8)
+    sharp = cv2.resize(base, size, interpolation=cv2.INTER_NEAREST)
+    blurred = cv2.GaussianBlur(sharp, (0, 0), 6)
+    for i in range(frames):
+        writer.write(sharp if i in SHARP_FRAMES else blurred)
+    writer.release()
+    return path
+
+
+class _CountingPass:
+    def __init__(self):
+        self.calls = 0
+        self._orig = video_frame_extractor._run_pass
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self._orig(*args, **kwargs)
+
+
+def test_best_frames_in_one_pass():
+    if not HAS_FFMPEG:
+        print("  ⏭️ ffmpeg not installed, skipped")
+        return
+    video = _make_video()
+    counter = _CountingPass()
+    video_frame_extractor._run_pass = counter
+    try:
+        candidates = extract_best_frames(video, n=3, start_percent=0.0, end_percent=1.0, samples=100)
+        assert len(candidates) == 3
+        assert candidates[0].score >= candidates[1].score >= candidates[2].score
+        assert 1.5 <= candidates[0].time <= 1.7
+        assert candidates[0].frame.shape == (720, 1280, 3)
+
+        again = extract_best_frames(video, n=1, start_percent=0.0, end_percent=1.0, samples=100)
+        assert counter.calls == 1 and again[0].time == candidates[0].time
+    finally:
+        video_frame_extractor._run_pass = counter._orig
+    print(f"  ✅ sharpest frame at {candidates[0].time:.2f}s, 1 ffmpeg pass for 2 requests")
+
+
+def test_memo_bounded_by_bytes():
+    if not HAS_FFMPEG:
+        print("  ⏭️ ffmpeg not installed, skipped")
+        return
+    assert '-fps_mode' in video_frame_extractor._passthrough_args() or \
+        video_frame_extractor._passthrough_args() == ['-vsync', 'passthrough']
+    video = _make_video()
+    counter = _CountingPass()
+    video_frame_extractor._run_pass = counter
+    os.environ['FRAME_MEMO_MB'] = '4'  # < 3 frame 1280x720 (~2.6MB mỗi frame)
+    try:
+        extract_best_frames(video, n=1, start_percent=0.0, end_percent=1.0, samples=100)
+        extract_best_frames(video, n=1, start_percent=0.0, end_percent=1.0, samples=100)
+        assert counter.calls == 2
+        assert sum(video_frame_extractor._candidates_bytes(c)
+                   for c, _ in video_frame_extractor._memo.values()) <= 4 * 1024 * 1024
+    finally:
+        del os.environ['FRAME_MEMO_MB']
+        video_frame_extractor._run_pass = counter._orig
+    print("  ✅ full-res frames over FRAME_MEMO_MB are not kept in memory")
+
+
+def test_stalled_input_is_killed():
+    if not HAS_FFMPEG or not hasattr(os, 'mkfifo'):
+        print("  ⏭️ ffmpeg / mkfifo not available, skipped")
+        return
+    fifo = os.path.join(tempfile.mkdtemp(), "stalled.mp4")
+    os.mkfifo(fifo)  # không ai ghi → ffmpeg đứng chờ dữ liệu
+    orig = video_frame_extractor.PASS_TIMEOUT
+    video_frame_extractor.PASS_TIMEOUT = 1
+    start = time.time()
+    try:
+        assert video_frame_extractor._run_pass(fifo, 0, 0, 2, 1, None, True) == []
+    finally:
+        video_frame_extractor.PASS_TIMEOUT = orig
+    assert time.time() - start < 15
+    print(f"  ✅ stalled ffmpeg killed after {time.time() - start:.1f}s")
+
+
+def test_vimeo_and_facebook_share_the_pass():
+    if not HAS_FFMPEG:
+        print("  ⏭️ ffmpeg not installed, skipped")
+        return
+    video = _make_video()
+    counter = _CountingPass()
+    video_frame_extractor._run_pass = counter
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())
+    try:
+        optimizer = FacebookThumbnailOptimizerUltra()
+        optimizer.output_dir = tempfile.mkdtemp()
+        fb_frame = optimizer.create_thumbnail_from_video_frame(video, mode='ffmpeg')
+
+        uploader = VimeoAPIUploader.__new__(VimeoAPIUploader)
+        vimeo_thumb = uploader.generate_thumbnail(video, "123")
+
+        assert fb_frame and vimeo_thumb and counter.calls == 1
+        assert cv2.imread(vimeo_thumb).shape[1] == 1280
+        sharp = cv2.Laplacian(cv2.imread(fb_frame, cv2.IMREAD_GRAYSCALE), cv2.CV_64F).var()
+        assert sharp > 100
+    finally:
+        os.chdir(cwd)
+        video_frame_extractor._run_pass = counter._orig
+    print("  ✅ Facebook + Vimeo thumbnails from one ffmpeg pass")
+
+
+if __name__ == "__main__":
+    print("\n🚀 VIDEO FRAME EXTRACTOR TEST")
+    test_best_frames_in_one_pass()
+    test_memo_bounded_by_bytes()
+    test_stalled_input_is_killed()
+    test_vimeo_and_facebook_share_the_pass()
+    print("\n🎉 ALL TESTS PASSED!")
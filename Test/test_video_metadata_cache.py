@@ -0,0 +1,111 @@
+"""
+Test Video Metadata Cache
+Key theo danh tính video, TTL theo platform, cache lỗi, get_many không gọi mạng
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model.video_metadata_cache as video_metadata_cache
+from model.video_metadata_cache import VideoMetadataCache, cached_oembed, video_identity
+
+
+def _cache(**kwargs):
+    return VideoMetadataCache(db_path=os.path.join(tempfile.mkdtemp(), "meta.sqlite3"), legacy_dir=None, **kwargs)
+
+
+def test_identity_normalizes_urls():
+    assert video_identity("https://youtu.be/dQw4w9WgXcQ") == ('youtube', 'dQw4w9WgXcQ')
+    assert video_identity("https://www.youtube.com/watch?feature=x&v=dQw4w9WgXcQ&t=10") == ('youtube', 'dQw4w9WgXcQ')
+    assert video_identity("https://m.facebook.com/page/videos/123456/") == ('facebook', '123456')
+    assert video_identity("https://www.facebook.com/watch/?v=123456") == ('facebook', '123456')
+    assert video_identity("https://player.vimeo.com/video/42") == ('vimeo', '42')
+    assert video_identity("https://www.tiktok.com/@user/video/777") == ('tiktok', '777')
+    print("  ✅ identity: platform + id")
+
+
+def test_hit_across_url_forms_and_get_many():
+    cache = _cache()
+    cache.put("https://youtu.be/dQw4w9WgXcQ", {'success': True, 'title': 'Song', 'thumbnail': 't.jpg'}, source='ytdlp')
+
+    hit = cache.get("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10", source='fb_fast')
+    assert hit['title'] == 'Song' and hit['cached']
+    assert hit['url'] == "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10"
+
+    urls = ["https://youtu.be/dQw4w9WgXcQ", "https://vimeo.com/1"]
+    found = cache.get_many(urls)
+    assert list(found) == ["https://youtu.be/dQw4w9WgXcQ"]
+    print("  ✅ same video, different URL → hit; get_many answers cached only")
+
+
+def test_negative_cache_is_per_source_and_short():
+    cache = _cache(negative_ttl=1)
+    url = "https://www.facebook.com/watch/?v=99"
+    cache.put(url, {'success': False, 'error': 'All methods failed'}, source='fb_fast')
+
+    assert cache.get(url, source='fb_fast')['success'] is False
+    assert cache.get(url, source='ytdlp') is None  # other fetchers still try
+
+    # Failure never overwrites a live success
+    cache.put(url, {'success': True, 'title': 'OK'}, source='ytdlp')
+    cache.put(url, {'success': False, 'error': 'x'}, source='fb_fast')
+    assert cache.get(url, source='fb_fast')['title'] == 'OK'
+
+    other = "https://www.facebook.com/watch/?v=100"
+    cache.put(other, {'success': False, 'error': 'x'}, source='fb_fast')
+    time.sleep(1.1)
+    assert cache.get(other, source='fb_fast') is None
+    print("  ✅ negative entries: per fetcher, short TTL")
+
+
+
+class _FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+    def json(self):
+        return {'title': 'Clip', 'thumbnail_url': 't.jpg'}
+
+
+def test_oembed_caches_only_definitive_errors():
+    import requests
+    statuses = []
+    real_get, real_cache = requests.get, video_metadata_cache._cache
+
+    def fake_get(url, timeout=None):
+        return _FakeResponse(statuses.pop(0))
+
+    requests.get = fake_get
+    video_metadata_cache._cache = _cache()
+    try:
+        url = "https://vimeo.com/5"
+        # 429 / 503 tạm thời → không cache, lần gọi sau hỏi lại site
+        statuses[:] = [429, 503, 200]
+        assert cached_oembed(url, "https://oembed.test/5")['error'] == 'oEmbed HTTP 429'
+        assert cached_oembed(url, "https://oembed.test/5")['error'] == 'oEmbed HTTP 503'
+        assert cached_oembed(url, "https://oembed.test/5")['title'] == 'Clip'
+        assert not statuses
+
+        # 404 / 403 dứt khoát → cache lỗi, không gọi lại mạng
+        for status, vid in ((404, 6), (403, 7)):
+            statuses[:] = [status]
+            other = f"https://vimeo.com/{vid}"
+            assert cached_oembed(other, "https://oembed.test")['error'] == f'oEmbed HTTP {status}'
+            assert cached_oembed(other, "https://oembed.test")['error'] == f'oEmbed HTTP {status}'  # hit, không gọi mạng
+    finally:
+        requests.get, video_metadata_cache._cache = real_get, real_cache
+    print("  ✅ oEmbed: 429/5xx not cached, 404/403 negative-cached")
+
+
+if __name__ == "__main__":
+    print("\n🚀 VIDEO METADATA CACHE TEST")
+    test_identity_normalizes_urls()
+    test_hit_across_url_forms_and_get_many()
+    test_negative_cache_is_per_source_and_short()
+    test_oembed_caches_only_definitive_errors()
+    print("\n🎉 ALL TESTS PASSED!")
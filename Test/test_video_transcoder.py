@@ -0,0 +1,101 @@
+"""
+Test Video Transcoder (cần ffmpeg trong PATH; tự tạo video mẫu bằng lavfi)
+Remux faststart / transcode giảm bitrate + thumbnail cùng lượt, cache theo nội dung, số liệu bytes vs CPU
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model.video_transcoder as video_transcoder
+from model.derived_image_cache import DerivedImageCache
+from model.video_transcoder import plan_transcode, prepare_for_upload, probe_video, transcode_settings
+
+HAS_FFMPEG = shutil.which('ffmpeg') is not None
+
+
+def _make_video(size, kbps, seconds=4):
+    path = os.path.join(tempfile.mkdtemp(), f"clip_{size}_{kbps}.mp4")
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'lavfi', '-i', f"testsrc2=size={size}:rate=30",
+                    '-f', 'lavfi', '-i', 'sine=frequency=440', '-t', str(seconds), '-c:v', 'libx264',
+                    '-b:v', f"{kbps}k", '-c:a', 'aac', '-shortest', path], check=True)
+    return path
+
+
+def _isolate():
+    """Cache + metrics riêng cho test (không dùng .cache/ của app)"""
+    tmp = tempfile.mkdtemp()
+    video_transcoder._cache = DerivedImageCache(cache_dir=os.path.join(tmp, "transcoded"))
+    video_transcoder._stats = video_transcoder.TranscodeStats(metrics_file=os.path.join(tmp, "metrics.jsonl"))
+    return tmp
+
+
+def test_plan():
+    settings = dict(transcode_settings(), max_side=1080, max_kbps=5000, target_mb=0)
+    base = {'duration': 60, 'width': 1920, 'height': 1080, 'vcodec': 'h264', 'acodec': 'aac', 'kbps': 4000}
+    assert plan_transcode(base, settings)[0] == 'remux'
+    assert plan_transcode(dict(base, kbps=16000), settings)[0] == 'transcode'       # phone bitrate
+    assert plan_transcode(dict(base, width=2160, height=3840), settings)[0] == 'transcode'  # 4K dọc
+    assert plan_transcode(dict(base, vcodec='hevc'), settings)[0] == 'transcode'
+    # 60s, mục tiêu 15MB → ~1920 kbps video
+    mode, kbps = plan_transcode(base, dict(settings, target_mb=15))
+    assert mode == 'transcode' and 1800 < kbps < 2000
+    print("  ✅ plan: remux when compliant, transcode for bitrate / size / codec")
+
+
+def test_transcode_remux_thumbnail_and_cache():
+    if not HAS_FFMPEG:
+        print("  ⏭️ ffmpeg not installed, skipped")
+        return
+    tmp = _isolate()
+    big = _make_video("640x360", 6000)
+    small = _make_video("320x240", 300)
+    settings = dict(transcode_settings(), max_side=240, max_kbps=800)
+
+    results = prepare_for_upload([big, small], settings)
+    r_big, r_small = results
+    assert r_big['mode'] == 'transcode' and r_big['bytes_saved'] > 0
+    assert min(probe_video(r_big['path'])['width'], probe_video(r_big['path'])['height']) == 240
+    assert r_small['mode'] == 'remux'
+    with open(r_small['path'], 'rb') as f:
+        head = f.read()
+    assert head.find(b'moov') < head.find(b'mdat')  # faststart
+    assert all(r['thumbnail'] and os.path.getsize(r['thumbnail']) > 0 for r in results)
+    assert os.path.exists(big) and os.path.exists(small)  # file gốc không bị động tới
+
+    stats = video_transcoder.transcode_stats()
+    assert stats.bytes_saved > 0 and stats.cpu_seconds > 0
+    print(f"  ✅ {stats.summary()}")
+
+    again = prepare_for_upload([big], settings)[0]
+    assert again['mode'] == 'cached' and again['path'] == r_big['path'] and again['thumbnail']
+    with open(os.path.join(tmp, "metrics.jsonl"), encoding='utf-8') as f:
+        assert len(f.readlines()) == 3
+    print("  ✅ second run served from content-hash cache")
+
+
+def test_output_larger_than_cache_uploads_original():
+    if not HAS_FFMPEG:
+        print("  ⏭️ ffmpeg not installed, skipped")
+        return
+    tmp = _isolate()
+    video_transcoder._cache = DerivedImageCache(cache_dir=os.path.join(tmp, "transcoded"), max_bytes=1024)
+    big = _make_video("640x360", 6000)
+    result = prepare_for_upload([big], dict(transcode_settings(), max_side=240, max_kbps=800))[0]
+    assert result['path'] == big and os.path.exists(result['path'])
+    assert result['mode'] == 'original' and result['bytes_saved'] == 0
+    assert result['thumbnail'] is None or os.path.exists(result['thumbnail'])
+    print("  ✅ output that does not fit in the cache → original file")
+
+
+if __name__ == "__main__":
+    print("\n🚀 VIDEO TRANSCODER TEST")
+    test_plan()
+    test_transcode_remux_thumbnail_and_cache()
+    test_output_larger_than_cache_uploads_original()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -119,7 +119,8 @@ def test_upload_sample():
         title="Test Upload from WprTool",
         description="This is a test upload using Vimeo API",
         privacy="nobody",  # Private video
-        log_callback=log_callback
+        log_callback=log_callback,
+        wait=True  # đợi Vimeo xử lý xong để in thumbnail
     )
     
     print()
@@ -0,0 +1,115 @@
+"""
+Test Vimeo Processing Poller (client giả lập, không cần Vimeo)
+Nhiều video đang transcode → 1 request / tick, callback khi xong, timeout
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.vimeo_processing_poller import VimeoProcessingPoller
+
+
+class FakeResponse:
+    def __init__(self, data, headers=None):
+        self._data = data
+        self.headers = headers or {}
+
+    def json(self):
+        return self._data
+
+
+class FakeClient:
+    """Video i xong sau ready_after[i] giây; None = không bao giờ xong"""
+
+    def __init__(self, ready_after):
+        self.ready_after = ready_after
+        self.started = time.time()
+        self.calls = []
+
+    def get(self, uri, params=None):
+        assert uri == '/videos'
+        uris = params['uris'].split(',')
+        self.calls.append(uris)
+        elapsed = time.time() - self.started
+        data = []
+        for u in uris:
+            after = self.ready_after[u]
+            done = after is not None and elapsed >= after
+            data.append({
+                'uri': u,
+                'status': 'available' if done else 'transcoding',
+                'transcode': {'status': 'complete' if done else 'in_progress'},
+                'link': f"https://vimeo.com/{u.rsplit('/', 1)[-1]}",
+                'pictures': {'sizes': [{'width': 1280, 'link': 'https://i.vimeocdn.com/x.jpg'}]},
+            })
+        return FakeResponse({'data': data}, {'X-RateLimit-Remaining': '500'})
+
+
+def test_many_videos_one_request_per_tick():
+    uris = [f"/videos/{i}" for i in range(10)]
+    client = FakeClient({u: 0.3 + 0.05 * i for i, u in enumerate(uris)})
+    poller = VimeoProcessingPoller(client, min_interval=0.1, max_interval=0.2)
+
+    done = []
+    lock = threading.Lock()
+
+    def on_done(ready, data):
+        with lock:
+            done.append((data['uri'], ready))
+
+    futures = [poller.watch(u, max_wait=5, on_done=on_done) for u in uris]
+    results = [f.result(timeout=5) for f in futures]
+    time.sleep(0.1)
+
+    assert all(ready for ready, _ in results)
+    assert results[3][1]['link'] == "https://vimeo.com/3"
+    assert sorted(u for u, _ in done) == sorted(uris)
+    assert len(client.calls) < len(uris) * 2  # mỗi tick 1 request cho mọi video
+    assert max(len(c) for c in client.calls) > 1  # nhiều video gộp trong 1 request
+    assert poller.pending() == 0
+    print(f"  ✅ 10 videos ready after {len(client.calls)} status requests")
+
+
+def test_timeout_and_failure():
+    client = FakeClient({"/videos/slow": None})
+    poller = VimeoProcessingPoller(client, min_interval=0.05, max_interval=0.1)
+    start = time.time()
+    ready, data = poller.watch("/videos/slow", max_wait=0.4).result(timeout=3)
+    assert not ready and data['status'] == 'transcoding'
+    assert 0.35 < time.time() - start < 1.5
+
+    class FailingClient(FakeClient):
+        def get(self, uri, params=None):
+            res = super().get(uri, params)
+            res._data['data'][0]['status'] = 'transcoding_error'
+            return res
+
+    poller = VimeoProcessingPoller(FailingClient({"/videos/bad": None}), min_interval=0.05)
+    ready, _ = poller.watch("/videos/bad", max_wait=10).result(timeout=3)
+    assert not ready
+    print("  ✅ timeout and transcoding_error end the watch")
+
+
+def test_second_watch_keeps_both_callbacks():
+    client = FakeClient({"/videos/7": 0.2})
+    poller = VimeoProcessingPoller(client, min_interval=0.05, max_interval=0.1)
+    called = []
+    first = poller.watch("/videos/7", max_wait=5, on_done=lambda ready, data: called.append('upload'))
+    second = poller.watch("/videos/7", max_wait=5, on_done=lambda ready, data: called.append('gui'))
+    assert first is second and first.result(timeout=3)[0]
+    time.sleep(0.1)
+    assert sorted(called) == ['gui', 'upload']
+    print("  ✅ every on_done of the same video is called")
+
+
+if __name__ == "__main__":
+    print("\n🚀 VIMEO PROCESSING POLLER TEST")
+    test_many_videos_one_request_per_tick()
+    test_timeout_and_failure()
+    test_second_watch_keeps_both_callbacks()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,195 @@
+"""
+Test WebDriver Pool (driver giả lập, không cần Chrome)
+Mượn/trả song song, health check thay driver chết, recycle sau N lần dùng / RAM tăng
+"""
+
+import os
+import sys
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model.webdriver_pool as webdriver_pool
+from model.webdriver_pool import DriverPoolTimeout, WebDriverPool, is_driver_alive
+from model.wp_model import WPAutoClient
+
+
+class FakeDriver:
+    def __init__(self, slot):
+        self.slot = slot
+        self.alive = True
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise RuntimeError("chrome not reachable")
+        return "https://example.com/wp-admin/"
+
+    @property
+    def window_handles(self):
+        return ["main"] if self.alive else []
+
+    def quit(self):
+        self.quit_called = True
+        self.alive = False
+
+
+class FakeFactory:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.made = []
+
+    def __call__(self, slot):
+        time.sleep(self.delay)
+        driver = FakeDriver(slot)
+        self.made.append(driver)
+        return driver
+
+
+def test_parallel_checkout_bounded():
+    factory = FakeFactory(delay=0.05)
+    pool = WebDriverPool(factory, size=2, max_uses=100)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        with pool.lease() as driver:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            assert is_driver_alive(driver)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert peak[0] == 2  # 2 driver chạy song song, không vượt size
+    assert len(factory.made) == 2  # Chrome chỉ khởi động 2 lần cho 8 việc
+    assert sorted(d.slot for d in factory.made) == [0, 1]  # mỗi driver 1 profile riêng
+    assert pool.stats()['idle'] == 2
+    print(f"  ✅ 8 jobs on {len(factory.made)} drivers, peak concurrency {peak[0]}")
+
+
+def test_health_check_and_recycle():
+    factory = FakeFactory()
+    pool = WebDriverPool(factory, size=1, max_uses=3)
+
+    first = pool.checkout()
+    pool.checkin(first)
+    first.alive = False  # Chrome bị đóng ngoài ý muốn
+    second = pool.checkout()
+    assert second is not first and first.quit_called and second.slot == 0
+    pool.checkin(second)
+
+    for _ in range(2):
+        with pool.lease() as driver:
+            assert driver is second
+    assert second.quit_called  # 3 lần dùng → recycle
+    third = pool.checkout()
+    assert third is not second
+    pool.checkin(third, broken=True)
+    assert third.quit_called and pool.stats()['recycled'] == 2
+    print("  ✅ dead driver replaced, recycled after max_uses and on error")
+
+
+def test_memory_growth_recycle():
+    rss = {'value': 300.0}
+    orig = webdriver_pool.driver_rss_mb
+    webdriver_pool.driver_rss_mb = lambda driver: rss['value']
+    try:
+        pool = WebDriverPool(FakeFactory(), size=1, max_uses=100, max_rss_growth_mb=500)
+        driver = pool.checkout()
+        pool.checkin(driver)
+        assert not driver.quit_called
+        rss['value'] = 900.0
+        driver = pool.checkout()
+        pool.checkin(driver)
+        assert driver.quit_called
+    finally:
+        webdriver_pool.driver_rss_mb = orig
+    print("  ✅ recycled when RSS grew > 500MB")
+
+
+def test_adopt_no_create_and_timeout():
+    pool = WebDriverPool(FakeFactory(), size=2)
+    try:
+        pool.checkout(create=False)
+        assert False, "empty pool should not lend without create"
+    except DriverPoolTimeout:
+        pass
+
+    login_driver = FakeDriver(0)
+    assert pool.adopt(login_driver, slot=0)
+    assert pool.checkout(create=False) is login_driver
+    start = time.time()
+    try:
+        pool.checkout(timeout=0.2, create=False)
+        assert False, "busy pool should time out"
+    except DriverPoolTimeout:
+        assert time.time() - start >= 0.15
+    pool.checkin(login_driver)
+
+    pool.prewarm(background=False)
+    assert pool.stats()['idle'] == 2
+    pool.close()
+    assert login_driver.quit_called
+    print("  ✅ adopt login driver, create=False, timeout, prewarm, close")
+
+
+class FakeRestClient:
+    rest_blocked = False
+
+    def __init__(self, ok):
+        self.ok = ok
+
+    def test_api_availability(self, aggressive=False):
+        return True, 200, "ok"
+
+    def post_article(self, blog_post):
+        return (True, "https://example.com/?p=1") if self.ok else (False, "500")
+
+
+class FakeSeleniumClient(FakeDriver):
+    driver = True
+
+    def post_article(self, blog_post, force_fresh_login=False, use_classic_editor=True):
+        return True, "https://example.com/?p=2"
+
+
+def test_rest_publish_does_not_lease_driver():
+    made = []
+    pool = WebDriverPool(lambda slot: made.append(FakeSeleniumClient(slot)) or made[-1], size=1)
+    leases = []
+
+    def lease():
+        leases.append(1)
+        return pool.lease()
+
+    client = WPAutoClient("https://example.com", "u", "p")
+    assert client.post_article(object(), reuse_fast_client=FakeRestClient(True), selenium_lease=lease)[0]
+    assert not leases and not made  # REST thành công → không mở Chrome
+
+    client = WPAutoClient("https://example.com", "u", "p")
+    ok, url = client.post_article(object(), reuse_fast_client=FakeRestClient(False), selenium_lease=lease)
+    assert ok and url.endswith("p=2") and leases == [1]
+    client.close()
+    assert pool.stats()['idle'] == 1 and not made[0].quit_called  # driver trả về pool
+    print("  ✅ driver leased only for the Selenium fallback")
+
+
+if __name__ == "__main__":
+    print("\n🚀 WEBDRIVER POOL TEST")
+    test_parallel_checkout_bounded()
+    test_health_check_and_recycle()
+    test_memory_growth_recycle()
+    test_adopt_no_create_and_timeout()
+    test_rest_publish_does_not_lease_driver()
+    print("\n🎉 ALL TESTS PASSED!")
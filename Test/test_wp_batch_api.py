@@ -0,0 +1,210 @@
+"""
+Test /batch/v1 mode của WordPressRESTClientFast
+Drafts + publish flips gộp thành 2 round trips, bài lỗi fallback từng bài
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http.client
+
+import requests
+import urllib3
+
+from model.wp_rest_api_fast import BATCH_NO_REPLY, BATCH_UNKNOWN_MESSAGE, WordPressRESTClientFast
+
+
+class FakeResponse:
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class FakeBatchSession:
+    """Giả lập WP: /batch/v1 tạo draft, bài có tiêu đề 'bad' bị từ chối"""
+
+    def __init__(self, has_batch=True):
+        self.has_batch = has_batch
+        self.batch_calls = []
+        self.single_posts = []
+        self.next_id = 100
+
+    def options(self, url, **kwargs):
+        if not self.has_batch:
+            return FakeResponse(404, {'code': 'rest_no_route'})
+        return FakeResponse(200, {'endpoints': [{'args': {'requests': {'maxItems': 25}}}]})
+
+    def post(self, url, json=None, **kwargs):
+        if url.endswith('/batch/v1'):
+            self.batch_calls.append(json['requests'])
+            return FakeResponse(207, {'responses': [self._handle(r) for r in json['requests']]})
+        self.single_posts.append((url, json))
+        if url.endswith('/posts'):
+            self.next_id += 1
+            return FakeResponse(201, {'id': self.next_id, 'link': f"https://x/?p={self.next_id}",
+                                      'status': 'draft', 'featured_media': json.get('featured_media', 0)})
+        return FakeResponse(200, {'id': int(url.rsplit('/', 1)[1]), 'link': url, 'status': 'publish'})
+
+    def get(self, url, **kwargs):
+        return FakeResponse(200, [])
+
+    def _handle(self, req):
+        body = req['body']
+        if req['path'] == '/wp/v2/posts':
+            if body['title'] == 'bad':
+                return {'status': 400, 'body': {'code': 'rest_invalid_param'}}
+            self.next_id += 1
+            return {'status': 201, 'body': {'id': self.next_id, 'link': f"https://x/?p={self.next_id}",
+                                            'status': body['status'], 'featured_media': 0}}
+        post_id = int(req['path'].rsplit('/', 1)[1])
+        return {'status': 200, 'body': {'id': post_id, 'link': f"https://x/post-{post_id}", **body}}
+
+
+def _client(session):
+    client = WordPressRESTClientFast("https://x", "u", "p", verbose=False)
+    client.session = session
+    client.cookies_loaded = True
+    return client
+
+
+def test_batched_create_and_publish():
+    session = FakeBatchSession()
+    client = _client(session)
+    items = [{'title': f'Post {i}', 'content': 'c', 'featured_media_id': 7} for i in range(30)]
+    results = client.create_posts_batched(items)
+
+    assert all(ok for ok, _, _ in results)
+    # 30 drafts → 2 chunks of ≤25, 30 updates → 2 chunks
+    assert len(session.batch_calls) == 4
+    assert all(len(c) <= 25 for c in session.batch_calls)
+    updates = session.batch_calls[2] + session.batch_calls[3]
+    assert all(u['body'] == {'featured_media': 7, 'status': 'publish'} for u in updates)
+    assert results[0][2].startswith("https://x/post-")
+    print("  ✅ 30 posts in 4 batch calls")
+
+
+def test_failed_item_falls_back_per_post():
+    session = FakeBatchSession()
+    client = _client(session)
+    results = client.create_posts_batched([{'title': 'ok', 'content': 'c'}, {'title': 'bad', 'content': 'c'}])
+    assert [ok for ok, _, _ in results] == [True, True]
+    assert any(url.endswith('/posts') and body['title'] == 'bad' for url, body in session.single_posts)
+    print("  ✅ rejected item retried on per-post path")
+
+
+def test_no_batch_route():
+    session = FakeBatchSession(has_batch=False)
+    client = _client(session)
+    results = client.create_posts_batched([{'title': 'a', 'content': 'c'}])
+    assert results[0][0] and not session.batch_calls
+    print("  ✅ falls back when /batch/v1 is missing")
+
+
+class TimeoutBatchSession(FakeBatchSession):
+    """Lô draft bị ReadTimeout nhưng WP vẫn tạo bài; draft chỉ thấy được từ lần tìm thứ 2"""
+
+    def __init__(self):
+        super().__init__()
+        self.drafts = {}
+        self.lookups = {}
+
+    def post(self, url, json=None, **kwargs):
+        if url.endswith('/batch/v1') and json['requests'][0]['path'] == '/wp/v2/posts':
+            self.batch_calls.append(json['requests'])
+            for req in json['requests']:
+                self._handle(req)
+                if req['body'].get('slug'):
+                    self.drafts[req['body']['slug']] = {'id': self.next_id, 'link': f"https://x/?p={self.next_id}",
+                                                        'status': 'draft', 'featured_media': 0}
+            raise requests.exceptions.ReadTimeout("batch timed out")
+        return super().post(url, json=json, **kwargs)
+
+    def get(self, url, params=None, **kwargs):
+        slug = (params or {}).get('slug')
+        self.lookups[slug] = self.lookups.get(slug, 0) + 1
+        if slug in self.drafts and self.lookups[slug] >= 2:  # WP còn đang lưu ở lần tìm đầu
+            return FakeResponse(200, [self.drafts[slug]])
+        return FakeResponse(200, [])
+
+
+def test_batch_timeout_does_not_repost():
+    old = os.environ.get("WP_IDEMPOTENT_SLUG")
+    try:
+        # Không có slug: không gửi lại, báo lỗi cần kiểm tra tay
+        os.environ["WP_IDEMPOTENT_SLUG"] = "0"
+        session = TimeoutBatchSession()
+        client = _client(session)
+        results = client.create_posts_batched([{'title': f'Post {i}', 'content': 'c'} for i in range(3)])
+        assert all(not ok and msg == BATCH_UNKNOWN_MESSAGE for ok, _, msg in results)
+        assert not any(url.endswith('/posts') for url, _ in session.single_posts)
+
+        # Có slug: poll tới khi thấy draft, rồi chỉ publish - không tạo bài mới
+        os.environ["WP_IDEMPOTENT_SLUG"] = "1"
+        session = TimeoutBatchSession()
+        client = _client(session)
+        client.SLUG_LOOKUP_DELAY = 0.01
+        results = client.create_posts_batched([{'title': f'Post {i}', 'content': 'c'} for i in range(3)])
+        assert all(ok for ok, _, _ in results)
+        assert not any(url.endswith('/posts') for url, _ in session.single_posts)
+        assert all(n == 2 for n in session.lookups.values())
+    finally:
+        if old is None:
+            os.environ.pop("WP_IDEMPOTENT_SLUG", None)
+        else:
+            os.environ["WP_IDEMPOTENT_SLUG"] = old
+    print("  ✅ batch ReadTimeout: drafts found by slug, never re-posted blindly")
+
+
+class OutcomeSession(FakeBatchSession):
+    """/batch/v1 trả về / ném đúng `outcome`"""
+
+    def __init__(self, outcome):
+        super().__init__()
+        self.outcome = outcome
+
+    def post(self, url, json=None, **kwargs):
+        if not url.endswith('/batch/v1'):
+            return super().post(url, json=json, **kwargs)
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+
+def test_batch_no_reply_cases():
+    refused = urllib3.exceptions.MaxRetryError(
+        None, "/batch/v1", urllib3.exceptions.NewConnectionError(None, "Connection refused"))
+    reset = requests.exceptions.ConnectionError(
+        urllib3.exceptions.ProtocolError("aborted", http.client.RemoteDisconnected("closed")))
+    chunk = [{'method': 'POST', 'path': '/wp/v2/posts', 'body': {'title': f't{i}'}} for i in range(3)]
+    cases = [
+        (FakeResponse(502, {}), [BATCH_NO_REPLY] * 3),
+        (FakeResponse(504, {}), [BATCH_NO_REPLY] * 3),
+        (reset, [BATCH_NO_REPLY] * 3),
+        (requests.exceptions.ReadTimeout("slow"), [BATCH_NO_REPLY] * 3),
+        (FakeResponse(207, {'responses': [{'status': 201, 'body': {'id': 1}}]}),
+         [(201, {'id': 1}), BATCH_NO_REPLY, BATCH_NO_REPLY]),
+        # Chắc chắn chưa xử lý → None (gửi lại an toàn)
+        (requests.exceptions.ConnectTimeout("connect"), [None] * 3),
+        (requests.exceptions.ConnectionError(refused), [None] * 3),
+        (FakeResponse(400, {}), [None] * 3),
+    ]
+    for outcome, expected in cases:
+        client = _client(OutcomeSession(outcome))
+        assert client._batch_call(chunk, {}) == expected, outcome
+    print("  ✅ 5xx / reset / short reply → no-reply; connect errors / 400 → safe to resend")
+
+
+if __name__ == "__main__":
+    print("\n🚀 WP BATCH API TEST")
+    test_batched_create_and_publish()
+    test_failed_item_falls_back_per_post()
+    test_no_batch_route()
+    test_batch_timeout_does_not_repost()
+    test_batch_no_reply_cases()
+    print("\n🎉 ALL TESTS PASSED!")
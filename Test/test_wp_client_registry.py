@@ -0,0 +1,72 @@
+"""
+Test WP Client Registry
+1 client / tài khoản, nonce được làm mới trước khi hết hạn
+"""
+
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.wp_client_registry import WPClientRegistry, _account_key
+
+
+def test_one_client_per_account():
+    registry = WPClientRegistry()
+    a = registry.get("https://site.example/", "admin", "pw", login=False)
+    assert registry.get("site.example", "ADMIN", "pw", login=False) is a
+    assert registry.get("https://site.example", "editor", "pw", login=False) is not a
+
+    # Password changed → fresh client
+    b = registry.get("https://site.example", "admin", "new-pw", login=False)
+    assert b is not a and b.password == "new-pw"
+    registry.close_all()
+    print("  ✅ one client per account")
+
+
+def test_refresh_due_renews_cookie_nonce():
+    registry = WPClientRegistry(refresh_interval=3600)
+    client = registry.get("https://site.example", "admin", "pw", login=False)
+    client.cookies_loaded = True
+    client.nonce = "old"
+    calls = []
+
+    def fake_extract():
+        calls.append(client.nonce)
+        client.nonce = "fresh"
+        return True
+
+    client._extract_nonce = fake_extract
+    key = _account_key("https://site.example", "admin")
+    registry._auth_at[key] = 1000.0
+
+    assert registry.refresh_due(now=1000.0 + 60) == 0
+    assert registry.refresh_due(now=1000.0 + 3600) == 1
+    assert calls == [None] and client.nonce == "fresh"
+    registry.close_all()
+    print("  ✅ nonce refreshed before expiry")
+
+
+def test_refresh_covers_login_false_clients():
+    """Client login=False (cookie + nonce copy từ Selenium) vẫn được làm mới theo tuổi nonce"""
+    registry = WPClientRegistry(refresh_interval=3600)
+    client = registry.get("https://site.example", "admin", "pw", login=False)
+    client.nonce = "from-selenium"  # như controller sau khi sync cookies
+    assert not client.cookies_loaded
+    stamped = client.nonce_at
+    client._extract_nonce = lambda: setattr(client, 'nonce', "fresh") or True
+
+    assert registry.refresh_due(now=stamped + 60) == 0
+    assert registry.refresh_due(now=stamped + 3600) == 1
+    assert client.nonce == "fresh" and client.nonce_at >= stamped
+    registry.close_all()
+    print("  ✅ login=False client refreshed by nonce age")
+
+
+if __name__ == "__main__":
+    print("\n🚀 WP CLIENT REGISTRY TEST")
+    test_one_client_per_account()
+    test_refresh_due_renews_cookie_nonce()
+    test_refresh_covers_login_false_clients()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,203 @@
+"""
+Test Async WordPress engine (httpx MockTransport, không cần WordPress)
+429 / 5xx / timeout: retry đúng, không tạo bài trùng, backoff không giữ slot của semaphore
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.wp_rest_api_async import HAS_HTTPX, AsyncWordPressRESTClient
+
+if HAS_HTTPX:
+    import httpx
+
+
+class FakePost:
+    def __init__(self, title, image_url=None):
+        self.title = title
+        self.content = f"<p>{title}</p>"
+        self.image_url = image_url
+
+
+class FakeWP:
+    """Router giả lập: responses[(method, path)] = list kết quả lần lượt (Response hoặc Exception)"""
+
+    def __init__(self, responses):
+        self.responses = {k: list(v) for k, v in responses.items()}
+        self.calls = []
+
+    async def __call__(self, request):
+        await request.aread()
+        key = (request.method, request.url.path)
+        self.calls.append(key)
+        queue = self.responses.get(key) or self.responses.get((request.method, '*'))
+        outcome = queue.pop(0) if len(queue) > 1 else queue[0]
+        if isinstance(outcome, type) and issubclass(outcome, Exception):
+            raise outcome("mock", request=request)
+        if callable(outcome):
+            return await outcome(request)
+        return outcome
+
+    def count(self, method, path):
+        return self.calls.count((method, path))
+
+
+def _json(status, data, headers=None):
+    return httpx.Response(status, json=data, headers=headers)
+
+
+POSTS = '/wp-json/wp/v2/posts'
+MEDIA = '/wp-json/wp/v2/media'
+CREATED = _json(201, {'id': 7, 'link': 'https://wp.test/?p=7', 'status': 'draft', 'featured_media': 0})
+PUBLISHED = _json(200, {'id': 7, 'link': 'https://wp.test/hello/'})
+
+
+def _engine(router, host, max_concurrency=5):
+    engine = AsyncWordPressRESTClient(f"https://{host}", max_concurrency=max_concurrency, verbose=False)
+    engine._loop = asyncio.get_running_loop()
+    engine._semaphore = asyncio.Semaphore(engine.max_concurrency)
+    engine._client = httpx.AsyncClient(transport=httpx.MockTransport(router))
+    return engine
+
+
+def _run(coro_fn):
+    """Chạy test với asyncio.sleep rút ngắn (ghi lại thời gian chờ)"""
+    sleeps = []
+    real_sleep = asyncio.sleep
+
+    async def fast_sleep(delay, *args):
+        sleeps.append(delay)
+        await real_sleep(min(delay, 0.05))
+
+    asyncio.sleep = fast_sleep
+    try:
+        return asyncio.run(coro_fn()), sleeps
+    finally:
+        asyncio.sleep = real_sleep
+
+
+def test_upload_429_then_ok():
+    if not HAS_HTTPX:
+        print("  ⏭️ httpx not installed, skipped")
+        return
+    image = os.path.join(tempfile.mkdtemp(), "car.jpg")
+    with open(image, "wb") as f:
+        f.write(b"\xff\xd8" + b"x" * 2048)
+    router = FakeWP({
+        ('POST', MEDIA): [_json(429, {}, {'Retry-After': '3'}),
+                          _json(201, {'id': 5, 'source_url': 'https://wp.test/car.jpg'})],
+        ('POST', POSTS): [CREATED],
+        ('POST', f"{POSTS}/7"): [PUBLISHED],
+    })
+
+    async def run():
+        engine = _engine(router, "async-429.test")
+        return await engine.post_article_fast(FakePost("Hello", image_url=image))
+
+    (ok, url), sleeps = _run(run)
+    assert ok and url == 'https://wp.test/hello/'
+    assert router.count('POST', MEDIA) == 2 and 3.0 in sleeps  # Retry-After được tôn trọng
+    print("  ✅ 429 on upload → wait Retry-After, retry, post published")
+
+
+def test_5xx_retry_and_give_up():
+    if not HAS_HTTPX:
+        print("  ⏭️ httpx not installed, skipped")
+        return
+    router = FakeWP({('POST', POSTS): [_json(502, {}), CREATED], ('POST', f"{POSTS}/7"): [PUBLISHED]})
+
+    async def run():
+        return await _engine(router, "async-5xx.test").post_article_fast(FakePost("Hello"))
+
+    (ok, _), _ = _run(run)
+    assert ok and router.count('POST', POSTS) == 2
+
+    router = FakeWP({('POST', MEDIA): [_json(503, {})]})
+    image = os.path.join(tempfile.mkdtemp(), "a.jpg")
+    with open(image, "wb") as f:
+        f.write(b"x" * 100)
+
+    async def upload():
+        return await _engine(router, "async-5xx-upload.test").upload_image_fast(image)
+
+    result, _ = _run(upload)
+    assert result == (False, None, None) and router.count('POST', MEDIA) == 3
+    print("  ✅ 502 retried once, persistent 503 gives up after 3 attempts")
+
+
+def test_timeout_does_not_duplicate():
+    if not HAS_HTTPX:
+        print("  ⏭️ httpx not installed, skipped")
+        return
+    old = os.environ.get("WP_IDEMPOTENT_SLUG")
+    try:
+        # Không có slug: ReadTimeout → báo lỗi, không gửi lại
+        os.environ["WP_IDEMPOTENT_SLUG"] = "0"
+        router = FakeWP({('POST', POSTS): [httpx.ReadTimeout]})
+
+        async def run_plain():
+            return await _engine(router, "async-timeout.test").post_article_fast(FakePost("Hello"))
+
+        (ok, _), _ = _run(run_plain)
+        assert not ok and router.count('POST', POSTS) == 1
+
+        # Có slug: ReadTimeout → tìm draft theo slug, chỉ publish - không tạo bài mới
+        os.environ["WP_IDEMPOTENT_SLUG"] = "1"
+        router = FakeWP({
+            ('POST', POSTS): [httpx.ReadTimeout],
+            ('GET', POSTS): [_json(200, [{'id': 7, 'link': 'https://wp.test/?p=7', 'status': 'draft'}])],
+            ('POST', f"{POSTS}/7"): [PUBLISHED],
+        })
+
+        async def run_slug():
+            return await _engine(router, "async-timeout-slug.test").post_article_fast(FakePost("Hello"))
+
+        (ok, url), _ = _run(run_slug)
+        assert ok and url == 'https://wp.test/hello/'
+        assert router.count('POST', POSTS) == 1 and router.count('GET', POSTS) == 1
+    finally:
+        if old is None:
+            os.environ.pop("WP_IDEMPOTENT_SLUG", None)
+        else:
+            os.environ["WP_IDEMPOTENT_SLUG"] = old
+    print("  ✅ ReadTimeout: no blind resend, draft found by slug")
+
+
+def test_backoff_does_not_hold_slot():
+    if not HAS_HTTPX:
+        print("  ⏭️ httpx not installed, skipped")
+        return
+    order = []
+
+    async def create(request):
+        title = httpx.Response(200, content=request.content).json()['title']
+        order.append(title)
+        if title == 'slow' and order.count('slow') == 1:
+            return _json(429, {})
+        return CREATED
+
+    router = FakeWP({('POST', POSTS): [create], ('POST', f"{POSTS}/7"): [PUBLISHED]})
+
+    async def run():
+        engine = _engine(router, "async-slot.test", max_concurrency=1)
+        return await engine.post_articles_parallel([FakePost("slow"), FakePost("fast")])
+
+    results, _ = _run(run)
+    assert all(ok for ok, _ in results)
+    # 'fast' dùng slot trong lúc 'slow' đang backoff sau 429
+    assert order == ['slow', 'fast', 'slow']
+    print("  ✅ 429 backoff releases the concurrency slot")
+
+
+if __name__ == "__main__":
+    print("\n🚀 ASYNC WP ENGINE TEST")
+    test_upload_429_then_ok()
+    test_5xx_retry_and_give_up()
+    test_timeout_does_not_duplicate()
+    test_backoff_does_not_hold_slot()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -0,0 +1,100 @@
+"""
+Test YouTube Data API batch (không cần mạng / API key thật)
+50 id / request, các nhóm chạy song song, kết quả đúng thứ tự input
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import model.video_metadata_cache as video_metadata_cache
+
+# Kho metadata riêng cho test (không đọc/ghi .cache/ của app)
+video_metadata_cache._cache = video_metadata_cache.VideoMetadataCache(
+    db_path=os.path.join(tempfile.mkdtemp(), "meta.sqlite3"), legacy_dir=None)
+
+from model.smart_video_fetcher import SmartVideoFetcher
+
+
+class FakeYouTube:
+    """Giả lập client googleapiclient: videos().list(...).execute()"""
+
+    def __init__(self, owner):
+        self.owner = owner
+
+    def videos(self):
+        return self
+
+    def list(self, part, id, fields, maxResults):
+        self.owner.calls.append({'part': part, 'ids': id.split(','), 'fields': fields})
+        self._ids = id.split(',')
+        return self
+
+    def execute(self):
+        with self.owner.lock:
+            self.owner.active += 1
+            self.owner.peak = max(self.owner.peak, self.owner.active)
+        time.sleep(0.2)
+        with self.owner.lock:
+            self.owner.active -= 1
+        # Video "missing" = đã xoá / private → không có trong items
+        return {'items': [
+            {'id': vid, 'snippet': {'title': f"T-{vid}", 'thumbnails': {'high': {'url': f"{vid}.jpg"}}}}
+            for vid in self._ids if not vid.startswith('missing')
+        ]}
+
+
+class FakeFetcher(SmartVideoFetcher):
+    def __init__(self):
+        super().__init__(youtube_api_key="test-key")
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def _thread_youtube_client(self):
+        return FakeYouTube(self)
+
+
+def _video_id(i):
+    return f"vid{i:08d}"  # 11 ký tự như id YouTube
+
+
+def test_batches_of_50_in_input_order():
+    fetcher = FakeFetcher()
+    urls = [f"https://www.youtube.com/watch?v={_video_id(i)}" for i in range(120)]
+    urls.insert(7, "https://youtu.be/missing0001")
+    urls.insert(3, f"https://youtu.be/{_video_id(5)}")  # cùng video, link khác
+
+    start = time.time()
+    results = fetcher.batch_get_videos(urls)
+    elapsed = time.time() - start
+
+    assert len(fetcher.calls) == 3  # 121 id → 50 + 50 + 21
+    assert all(len(c['ids']) <= 50 for c in fetcher.calls)
+    assert all(c['fields'] == 'items(id,snippet(title,thumbnails))' for c in fetcher.calls)
+    assert fetcher.peak > 1
+    assert elapsed < 3 * 0.2
+    assert [r['url'] for r in results] == urls
+    assert results[3]['title'] == results[6]['title'] == f"T-{_video_id(5)}"
+    missing = results[urls.index("https://youtu.be/missing0001")]
+    assert missing['success'] is False and missing['error'] == 'Video not found'
+    print(f"  ✅ {len(urls)} URLs → {len(fetcher.calls)} API calls in {elapsed:.2f}s, input order kept")
+
+    # Lần 2: thành công trả từ cache, không gọi API
+    fetcher.calls.clear()
+    again = fetcher.batch_get_videos(urls[:10])
+    assert fetcher.calls == [] or all('missing0001' in c['ids'] for c in fetcher.calls)
+    assert all(r.get('cached') for r in again if r['success'])
+    print("  ✅ second batch answered from metadata cache")
+
+
+if __name__ == "__main__":
+    print("\n🚀 YOUTUBE BATCH TEST")
+    test_batches_of_50_in_input_order()
+    print("\n🎉 ALL TESTS PASSED!")
@@ -18,6 +18,7 @@ class AppController:
         # API Clients (Lazy loaded)
         self.rest_client = None
         self.selenium_client = None
+        self.selenium_headless = False
         self.client_lock = threading.Lock()
 
     def run(self):
@@ -34,6 +35,10 @@ class AppController:
         self.view = GUIView(self, initial_config=self.config)
         self.view.mainloop()
 
+        # Đóng mọi Chrome trong pool khi thoát app
+        from model.webdriver_pool import shutdown_pools
+        shutdown_pools()
+
     def handle_login(self, site, user, pwd, headless=False):
         """
         Verify credentials via Selenium.
@@ -54,13 +59,15 @@ class AppController:
                     self.site_url = site
                     self.username = user
                     self.password = pwd
+                    self.selenium_headless = headless
                     # Preserve app_password if present in config
                     self.config_manager.save_config(site, user, pwd, app_password=self.app_password)
                     
                     # --- NEW: Init Fast REST Client & Sync Cookies ---
                     try:
-                        from model.wp_rest_api_fast import WordPressRESTClientFast
-                        self.rest_client = WordPressRESTClientFast(site, user, pwd, app_password=self.app_password)
+                        # Registry: client của tài khoản này có thể đã được prewarm (đã login, nonce sẵn)
+                        from model.wp_client_registry import get_client_registry
+                        self.rest_client = get_client_registry().get(site, user, pwd, app_password=self.app_password, login=False)
                         
                         # Sync cookies from Selenium to Fast Client
                         selenium_cookies = self.selenium_client.driver.get_cookies()
@@ -81,6 +88,12 @@ class AppController:
                     except Exception as rest_err:
                         print(f"[CONTROLLER] ⚠️ REST Init Warning: {rest_err}")
 
+                    # Driver vừa login thành slot 0 của pool, các slot còn lại khởi động + login ở background
+                    from model.webdriver_pool import get_wp_driver_pool
+                    pool = get_wp_driver_pool(site, user, pwd, headless=headless, fresh=True)
+                    pool.adopt(self.selenium_client, slot=0)
+                    pool.prewarm()
+
                     self.view.after(0, self.view.login_success)
                 else:
                     self.selenium_client.close()
@@ -103,31 +116,76 @@ class AppController:
         data.username = self.username
         data.password = self.password
 
+        # Batch: qua pipeline nhiều stage để các bài chồng lên nhau
+        if is_batch:
+            self._submit_to_pipeline(data, is_batch=True)
+            return
+
         # Thread for Selenium Posting
         thread = threading.Thread(target=self._process_post, args=(data, is_batch))
         thread.start()
 
-    def _is_driver_alive(self):
+    def _wp_driver_pool(self):
+        """Pool SeleniumWPClient đã login của tài khoản hiện tại (health check + recycle trong pool)"""
+        from model.webdriver_pool import get_wp_driver_pool
+        return get_wp_driver_pool(self.site_url, self.username, self.password, headless=self.selenium_headless)
+
+    def _sync_selenium_session(self, with_nonce=True, timeout=5):
         """
-        Check if Selenium driver is still alive and responsive.
-        Returns True if driver is accessible, False otherwise.
+        Copy cookies (+ nonce) từ 1 driver Selenium đã login sang REST client.
+        Chỉ mượn driver đang có sẵn - không khởi động Chrome chỉ để lấy cookie.
         """
+        from model.webdriver_pool import DriverPoolTimeout
+        if not self.rest_client:
+            return
         try:
-            if not hasattr(self, 'selenium_client') or not self.selenium_client:
-                return False
-            if not self.selenium_client.driver:
-                return False
-            # Try to get current URL to verify driver is responsive
-            _ = self.selenium_client.driver.current_url
-            return True
-        except Exception as e:
-            print(f"[CONTROLLER] Driver health check failed: {e}")
-            return False
+            with self._wp_driver_pool().lease(timeout=timeout, create=False) as client:
+                for cookie in client.driver.get_cookies():
+                    self.rest_client.session.cookies.set(
+                        cookie['name'],
+                        cookie['value'],
+                        domain=cookie.get('domain', '')
+                    )
+                if with_nonce and not self.rest_client.nonce:
+                    try:
+                        nonce = client.driver.execute_script("return window.wpApiSettings ? window.wpApiSettings.nonce : (window.wp && window.wp.api && window.wp.api.settings ? window.wp.api.settings.nonce : null);")
+                        if nonce:
+                            self.rest_client.nonce = nonce
+                    except:
+                        pass
+        except DriverPoolTimeout:
+            pass  # Chưa có driver nào / tất cả đang bận
+        except Exception as cookie_err:
+            print(f"[CONTROLLER] Warning: Cookie sync error: {cookie_err}")
 
     def _upload_image_smart(self, image_path, sync_cookies=True):
         """
-        Smart image upload: Try REST API first (fast), fallback to Selenium
-        Thread-safe: Locks Selenium access.
+        Smart image upload: reuse already-uploaded media (content hash), otherwise
+        try REST API first (fast), fallback to Selenium.
+        Thread-safe: Selenium drivers are checked out from the pool.
+        """
+        from model.media_dedup_cache import MediaDedupCache
+        
+        digest = None
+        try:
+            cache = MediaDedupCache.for_site(self.site_url)
+            verify = self.rest_client.media_exists if self.rest_client else None
+            digest, cached = cache.lookup_file(image_path, verify)
+            if cached and cached[1]:
+                print(f"[CONTROLLER] ♻️ Same image already on site, reusing: {cached[1]}")
+                return cached
+        except Exception as cache_err:
+            print(f"[CONTROLLER] Media cache warning: {cache_err}")
+        
+        media_id, media_url = self._upload_image_uncached(image_path, sync_cookies)
+        if digest and media_url:
+            cache.store(digest, media_id, media_url)
+        return media_id, media_url
+
+    def _upload_image_uncached(self, image_path, sync_cookies=True):
+        """
+        REST API upload (fast) → wp-admin async-upload → Selenium fallback
+        Thread-safe: Selenium drivers are checked out from the pool.
         """
         try:
             # Try REST API first (if available)
@@ -136,47 +194,17 @@ class AppController:
                 if getattr(self.rest_client, "rest_blocked", False):
                     print(f"[CONTROLLER] 🚫 REST blocked ({getattr(self.rest_client, 'rest_blocked_reason', 'blocked')}), using wp-admin async-upload API")
                     # Ensure cookies/nonce are synced once (needed for wp-admin upload endpoints)
-                    if sync_cookies and self._is_driver_alive():
-                        with self.client_lock:
-                            try:
-                                selenium_cookies = self.selenium_client.driver.get_cookies()
-                                for cookie in selenium_cookies:
-                                    self.rest_client.session.cookies.set(
-                                        cookie['name'],
-                                        cookie['value'],
-                                        domain=cookie.get('domain', '')
-                                    )
-                            except Exception as cookie_err:
-                                print(f"[CONTROLLER] Warning: Cookie sync error: {cookie_err}")
+                    if sync_cookies:
+                        self._sync_selenium_session(with_nonce=False)
 
                     success, media_id, media_url = self.rest_client.upload_image_via_admin_async(image_path)
                     if success and media_url:
                         print(f"[CONTROLLER] ✅ Async-upload successful: {media_url}")
                         return media_id, media_url
                 else:
-                # Sync cookies if requested (do this OUTSIDE thread pool if possible, or use lock)
-                    if sync_cookies and self._is_driver_alive():
-                        with self.client_lock: # Lock while reading cookies from Selenium
-                            try:
-                                # Only sync if we haven't recently or if force sync
-                                 selenium_cookies = self.selenium_client.driver.get_cookies()
-                                 for cookie in selenium_cookies:
-                                     self.rest_client.session.cookies.set(
-                                         cookie['name'], 
-                                         cookie['value'],
-                                         domain=cookie.get('domain', '')
-                                     )
-                                 
-                                 # Extract nonce if needed
-                                 if not self.rest_client.nonce:
-                                     try:
-                                         nonce = self.selenium_client.driver.execute_script("return window.wpApiSettings ? window.wpApiSettings.nonce : (window.wp && window.wp.api && window.wp.api.settings ? window.wp.api.settings.nonce : null);")
-                                         if nonce:
-                                             self.rest_client.nonce = nonce
-                                     except:
-                                         pass
-                            except Exception as cookie_err:
-                                print(f"[CONTROLLER] Warning: Cookie sync error: {cookie_err}")
+                    # Sync cookies if requested (mượn 1 driver đang rảnh trong pool)
+                    if sync_cookies:
+                        self._sync_selenium_session()
 
                     # RETRY LOGIC: Try up to 2 times
                     for attempt in range(2):
@@ -215,20 +243,16 @@ class AppController:
                                     print(f"[CONTROLLER] Async-upload error: {async_err}")
                                 break
             
-            # Fallback to Selenium (Thread-Safe with Lock)
+            # Fallback to Selenium: mỗi upload mượn 1 driver riêng → nhiều upload chạy song song
             print(f"[CONTROLLER] Using Selenium upload fallback for: {image_path}")
-            with self.client_lock: # CRITICAL: Lock Selenium driver usage
-                if self._is_driver_alive():
-                   uploaded_url = self.selenium_client.upload_image_to_media(image_path)
-                   if uploaded_url:
-                       print(f"[CONTROLLER] ✅ Selenium upload successful: {uploaded_url}")
-                       return None, uploaded_url
-                   else:
-                       print(f"[CONTROLLER] ❌ Selenium upload failed")
-                       return None, None
-                else:
-                    print(f"[CONTROLLER] ❌ Selenium driver not available")
-                    return None, None
+            with self._wp_driver_pool().lease() as client:
+                uploaded_url = client.upload_image_to_media(image_path)
+            if uploaded_url:
+                print(f"[CONTROLLER] ✅ Selenium upload successful: {uploaded_url}")
+                return None, uploaded_url
+            else:
+                print(f"[CONTROLLER] ❌ Selenium upload failed")
+                return None, None
             
         except Exception as e:
             print(f"[CONTROLLER] ❌ Image upload error: {e}")
@@ -236,332 +260,404 @@ class AppController:
             traceback.print_exc()
             return None, None
 
+    # ========================================
+    # POST PIPELINE: prepare images → upload media → create post
+    # Mỗi stage có workers riêng, queue giới hạn giữa các stage:
+    # bài N+1 đang optimize ảnh trong khi bài N đang được tạo trên WordPress.
+    # ========================================
+    PIPELINE_QUEUE_SIZE = 4
+
+    @staticmethod
+    def _pipeline_workers(stage, default):
+        """Workers mỗi stage, override bằng env PIPELINE_<STAGE>_WORKERS"""
+        try:
+            return max(1, int(os.environ.get(f"PIPELINE_{stage.upper()}_WORKERS", default)))
+        except ValueError:
+            return default
+
+    def _get_post_pipeline(self):
+        """Lazy-create pipeline dùng chung cho các bài batch"""
+        if getattr(self, 'post_pipeline', None) is None:
+            with self.client_lock:
+                if getattr(self, 'post_pipeline', None) is None:
+                    from model.post_pipeline import StagedPipeline
+                    self.post_pipeline = StagedPipeline(
+                        [
+                            ('prepare', self._stage_prepare_images, self._pipeline_workers('prepare', 2)),
+                            ('upload', self._stage_upload_media, self._pipeline_workers('upload', 2)),
+                            # REST không chiếm driver; chỉ bài phải fallback Selenium mới chờ driver trong pool
+                            # → mặc định = AUTO_POST_CONCURRENCY (3), không bị giới hạn bởi WEBDRIVER_POOL_SIZE
+                            ('publish', self._stage_create_post, self._pipeline_workers('publish', 3)),
+                        ],
+                        on_done=self._on_pipeline_job_done,
+                        queue_size=self.PIPELINE_QUEUE_SIZE,
+                        name="post-pipeline"
+                    )
+                    print(f"[CONTROLLER] ✅ Post pipeline started: {self.post_pipeline.format_stats()}")
+        return self.post_pipeline
+
+    def _submit_to_pipeline(self, data, is_batch=True):
+        from model.post_pipeline import PipelineJob
+        pipeline = self._get_post_pipeline()
+        # submit() blocks when the first stage is full (back-pressure) → không chặn GUI thread
+        threading.Thread(
+            target=pipeline.submit, args=(PipelineJob(data, is_batch=is_batch),), daemon=True
+        ).start()
+
+    def get_post_concurrency_limit(self):
+        """
+        Số bài tối đa nên chạy song song: theo cửa sổ hiện tại của rate limiter
+        (AIMD) của site, để hàng chờ AUTO không vượt quá những gì server chịu được.
+        """
+        limiter = getattr(self.rest_client, 'upload_limiter', None)
+        if limiter is None:
+            from model.adaptive_limiter import get_host_limiter
+            limiter = get_host_limiter(self.site_url)
+        return max(1, int(limiter.window))
+
+    def get_pipeline_stats(self):
+        """Throughput theo từng stage (rỗng nếu pipeline chưa chạy)"""
+        pipeline = getattr(self, 'post_pipeline', None)
+        return pipeline.stats() if pipeline else []
+
+    def _on_pipeline_job_done(self, job):
+        """Gọi từ worker thread khi 1 bài ra khỏi pipeline (thành công hoặc lỗi)"""
+        # GUI chạy nhiều bài song song → báo đúng bài nào xong
+        token = getattr(job.data, 'queue_token', None)
+        if job.error is not None:
+            err_title = getattr(job.data, 'title', None) or "Error Post"
+            self.view.after(0, lambda msg=str(job.error), b=job.is_batch, t=err_title, k=token: self.view.on_post_finished(False, msg, b, t, queue_token=k))
+        else:
+            success, message, title = job.result
+            self.view.after(0, lambda s=success, m=message, b=job.is_batch, t=title, k=token: self.view.on_post_finished(s, m, b, t, queue_token=k))
+        print(f"[PIPELINE] 📊 {self.post_pipeline.format_stats()}")
+
+    def _ensure_rest_client(self):
+        # Initialize REST API client for fast image uploads (if admin account)
+        # THREAD SAFETY: Use lock to prevent race conditions in batch mode
+        if self.rest_client is None:
+            with self.client_lock:
+                if self.rest_client is None:  # Double-check inside lock
+                    # USE FAST API CLIENT (shared per account, possibly prewarmed)
+                    from model.wp_client_registry import get_client_registry
+                    self.rest_client = get_client_registry().get(self.site_url, self.username, self.password, app_password=self.app_password, login=False)
+                    
+                    # Don't login yet - we'll copy cookies from Selenium later
+                    print("[CONTROLLER] ✅ REST API client initialized (will use Selenium cookies)")
+                    self.view.after(0, lambda: self.view.log(f"⚡ Sẵn sàng upload ảnh nhanh với REST API"))
+
+    def _sync_rest_cookies(self):
+        # Sync cookies ONCE for all upload threads
+        self._sync_selenium_session()
+
     def _process_post(self, data, is_batch=False):
-        import concurrent.futures # Import locally to avoid scope issues, or move to top level
+        """Bài lẻ: chạy lần lượt 3 stage của pipeline trên thread hiện tại"""
+        from model.post_pipeline import PipelineJob
         try:
-            # Initialize REST API client for fast image uploads (if admin account)
-            # Initialize REST API client for fast image uploads (if admin account)
-            # Initialize REST API client for fast image uploads (if admin account)
-            # THREAD SAFETY: Use lock to prevent race conditions in batch mode
-            if self.rest_client is None:
-                with self.client_lock:
-                    if self.rest_client is None:  # Double-check inside lock
-                        # USE FAST API CLIENT
-                        from model.wp_rest_api_fast import WordPressRESTClientFast as WordPressRESTClient
-                        self.rest_client = WordPressRESTClient(self.site_url, self.username, self.password, app_password=self.app_password)
-                        
-                        # Don't login yet - we'll copy cookies from Selenium later
-                        print("[CONTROLLER] ✅ REST API client initialized (will use Selenium cookies)")
-                        self.view.after(0, lambda: self.view.log(f"⚡ Sẵn sàng upload ảnh nhanh với REST API"))
+            job = PipelineJob(data, is_batch=is_batch)
+            for stage in (self._stage_prepare_images, self._stage_upload_media, self._stage_create_post):
+                stage(job)
+            success, message, title = job.result
             
-            from model.wp_model import BlogPost
+            # Update UI - PASS TITLE EXPLICITLY
+            self.view.after(0, lambda s=success, m=message, b=is_batch, t=title: self.view.on_post_finished(s, m, b, t))
             
-            # 1. Create Post Object (Content Generation)
-            # Fix: Nếu có video URL nhưng content trống → Auto-generate
-            content = data.content.strip() if data.content else ""
-            if data.video_url and not content:
-                raw_content = ""  # Để trống để auto-generate với video
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            # Pass title from data if possible, or "Error Post"
+            err_title = data.title if hasattr(data, 'title') else "Error Post"
+            self.view.after(0, lambda msg=str(e), b=is_batch, t=err_title: self.view.on_post_finished(False, msg, b, t))
+
+    def _stage_prepare_images(self, job):
+        """
+        Stage 1 (CPU + tải ảnh): tải ảnh URL, optimize featured/content, auto-fetch ảnh xe.
+        Kết quả: job.images = [(type, index, source_path, upload_path)], job.manual_images, job.raw_content
+        """
+        import concurrent.futures
+        data = job.data
+        
+        # Fix: Nếu có video URL nhưng content trống → Auto-generate
+        content = data.content.strip() if data.content else ""
+        if data.video_url and not content:
+            job.raw_content = ""  # Để trống để auto-generate với video
+        else:
+            job.raw_content = content  # Dùng content user nhập
+        
+        self.view.after(0, lambda: self.view.log(f"⚡ Đang xử lý song song tất cả ảnh..."))
+        
+        # 1. Define Upload Tasks
+        # Task format: (type, index, source_path_or_url, is_featured)
+        upload_tasks = []
+        
+        # A. Add Featured Image Task
+        if data.image_url and data.image_url.strip():
+            if not data.image_url.startswith('http'):
+                 upload_tasks.append(('featured', 0, data.image_url, True))
             else:
-                raw_content = content  # Dùng content user nhập
-            
-            # ========================================
-            # UNIFIED PARALLEL IMAGE UPLOAD (Featured + Manual Content)
-            # ========================================
-            self.view.after(0, lambda: self.view.log(f"⚡ Đang xử lý song song tất cả ảnh..."))
-            
-            # Sync cookies ONCE for all threads
-            if self._is_driver_alive() and self.rest_client:
-                 with self.client_lock:
-                     try:
-                         # Sync cookies
-                         selenium_cookies = self.selenium_client.driver.get_cookies()
-                         for cookie in selenium_cookies:
-                             self.rest_client.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain', ''))
-                         # Sync nonce
-                         if not self.rest_client.nonce:
-                             nonce = self.selenium_client.driver.execute_script("return window.wpApiSettings ? window.wpApiSettings.nonce : (window.wp && window.wp.api && window.wp.api.settings ? window.wp.api.settings.nonce : null);")
-                             if nonce: self.rest_client.nonce = nonce
-                     except Exception as e:
-                         print(f"Cookie sync warning: {e}")
+                 # It's a URL - download first, then upload as featured image
+                 # CRITICAL FIX: Previously this was just added to content_image_urls,
+                 # which made it a content image instead of the featured image.
+                 # We need to download it and upload properly to get featured_media_id.
+                 try:
+                     import requests as req
+                     import time as _time
+                     import random
+                     os.makedirs("downloaded_featured", exist_ok=True)
+                     timestamp = _time.strftime("%Y%m%d_%H%M%S")
+                     ext = '.jpg'
+                     if '.png' in data.image_url.lower(): ext = '.png'
+                     elif '.webp' in data.image_url.lower(): ext = '.webp'
+                     # Random suffix: several posts may download in the same second
+                     local_featured_path = f"downloaded_featured/featured_{timestamp}_{random.randint(1000, 9999)}{ext}"
+                     resp = req.get(data.image_url, timeout=15, headers={'User-Agent': 'Mozilla/5.0'})
+                     if resp.status_code == 200:
+                         with open(local_featured_path, 'wb') as f_img:
+                             f_img.write(resp.content)
+                         upload_tasks.append(('featured', 0, local_featured_path, True))
+                         print(f"[CONTROLLER] Downloaded featured image URL to: {local_featured_path}")
+                     else:
+                         print(f"[CONTROLLER] Failed to download featured image URL: {resp.status_code}")
+                 except Exception as dl_err:
+                     print(f"[CONTROLLER] Error downloading featured image URL: {dl_err}")
+        
+        # B. Add Manual Content Images Tasks
+        job.manual_images = []
+        for i, attr in enumerate(['content_image', 'content_image2', 'content_image3'], 1):
+            img_path = getattr(data, attr, '')
+            if img_path and img_path.strip():
+                if not img_path.startswith('http'):
+                    upload_tasks.append(('content', i, img_path, False))
+                else:
+                    job.manual_images.append((i, img_path)) # Direct URL, no upload needed
 
-            
-            content_image_urls = []  # To store successful uploads
-            featured_media_id = None
-            
-            # 1. Define Upload Tasks
-            # Task format: (type, index, source_path_or_url, is_featured)
-            upload_tasks = []
-            
-            # A. Add Featured Image Task
-            if data.image_url and data.image_url.strip():
-                if not data.image_url.startswith('http'):
-                     upload_tasks.append(('featured', 0, data.image_url, True))
+        # 2. Optimize in parallel (upload happens in the next stage)
+        def optimize_image(t_type, t_idx, t_path, t_featured):
+            upload_path = t_path
+            try:
+                from model.image_api import ImageAPI
+                from model.facebook_thumbnail_optimizer import optimize_batched
+                
+                if t_featured:
+                     # Facebook Optimization (High Quality) - gom chung 1 lần optimize_many với
+                     # thumbnail của các bài khác đang chuẩn bị song song (process pool giữ ấm)
+                     optimized = optimize_batched(t_path, enhance=True)
+                     if optimized and os.path.exists(optimized): upload_path = optimized
                 else:
-                     # It's a URL - download first, then upload as featured image
-                     # CRITICAL FIX: Previously this was just added to content_image_urls,
-                     # which made it a content image instead of the featured image.
-                     # We need to download it and upload properly to get featured_media_id.
-                     try:
-                         import requests as req
-                         import time as _time
-                         os.makedirs("downloaded_featured", exist_ok=True)
-                         timestamp = _time.strftime("%Y%m%d_%H%M%S")
-                         ext = '.jpg'
-                         if '.png' in data.image_url.lower(): ext = '.png'
-                         elif '.webp' in data.image_url.lower(): ext = '.webp'
-                         local_featured_path = f"downloaded_featured/featured_{timestamp}{ext}"
-                         resp = req.get(data.image_url, timeout=15, headers={'User-Agent': 'Mozilla/5.0'})
-                         if resp.status_code == 200:
-                             with open(local_featured_path, 'wb') as f_img:
-                                 f_img.write(resp.content)
-                             upload_tasks.append(('featured', 0, local_featured_path, True))
-                             print(f"[CONTROLLER] Downloaded featured image URL to: {local_featured_path}")
-                         else:
-                             print(f"[CONTROLLER] Failed to download featured image URL: {resp.status_code}")
-                     except Exception as dl_err:
-                         print(f"[CONTROLLER] Error downloading featured image URL: {dl_err}")
-            
-            # B. Add Manual Content Images Tasks
-            manual_images = []
-            for i, attr in enumerate(['content_image', 'content_image2', 'content_image3'], 1):
-                img_path = getattr(data, attr, '')
-                if img_path and img_path.strip():
-                    if not img_path.startswith('http'):
-                        upload_tasks.append(('content', i, img_path, False))
-                    else:
-                        manual_images.append((i, img_path)) # Direct URL, no upload needed
-
-            # 2. Execute Parallel Processing (Optimize + Upload)
-            image_results = {} # Map index -> url
-            
-            if upload_tasks:
-                print(f"[CONTROLLER] Processing {len(upload_tasks)} manual images in parallel...")
-                self.view.after(0, lambda: self.view.log(f"🚀 Upload {len(upload_tasks)} ảnh song song..."))
+                     # Content Optimization (Low Quality for speed)
+                     img_api = ImageAPI()
+                     optimized = img_api.optimize_image_for_upload(t_path, max_height=180, quality=55)
+                     if optimized and os.path.exists(optimized): upload_path = optimized
+            except Exception as e:
+                print(f"Optimization error for {t_path}: {e}")
+            return (t_type, t_idx, t_path, upload_path)
+
+        job.images = []
+        if upload_tasks:
+            print(f"[CONTROLLER] Optimizing {len(upload_tasks)} manual images in parallel...")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(upload_tasks)+1, 10)) as executor:
+                futures = [executor.submit(optimize_image, *task) for task in upload_tasks]
+                for future in concurrent.futures.as_completed(futures):
+                    try:
+                        job.images.append(future.result())
+                    except Exception as e:
+                        print(f"Parallel Task Error: {e}")
+
+        # ========================================
+        # 3. Auto-Fetch Car Images (download + optimize)
+        # ========================================
+        job.auto_images = []
+        auto_fetch = getattr(data, 'auto_fetch_images', False)
+        
+        # Check if any MANUAL CONTENT images were provided (ignore featured image)
+        manual_content_provided = any([
+            getattr(data, 'content_image', '').strip(),
+            getattr(data, 'content_image2', '').strip(),
+            getattr(data, 'content_image3', '').strip()
+        ])
+        
+        # Auto-fetch images if enabled and no manual content images provided
+        if auto_fetch and not manual_content_provided:
+            self.view.after(0, lambda: self.view.log(f"🚗 Đang tự động lấy ảnh xe từ API..."))
+            try:
+                from model.image_api import ImageAPI
+                image_api = ImageAPI()
                 
-                with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(upload_tasks)+1, 10)) as executor:
-                    future_to_task = {}
+                # Get car images based on title
+                car_image_urls = image_api.get_car_images_from_title(data.title, count=3)
+                
+                if car_image_urls:
+                    self.view.after(0, lambda count=len(car_image_urls): self.view.log(f"✅ Đã lấy {count} ảnh xe từ API"))
                     
-                    for task_type, idx, path, is_featured in upload_tasks:
-                        # Define wrapper function for optimization + upload
-                        def process_image(t_type, t_idx, t_path, t_featured):
-                            # Optimize
-                            upload_path = t_path
-                            try:
-                                import os
-                                from model.image_api import ImageAPI
-                                from model.facebook_thumbnail_optimizer import FacebookThumbnailOptimizer
-                                
-                                if t_featured:
-                                     # Facebook Optimization (High Quality)
-                                     fb_optimizer = FacebookThumbnailOptimizer()
-                                     optimized = fb_optimizer.optimize_for_facebook(t_path, enhance=True)
-                                     if optimized and os.path.exists(optimized): upload_path = optimized
-                                else:
-                                     # Content Optimization (Low Quality for speed)
-                                     img_api = ImageAPI()
-                                     optimized = img_api.optimize_image_for_upload(t_path, max_height=180, quality=55)
-                                     if optimized and os.path.exists(optimized): upload_path = optimized
-                            except Exception as e:
-                                print(f"Optimization error for {t_path}: {e}")
-                            
-                            # Upload (using sync_cookies=False since we synced globally)
-                            # Note: self._upload_image_smart is thread-safe for Selenium, and fast for REST
-                            mid, url = self._upload_image_smart(upload_path, sync_cookies=False)
-                            
-                            # Clean up optimized file if different
-                            if upload_path != t_path and upload_path and os.path.exists(upload_path):
-                                try:
-                                    os.remove(upload_path)
-                                except: pass
-                                
-                            return (t_type, t_idx, mid, url)
-
-                        future = executor.submit(process_image, task_type, idx, path, is_featured)
-                        future_to_task[future] = (task_type, idx)
+                    # Download images to local folder
+                    import time
+                    import random
+                    os.makedirs("downloaded_cars", exist_ok=True)
                     
-                    # Collect results
-                    for future in concurrent.futures.as_completed(future_to_task):
-                        t_type, t_idx = future_to_task[future]
-                        try:
-                            res_type, res_idx, media_id, url = future.result()
-                            print(f"[CONTROLLER] Upload result: type={res_type}, idx={res_idx}, media_id={media_id}, url={url[:50] if url else 'None'}...")
-                            if url:
-                                if res_type == 'featured':
-                                    featured_media_id = media_id
-                                    print(f"[CONTROLLER] ⭐ FEATURED IMAGE: media_id={featured_media_id}, url={url}")
-                                    # Update data.image_url to key the SEO correct
-                                    data.image_url = url
-                                    # Only add featured image to content if using a custom theme
-                                    # With default WP theme ('none'), the featured image is already
-                                    # displayed by the theme itself - no need to add to content body
-                                    selected_theme = getattr(data, 'theme', 'none')
-                                    if selected_theme and selected_theme != 'none':
-                                        content_image_urls.append(url) # Add featured to content list for custom themes only
-                                    self.view.after(0, lambda: self.view.log(f"✅ Ảnh đại diện OK (ID: {featured_media_id})"))
+                    download_tasks = []
+                    for idx, img_url in enumerate(car_image_urls, 1):
+                        timestamp = time.strftime("%Y%m%d_%H%M%S")
+                        random_suffix = random.randint(1000, 9999)
+                        local_path = f"downloaded_cars/car_api_{timestamp}_{random_suffix}_{idx}.jpg"
+                        download_tasks.append((idx, img_url, local_path))
+                    
+                    # Download all images in parallel
+                    self.view.after(0, lambda: self.view.log(f"📥 Đang tải {len(download_tasks)} ảnh song song..."))
+                    
+                    def download_and_optimize(img_url, local_path):
+                        """Download and immediately optimize image"""
+                        success = image_api.download_image(img_url, local_path)
+                        if success and os.path.exists(local_path):
+                            # Optimize - Low quality for content
+                            optimized_path = image_api.optimize_image_for_upload(local_path, max_height=180, quality=55)
+                            return optimized_path
+                        return None
+                    
+                    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                        future_to_task = {executor.submit(download_and_optimize, t[1], t[2]): t for t in download_tasks}
+                        for future in concurrent.futures.as_completed(future_to_task):
+                            idx, _, local_path = future_to_task[future]
+                            try:
+                                optimized_path = future.result()
+                                if optimized_path:
+                                    job.auto_images.append((idx, optimized_path))
                                 else:
-                                    image_results[res_idx] = url
-                                    self.view.after(0, lambda i=res_idx: self.view.log(f"✅ Ảnh content {i} OK"))
-                            else:
-                                self.view.after(0, lambda t=t_type: self.view.log(f"⚠️ Lỗi upload {t}"))
-                        except Exception as e:
-                             print(f"Parallel Task Error: {e}")
-
-            # Reconstruct content_image_urls list in order
-            # First is featured (already added if success), then manual images in order
-            for idx in sorted(image_results.keys()):
-                content_image_urls.append(image_results[idx])
-            
-            # Add Manual URLs (that didn't need upload)
-            for idx, url in manual_images:
-                content_image_urls.append(url)
-            
-            print(f"[CONTROLLER] Parallel processing done. Total content images: {len(content_image_urls)}")
+                                    if os.path.exists(local_path): os.remove(local_path)
+                            except Exception: pass
+                else:
+                    self.view.after(0, lambda: self.view.log(f"⚠️ Không tìm thấy ảnh xe"))
+            except Exception as e:
+                print(f"Auto-fetch error: {e}")
+        return job
 
-            # ========================================
-            # STEP 3: Auto-Fetch Car Images (Existing Parallel Logic)
-            # ========================================
-            # ... (Existing code for auto-fetch continues below) ...
-            
-            # Check if we need to auto-fetch car images
-            auto_fetch = getattr(data, 'auto_fetch_images', False)
-            
-            # Check if any MANUAL CONTENT images were provided (ignore featured image)
-            manual_content_provided = any([
-                getattr(data, 'content_image', '').strip(),
-                getattr(data, 'content_image2', '').strip(),
-                getattr(data, 'content_image3', '').strip()
-            ])
+    def _stage_upload_media(self, job):
+        """
+        Stage 2 (network): upload ảnh đã optimize song song.
+        Kết quả: job.featured_media_id, job.content_image_urls
+        """
+        import concurrent.futures
+        data = job.data
+        self._ensure_rest_client()
+        self._sync_rest_cookies()
+        
+        from model.derived_image_cache import DerivedImageCache
+        derived_cache = DerivedImageCache.shared()
+        
+        content_image_urls = []  # To store successful uploads
+        featured_media_id = None
+        image_results = {} # Map index -> url
+        
+        def upload_image(t_type, t_idx, t_path, upload_path):
+            # Upload (using sync_cookies=False since we synced globally)
+            # Note: self._upload_image_smart is thread-safe for Selenium, and fast for REST
+            mid, url = self._upload_image_smart(upload_path, sync_cookies=False)
             
-            # Auto-fetch images if enabled and no manual content images provided
-            if auto_fetch and not manual_content_provided:
-                self.view.after(0, lambda: self.view.log(f"🚗 Đang tự động lấy ảnh xe từ API..."))
+            # Clean up optimized file if different (file trong derived cache được giữ cho bài sau)
+            if upload_path != t_path and upload_path and os.path.exists(upload_path) and not derived_cache.owns(upload_path):
                 try:
-                    from model.image_api import ImageAPI
-                    image_api = ImageAPI()
-                    
-                    # Get car images based on title
-                    car_image_urls = image_api.get_car_images_from_title(data.title, count=3)
-                    
-                    if car_image_urls:
-                        self.view.after(0, lambda count=len(car_image_urls): self.view.log(f"✅ Đã lấy {count} ảnh xe từ API"))
-                        
-                        # Download images to local folder
-                        import os
-                        import time
-                        os.makedirs("downloaded_cars", exist_ok=True)
-                        
-                        # PARALLEL DOWNLOAD + OPTIMIZE
-                        import concurrent.futures
-                        download_tasks = []
-                        
-                        for idx, img_url in enumerate(car_image_urls, 1):
-                            timestamp = time.strftime("%Y%m%d_%H%M%S")
-                            import random
-                            random_suffix = random.randint(1000, 9999)
-                            local_path = f"downloaded_cars/car_api_{timestamp}_{random_suffix}_{idx}.jpg"
-                            download_tasks.append((idx, img_url, local_path))
-                        
-                        # Download all images in parallel
-                        self.view.after(0, lambda: self.view.log(f"📥 Đang tải {len(download_tasks)} ảnh song song..."))
-                        downloaded_images = []
-                        
-                        def download_and_optimize(img_url, local_path):
-                            """Download and immediately optimize image"""
-                            success = image_api.download_image(img_url, local_path)
-                            if success and os.path.exists(local_path):
-                                # Optimize - Low quality for content
-                                optimized_path = image_api.optimize_image_for_upload(local_path, max_height=180, quality=55)
-                                return optimized_path
-                            return None
-                        
-                        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-                            future_to_task = {executor.submit(download_and_optimize, t[1], t[2]): t for t in download_tasks}
-                            for future in concurrent.futures.as_completed(future_to_task):
-                                idx, _, local_path = future_to_task[future]
-                                try:
-                                    optimized_path = future.result()
-                                    if optimized_path:
-                                        downloaded_images.append((idx, optimized_path))
-                                    else:
-                                        if os.path.exists(local_path): os.remove(local_path)
-                                except Exception: pass
-
-                        # PARALLEL UPLOAD
-                        if downloaded_images:
-                            self.view.after(0, lambda: self.view.log(f"📤 Upload {len(downloaded_images)} ảnh auto..."))
-                            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-                                future_to_img = {executor.submit(self._upload_image_smart, img[1], False): img for img in downloaded_images}
-                                for future in concurrent.futures.as_completed(future_to_img):
-                                    img = future_to_img[future]
-                                    try:
-                                        _, url = future.result()
-                                        if url: content_image_urls.append(url)
-                                        if os.path.exists(img[1]): os.remove(img[1])
-                                    except Exception: pass
-                    else:
-                        self.view.after(0, lambda: self.view.log(f"⚠️ Không tìm thấy ảnh xe"))
-                except Exception as e:
-                    print(f"Auto-fetch error: {e}")
-            
-            # Note: The existing auto-fetch block starts with:
-            # check auto_fetch... 
-            # We need to make sure we connect correctly.
-            
-            # ... REMOVING OLD SEQUENTIAL BLOCKS ...
-            # The previous code had Step 1 and Step 2 manual separate. 
-            # We replaced them with the block above.
-            
-            # We need to ensure variables align for the BlogPost creation below.
-            
-            # DEBUG: Log critical values before BlogPost creation
-            print(f"[CONTROLLER] ========== BLOGPOST CREATION ==========")
-            print(f"[CONTROLLER] Title: {data.title[:50]}")
-            print(f"[CONTROLLER] image_url: {data.image_url[:80] if data.image_url else 'NONE'}")
-            print(f"[CONTROLLER] featured_media_id: {featured_media_id}")
-            print(f"[CONTROLLER] content_image_urls count: {len(content_image_urls)}")
-            for i, cimg in enumerate(content_image_urls):
-                print(f"[CONTROLLER]   content_image[{i}]: {cimg[:80]}")
-            print(f"[CONTROLLER] ==========================================")
-            
-            # Create BlogPost with featured_media_id (Critical for setting WordPress Featured Image)
-            # data.image_url passed as fallback image_url
-            post = BlogPost(data.title, data.video_url, data.image_url, raw_content, content_images=content_image_urls, featured_media_id=featured_media_id)
-            
-            # Set theme if provided
-            if hasattr(data, 'theme') and data.theme:
-                post.theme = data.theme
-                print(f"[CONTROLLER] Using theme: {data.theme}")
-            
-            post.generate_seo_content()
-
-            # 2. Use Auto Client (tries REST API first, then Selenium)
-            # Check if we have an existing selenium client (for image uploads)
-            if not self._is_driver_alive():
-                # Initialize selenium client for image uploads
-                print("[CONTROLLER] Selenium driver not available, initializing...")
-                from model.selenium_wp import SeleniumWPClient
-                self.selenium_client = SeleniumWPClient(self.site_url, self.username, self.password)
-                self.selenium_client.init_driver(headless=False)
-                self.selenium_client.login()
+                    os.remove(upload_path)
+                except: pass
+            return (t_type, t_idx, mid, url)
 
-            
-            # 3. Execute Post using Auto Client (REST API → Selenium fallback)
-            if not is_batch:
-                print(f"[INFO] Đang đăng bài (tự động chọn phương thức tốt nhất)...")  # Terminal only
-            
-            # Use WPAutoClient for intelligent method selection
-            from model.wp_model import WPAutoClient
-            auto_client = WPAutoClient(self.site_url, self.username, self.password)
-            
-            # Pass existing selenium client to avoid re-login if REST API fails
-            success, message = auto_client.post_article(post, reuse_selenium_client=self.selenium_client, reuse_fast_client=self.rest_client)
-            
-            # 4. Update UI - PASS TITLE EXPLICITLY
-            self.view.after(0, lambda s=success, m=message, b=is_batch, t=post.title: self.view.on_post_finished(s, m, b, t))
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            # Pass title from data if possible, or "Error Post"
-            err_title = data.title if hasattr(data, 'title') else "Error Post"
-            self.view.after(0, lambda msg=str(e), b=is_batch, t=err_title: self.view.on_post_finished(False, msg, b, t))
+        if job.images:
+            self.view.after(0, lambda n=len(job.images): self.view.log(f"🚀 Upload {n} ảnh song song..."))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(job.images)+1, 10)) as executor:
+                future_to_task = {executor.submit(upload_image, *img): img[:2] for img in job.images}
+                
+                # Collect results
+                for future in concurrent.futures.as_completed(future_to_task):
+                    t_type, t_idx = future_to_task[future]
+                    try:
+                        res_type, res_idx, media_id, url = future.result()
+                        print(f"[CONTROLLER] Upload result: type={res_type}, idx={res_idx}, media_id={media_id}, url={url[:50] if url else 'None'}...")
+                        if url:
+                            if res_type == 'featured':
+                                featured_media_id = media_id
+                                print(f"[CONTROLLER] ⭐ FEATURED IMAGE: media_id={featured_media_id}, url={url}")
+                                # Update data.image_url to key the SEO correct
+                                data.image_url = url
+                                # Only add featured image to content if using a custom theme
+                                # With default WP theme ('none'), the featured image is already
+                                # displayed by the theme itself - no need to add to content body
+                                selected_theme = getattr(data, 'theme', 'none')
+                                if selected_theme and selected_theme != 'none':
+                                    content_image_urls.append(url) # Add featured to content list for custom themes only
+                                self.view.after(0, lambda m=featured_media_id: self.view.log(f"✅ Ảnh đại diện OK (ID: {m})"))
+                            else:
+                                image_results[res_idx] = url
+                                self.view.after(0, lambda i=res_idx: self.view.log(f"✅ Ảnh content {i} OK"))
+                        else:
+                            self.view.after(0, lambda t=t_type: self.view.log(f"⚠️ Lỗi upload {t}"))
+                    except Exception as e:
+                         print(f"Parallel Task Error: {e}")
+
+        # Reconstruct content_image_urls list in order
+        # First is featured (already added if success), then manual images in order
+        for idx in sorted(image_results.keys()):
+            content_image_urls.append(image_results[idx])
+        
+        # Add Manual URLs (that didn't need upload)
+        for idx, url in job.manual_images:
+            content_image_urls.append(url)
+
+        # Auto-fetched car images
+        if job.auto_images:
+            self.view.after(0, lambda n=len(job.auto_images): self.view.log(f"📤 Upload {n} ảnh auto..."))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+                future_to_img = {executor.submit(self._upload_image_smart, img[1], False): img for img in job.auto_images}
+                for future in concurrent.futures.as_completed(future_to_img):
+                    img = future_to_img[future]
+                    try:
+                        _, url = future.result()
+                        if url: content_image_urls.append(url)
+                        if os.path.exists(img[1]) and not derived_cache.owns(img[1]): os.remove(img[1])
+                    except Exception: pass
+        
+        print(f"[CONTROLLER] Parallel upload done. Total content images: {len(content_image_urls)}")
+        job.featured_media_id = featured_media_id
+        job.content_image_urls = content_image_urls
+        return job
+
+    def _stage_create_post(self, job):
+        """
+        Stage 3: generate SEO content + đăng bài (WPAutoClient: REST API → Selenium fallback).
+        Kết quả: job.result = (success, message, title)
+        """
+        from model.wp_model import BlogPost, WPAutoClient
+        data = job.data
+        featured_media_id = job.featured_media_id
+        content_image_urls = job.content_image_urls
+        
+        # DEBUG: Log critical values before BlogPost creation
+        print(f"[CONTROLLER] ========== BLOGPOST CREATION ==========")
+        print(f"[CONTROLLER] Title: {data.title[:50]}")
+        print(f"[CONTROLLER] image_url: {data.image_url[:80] if data.image_url else 'NONE'}")
+        print(f"[CONTROLLER] featured_media_id: {featured_media_id}")
+        print(f"[CONTROLLER] content_image_urls count: {len(content_image_urls)}")
+        for i, cimg in enumerate(content_image_urls):
+            print(f"[CONTROLLER]   content_image[{i}]: {cimg[:80]}")
+        print(f"[CONTROLLER] ==========================================")
+        
+        # Create BlogPost with featured_media_id (Critical for setting WordPress Featured Image)
+        # data.image_url passed as fallback image_url
+        post = BlogPost(data.title, data.video_url, data.image_url, job.raw_content, content_images=content_image_urls, featured_media_id=featured_media_id)
+        
+        # Set theme if provided
+        if hasattr(data, 'theme') and data.theme:
+            post.theme = data.theme
+            print(f"[CONTROLLER] Using theme: {data.theme}")
+        
+        post.generate_seo_content()
+
+        # Execute Post using Auto Client (REST API → Selenium fallback)
+        if not job.is_batch:
+            print(f"[INFO] Đang đăng bài (tự động chọn phương thức tốt nhất)...")  # Terminal only
+        
+        # Use WPAutoClient for intelligent method selection
+        auto_client = WPAutoClient(self.site_url, self.username, self.password)
+        
+        # Chỉ khi REST thất bại mới mượn 1 driver đã login trong pool (pool tự tạo lại nếu driver chết)
+        success, message = auto_client.post_article(post, reuse_fast_client=self.rest_client,
+                                                    selenium_lease=lambda: self._wp_driver_pool().lease())
+        job.result = (success, message, post.title)
+        return job
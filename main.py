@@ -34,9 +34,14 @@ def cleanup_chrome_on_exit():
     except Exception as e:
         print(f"[CLEANUP] ⚠️  Lỗi: {e}")
 
-# Register cleanup function to run on exit
-atexit.register(cleanup_chrome_on_exit)
-
 if __name__ == "__main__":
+    # Worker processes (image/render pools) re-import this module: only the main
+    # process may register the Chrome cleanup, and frozen builds need freeze_support
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
+    # Register cleanup function to run on exit
+    atexit.register(cleanup_chrome_on_exit)
+    
     app = AppController()
     app.run()
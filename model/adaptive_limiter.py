@@ -0,0 +1,228 @@
+"""
+Adaptive Concurrency Limiter (AIMD) - 1 limiter cho mỗi host WordPress
+Thay cho Semaphore cố định toàn cục:
+- Site nhanh: window tăng dần (+1 mỗi RTT khi latency/success khỏe)
+- Site bị 429/503/timeout: window giảm một nửa, tôn trọng Retry-After
+- Site này bị chặn KHÔNG làm kẹt upload của site khác
+"""
+
+import asyncio
+import os
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from urllib.parse import urlparse
+
+
+def _env_int(name, default, low, high):
+    try:
+        v = int(os.environ.get(name, "").strip() or default)
+        return max(low, min(v, high))
+    except Exception:
+        return default
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency window cho 1 host.
+    Thread-safe; có cả slot() (sync) và async_slot() (asyncio).
+    """
+
+    # Status codes that mean "server overloaded / slow down"
+    CONGESTION_STATUSES = (429, 503)
+
+    def __init__(self, host="", initial_window=5, min_window=1, max_window=30, latency_factor=2.0):
+        """
+        Args:
+            host: Tên host (chỉ để log)
+            initial_window: Số request đồng thời ban đầu
+            min_window: Window nhỏ nhất
+            max_window: Window lớn nhất
+            latency_factor: RTT > min_rtt * factor được coi là "chậm" (không tăng window)
+        """
+        self.host = host
+        self.min_window = max(1, min_window)
+        self.max_window = max(self.min_window, max_window)
+        self._window = float(max(self.min_window, min(initial_window, self.max_window)))
+        self.latency_factor = latency_factor
+
+        self.in_flight = 0
+        self.rtt = None          # EWMA of request latency (seconds)
+        self.min_rtt = None
+        self.blocked_until = 0.0  # Retry-After gate
+        self._last_decrease = 0.0
+
+        self.successes = 0
+        self.congestion_events = 0
+
+        self._cond = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Public state
+    # ------------------------------------------------------------------
+
+    @property
+    def window(self):
+        """Current concurrency window (integer)"""
+        return max(self.min_window, int(self._window))
+
+    def snapshot(self):
+        """State dict cho log/BatchUploadManager"""
+        with self._cond:
+            return {
+                'host': self.host,
+                'window': self.window,
+                'in_flight': self.in_flight,
+                'rtt': self.rtt,
+                'min_rtt': self.min_rtt,
+                'successes': self.successes,
+                'congestion_events': self.congestion_events,
+                'blocked_for': max(0.0, self.blocked_until - time.time()),
+            }
+
+    # ------------------------------------------------------------------
+    # Acquire / release
+    # ------------------------------------------------------------------
+
+    def _can_enter(self, now):
+        return self.in_flight < self.window and now >= self.blocked_until
+
+    def acquire(self, timeout=None):
+        """Chờ tới khi có slot (blocking). Returns True nếu lấy được slot."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._can_enter(now):
+                    self.in_flight += 1
+                    return True
+                if deadline is not None and now >= deadline:
+                    return False
+                wait = 0.5
+                if self.blocked_until > now:
+                    wait = min(wait, self.blocked_until - now)
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                self._cond.wait(max(0.01, wait))
+
+    def try_acquire(self):
+        """Non-blocking acquire"""
+        with self._cond:
+            if self._can_enter(time.time()):
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self):
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+    # Feedback
+    # ------------------------------------------------------------------
+
+    def on_success(self, rtt):
+        """Request thành công: cập nhật RTT, tăng window nếu latency khỏe (additive increase)"""
+        with self._cond:
+            self.successes += 1
+            if rtt is not None and rtt > 0:
+                self.rtt = rtt if self.rtt is None else (0.8 * self.rtt + 0.2 * rtt)
+                self.min_rtt = rtt if self.min_rtt is None else min(self.min_rtt, rtt)
+
+            healthy = (
+                self.min_rtt is None or rtt is None
+                or rtt <= self.min_rtt * self.latency_factor
+            )
+            if healthy and self._window < self.max_window:
+                # +1 per full window of successes (~ +1 per RTT)
+                self._window = min(self.max_window, self._window + 1.0 / max(1.0, self._window))
+            self._cond.notify_all()
+
+    def on_congestion(self, retry_after=None, reason=""):
+        """429/503/timeout: giảm window một nửa (tối đa 1 lần mỗi RTT), chặn theo Retry-After"""
+        with self._cond:
+            now = time.time()
+            self.congestion_events += 1
+            cooldown = self.rtt or 1.0
+            if now - self._last_decrease >= cooldown:
+                old = self.window
+                self._window = max(float(self.min_window), self._window / 2.0)
+                self._last_decrease = now
+                print(f"[LIMITER] ⚠️ {self.host}: {reason or 'congestion'} → window {old} → {self.window}")
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+            self._cond.notify_all()
+
+    def record_response(self, status_code, rtt, retry_after_header=None):
+        """
+        Feedback từ 1 HTTP response: 2xx/3xx tăng window, 429/503 giảm,
+        các lỗi khác (400/401/403/404, 500...) trung tính - vòng lặp lỗi auth không được tăng tốc
+        """
+        if status_code in self.CONGESTION_STATUSES:
+            self.on_congestion(parse_retry_after(retry_after_header), reason=f"HTTP {status_code}")
+        elif status_code is not None and 200 <= status_code < 400:
+            self.on_success(rtt)
+
+    def record_timeout(self):
+        self.on_congestion(reason="timeout")
+
+    # ------------------------------------------------------------------
+    # Context managers
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def slot(self):
+        """with limiter.slot(): ... (sync)"""
+        self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def async_slot(self, poll_interval=0.05):
+        """async with limiter.async_slot(): ... (không block event loop)"""
+        while not self.try_acquire():
+            await asyncio.sleep(poll_interval)
+        try:
+            yield self
+        finally:
+            self.release()
+
+
+def parse_retry_after(value):
+    """Retry-After (giây) -> float, hoặc None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_host_limiter(site_url):
+    """
+    Limiter dùng chung cho 1 host (process-wide).
+    WP_MAX_CONCURRENT_UPLOADS = window ban đầu, WP_MAX_CONCURRENT_UPLOADS_CAP = window tối đa.
+    """
+    host = (urlparse(site_url).netloc or site_url or "").lower()
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter(
+                host=host,
+                initial_window=_env_int("WP_MAX_CONCURRENT_UPLOADS", 5, 1, 30),
+                max_window=_env_int("WP_MAX_CONCURRENT_UPLOADS_CAP", 30, 1, 100),
+            )
+            _limiters[host] = limiter
+        return limiter
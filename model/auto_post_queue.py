@@ -0,0 +1,83 @@
+"""
+Auto Post Queue - sổ sách hàng chờ CHAY AUTO, không phụ thuộc GUI
+- Tối đa K bài chạy song song (AUTO_POST_CONCURRENCY, không vượt cửa sổ rate limiter của site)
+- Mỗi bài đang chạy có 1 token: bài xong không theo thứ tự vẫn tìm đúng item
+- Xoá item theo identity (2 bài trùng tiêu đề không bị xoá nhầm)
+- Content pool: mỗi nội dung .txt chỉ được gán cho đúng 1 bài
+"""
+
+import os
+import threading
+
+
+def queue_concurrency(window=None):
+    """
+    Số bài AUTO chạy song song (K): AUTO_POST_CONCURRENCY (mặc định 3),
+    không vượt quá cửa sổ hiện tại của rate limiter (window, nếu có).
+    """
+    try:
+        k = max(1, int(os.environ.get("AUTO_POST_CONCURRENCY", "3")))
+    except ValueError:
+        k = 3
+    if window is not None:
+        k = min(k, int(window))
+    return max(1, k)
+
+
+class AutoPostQueue:
+    """Hàng chờ AUTO: items theo thứ tự thêm vào + các bài đang chạy (token -> item)"""
+
+    def __init__(self):
+        self.items = []  # dict bài, giữ thứ tự thêm vào
+        self.in_flight = {}  # token -> item
+        self.content_pool = []
+        self.content_pool_lock = threading.Lock()
+        self._token_seq = 0
+
+    def pending(self):
+        """Các bài chưa bắt đầu"""
+        return [item for item in self.items if not item.get('_in_flight')]
+
+    def is_finished(self):
+        return not self.in_flight and not self.pending()
+
+    def start_next(self, window=None):
+        """
+        Đánh dấu các bài được chạy tiếp để lấp chỗ trống (tối đa K đang chạy).
+
+        Returns:
+            list: (token, item) cần bắt đầu
+        """
+        slots = queue_concurrency(window) - len(self.in_flight)
+        started = []
+        for item in self.pending()[:max(0, slots)]:
+            self._token_seq += 1
+            item['_in_flight'] = True
+            self.in_flight[self._token_seq] = item
+            started.append((self._token_seq, item))
+        return started
+
+    def finished_item(self, token=None):
+        """
+        Item vừa xong: theo token (K bài song song), không có token → bài đầu hàng chờ (đường cũ).
+        Chưa xoá khỏi hàng chờ - gọi remove() sau khi xử lý xong.
+        """
+        if token is not None:
+            return self.in_flight.pop(token, None)
+        return self.items[0] if self.items else None
+
+    def remove(self, item):
+        """Xóa đúng item đã xong khỏi hàng chờ (so sánh identity, không dùng index / tiêu đề)"""
+        item.pop('_in_flight', None)
+        for i, queued in enumerate(self.items):
+            if queued is item:
+                del self.items[i]
+                return True
+        return False
+
+    def take_content(self):
+        """Lấy 1 nội dung từ content_pool (atomic) → (content_item hoặc None, số còn lại)"""
+        with self.content_pool_lock:
+            if self.content_pool:
+                return self.content_pool.pop(0), len(self.content_pool)
+        return None, 0
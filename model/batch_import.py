@@ -7,6 +7,8 @@ import json
 import os
 from pathlib import Path
 
+from model.url_canonicalizer import canonical_key
+
 
 class BatchImporter:
     """Import video links từ file CSV/Excel và chuẩn bị scan"""
@@ -14,6 +16,32 @@ class BatchImporter:
     def __init__(self):
         self.videos = []
         self.errors = []
+        self.duplicates = 0
+        self._seen = set()  # canonical key của các video đã import
+    
+    def _add_video(self, url, title):
+        """
+        Thêm 1 video nếu chưa có (so theo danh tính video, không theo URL thô).
+        Returns: True nếu được thêm, False nếu trùng
+        """
+        key = canonical_key(url)
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen.add(key)
+        self.videos.append({
+            'url': url,
+            'title': title,
+            'status': 'pending',
+            'thumbnail': None,
+            'embed_code': None,
+            'video_id': None
+        })
+        return True
+    
+    def _duplicates_note(self, before):
+        count = self.duplicates - before
+        return f" (bỏ {count} link trùng)" if count else ""
     
     def import_csv(self, file_path):
         """Import từ file CSV"""
@@ -47,23 +75,17 @@ class BatchImporter:
                 
                 # Read rows
                 row_count = 0
+                dup_before = self.duplicates
                 for row in reader:
                     url = row.get(url_col, '').strip()
                     title = row.get(title_col, '').strip() if title_col else ''
                     
-                    if url:
-                        self.videos.append({
-                            'url': url,
-                            'title': title or 'Auto-generated',
-                            'status': 'pending',
-                            'thumbnail': None,
-                            'embed_code': None,
-                            'video_id': None
-                        })
+                    if url and self._add_video(url, title or 'Auto-generated'):
                         row_count += 1
                 
-                print(f"[IMPORT] ✅ Đã import {row_count} video")
-                return True, f"Đã import {row_count} video"
+                note = self._duplicates_note(dup_before)
+                print(f"[IMPORT] ✅ Đã import {row_count} video{note}")
+                return True, f"Đã import {row_count} video{note}"
                 
         except Exception as e:
             error_msg = f"Lỗi đọc CSV: {str(e)}"
@@ -79,6 +101,7 @@ class BatchImporter:
             with open(file_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
             
+            dup_before = self.duplicates
             if isinstance(data, list):
                 for item in data:
                     if isinstance(item, dict):
@@ -86,17 +109,11 @@ class BatchImporter:
                         title = item.get('title') or item.get('name') or 'Auto-generated'
                         
                         if url:
-                            self.videos.append({
-                                'url': url,
-                                'title': title,
-                                'status': 'pending',
-                                'thumbnail': None,
-                                'embed_code': None,
-                                'video_id': None
-                            })
+                            self._add_video(url, title)
             
-            print(f"[IMPORT] ✅ Đã import {len(self.videos)} video từ JSON")
-            return True, f"Đã import {len(self.videos)} video"
+            note = self._duplicates_note(dup_before)
+            print(f"[IMPORT] ✅ Đã import {len(self.videos)} video từ JSON{note}")
+            return True, f"Đã import {len(self.videos)} video{note}"
             
         except Exception as e:
             error_msg = f"Lỗi đọc JSON: {str(e)}"
@@ -113,21 +130,16 @@ class BatchImporter:
                 lines = f.readlines()
             
             row_count = 0
+            dup_before = self.duplicates
             for line in lines:
                 url = line.strip()
                 if url and not url.startswith('#'):  # Skip empty lines and comments
-                    self.videos.append({
-                        'url': url,
-                        'title': 'Auto-generated',
-                        'status': 'pending',
-                        'thumbnail': None,
-                        'embed_code': None,
-                        'video_id': None
-                    })
-                    row_count += 1
+                    if self._add_video(url, 'Auto-generated'):
+                        row_count += 1
             
-            print(f"[IMPORT] ✅ Đã import {row_count} video từ TXT")
-            return True, f"Đã import {row_count} video"
+            note = self._duplicates_note(dup_before)
+            print(f"[IMPORT] ✅ Đã import {row_count} video từ TXT{note}")
+            return True, f"Đã import {row_count} video{note}"
             
         except Exception as e:
             error_msg = f"Lỗi đọc TXT: {str(e)}"
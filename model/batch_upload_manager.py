@@ -9,7 +9,9 @@ import queue
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Tuple, Callable, Optional
 import json
+import math
 import os
+from model.job_journal import JobJournal, post_fingerprint
 
 
 class BatchUploadManager:
@@ -23,7 +25,9 @@ class BatchUploadManager:
         batch_size: int = 20,
         max_parallel_batches: int = 3,
         max_workers_per_batch: int = 5,
-        checkpoint_file: str = "upload_checkpoint.json"
+        checkpoint_file: str = "upload_checkpoint.json",
+        limiter=None,
+        journal_file: str = "upload_journal.jsonl"
     ):
         """
         Args:
@@ -31,15 +35,22 @@ class BatchUploadManager:
             max_parallel_batches: Số batches chạy song song (default: 3)
             max_workers_per_batch: Số uploads song song/batch (default: 5)
             checkpoint_file: File lưu progress
+            limiter: Optional AdaptiveConcurrencyLimiter của site; nếu có,
+                số workers/batch được tính lại từ window hiện tại mỗi khi bắt đầu batch
+            journal_file: Journal JSONL lưu trạng thái từng bài (để resume)
         """
         self.batch_size = batch_size
         self.max_parallel_batches = max_parallel_batches
         self.max_workers_per_batch = max_workers_per_batch
         self.checkpoint_file = checkpoint_file
+        self.limiter = limiter
+        self.journal_file = journal_file
+        self.journal = None  # Opened lazily by process_posts_batch
         
         # Statistics
         self.total_posts = 0
         self.completed_posts = 0
+        self.skipped_posts = 0
         self.failed_posts = []
         self.start_time = None
         
@@ -56,19 +67,44 @@ class BatchUploadManager:
         self,
         posts: List[Dict],
         upload_func: Callable,
-        progress_callback: Optional[Callable] = None
+        progress_callback: Optional[Callable] = None,
+        resume: bool = True
     ) -> Tuple[int, int, List[Dict]]:
         """
         Xử lý hàng loạt posts với batch processing
         
+        Mỗi post được gắn '_job_fp' (fingerprint ổn định) và '_job_state'
+        (trạng thái đã ghi trong journal, vd: {'state': 'draft_created', 'data': {'post_id': 12}})
+        để upload_func có thể làm tiếp từ chỗ dừng. upload_func báo các bước trung gian
+        qua mark_stage(post, state, **data).
+        
         Args:
             posts: List of post data dicts
             upload_func: Function to upload a single post (post_data) -> (success, result)
             progress_callback: Optional callback(completed, total, eta)
+            resume: Bỏ qua các bài đã 'published' trong journal (default: True)
             
         Returns:
             (success_count, failed_count, failed_posts)
         """
+        if self.journal is None:
+            self.journal = JobJournal(self.journal_file)
+        
+        # RESUME: skip posts the journal already saw published
+        pending_posts = []
+        self.skipped_posts = 0
+        for post in posts:
+            fp = post_fingerprint(post)
+            post['_job_fp'] = fp
+            post['_job_state'] = self.journal.state_of(fp)
+            if resume and self.journal.is_done(fp):
+                self.skipped_posts += 1
+                continue
+            pending_posts.append(post)
+        if self.skipped_posts:
+            print(f"[BATCH_MGR] ⏭️ Resume: skipping {self.skipped_posts} posts already published")
+        posts = pending_posts
+        
         self.total_posts = len(posts)
         self.completed_posts = 0
         self.failed_posts = []
@@ -123,8 +159,11 @@ class BatchUploadManager:
             print(f"[BATCH_MGR] 🔄 Retrying {self.retry_queue.qsize()} failed posts...")
             self._process_retry_queue(upload_func)
         
+        self.journal.sync()
+        self._save_checkpoint()
+        
         # Final stats
-        elapsed = time.time() - self.start_time
+        elapsed = max(time.time() - self.start_time, 1e-6)
         success_count = self.completed_posts - len(self.failed_posts)
         
         print(f"\n[BATCH_MGR] ✅ COMPLETED!")
@@ -135,6 +174,24 @@ class BatchUploadManager:
         
         return success_count, len(self.failed_posts), self.failed_posts
     
+    def mark_stage(self, post: Dict, state: str, **data):
+        """
+        Ghi bước trung gian của 1 bài vào journal
+        (vd: mark_stage(post, 'media_uploaded', media_id=55) hoặc 'draft_created', post_id=12)
+        """
+        fp = post.get('_job_fp') or post_fingerprint(post)
+        if self.journal is not None:
+            self.journal.record(fp, state, **data)
+    
+    def _record_result(self, post: Dict, success: bool, result):
+        if self.journal is None:
+            return
+        if success:
+            self.mark_stage(post, 'published', result=result)
+        else:
+            # Không ghi đè draft_created / media_uploaded bằng 'failed' → resume vẫn dùng lại được
+            self.journal.record_failure(post.get('_job_fp') or post_fingerprint(post), result)
+    
     def _split_into_batches(self, posts: List[Dict]) -> List[List[Dict]]:
         """Chia posts thành batches"""
         batches = []
@@ -143,6 +200,16 @@ class BatchUploadManager:
             batches.append(batch)
         return batches
     
+    def _workers_for_batch(self) -> int:
+        """
+        Số workers cho batch sắp chạy.
+        Có limiter: chia window hiện tại của site cho các batches song song
+        (window tăng khi site khỏe, giảm khi bị 429/503).
+        """
+        if self.limiter is None:
+            return self.max_workers_per_batch
+        return max(1, math.ceil(self.limiter.window / self.max_parallel_batches))
+    
     def _process_single_batch(
         self,
         batch_idx: int,
@@ -157,14 +224,19 @@ class BatchUploadManager:
             (success_count, failed_count)
         """
         batch_size = len(batch)
-        print(f"[BATCH {batch_idx}/{total_batches}] 🚀 Processing {batch_size} posts...")
+        workers = self._workers_for_batch()
+        print(f"[BATCH {batch_idx}/{total_batches}] 🚀 Processing {batch_size} posts with {workers} workers...")
+        if self.limiter is not None:
+            state = self.limiter.snapshot()
+            rtt = f"{state['rtt']:.2f}s" if state['rtt'] else "n/a"
+            print(f"[BATCH {batch_idx}] 📶 Site window={state['window']}, rtt={rtt}")
         
         batch_start = time.time()
         batch_success = 0
         batch_failed = 0
         
         # Process posts in this batch (parallel within batch)
-        with ThreadPoolExecutor(max_workers=self.max_workers_per_batch) as executor:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
             future_to_post = {
                 executor.submit(upload_func, post): post
                 for post in batch
@@ -174,6 +246,7 @@ class BatchUploadManager:
                 post = future_to_post[future]
                 try:
                     success, result = future.result()
+                    self._record_result(post, success, result)
                     
                     with self.stats_lock:
                         self.completed_posts += 1
@@ -195,6 +268,7 @@ class BatchUploadManager:
                     
                 except Exception as e:
                     print(f"[BATCH {batch_idx}] ❌ Post error: {e}")
+                    self._record_result(post, False, e)
                     batch_failed += 1
                     with self.stats_lock:
                         self.completed_posts += 1
@@ -218,7 +292,9 @@ class BatchUploadManager:
                 post = self.retry_queue.get_nowait()
                 print(f"[RETRY] Retrying post: {post.get('title', 'Unknown')[:30]}...")
                 
+                post['_job_state'] = self.journal.state_of(post['_job_fp']) if self.journal else None
                 success, result = upload_func(post)
+                self._record_result(post, success, result)
                 if success:
                     print(f"[RETRY] ✅ Success!")
                     # Remove from failed list
@@ -251,6 +327,9 @@ class BatchUploadManager:
                 'total': self.total_posts,
                 'completed': self.completed_posts,
                 'failed': len(self.failed_posts),
+                'skipped': self.skipped_posts,
+                'journal': self.journal_file,
+                'states': self.journal.summary() if self.journal else {},
                 'timestamp': time.time()
             }
             
@@ -267,11 +346,19 @@ class BatchUploadManager:
                 with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
                     checkpoint = json.load(f)
                     print(f"[CHECKPOINT] 📂 Loaded: {checkpoint['completed']}/{checkpoint['total']} completed")
+                    if checkpoint.get('states'):
+                        print(f"[CHECKPOINT] 📒 Journal states: {checkpoint['states']}")
                     return checkpoint
         except Exception as e:
             print(f"[CHECKPOINT] ⚠️ Load error: {e}")
         
         return None
+    
+    def close(self):
+        """Đóng journal (fsync phần còn lại)"""
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
 
 
 # ============================================================================
@@ -0,0 +1,216 @@
+"""
+Bulk Offline Renderer - render HTML cho hàng nghìn bài từ CSV/Excel, không cần WordPress
+- Input: CSV (BatchPostData: title, video_url, image_path, content) hoặc Excel (ExcelHelper.read_excel)
+- Render song song bằng process pool (BlogPost.generate_seo_content hoặc seo_html.wrap_seo_html)
+- Output: thư mục .html hoặc 1 file .jsonl
+- Báo throughput theo từng theme để review / benchmark riêng phần tạo nội dung
+
+Usage:
+    python -m model.bulk_renderer sample_posts.csv -o rendered/ --themes supercar,news --workers 4
+    python -m model.bulk_renderer videos.xlsx -o rendered.jsonl --renderer seo
+"""
+
+import concurrent.futures
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+RENDERERS = ('theme', 'seo')
+
+
+def load_rows(input_path):
+    """
+    Đọc input thành list of dict {'title', 'video_url', 'image_url', 'content'}
+
+    Raises:
+        ValueError: Định dạng không hỗ trợ / Excel đọc lỗi
+    """
+    ext = os.path.splitext(input_path)[1].lower()
+    if ext == '.csv':
+        from model.batch_helper import BatchPostData
+        return BatchPostData(input_path).posts
+    if ext in ('.xlsx', '.xlsm'):
+        from model.excel_helper import ExcelHelper
+        videos, error = ExcelHelper.read_excel(input_path)
+        if videos is None:
+            raise ValueError(error)
+        return [
+            {'title': str(v.get('title') or ''), 'video_url': v.get('url', ''), 'image_url': '', 'content': ''}
+            for v in videos
+        ]
+    raise ValueError(f"Unsupported input format: {ext} (use .csv or .xlsx)")
+
+
+def render_row(row, theme, renderer='theme'):
+    """Render 1 bài → HTML (chạy trong worker process)"""
+    if renderer == 'seo':
+        from model.seo_html import wrap_seo_html
+        result = wrap_seo_html(row['title'], row.get('content', ''), row.get('image_url', ''))
+        return result.get('content_html', '') if isinstance(result, dict) else str(result)
+
+    from model.wp_model import BlogPost
+    post = BlogPost(row['title'], row.get('video_url', ''), row.get('image_url', ''), row.get('content', ''))
+    post.theme = theme
+    post.generate_seo_content()
+    return post.content
+
+
+def _render_chunk(chunk, renderer, quiet):
+    """Worker: render 1 lô (index, row, theme); trả về kết quả kèm thời gian render"""
+    results = []
+    sink = io.StringIO() if quiet else None
+    with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+        for index, row, theme in chunk:
+            start = time.perf_counter()
+            try:
+                html, error = render_row(row, theme, renderer), None
+            except Exception as e:
+                html, error = "", str(e)
+            results.append({
+                'index': index,
+                'title': row.get('title', ''),
+                'theme': theme,
+                'html': html,
+                'error': error,
+                'seconds': time.perf_counter() - start,
+            })
+            if sink is not None:
+                sink.seek(0)
+                sink.truncate()
+    return results
+
+
+class BulkRenderer:
+    """Render nhiều bài song song, ghi ra thư mục hoặc JSONL, thống kê theo theme"""
+
+    def __init__(self, themes=None, renderer='theme', workers=None, chunk_size=25, quiet=True):
+        """
+        Args:
+            themes: List theme id; mỗi bài được render với từng theme (mặc định ['supercar'])
+            renderer: 'theme' (BlogPost + ThemeManager) hoặc 'seo' (seo_html.wrap_seo_html)
+            workers: Số process (mặc định os.cpu_count())
+            chunk_size: Số bài mỗi lần gửi sang worker
+            quiet: Tắt log print trong worker
+        """
+        if renderer not in RENDERERS:
+            raise ValueError(f"renderer must be one of {RENDERERS}")
+        self.themes = list(themes or ['supercar'])
+        if renderer == 'seo':
+            self.themes = ['seo']
+        self.renderer = renderer
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(1, chunk_size)
+        self.quiet = quiet
+        self.stats = {}
+
+    def _jobs(self, rows):
+        jobs = [(i, row, theme) for i, row in enumerate(rows) for theme in self.themes]
+        return [jobs[i:i + self.chunk_size] for i in range(0, len(jobs), self.chunk_size)]
+
+    def render(self, rows, output):
+        """
+        Args:
+            rows: list of dict (xem load_rows)
+            output: Thư mục (1 file .html/bài/theme) hoặc đường dẫn .jsonl
+
+        Returns:
+            dict: thống kê (xem summary())
+        """
+        self.stats = {theme: {'renders': 0, 'errors': 0, 'render_seconds': 0.0, 'chars': 0} for theme in self.themes}
+        to_jsonl = output.lower().endswith('.jsonl')
+        if to_jsonl:
+            os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+            sink = open(output, 'w', encoding='utf-8')
+        else:
+            os.makedirs(output, exist_ok=True)
+            sink = None
+
+        chunks = self._jobs(rows)
+        start = time.perf_counter()
+        try:
+            if self.workers <= 1:
+                batches = (_render_chunk(c, self.renderer, self.quiet) for c in chunks)
+                for batch in batches:
+                    self._write(batch, output, sink)
+            else:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=self.workers) as executor:
+                    futures = [executor.submit(_render_chunk, c, self.renderer, self.quiet) for c in chunks]
+                    for future in concurrent.futures.as_completed(futures):
+                        self._write(future.result(), output, sink)
+        finally:
+            if sink is not None:
+                sink.close()
+        self.wall_seconds = time.perf_counter() - start
+        return self.summary()
+
+    def _write(self, batch, output, sink):
+        from model.post_idempotency import slugify
+        for res in batch:
+            st = self.stats[res['theme']]
+            st['render_seconds'] += res['seconds']
+            if res['error']:
+                st['errors'] += 1
+                print(f"[BULK_RENDER] ❌ #{res['index']} {res['title'][:40]} ({res['theme']}): {res['error']}")
+                continue
+            st['renders'] += 1
+            st['chars'] += len(res['html'])
+            if sink is not None:
+                sink.write(json.dumps({k: res[k] for k in ('index', 'title', 'theme', 'html')}, ensure_ascii=False) + "\n")
+            else:
+                name = f"{res['index']:05d}_{(slugify(res['title']) or 'post')[:60]}_{res['theme']}.html"
+                with open(os.path.join(output, name), 'w', encoding='utf-8') as f:
+                    f.write(res['html'])
+
+    def summary(self):
+        """Throughput theo theme: renders/giây trên 1 core (render_seconds là tổng thời gian trong workers)"""
+        themes = {}
+        for theme, st in self.stats.items():
+            done = st['renders'] + st['errors']
+            themes[theme] = dict(
+                st,
+                avg_ms=(st['render_seconds'] / done * 1000) if done else 0.0,
+                per_second_per_core=(done / st['render_seconds']) if st['render_seconds'] else 0.0,
+            )
+        total = sum(st['renders'] for st in self.stats.values())
+        wall = getattr(self, 'wall_seconds', 0.0)
+        return {
+            'themes': themes,
+            'total_renders': total,
+            'wall_seconds': wall,
+            'per_second': (total / wall) if wall else 0.0,
+            'workers': self.workers,
+        }
+
+
+def print_summary(summary):
+    print(f"\n[BULK_RENDER] 📊 {summary['total_renders']} renders in {summary['wall_seconds']:.2f}s "
+          f"({summary['per_second']:.0f}/s, {summary['workers']} workers)")
+    for theme, st in summary['themes'].items():
+        print(f"   {theme:<10} {st['renders']:>6} ok  {st['errors']:>4} err  "
+              f"{st['avg_ms']:7.2f} ms/bài  {st['per_second_per_core']:8.0f}/s/core  {st['chars'] / max(1, st['renders']):8.0f} chars/bài")
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Render HTML cho nhiều bài từ CSV/Excel (offline, không đăng WordPress)")
+    parser.add_argument('input', help="File .csv (title,video_url,image_path,content) hoặc .xlsx")
+    parser.add_argument('-o', '--output', default='rendered_posts', help="Thư mục output hoặc file .jsonl")
+    parser.add_argument('--themes', default='supercar', help="Danh sách theme, cách nhau bởi dấu phẩy")
+    parser.add_argument('--renderer', choices=RENDERERS, default='theme')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true', help="Giữ log của renderer")
+    args = parser.parse_args(argv)
+
+    rows = load_rows(args.input)
+    themes = [t.strip() for t in args.themes.split(',') if t.strip()]
+    print(f"[BULK_RENDER] 🚀 {len(rows)} posts x {len(themes)} themes → {args.output}")
+    renderer = BulkRenderer(themes, renderer=args.renderer, workers=args.workers, quiet=not args.verbose)
+    print_summary(renderer.render(rows, args.output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
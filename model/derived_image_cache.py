@@ -0,0 +1,240 @@
+"""
+Derived Image Cache - ảnh đã optimize / thumbnail Facebook được giữ lại trên đĩa
+Key = SHA-256(ảnh nguồn) + digest(loại biến đổi, params)
+- Cùng ảnh nguồn (thumbnails/, thư viện ảnh đã lưu...) dùng lại ở bài sau, không xử lý lại
+- File lưu ở <key>/<tên file gốc>: upload lên WordPress vẫn giữ tên mô tả (slug ảnh), không phải hash
+- LRU theo lần dùng cuối, tổng dung lượng bị giới hạn (DERIVED_IMAGE_CACHE_MB);
+  entry vừa dùng (có thể đang được upload) không bị evict, file lớn hơn cả giới hạn thì không cache
+- Index lưu trong .cache/derived_images/index.json (ghi atomic); cache hit chỉ cập nhật RAM,
+  last_used được ghi xuống đĩa theo lô (INDEX_FLUSH_SECONDS) / khi put / flush()
+"""
+
+import atexit
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from model.media_dedup_cache import hash_file
+
+
+def _default_max_bytes():
+    """DERIVED_IMAGE_CACHE_MB, mặc định 512MB"""
+    try:
+        return max(1, int(os.environ.get("DERIVED_IMAGE_CACHE_MB", "").strip() or "512")) * 1024 * 1024
+    except ValueError:
+        return 512 * 1024 * 1024
+
+
+def params_digest(kind, params):
+    """Digest ổn định của (loại biến đổi, params)"""
+    raw = json.dumps([kind, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+class DerivedImageCache:
+    """
+    Disk LRU cache cho ảnh dẫn xuất. Thread-safe; dùng chung qua DerivedImageCache.shared().
+    File trong cache thuộc về cache: caller không được xoá (xem owns()).
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+    INDEX_FLUSH_SECONDS = 30  # cache hit: ghi last_used xuống index tối đa 1 lần / 30s
+
+    def __init__(self, cache_dir=".cache/derived_images", max_bytes=None, protect_seconds=600):
+        """
+        Args:
+            cache_dir: Thư mục chứa file + index
+            max_bytes: Giới hạn tổng dung lượng (mặc định DERIVED_IMAGE_CACHE_MB)
+            protect_seconds: Entry dùng trong khoảng này không bị evict
+                (file vừa trả cho caller có thể đang được upload)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.cache_dir / "index.json"
+        self.max_bytes = max_bytes or _default_max_bytes()
+        self.protect_seconds = protect_seconds
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._dirty = False
+        self._last_save = time.time()
+
+    @classmethod
+    def shared(cls):
+        """Instance dùng chung cho cả process"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+                atexit.register(cls._shared.flush)
+            return cls._shared
+
+    def _load(self):
+        try:
+            if self.index_file.exists():
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('entries', {})
+        except Exception as e:
+            print(f"[DERIVED_CACHE] ⚠️ Load error: {e}")
+        return {}
+
+    def _save(self):
+        """Ghi atomic (tmp + replace) để crash giữa chừng không làm hỏng index"""
+        try:
+            tmp = self.index_file.with_suffix('.json.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'entries': self._entries}, f, separators=(',', ':'))
+            os.replace(tmp, self.index_file)
+            self._dirty = False
+            self._last_save = time.time()
+        except Exception as e:
+            print(f"[DERIVED_CACHE] ⚠️ Save error: {e}")
+
+    def flush(self):
+        """Ghi last_used còn trong RAM xuống index (gọi khi thoát)"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def key_for(self, source_path, kind, **params):
+        """
+        Key của 1 biến đổi trên file nguồn local.
+
+        Returns:
+            str hoặc None (nguồn là URL / không đọc được)
+        """
+        if not source_path or str(source_path).startswith('http') or not os.path.isfile(source_path):
+            return None
+        try:
+            return f"{hash_file(source_path)[:32]}_{params_digest(kind, params)}"
+        except OSError:
+            return None
+
+    def get(self, key):
+        """Đường dẫn file đã cache (đánh dấu vừa dùng) hoặc None"""
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            path = self.cache_dir / entry['file'] if entry else None
+            if path is None or not path.exists():
+                if entry:
+                    self._entries.pop(key, None)
+                    self._save()
+                self.misses += 1
+                return None
+            entry['last_used'] = time.time()
+            self._dirty = True
+            if entry['last_used'] - self._last_save >= self.INDEX_FLUSH_SECONDS:
+                self._save()
+            self.hits += 1
+        return str(path)
+
+    def put(self, key, produced_path):
+        """
+        Chuyển file vừa tạo vào cache (move, giữ nguyên tên file) rồi evict nếu vượt giới hạn.
+        Key đã có file trong cache → giữ file đó (không bao giờ xoá path đã trả cho caller), xoá file mới.
+
+        Returns:
+            str: Đường dẫn trong cache (hoặc produced_path nếu không cache được,
+                 vd. file lớn hơn cả giới hạn cache)
+        """
+        if not key or not produced_path or not os.path.isfile(produced_path):
+            return produced_path
+        size = os.path.getsize(produced_path)
+        if size > self.max_bytes:
+            print(f"[DERIVED_CACHE] ℹ️ {os.path.basename(produced_path)} ({size // 1024}KB) larger than cache limit, not cached")
+            return produced_path
+        name = f"{key}/{os.path.basename(produced_path)}"
+        target = self.cache_dir / name
+        with self._lock:
+            old = self._entries.get(key)
+            if old and (self.cache_dir / old['file']).is_file():
+                # Key đã có file (cùng nguồn xử lý 2 lần song song): giữ file cũ - có thể caller khác
+                # đang dùng - bỏ file vừa tạo
+                try:
+                    os.remove(produced_path)
+                except OSError:
+                    pass
+                old['last_used'] = time.time()
+                self._dirty = True
+                return str(self.cache_dir / old['file'])
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(produced_path, target)
+            except OSError as e:
+                print(f"[DERIVED_CACHE] ⚠️ Store error: {e}")
+                return produced_path
+            self._entries[key] = {'file': name, 'size': size, 'last_used': time.time()}
+            self._evict_locked(keep=key)
+            self._save()
+        return str(target)
+
+    def get_or_create(self, source_path, kind, produce, **params):
+        """
+        Cache-through: trả về file đã cache, hoặc gọi produce() (-> path) rồi cache kết quả.
+        Nguồn là URL / produce trả về chính nguồn → không cache.
+        """
+        key = self.key_for(source_path, kind, **params)
+        cached = self.get(key)
+        if cached:
+            print(f"[DERIVED_CACHE] ♻️ {kind}: {os.path.basename(str(source_path))}")
+            return cached
+        produced = produce()
+        if not produced or produced == source_path:
+            return produced
+        return self.put(key, produced)
+
+    def owns(self, path):
+        """File nằm trong cache (caller không được xoá)"""
+        try:
+            resolved = Path(path).resolve()
+            return resolved != self.index_file.resolve() and self.cache_dir.resolve() in resolved.parents
+        except (OSError, TypeError):
+            return False
+
+    def _unlink(self, name):
+        path = self.cache_dir / name
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        if path.parent != self.cache_dir:
+            try:
+                path.parent.rmdir()  # thư mục <key>/ (chỉ xoá khi trống)
+            except OSError:
+                pass
+
+    def _evict_locked(self, keep=None):
+        """
+        Xoá entry dùng lâu nhất tới khi dưới giới hạn. Không xoá `keep` (entry vừa lưu)
+        và entry dùng trong protect_seconds (file có thể đang được upload) - có thể tạm vượt giới hạn.
+        """
+        total = sum(e.get('size', 0) for e in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        protected_after = time.time() - self.protect_seconds
+        for key, entry in sorted(self._entries.items(), key=lambda kv: kv[1].get('last_used', 0)):
+            if total <= self.max_bytes:
+                break
+            if key == keep or entry.get('last_used', 0) > protected_after:
+                continue
+            self._unlink(entry['file'])
+            total -= entry.get('size', 0)
+            del self._entries[key]
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': sum(e.get('size', 0) for e in self._entries.values()),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
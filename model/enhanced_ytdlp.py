@@ -5,15 +5,15 @@ Version: 2.0.7+ (Anti-Rate-Limit Edition)
 
 import yt_dlp
 import os
-import json
 import time
-import hashlib
 import random
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import lru_cache
 from threading import Lock, Semaphore
 
+from model.video_metadata_cache import get_video_metadata_cache
+
 class EnhancedYTDLP:
     """
     yt-dlp wrapper với các tính năng nâng cao:
@@ -47,6 +47,7 @@ class EnhancedYTDLP:
         self.cookies_file = cookies_file
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.metadata_cache = get_video_metadata_cache()
         
         # Rate limiting settings
         self.max_workers = max_workers
@@ -99,60 +100,34 @@ class EnhancedYTDLP:
         
         print(f"[YTDLP+] ⚙️ Config: workers={max_workers}, delay={request_delay}s, timeout={timeout}s")
     
-    def _get_cache_key(self, url):
-        """Generate cache key from URL"""
-        return hashlib.md5(url.encode()).hexdigest()
-    
-    def _get_cache_path(self, url):
-        """Get cache file path for URL"""
-        cache_key = self._get_cache_key(url)
-        return self.cache_dir / f"{cache_key}.json"
-    
-    def _load_from_cache(self, url, max_age_hours=24):
+    def _load_from_cache(self, url, max_age_hours=None):
         """
-        Load result from cache if available and not expired
+        Load result from the shared video metadata cache (keyed by platform + video id)
         
         Args:
             url: Video URL
-            max_age_hours: Maximum cache age in hours
+            max_age_hours: Maximum cache age in hours (None = platform TTL)
             
         Returns:
-            dict or None: Cached result or None if not found/expired
+            dict or None: Cached result (also cached failures of yt-dlp) or None if not found/expired
         """
-        cache_path = self._get_cache_path(url)
-        
-        if not cache_path.exists():
-            return None
-        
-        try:
-            # Check cache age
-            cache_age = time.time() - cache_path.stat().st_mtime
-            if cache_age > max_age_hours * 3600:
-                print(f"[YTDLP+] ⏰ Cache expired ({cache_age/3600:.1f}h old)")
-                return None
-            
-            # Load cache
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            print(f"[YTDLP+] ✅ Cache hit: {data.get('title', '')[:50]}...")
-            return data
-            
-        except Exception as e:
-            print(f"[YTDLP+] ⚠️ Cache load error: {e}")
-            return None
+        data = self.metadata_cache.get(
+            url, source='ytdlp', max_age=max_age_hours * 3600 if max_age_hours else None
+        )
+        if data is not None:
+            if data.get('success'):
+                print(f"[YTDLP+] ✅ Cache hit: {(data.get('title') or '')[:50]}...")
+            else:
+                print(f"[YTDLP+] ⏭️ Cached failure, skipping: {data.get('error')}")
+        return data
     
     def _save_to_cache(self, url, data):
-        """Save result to cache"""
+        """Save result (success or failure) to the shared video metadata cache"""
         try:
-            cache_path = self._get_cache_path(url)
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            print(f"[YTDLP+] 💾 Cached result for future use")
+            self.metadata_cache.put(url, data, source='ytdlp')
         except Exception as e:
             print(f"[YTDLP+] ⚠️ Cache save error: {e}")
     
-    
     def _wait_for_rate_limit(self):
         """Enforce rate limiting between requests"""
         with self.request_lock:
@@ -262,6 +237,9 @@ class EnhancedYTDLP:
                     else:
                         print(f"[YTDLP+] ⚠️ Attempt {attempt + 1} failed: {e}")
         
+        # Negative cache: không thử lại URL hỏng ngay lập tức
+        if use_cache:
+            self._save_to_cache(url, result)
         return result
     
     
@@ -282,7 +260,15 @@ class EnhancedYTDLP:
         total = len(urls)
         workers = max_workers or self.max_workers
         
-        print(f"[YTDLP+] 🚀 Processing {total} URLs with {workers} workers...")
+        # Trả lời ngay các URL đã có trong cache (không gọi mạng)
+        if use_cache:
+            cached = self.metadata_cache.get_many(urls, source='ytdlp')
+            if cached:
+                print(f"[YTDLP+] ♻️ {len(cached)}/{total} URLs answered from cache")
+                results.extend(cached.values())
+                urls = [url for url in urls if url not in cached]
+        
+        print(f"[YTDLP+] 🚀 Processing {len(urls)} URLs with {workers} workers...")
         print(f"[YTDLP+] 📊 Rate limit: {self.request_delay}s delay, {self.timeout}s timeout")
         
         start_time = time.time()
@@ -295,7 +281,7 @@ class EnhancedYTDLP:
             }
             
             # Collect results as they complete
-            for i, future in enumerate(as_completed(future_to_url), 1):
+            for i, future in enumerate(as_completed(future_to_url), len(results) + 1):
                 url = future_to_url[future]
                 try:
                     result = future.result()
@@ -333,11 +319,14 @@ class EnhancedYTDLP:
     
     def clear_cache(self, older_than_hours=None):
         """
-        Clear cache files
+        Clear legacy cache files and expired entries of the metadata cache
         
         Args:
             older_than_hours: Only clear files older than this (None = all)
         """
+        purged = self.metadata_cache.purge_expired()
+        if purged:
+            print(f"[YTDLP+] 🗑️ Purged {purged} expired metadata entries")
         count = 0
         for cache_file in self.cache_dir.glob("*.json"):
             try:
@@ -7,15 +7,65 @@ Features:
 - Fallback to Mobile scrape (m.facebook.com)
 - Fallback to requests + BeautifulSoup (multi-UA)
 - Cuối cùng mới dùng yt-dlp
+- Batch song song (FB_FETCH_WORKERS) với ngân sách request/giây cho mỗi host (FB_HOST_RATE)
+- Race oEmbed + mobile scrape: lấy kết quả thành công đầu tiên, huỷ phần còn lại
 """
 
+import concurrent.futures
+import os
 import requests
 import re
+import threading
 import time
 import json
 from typing import Dict, Optional
 from urllib.parse import quote, urlparse, parse_qs
 
+from model.video_metadata_cache import get_video_metadata_cache
+
+
+def _env_number(name, default, cast=int, low=1):
+    try:
+        return max(low, cast(os.environ.get(name, "").strip() or default))
+    except ValueError:
+        return default
+
+
+class FetchCancelled(Exception):
+    """Strategy bị huỷ vì strategy khác đã thành công (race mode)"""
+
+
+class HostRateBudget:
+    """
+    Token bucket theo host: tối đa `rate` request/giây, burst `burst`.
+    Dùng chung cho mọi thread của 1 fetcher - nhiều worker không dồn request vào cùng 1 host.
+    """
+    
+    def __init__(self, rate=8.0, burst=4):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._buckets = {}  # host -> (tokens, last_refill)
+        self._lock = threading.Lock()
+    
+    def acquire(self, url, cancel_event=None):
+        """Chờ tới khi host của url còn token. Raises FetchCancelled nếu bị huỷ khi đang chờ"""
+        host = (urlparse(url).netloc or "").lower()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, last = self._buckets.get(host, (float(self.burst), now))
+                tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+                if tokens >= 1.0:
+                    self._buckets[host] = (tokens - 1.0, now)
+                    return
+                self._buckets[host] = (tokens, now)
+                wait = (1.0 - tokens) / self.rate
+            if cancel_event is not None:
+                if cancel_event.wait(wait):
+                    raise FetchCancelled()
+            else:
+                time.sleep(wait)
+
 
 class FacebookFastFetcher:
     """
@@ -23,17 +73,41 @@ class FacebookFastFetcher:
     Bypass yt-dlp để tránh rate limiting
     """
     
-    def __init__(self, facebook_access_token: Optional[str] = None):
+    def __init__(self, facebook_access_token: Optional[str] = None, max_workers: Optional[int] = None,
+                 race: bool = False):
         """
         Args:
             facebook_access_token: Optional Facebook Graph API access token
+            max_workers: Số URL xử lý song song trong batch (mặc định FB_FETCH_WORKERS=8)
+            race: get_video_info chạy oEmbed + mobile scrape đồng thời (mặc định False)
         """
         self.access_token = facebook_access_token
+        self.max_workers = max_workers or _env_number("FB_FETCH_WORKERS", 8)
+        self.race = race
+        self.rate_budget = HostRateBudget(rate=_env_number("FB_HOST_RATE", 8.0, float, low=0.1), burst=self.max_workers)
+        self._local = threading.local()  # cancel event của strategy đang chạy (race mode)
+        self.metadata_cache = get_video_metadata_cache()
+        
         self.session = requests.Session()
+        # Pool đủ lớn cho batch song song (mặc định của requests chỉ 10 kết nối / host)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max(10, self.max_workers * 2))
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/144.0.0.0 Safari/537.36'
         })
     
+    def _get(self, url, session=None, **kwargs):
+        """
+        GET qua ngân sách request của host.
+        Strategy đã bị huỷ (race mode) → FetchCancelled thay vì gửi thêm request.
+        """
+        cancel_event = getattr(self._local, 'cancel', None)
+        if cancel_event is not None and cancel_event.is_set():
+            raise FetchCancelled()
+        self.rate_budget.acquire(url, cancel_event)
+        return (session or requests).get(url, **kwargs)
+    
     def extract_video_id(self, url: str) -> Optional[str]:
         """Extract Facebook video ID from URL"""
         patterns = [
@@ -71,7 +145,7 @@ class FacebookFastFetcher:
             
             for oembed_url in oembed_endpoints:
                 try:
-                    response = self.session.get(oembed_url, timeout=5)
+                    response = self._get(oembed_url, session=self.session, timeout=5)
                     
                     if response.status_code == 200:
                         data = response.json()
@@ -140,7 +214,7 @@ class FacebookFastFetcher:
                 'access_token': self.access_token
             }
             
-            response = self.session.get(graph_url, params=params, timeout=5)
+            response = self._get(graph_url, session=self.session, params=params, timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
@@ -180,7 +254,7 @@ class FacebookFastFetcher:
                 'Accept-Encoding': 'gzip, deflate',
             }
             
-            response = requests.get(mobile_url, headers=headers, timeout=8, allow_redirects=True)
+            response = self._get(mobile_url, headers=headers, timeout=8, allow_redirects=True)
             
             if response.status_code != 200:
                 return {'success': False, 'error': f'Mobile HTTP {response.status_code}'}
@@ -309,7 +383,7 @@ class FacebookFastFetcher:
                     strategy_name = strategy.pop('name')
                     headers = {**strategy, 'Accept-Language': 'en-US,en;q=0.5'}
                     
-                    response = requests.get(url, headers=headers, timeout=8, allow_redirects=True)
+                    response = self._get(url, headers=headers, timeout=8, allow_redirects=True)
                     
                     if response.status_code != 200:
                         continue
@@ -388,13 +462,17 @@ class FacebookFastFetcher:
         except Exception as e:
             return {'success': False, 'error': f'yt-dlp error: {str(e)}'}
     
-    def get_video_info(self, url: str, skip_ytdlp: bool = True) -> Dict:
+    def get_video_info(self, url: str, skip_ytdlp: bool = True, race: Optional[bool] = None,
+                       use_cache: bool = True) -> Dict:
         """
         Get Facebook video info with intelligent fallback
         
         Args:
             url: Facebook video URL
             skip_ytdlp: If True, skip yt-dlp (default: True for speed)
+            race: Chạy oEmbed + mobile scrape đồng thời, lấy kết quả thành công đầu tiên
+                (mặc định theo self.race)
+            use_cache: Hỏi video metadata cache trước, ghi kết quả (kể cả lỗi) sau khi fetch
         
         Returns:
             dict: {'success': bool, 'title': str, 'thumbnail': str, 'method': str}
@@ -403,23 +481,42 @@ class FacebookFastFetcher:
         if 'facebook.com' not in url and 'fb.watch' not in url:
             return {'success': False, 'error': 'Not a Facebook URL', 'url': url}
         
-        print(f"[FB-FAST] Processing: {url[:60]}...")
+        if use_cache:
+            cached = self.metadata_cache.get(url, source='fb_fast')
+            if cached is not None:
+                print(f"[FB-FAST] ♻️ Cache: {(cached.get('title') or cached.get('error') or '')[:50]}")
+                return cached
         
-        # Method 1: oEmbed (fastest, no auth)
-        print(f"[FB-FAST] Trying oEmbed API...")
-        result = self.fetch_via_oembed(url)
-        if result['success']:
-            print(f"[FB-FAST] ✅ oEmbed success: {result.get('title', 'N/A')[:50]}")
-            return result
-        print(f"[FB-FAST] ⚠️ oEmbed failed: {result.get('error')}")
+        result = self._fetch_video_info(url, skip_ytdlp, race)
+        if use_cache:
+            self.metadata_cache.put(url, result, source='fb_fast')
+        return result
+    
+    def _fetch_video_info(self, url: str, skip_ytdlp: bool, race: Optional[bool]) -> Dict:
+        """get_video_info không qua cache"""
+        print(f"[FB-FAST] Processing: {url[:60]}...")
         
-        # Method 2: Mobile scrape (reliable for public videos)
-        print(f"[FB-FAST] Trying mobile scrape...")
-        result = self.fetch_via_mobile_scrape(url)
-        if result['success']:
-            print(f"[FB-FAST] ✅ Mobile scrape success: {result.get('title', 'N/A')[:50]}")
-            return result
-        print(f"[FB-FAST] ⚠️ Mobile scrape failed: {result.get('error')}")
+        if self.race if race is None else race:
+            # Method 1+2: race oEmbed vs mobile scrape
+            result = self._race_cheap_strategies(url)
+            if result['success']:
+                return result
+        else:
+            # Method 1: oEmbed (fastest, no auth)
+            print(f"[FB-FAST] Trying oEmbed API...")
+            result = self.fetch_via_oembed(url)
+            if result['success']:
+                print(f"[FB-FAST] ✅ oEmbed success: {result.get('title', 'N/A')[:50]}")
+                return result
+            print(f"[FB-FAST] ⚠️ oEmbed failed: {result.get('error')}")
+            
+            # Method 2: Mobile scrape (reliable for public videos)
+            print(f"[FB-FAST] Trying mobile scrape...")
+            result = self.fetch_via_mobile_scrape(url)
+            if result['success']:
+                print(f"[FB-FAST] ✅ Mobile scrape success: {result.get('title', 'N/A')[:50]}")
+                return result
+            print(f"[FB-FAST] ⚠️ Mobile scrape failed: {result.get('error')}")
         
         # Method 3: Graph API (if token available)
         if self.access_token:
@@ -455,22 +552,65 @@ class FacebookFastFetcher:
             'method': 'none'
         }
     
+    def _race_cheap_strategies(self, url: str) -> Dict:
+        """
+        oEmbed và mobile scrape chạy đồng thời; strategy thành công đầu tiên thắng,
+        strategy còn lại bị huỷ ở request kế tiếp (không chờ nó xong).
+        """
+        strategies = [('oEmbed', self.fetch_via_oembed), ('Mobile scrape', self.fetch_via_mobile_scrape)]
+        cancel = threading.Event()
+        
+        def run(func):
+            self._local.cancel = cancel
+            try:
+                return func(url)
+            except FetchCancelled:
+                return {'success': False, 'error': 'cancelled'}
+            finally:
+                self._local.cancel = None
+        
+        print(f"[FB-FAST] Racing oEmbed vs mobile scrape...")
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(strategies))
+        futures = {executor.submit(run, func): name for name, func in strategies}
+        errors = []
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                result = future.result()
+                if result.get('success'):
+                    cancel.set()
+                    print(f"[FB-FAST] ✅ {name} won the race: {result.get('title', 'N/A')[:50]}")
+                    return result
+                errors.append(f"{name}: {result.get('error')}")
+        finally:
+            cancel.set()
+            executor.shutdown(wait=False)
+        print(f"[FB-FAST] ⚠️ Race failed ({'; '.join(errors)})")
+        return {'success': False, 'error': '; '.join(errors), 'url': url}
+    
     def batch_get_videos(self, urls: list, skip_ytdlp: bool = True, 
-                        delay: float = 0.2, progress_callback=None) -> list:
+                        delay: float = 0.2, progress_callback=None,
+                        max_workers: Optional[int] = None) -> list:
         """
         Batch fetch Facebook videos
         
         Args:
             urls: List of Facebook URLs
             skip_ytdlp: Skip yt-dlp for speed (default: True)
-            delay: Delay between requests (default: 0.2s)
+            delay: Delay between URLs - chỉ dùng khi max_workers=1
+                (batch song song được giới hạn bởi ngân sách request/host)
             progress_callback: Optional callback(current, total, result)
+            max_workers: Số URL song song (mặc định self.max_workers)
         
         Returns:
-            list: List of result dicts
+            list: List of result dicts (cùng thứ tự với urls)
         """
-        results = []
         total = len(urls)
+        workers = max(1, min(max_workers or self.max_workers, total or 1))
+        if workers > 1:
+            return self._batch_concurrent(urls, skip_ytdlp, progress_callback, workers)
+        
+        results = []
         
         print(f"[FB-FAST] 🚀 Processing {total} Facebook URLs...")
         print(f"[FB-FAST] ⚙️ Settings: skip_ytdlp={skip_ytdlp}, delay={delay}s")
@@ -501,6 +641,52 @@ class FacebookFastFetcher:
         print(f"[FB-FAST] ⏱️ Time: {elapsed:.1f}s (avg: {elapsed/total:.2f}s/video)")
         
         return results
+    
+    def _batch_concurrent(self, urls, skip_ytdlp, progress_callback, workers):
+        """batch_get_videos với `workers` URL song song; kết quả giữ thứ tự input"""
+        total = len(urls)
+        results = [None] * total
+        done = 0
+        
+        # URL đã có trong cache: trả lời ngay, không gọi mạng
+        cached = self.metadata_cache.get_many(urls, source='fb_fast')
+        todo = []
+        for i, url in enumerate(urls):
+            if url in cached:
+                results[i] = cached[url]
+                done += 1
+            else:
+                todo.append(i)
+        
+        print(f"[FB-FAST] 🚀 Processing {total} Facebook URLs ({done} cached, {workers} workers, "
+              f"{self.rate_budget.rate:g} req/s per host)...")
+        start_time = time.time()
+        
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.get_video_info, urls[i], skip_ytdlp): i for i in todo}
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {'success': False, 'error': str(e), 'url': urls[i], 'method': 'none'}
+                results[i] = result
+                done += 1
+                
+                # Progress callback (current = số URL đã xong)
+                if progress_callback:
+                    progress_callback(done, total, result)
+                else:
+                    status = "✅" if result['success'] else "❌"
+                    print(f"[FB-FAST] [{done}/{total}] {status} [{result.get('method', 'none')}]")
+        
+        elapsed = time.time() - start_time
+        success_count = sum(1 for r in results if r['success'])
+        
+        print(f"\n[FB-FAST] 🏁 Complete: {success_count}/{total} successful")
+        print(f"[FB-FAST] ⏱️ Time: {elapsed:.1f}s (avg: {elapsed/max(1, total):.2f}s/video)")
+        
+        return results
 
 
 # ============= DEMO USAGE =============
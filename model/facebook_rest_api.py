@@ -53,17 +53,33 @@ class FacebookRestAPI:
         except Exception as e:
             print(f"[FB-API] ⚠️ Could not load cookies: {e}")
     
-    def get_video_info(self, fb_url, timeout=10):
+    def get_video_info(self, fb_url, timeout=10, use_cache=True):
         """
         Lấy thông tin video Facebook bằng REST API
         
         Args:
             fb_url: URL Facebook video
             timeout: Timeout (giây)
+            use_cache: Hỏi video metadata cache trước, ghi kết quả (kể cả lỗi) sau khi fetch
             
         Returns:
             dict: {'title': str, 'thumbnail': str, 'video_id': str}
         """
+        if not use_cache:
+            return self._fetch_video_info(fb_url, timeout)
+        
+        from model.video_metadata_cache import get_video_metadata_cache
+        cache = get_video_metadata_cache()
+        cached = cache.get(fb_url, source='fb_rest')
+        if cached is not None:
+            print(f"[FB-API] ♻️ Cache: {(cached.get('title') or '')[:50]}")
+            return cached
+        result = self._fetch_video_info(fb_url, timeout)
+        cache.put(fb_url, result, source='fb_rest')
+        return result
+    
+    def _fetch_video_info(self, fb_url, timeout):
+        """get_video_info không qua cache"""
         result = {
             'title': None,
             'thumbnail': None,
@@ -13,6 +13,13 @@ from io import BytesIO
 import cv2
 import numpy as np
 from scipy.signal import convolve2d
+import shutil
+import threading
+import time
+import uuid
+import concurrent.futures
+
+from model.video_frame_extractor import extract_best_frames, score_gray, sharpness_scores
 
 # === Thêm Real-ESRGAN (nếu có) ===
 try:
@@ -58,6 +65,12 @@ class FacebookThumbnailOptimizerUltra:
             original_size = img.size
             print(f"[FB_THUMB] Ảnh gốc: {original_size}")
             
+            # JPEG: giải mã thẳng ở độ phân giải nhỏ hơn (1/2, 1/4, 1/8) nếu ảnh lớn hơn
+            # nhiều so với cần thiết - nhanh hơn và ít RAM hơn decode full rồi resize
+            self._draft_for_target(img, 1920, 1080)
+            if img.size != original_size:
+                print(f"[FB_THUMB] ⚡ Draft decode: {original_size} → {img.size}")
+            
             # Chuẩn hóa RGB
             if img.mode in ('RGBA', 'LA', 'P'):
                 bg = Image.new('RGB', img.size, (255, 255, 255))
@@ -78,24 +91,12 @@ class FacebookThumbnailOptimizerUltra:
                 print(f"[FB_THUMB] 📱 Phát hiện video dọc → Tạo ảnh ngang {TARGET_WIDTH}x{TARGET_HEIGHT} (Full HD) với nền mờ (Pillarbox)")
                 
                 # Tạo background mờ từ ảnh gốc
-                bg_scale = TARGET_WIDTH / img.width
-                bg_new_height = int(img.height * bg_scale)
-                bg_img = img.resize((TARGET_WIDTH, bg_new_height), Image.Resampling.LANCZOS)
-                
-                # Cắt lấy giữa cho background
-                top_bg = (bg_img.height - TARGET_HEIGHT) // 2
-                bg_img = bg_img.crop((0, top_bg, TARGET_WIDTH, top_bg + TARGET_HEIGHT))
-                
-                # Làm mờ mạnh
-                bg_img = bg_img.filter(ImageFilter.GaussianBlur(radius=40))
-                
-                # Làm tối nhẹ nền mờ để ảnh chính nổi bật hơn
-                bg_img = ImageEnhance.Brightness(bg_img).enhance(0.7)
+                bg_img = self._pillarbox_background(img, TARGET_WIDTH, TARGET_HEIGHT)
                 
                 # Xử lý foreground (ảnh gốc)
                 fg_scale = TARGET_HEIGHT / img.height
                 fg_new_width = int(img.width * fg_scale)
-                fg_img = img.resize((fg_new_width, TARGET_HEIGHT), Image.Resampling.LANCZOS)
+                fg_img = img.resize((fg_new_width, TARGET_HEIGHT), Image.Resampling.LANCZOS, reducing_gap=3.0)
                 
                 # Tính vị trí để chèn foreground vào chính giữa background
                 paste_x = (TARGET_WIDTH - fg_new_width) // 2
@@ -131,7 +132,7 @@ class FacebookThumbnailOptimizerUltra:
                 
                 # ============= RESIZE CHÍNH XÁC =============
                 if img.size != (TARGET_WIDTH, TARGET_HEIGHT):
-                    img = img.resize((TARGET_WIDTH, TARGET_HEIGHT), Image.Resampling.LANCZOS)
+                    img = img.resize((TARGET_WIDTH, TARGET_HEIGHT), Image.Resampling.LANCZOS, reducing_gap=3.0)
                     print(f"[FB_THUMB] → Resize cuối: {img.size}")
                 
                 # ============= XỬ LÝ NHẸ (CHỈ KHI CẦN) =============
@@ -166,6 +167,62 @@ class FacebookThumbnailOptimizerUltra:
             traceback.print_exc()
             return None
     
+    # ================== DECODE / BACKGROUND ==================
+    @staticmethod
+    def _draft_for_target(img, target_width, target_height):
+        """
+        Image.draft: JPEG decoder scale (1/2, 1/4, 1/8) sao cho ảnh vẫn >= kích thước cần.
+        Portrait cần cao >= target_height (foreground); landscape cần phủ kín target.
+        Không phải JPEG → no-op.
+        """
+        if getattr(img, 'format', None) != 'JPEG':
+            return
+        w, h = img.size
+        if w / h < 0.75:
+            scale = target_height / h
+        else:
+            scale = max(target_width / w, target_height / h)
+        if scale < 0.5:
+            img.draft('RGB', (int(w * scale) + 1, int(h * scale) + 1))
+    
+    BLUR_DOWNSCALE = 4  # nền mờ tính ở 1/4 độ phân giải rồi phóng lên
+    
+    def _pillarbox_background(self, img, target_width, target_height, radius=40):
+        """
+        Nền mờ cho ảnh dọc: cover target, GaussianBlur(radius), tối 70%.
+        Blur ở 1/BLUR_DOWNSCALE độ phân giải (radius chia tương ứng) rồi upscale:
+        với blur mạnh như vậy kết quả nhìn giống hệt, nhưng nhanh hơn ~16 lần.
+        """
+        f = self.BLUR_DOWNSCALE
+        small_w, small_h = target_width // f, target_height // f
+        bg_new_height = max(small_h, int(img.height * small_w / img.width))
+        bg_img = img.resize((small_w, bg_new_height), Image.Resampling.BILINEAR, reducing_gap=2.0)
+        
+        # Cắt lấy giữa cho background
+        top_bg = (bg_img.height - small_h) // 2
+        bg_img = bg_img.crop((0, top_bg, small_w, top_bg + small_h))
+        
+        # Làm mờ mạnh
+        bg_img = bg_img.filter(ImageFilter.GaussianBlur(radius=radius / f))
+        
+        # Làm tối nhẹ nền mờ để ảnh chính nổi bật hơn
+        bg_img = ImageEnhance.Brightness(bg_img).enhance(0.7)
+        return bg_img.resize((target_width, target_height), Image.Resampling.BICUBIC)
+    
+    # ================== BATCH (PROCESS POOL) ==================
+    def optimize_many(self, image_paths, enhance=True):
+        """
+        Tối ưu nhiều ảnh song song trên process pool luôn sẵn sàng (không bị GIL chặn).
+        
+        Args:
+            image_paths: List đường dẫn / URL ảnh
+            enhance: Như optimize_for_facebook
+            
+        Returns:
+            list: Đường dẫn output (None nếu ảnh đó lỗi), cùng thứ tự với image_paths
+        """
+        return optimize_many(image_paths, enhance=enhance, output_dir=self.output_dir)
+    
     # ================== AI UPSCALE ==================
     def _ai_upscale(self, img, target_scale=4):
         if not HAS_REALESRGAN:
@@ -319,8 +376,130 @@ class FacebookThumbnailOptimizerUltra:
         return cv2.cvtColor(img_lab, cv2.COLOR_LAB2RGB).astype(np.float32)
     
     # ================== TRÍCH FRAME VIDEO ==================
-    def create_thumbnail_from_video_frame(self, video_path_or_url, start_percent=0.1, end_percent=0.6, samples=30):
-        """Chọn frame nét nhất từ video với độ chính xác cao"""
+    SHARPNESS_SCORE_WIDTH = 320  # chấm điểm độ nét trên ảnh xám thu nhỏ
+    GRAB_MAX_STEP = 15           # khoảng cách mẫu <= ngưỡng này: grab() tuần tự rẻ hơn seek keyframe
+    
+    def create_thumbnail_from_video_frame(self, video_path_or_url, start_percent=0.1, end_percent=0.6, samples=30, mode=None):
+        """
+        Chọn frame nét nhất từ video với độ chính xác cao
+        
+        Args:
+            mode: 'ffmpeg' (mặc định khi có ffmpeg, env FB_FRAME_MODE) - video_frame_extractor dùng chung
+                với thumbnail Vimeo: 1 lần ffmpeg chỉ decode keyframe;
+                'fast' - đọc tuần tự grab()/retrieve(), chấm điểm cả lô trên ảnh xám thu nhỏ,
+                chỉ frame thắng được đọc lại full-res;
+                'seek' - seek + chấm điểm full-res từng frame (cách cũ)
+        """
+        default_mode = 'ffmpeg' if shutil.which('ffmpeg') else 'fast'
+        mode = (mode or os.environ.get("FB_FRAME_MODE", "") or default_mode).strip().lower()
+        if mode == 'ffmpeg':
+            path = self._best_frame_ffmpeg(video_path_or_url, start_percent, end_percent, samples)
+            if path:
+                return path
+            print(f"[ULTRA] ⚠️ ffmpeg frame scan không có kết quả, fallback fast mode")
+            mode = 'fast'
+        if mode != 'seek':
+            try:
+                return self._best_frame_fast(video_path_or_url, start_percent, end_percent, samples)
+            except Exception as e:
+                print(f"[ULTRA] ⚠️ Fast frame scan failed ({e}), fallback seek mode")
+        return self._best_frame_seek(video_path_or_url, start_percent, end_percent, samples)
+    
+    def _best_frame_ffmpeg(self, video_path_or_url, start_percent, end_percent, samples):
+        print(f"\n[ULTRA] 🔍 Tìm frame nét nhất trong video (ffmpeg keyframes)...")
+        candidates = extract_best_frames(video_path_or_url, n=1, start_percent=start_percent,
+                                         end_percent=end_percent, samples=samples)
+        if not candidates:
+            return None
+        best = candidates[0]
+        img = Image.fromarray(cv2.cvtColor(best.frame, cv2.COLOR_BGR2RGB))
+        temp_path = os.path.join(self.output_dir, "ultra_frame_best.jpg")
+        img.save(temp_path, quality=98)
+        print(f"[ULTRA] ✅ Chọn frame tốt nhất tại {best.time:.2f}s (score: {best.score:.0f}, {img.width}x{img.height})")
+        print(f"[ULTRA] 💾 Lưu frame tạm: {temp_path}")
+        return temp_path
+    
+    def _best_frame_fast(self, video_path_or_url, start_percent, end_percent, samples):
+        print(f"\n[ULTRA] 🔍 Tìm frame nét nhất trong video (fast)...")
+        cap = cv2.VideoCapture(video_path_or_url)
+        if not cap.isOpened():
+            print("[ULTRA] ❌ Không mở được video")
+            return None
+        try:
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            start_frame = int(total_frames * start_percent)
+            end_frame = int(total_frames * end_percent)
+            step = max(1, (end_frame - start_frame) // samples)
+            sequential = step <= self.GRAB_MAX_STEP
+            
+            grays, indices = [], []
+            pos = 0
+            if sequential and start_frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+                pos = start_frame
+            for frame_idx in range(start_frame, end_frame, step):
+                if sequential:
+                    # grab() chỉ demux/decode, bỏ qua bước chuyển màu của frame không lấy mẫu
+                    while pos < frame_idx and cap.grab():
+                        pos += 1
+                    if pos < frame_idx or not cap.grab():
+                        break
+                    pos += 1
+                    ret, frame = cap.retrieve()
+                else:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+                    ret, frame = cap.read()
+                if not ret:
+                    continue
+                if not grays:
+                    h, w = frame.shape[:2]
+                    orientation = "Khung (9:16)" if w / h < 0.75 else "Khung (16:9)"
+                    print(f"[ULTRA]   → {total_frames} frames | {fps:.2f} FPS | {w}x{h} | {orientation}"
+                          f" | {'grab' if sequential else 'seek'} step {step}")
+                grays.append(self._score_thumbnail(frame))
+                indices.append(frame_idx)
+            
+            if not grays:
+                print("[ULTRA] ❌ Không tìm thấy frame đạt chuẩn")
+                return None
+            
+            scores = self._sharpness_scores(np.stack(grays))
+            best = int(np.argmax(scores))
+            best_idx = indices[best]
+            
+            # Chỉ frame thắng được đọc lại ở độ phân giải gốc
+            cap.set(cv2.CAP_PROP_POS_FRAMES, best_idx)
+            ret, best_frame = cap.read()
+            if not ret:
+                print("[ULTRA] ❌ Không đọc lại được frame tốt nhất")
+                return None
+        finally:
+            cap.release()
+        
+        img = Image.fromarray(cv2.cvtColor(best_frame, cv2.COLOR_BGR2RGB))
+        temp_path = os.path.join(self.output_dir, "ultra_frame_best.jpg")
+        img.save(temp_path, quality=98)
+        
+        best_time = best_idx / fps if fps > 0 else 0
+        print(f"[ULTRA] ✅ Chọn frame tốt nhất tại {best_time:.2f}s (score: {scores[best]:.0f}, {len(grays)} mẫu)")
+        print(f"[ULTRA] 💾 Lưu frame tạm: {temp_path}")
+        return temp_path
+    
+    def _score_thumbnail(self, frame):
+        """Frame BGR → ảnh xám rộng SHARPNESS_SCORE_WIDTH để chấm điểm"""
+        return score_gray(frame, self.SHARPNESS_SCORE_WIDTH)
+    
+    @staticmethod
+    def _sharpness_scores(grays):
+        """
+        Cùng công thức với seek mode (Laplacian var * 0.7 + Tenengrad * 0.3, thưởng/phạt độ sáng)
+        nhưng tính 1 lần cho cả lô (N, H, W) bằng numpy (xem video_frame_extractor.sharpness_scores).
+        """
+        return sharpness_scores(grays)
+    
+    def _best_frame_seek(self, video_path_or_url, start_percent, end_percent, samples):
+        """Seek mode: seek + chấm điểm full-res từng frame"""
         try:
             print(f"\n[ULTRA] 🔍 Tìm frame nét nhất trong video...")
             cap = cv2.VideoCapture(video_path_or_url)
@@ -404,6 +583,166 @@ class FacebookThumbnailOptimizerUltra:
             print(f"[ULTRA] ❌ Lỗi xử lý video: {e}")
             return None
     
+# ============= PROCESS POOL DÙNG CHUNG =============
+_pool = None
+_pool_lock = threading.Lock()
+_worker_optimizers = {}
+
+
+def _pool_workers():
+    """FB_THUMB_WORKERS, mặc định min(4, số CPU)"""
+    try:
+        return max(1, int(os.environ.get("FB_THUMB_WORKERS", "").strip() or min(4, os.cpu_count() or 1)))
+    except ValueError:
+        return min(4, os.cpu_count() or 1)
+
+
+def _get_pool():
+    """Pool được tạo 1 lần và giữ ấm cho cả phiên làm việc"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=_pool_workers())
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _optimize_in_worker(image_path, output_filename, enhance, output_dir):
+    """Chạy trong worker process: 1 optimizer/process (không makedirs/print mỗi ảnh)"""
+    optimizer = _worker_optimizers.get(output_dir)
+    if optimizer is None:
+        optimizer = FacebookThumbnailOptimizerUltra.__new__(FacebookThumbnailOptimizerUltra)
+        optimizer.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        _worker_optimizers[output_dir] = optimizer
+    return optimizer.optimize_for_facebook(image_path, output_filename=output_filename, enhance=enhance)
+
+
+def optimize_many(image_paths, enhance=True, output_dir="thumbnails_optimized"):
+    """
+    Batch API: tối ưu nhiều ảnh trên process pool giữ ấm.
+    Ảnh nguồn local đã xử lý trước đó được lấy từ DerivedImageCache, chỉ ảnh mới mới vào pool.
+    Pool hỏng (worker bị kill...) → tạo lại pool lần sau, lần này chạy ngay trong process.
+    
+    Returns:
+        list: output path hoặc None, cùng thứ tự với image_paths
+        (file trong DerivedImageCache - caller không được xoá)
+    """
+    image_paths = list(image_paths)
+    if not image_paths:
+        return []
+    from model.derived_image_cache import DerivedImageCache
+    cache = DerivedImageCache.shared()
+    keys = [cache.key_for(p, 'fb_thumbnail', enhance=enhance) for p in image_paths]
+    results = [cache.get(k) for k in keys]
+    todo, same_key = [], {}  # cùng nguồn xuất hiện nhiều lần trong lô → xử lý 1 lần, chia kết quả
+    for i, r in enumerate(results):
+        if r is not None:
+            continue
+        if keys[i] is None or keys[i] not in same_key:
+            todo.append(i)
+        if keys[i] is not None:
+            same_key.setdefault(keys[i], []).append(i)
+    if len(todo) < len(image_paths):
+        print(f"[FB_THUMB] ♻️ {len(image_paths) - len(todo)}/{len(image_paths)} thumbnails from cache / duplicates")
+    if not todo:
+        return results
+    
+    from time import strftime
+    stamp = strftime('%Y%m%d_%H%M%S')
+    # Tên file duy nhất: nhiều ảnh trong cùng 1 giây không ghi đè nhau
+    jobs = [(image_paths[i], f"fb_natural_{stamp}_{uuid.uuid4().hex[:8]}.jpg") for i in todo]
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(_optimize_in_worker, p, n, enhance, output_dir) for p, n in jobs]
+        produced = [f.result() for f in futures]
+    except concurrent.futures.process.BrokenProcessPool as e:
+        print(f"[FB_THUMB] ⚠️ Process pool broken ({e}), optimizing in-process")
+        _reset_pool()
+        produced = [_optimize_in_worker(p, n, enhance, output_dir) for p, n in jobs]
+    for i, path in zip(todo, produced):
+        results[i] = cache.put(keys[i], path) if path and path != image_paths[i] else path
+        for j in same_key.get(keys[i], ()):
+            results[j] = results[i]
+    return results
+
+class _ThumbnailBatcher:
+    """
+    Gom yêu cầu thumbnail của các bài đang chuẩn bị song song (pipeline / hàng chờ AUTO)
+    thành 1 lần optimize_many: chờ tối đa `window` giây sau yêu cầu đầu tiên hoặc tới `max_batch` ảnh.
+    """
+
+    def __init__(self, window=None, max_batch=8):
+        if window is None:
+            try:
+                window = max(0.0, float(os.environ.get("FB_THUMB_BATCH_WINDOW_MS", "").strip() or 100) / 1000)
+            except ValueError:
+                window = 0.1
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._pending = []  # (image_path, enhance, output_dir, Future)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, image_path, enhance=True, output_dir="thumbnails_optimized"):
+        future = concurrent.futures.Future()
+        with self._cond:
+            self._pending.append((image_path, enhance, output_dir, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="fb-thumb-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = time.time() + self.window
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            groups = {}
+            for item in batch:
+                groups.setdefault((item[1], item[2]), []).append(item)
+            for (enhance, output_dir), items in groups.items():
+                try:
+                    outputs = optimize_many([i[0] for i in items], enhance=enhance, output_dir=output_dir)
+                    for item, out in zip(items, outputs):
+                        item[3].set_result(out)
+                except Exception as e:
+                    for item in items:
+                        item[3].set_exception(e)
+
+
+_batcher = None
+
+
+def optimize_batched(image_path, enhance=True, output_dir="thumbnails_optimized"):
+    """
+    1 thumbnail, nhưng đi chung lô optimize_many với các bài khác đang chạy song song.
+
+    Returns:
+        output path hoặc None (file trong DerivedImageCache - caller không được xoá)
+    """
+    global _batcher
+    with _pool_lock:
+        if _batcher is None:
+            _batcher = _ThumbnailBatcher()
+    return _batcher.submit(image_path, enhance, output_dir).result()
+
+
 # ============= DEMO =============
 if __name__ == "__main__":
     optimizer = FacebookThumbnailOptimizerUltra()
@@ -29,7 +29,10 @@ class ImageAPI:
         self.image_pool = []  # Pool of available images
         self.current_api_index = 0  # Rotate between APIs
     
-    def optimize_image_for_upload(self, image_path, max_width=None, max_height=None, quality=85):
+    # Ảnh output nhỏ hơn ngưỡng này: bỏ optimize=True (thêm 1 lượt encode mà gần như không giảm byte)
+    OPTIMIZE_MIN_PIXELS = 200_000
+    
+    def optimize_image_for_upload(self, image_path, max_width=None, max_height=None, quality=85, target_bytes=None):
         """
         Optimize image before upload to reduce size and speed up upload
         
@@ -37,19 +40,34 @@ class ImageAPI:
             image_path: Path to original image
             max_width: Maximum width (optional)
             max_height: Maximum height (optional - takes precedence for 180p logic)
-            quality: JPEG quality (default 85)
+            quality: JPEG quality (default 85; upper bound when target_bytes is set)
+            target_bytes: Optional size budget - binary search the highest quality that fits
             
         Returns:
-            str: Path to optimized image
+            str: Path to optimized image (may live in DerivedImageCache - do not delete)
         """
+        # Cùng nội dung + cùng params → dùng lại output đã có trên đĩa
+        try:
+            from model.derived_image_cache import DerivedImageCache
+            return DerivedImageCache.shared().get_or_create(
+                image_path, 'upload',
+                lambda: self._optimize_image(image_path, max_width, max_height, quality, target_bytes),
+                max_width=max_width, max_height=max_height, quality=quality, target_bytes=target_bytes,
+            )
+        except Exception as e:
+            print(f"[IMAGE_API] ⚠️ Derived cache error: {e}")
+            return self._optimize_image(image_path, max_width, max_height, quality, target_bytes)
+    
+    def _optimize_image(self, image_path, max_width, max_height, quality, target_bytes):
+        """optimize_image_for_upload không qua cache"""
         try:
             from PIL import Image
             
-            # Open image
-            img = Image.open(image_path)
-            
             # Get original size
             original_size = os.path.getsize(image_path)
+            
+            # Open image
+            img = Image.open(image_path)
             width, height = img.size
             
             # Check if optimization needed
@@ -59,22 +77,23 @@ class ImageAPI:
             
             # Calculate new size
             new_width, new_height = width, height
-            
-            # Resize by Height (Priority if set, e.g. 180p - GIẢM TỪ 240 XUỐNG 180)
             if max_height and height > max_height:
-                ratio = max_height / height
-                new_width = int(width * ratio)
-                new_height = max_height
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                print(f"[IMAGE_API] Resized by Height: {width}x{height} → {new_width}x{new_height}")
-                
-            # Resize by Width (if height not set or width still too big)
+                new_width, new_height = int(width * max_height / height), max_height
             elif max_width and width > max_width:
-                ratio = max_width / width
-                new_height = int(height * ratio)
-                new_width = max_width
-                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                print(f"[IMAGE_API] Resized by Width: {width}x{height} → {new_width}x{new_height}")
+                new_width, new_height = max_width, int(height * max_width / width)
+            
+            # JPEG: giải mã thẳng ở 1/2, 1/4, 1/8 (DCT scaling) khi đích nhỏ hơn nhiều so với nguồn
+            if img.format == 'JPEG' and new_width * 2 <= width:
+                img.draft('RGB', (new_width, new_height))
+                if img.size != (width, height):
+                    print(f"[IMAGE_API] ⚡ Draft decode: {width}x{height} → {img.size[0]}x{img.size[1]}")
+            
+            # Resize by Height (Priority if set, e.g. 180p - GIẢM TỪ 240 XUỐNG 180)
+            # or by Width (if height not set or width still too big)
+            if (new_width, new_height) != (width, height):
+                img = img.resize((new_width, new_height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+                by = "Height" if max_height and height > max_height else "Width"
+                print(f"[IMAGE_API] Resized by {by}: {width}x{height} → {new_width}x{new_height}")
             
             # Convert to RGB if needed (for JPEG)
             if img.mode in ('RGBA', 'P'):
@@ -82,7 +101,15 @@ class ImageAPI:
             
             # Save optimized version
             optimized_path = image_path.replace('.jpg', '_optimized.jpg').replace('.png', '_optimized.jpg')
-            img.save(optimized_path, 'JPEG', quality=quality, optimize=True)
+            if optimized_path == image_path:
+                optimized_path = os.path.splitext(image_path)[0] + '_optimized.jpg'
+            use_optimize = new_width * new_height > self.OPTIMIZE_MIN_PIXELS
+            if target_bytes:
+                data = self._encode_to_target(img, target_bytes, quality, use_optimize)
+                with open(optimized_path, 'wb') as f:
+                    f.write(data)
+            else:
+                img.save(optimized_path, 'JPEG', quality=quality, optimize=use_optimize)
             
             optimized_size = os.path.getsize(optimized_path)
             reduction = ((original_size - optimized_size) / original_size) * 100
@@ -95,6 +122,37 @@ class ImageAPI:
             print(f"[IMAGE_API] ⚠️ Optimization failed: {e}, using original")
             return image_path
     
+    @staticmethod
+    def _encode_to_target(img, target_bytes, max_quality=85, optimize=False, min_quality=20):
+        """
+        Binary search JPEG quality: quality cao nhất mà output <= target_bytes.
+        Không đạt được → trả về bản min_quality.
+        
+        Returns:
+            bytes: JPEG data
+        """
+        from io import BytesIO
+        
+        def encode(q):
+            buf = BytesIO()
+            img.save(buf, 'JPEG', quality=q, optimize=optimize)
+            return buf.getvalue()
+        
+        best = None
+        lo, hi = min_quality, max_quality
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            data = encode(mid)
+            if len(data) <= target_bytes:
+                best = data
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        if best is None:
+            best = encode(min_quality)
+            print(f"[IMAGE_API] ⚠️ Target {target_bytes // 1024}KB not reachable, using quality {min_quality}")
+        return best
+    
     def extract_car_brand(self, title):
         """Extract car brand from title"""
         # Common car brands
@@ -0,0 +1,174 @@
+"""
+Job Journal - nhật ký append-only (JSONL) cho BatchUploadManager
+Lưu trạng thái TỪNG bài (không chỉ counters) để resume chính xác sau crash:
+    pending → media_uploaded → draft_created → published   (hoặc failed)
+  Lỗi sau media_uploaded / draft_created chỉ ghi kèm 'error', không lùi trạng thái
+- Mỗi dòng: {"fp": <fingerprint>, "state": ..., "ts": ..., "data": {...}}
+- fsync theo lô (mỗi N dòng hoặc T giây) để vừa bền vừa nhanh
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# Thứ tự trạng thái: state sau "tiến xa hơn" state trước
+STATES = ('pending', 'media_uploaded', 'draft_created', 'published')
+FAILED = 'failed'
+
+
+def post_fingerprint(post) -> str:
+    """
+    Fingerprint ổn định của 1 bài (dict hoặc BlogPost) để nhận ra nó qua các lần chạy.
+    Ưu tiên key do caller cung cấp ('fingerprint' / 'id'), nếu không thì hash nội dung.
+    """
+    if isinstance(post, dict):
+        for key in ('fingerprint', 'id'):
+            if post.get(key):
+                return str(post[key])
+        source = post.get('blog_post', post)
+    else:
+        source = post
+
+    def field(name):
+        if isinstance(source, dict):
+            value = source.get(name)
+        else:
+            value = getattr(source, name, None)
+        return value if isinstance(value, str) else ""
+
+    # 'content' is generated (theme/SEO) and may change between runs; use the raw input
+    basis = "\x1f".join([
+        field('title'),
+        field('video_url'),
+        field('image_url'),
+        field('raw_content') or field('content'),
+    ])
+    return hashlib.sha256(basis.encode('utf-8')).hexdigest()[:32]
+
+
+class JobJournal:
+    """
+    Append-only JSONL journal, thread-safe.
+    Trạng thái mới nhất của mỗi fingerprint được giữ trong RAM sau khi replay.
+    """
+
+    def __init__(self, path: str = "upload_journal.jsonl", fsync_every: int = 20, fsync_interval: float = 1.0):
+        """
+        Args:
+            path: File journal
+            fsync_every: fsync sau mỗi N records
+            fsync_interval: hoặc sau T giây kể từ lần fsync trước
+        """
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict] = {}
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+        self._replay()
+        self._fh = open(self.path, 'a', encoding='utf-8')
+
+    def _replay(self):
+        """Đọc lại journal; dòng cuối bị cắt dở (crash lúc đang ghi) được bỏ qua"""
+        if not os.path.exists(self.path):
+            return
+        lines = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                lines += 1
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                fp = rec.get('fp')
+                if not fp:
+                    continue
+                current = self._states.setdefault(fp, {'state': 'pending', 'data': {}})
+                current['state'] = rec.get('state', current['state'])
+                current['data'].update(rec.get('data') or {})
+                current['ts'] = rec.get('ts')
+        print(f"[JOURNAL] 📂 Replayed {lines} records, {len(self._states)} posts")
+        if lines > 4 * max(1, len(self._states)):
+            self._compact()
+
+    def _compact(self):
+        """Ghi lại journal chỉ với trạng thái mới nhất của mỗi bài"""
+        tmp = self.path + ".tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for fp, st in self._states.items():
+                f.write(json.dumps({'fp': fp, 'state': st['state'], 'ts': st.get('ts'), 'data': st['data']},
+                                   ensure_ascii=False, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        print(f"[JOURNAL] 🧹 Compacted to {len(self._states)} records")
+
+    def record(self, fp: str, state: str, **data):
+        """Ghi 1 chuyển trạng thái (append + fsync theo lô)"""
+        now = time.time()
+        rec = {'fp': fp, 'state': state, 'ts': now, 'data': data}
+        line = json.dumps(rec, ensure_ascii=False, separators=(',', ':'), default=str) + "\n"
+        with self._lock:
+            current = self._states.setdefault(fp, {'state': 'pending', 'data': {}})
+            current['state'] = state
+            current['data'].update(data)
+            current['ts'] = now
+
+            self._fh.write(line)
+            self._fh.flush()
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every or now - self._last_sync >= self.fsync_interval:
+                self._sync_locked()
+
+    def record_failure(self, fp: str, error):
+        """
+        Ghi lỗi của 1 bài. Bài đã qua media_uploaded / draft_created giữ nguyên bước đó
+        (kèm 'error') để lần chạy sau publish draft cũ / dùng lại media thay vì tạo lại.
+        """
+        st = self.state_of(fp)
+        state = st['state'] if st and st['state'] in STATES[1:-1] else FAILED
+        self.record(fp, state, error=str(error))
+
+    def _sync_locked(self):
+        try:
+            os.fsync(self._fh.fileno())
+        except OSError:
+            pass
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+    def sync(self):
+        """fsync ngay (gọi khi kết thúc batch)"""
+        with self._lock:
+            if self._unsynced:
+                self._sync_locked()
+
+    def state_of(self, fp: str) -> Optional[Dict]:
+        """{'state': ..., 'data': {...}} hoặc None nếu chưa từng thấy"""
+        with self._lock:
+            st = self._states.get(fp)
+            return {'state': st['state'], 'data': dict(st['data'])} if st else None
+
+    def is_done(self, fp: str) -> bool:
+        st = self.state_of(fp)
+        return bool(st) and st['state'] == 'published'
+
+    def summary(self) -> Dict[str, int]:
+        """Đếm số bài theo trạng thái"""
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for st in self._states.values():
+                counts[st['state']] = counts.get(st['state'], 0) + 1
+        return counts
+
+    def close(self):
+        with self._lock:
+            if not self._fh.closed:
+                self._sync_locked()
+                self._fh.close()
@@ -0,0 +1,155 @@
+"""
+Media Dedup Cache - không bao giờ upload cùng 1 ảnh 2 lần lên cùng 1 site
+Index theo từng site: SHA-256(bytes đã optimize) -> (media_id, source_url)
+- Lưu trong .cache/media_index/<host>.json (ghi atomic)
+- Entry cũ hơn TTL được verify lại (HEAD/GET rẻ) trước khi dùng
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+
+def _default_ttl():
+    """WP_MEDIA_CACHE_TTL (giây), mặc định 7 ngày"""
+    try:
+        return max(0, int(os.environ.get("WP_MEDIA_CACHE_TTL", "").strip() or str(7 * 24 * 3600)))
+    except Exception:
+        return 7 * 24 * 3600
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """SHA-256 của file (đọc từng block, không load cả file)"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class MediaDedupCache:
+    """
+    Index content-hash -> media đã upload của 1 site.
+    Thread-safe; dùng chung qua MediaDedupCache.for_site().
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, site_url, cache_dir=".cache/media_index", ttl=None):
+        """
+        Args:
+            site_url: WordPress site URL
+            cache_dir: Thư mục chứa index
+            ttl: Sau bao lâu (giây) thì entry cần verify lại
+        """
+        self.site_url = site_url
+        host = (urlparse(site_url).netloc or site_url or "default").lower()
+        safe_host = re.sub(r'[^a-z0-9._-]', '_', host)
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_file = self.cache_dir / f"{safe_host}.json"
+        self.ttl = _default_ttl() if ttl is None else ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @classmethod
+    def for_site(cls, site_url):
+        """Instance dùng chung cho 1 site (process-wide)"""
+        key = (urlparse(site_url).netloc or site_url or "").lower()
+        with cls._instances_lock:
+            cache = cls._instances.get(key)
+            if cache is None:
+                cache = cls(site_url)
+                cls._instances[key] = cache
+            return cache
+
+    def _load(self):
+        try:
+            if self.index_file.exists():
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get('entries', {})
+        except Exception as e:
+            print(f"[MEDIA_CACHE] ⚠️ Load error: {e}")
+        return {}
+
+    def _save(self):
+        """Ghi atomic (tmp + replace) để crash giữa chừng không làm hỏng index"""
+        try:
+            tmp = self.index_file.with_suffix('.json.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'site_url': self.site_url, 'entries': self._entries}, f, separators=(',', ':'))
+            os.replace(tmp, self.index_file)
+        except Exception as e:
+            print(f"[MEDIA_CACHE] ⚠️ Save error: {e}")
+
+    def lookup(self, digest, verify_func=None):
+        """
+        Tìm media đã upload theo content hash.
+
+        Args:
+            digest: SHA-256 hex của file sẽ upload
+            verify_func: Optional callable(media_id, source_url) -> bool,
+                chỉ được gọi khi entry cũ hơn TTL
+
+        Returns:
+            tuple (media_id, source_url) hoặc None
+        """
+        with self._lock:
+            entry = self._entries.get(digest)
+        if not entry:
+            self.misses += 1
+            return None
+
+        if verify_func is not None and time.time() - entry.get('verified_at', 0) > self.ttl:
+            try:
+                still_there = verify_func(entry.get('media_id'), entry.get('source_url'))
+            except Exception:
+                still_there = True  # Network hiccup: keep the entry, try again next time
+            if not still_there:
+                print(f"[MEDIA_CACHE] 🗑️ Media {entry.get('media_id')} no longer exists, re-uploading")
+                self.invalidate(digest)
+                self.misses += 1
+                return None
+            with self._lock:
+                entry['verified_at'] = time.time()
+                self._save()
+
+        self.hits += 1
+        return entry.get('media_id'), entry.get('source_url')
+
+    def lookup_file(self, path, verify_func=None):
+        """lookup() theo đường dẫn file. Returns (digest, cached_or_None)"""
+        digest = hash_file(path)
+        return digest, self.lookup(digest, verify_func)
+
+    def store(self, digest, media_id, source_url):
+        """Ghi nhận upload thành công"""
+        if not digest or not source_url:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[digest] = {
+                'media_id': media_id,
+                'source_url': source_url,
+                'uploaded_at': now,
+                'verified_at': now,
+            }
+            self._save()
+
+    def invalidate(self, digest):
+        with self._lock:
+            if self._entries.pop(digest, None) is not None:
+                self._save()
+
+    def stats(self):
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
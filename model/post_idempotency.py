@@ -0,0 +1,44 @@
+"""
+Post Idempotency - key do client sinh ra để POST /posts retry an toàn
+- Mỗi bài có idempotency key (hash ổn định của tiêu đề + nội dung, hoặc key do caller đặt)
+- Bật bằng WP_IDEMPOTENT_SLUG=1: key được nhúng vào slug "<tieu-de>-<key[:8]>"
+  (mặc định TẮT - permalink giữ nguyên như WordPress tự sinh)
+- Sau ReadTimeout: GET /posts?slug=...&status=draft,pending để xem bản nháp đã được tạo chưa
+  trước khi quyết định gửi lại → không bao giờ đăng trùng. Bài đã publish không được tính:
+  cố ý đăng lại cùng bài không bị trả về bài cũ
+"""
+
+import hashlib
+import os
+import re
+import unicodedata
+
+SLUG_KEY_LEN = 8
+SLUG_MAX_LEN = 190  # WordPress post_name is varchar(200)
+
+
+def idempotent_slugs_enabled():
+    """WP_IDEMPOTENT_SLUG=1 để bật (đổi permalink) - mặc định giữ slug WordPress tự sinh"""
+    return os.environ.get("WP_IDEMPOTENT_SLUG", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+def make_idempotency_key(title, content=""):
+    """Key ổn định: cùng tiêu đề + nội dung → cùng key qua mọi lần retry/resume"""
+    basis = f"{title or ''}\x1f{content or ''}"
+    return hashlib.sha256(basis.encode('utf-8')).hexdigest()
+
+
+def slugify(text):
+    """Giống sanitize_title của WordPress: bỏ dấu tiếng Việt, chữ thường, nối bằng '-'"""
+    text = (text or "").replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r'[^a-zA-Z0-9]+', '-', text).strip('-').lower()
+    return text
+
+
+def idempotent_slug(title, key):
+    """Slug chứa idempotency key: '<slug-tieu-de>-<key[:8]>'"""
+    suffix = re.sub(r'[^a-z0-9]', '', str(key).lower())[:SLUG_KEY_LEN] or "post"
+    base = slugify(title)[:SLUG_MAX_LEN - SLUG_KEY_LEN - 1].rstrip('-')
+    return f"{base}-{suffix}" if base else suffix
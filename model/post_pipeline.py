@@ -0,0 +1,201 @@
+"""
+Post Pipeline - xử lý bài theo từng stage chồng lên nhau (pipelining)
+Thay vì: [tải+optimize → upload → tạo bài] của bài N xong mới tới bài N+1,
+mỗi stage có workers riêng và queue giới hạn giữa các stage:
+    bài N+1 đang optimize ảnh trong khi bài N đang được tạo trên WordPress.
+Có thống kê throughput theo từng stage.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+_STOP = object()
+
+
+class PipelineJob:
+    """1 bài đi qua pipeline. Stage functions đọc/ghi thuộc tính tùy ý trên job."""
+
+    def __init__(self, data, **extra):
+        self.data = data
+        self.error = None
+        self.failed_stage = None
+        self.result = None
+        self.created_at = time.time()
+        self.__dict__.update(extra)
+
+
+class StageStats:
+    """Thống kê của 1 stage (thread-safe)"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, started, ended, waited, ok):
+        with self._lock:
+            if self.first_start is None:
+                self.first_start = started
+            self.last_end = ended
+            self.busy_seconds += ended - started
+            self.wait_seconds += waited
+            if ok:
+                self.processed += 1
+            else:
+                self.failed += 1
+
+    def snapshot(self, queue_depth=0):
+        with self._lock:
+            done = self.processed + self.failed
+            span = (self.last_end - self.first_start) if done and self.last_end else 0.0
+            return {
+                'stage': self.name,
+                'workers': self.workers,
+                'processed': self.processed,
+                'failed': self.failed,
+                'queued': queue_depth,
+                'avg_seconds': self.busy_seconds / done if done else 0.0,
+                'avg_wait_seconds': self.wait_seconds / done if done else 0.0,
+                'per_minute': (done / span * 60) if span > 0 else 0.0,
+                # busy / (workers * span): ~1.0 = this stage is the bottleneck
+                'utilization': (self.busy_seconds / (self.workers * span)) if span > 0 else 0.0,
+            }
+
+
+class StagedPipeline:
+    """
+    Pipeline nhiều stage, mỗi stage = (name, func(job) -> job, workers).
+    Giữa các stage là queue.Queue(maxsize=queue_size) để giới hạn bộ nhớ/áp lực ngược.
+    Job lỗi ở stage nào thì dừng tại đó và được trả về on_done với job.error.
+    """
+
+    def __init__(
+        self,
+        stages: List[Tuple[str, Callable, int]],
+        on_done: Optional[Callable] = None,
+        queue_size: int = 4,
+        name: str = "pipeline"
+    ):
+        """
+        Args:
+            stages: [(name, func, workers), ...] theo thứ tự
+            on_done: callback(job) khi job xong (thành công hoặc lỗi), gọi từ worker thread
+            queue_size: Số job tối đa chờ trước mỗi stage
+            name: Tên pipeline (log)
+        """
+        self.name = name
+        self.on_done = on_done
+        self._stages = stages
+        self._queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in stages]
+        self._stats = [StageStats(stage_name, max(1, workers)) for stage_name, _, workers in stages]
+        self._threads = []
+        self._in_flight = 0
+        self._idle = threading.Condition()
+        self._closed = False
+
+        for idx, (stage_name, func, workers) in enumerate(stages):
+            for w in range(max(1, workers)):
+                t = threading.Thread(
+                    target=self._worker, args=(idx, func),
+                    name=f"{name}:{stage_name}:{w}", daemon=True
+                )
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, job: PipelineJob, block: bool = True, timeout: Optional[float] = None):
+        """Đưa job vào stage đầu tiên (block khi queue đầy = back-pressure)"""
+        if self._closed:
+            raise RuntimeError(f"{self.name} is closed")
+        with self._idle:
+            self._in_flight += 1
+        job._enqueued_at = time.time()
+        try:
+            self._queues[0].put(job, block=block, timeout=timeout)
+        except queue.Full:
+            self._finish(None)
+            raise
+        return job
+
+    def _worker(self, idx, func):
+        q_in = self._queues[idx]
+        stats = self._stats[idx]
+        last = idx == len(self._stages) - 1
+        while True:
+            job = q_in.get()
+            if job is _STOP:
+                break
+            started = time.time()
+            waited = started - getattr(job, '_enqueued_at', started)
+            ok = True
+            try:
+                job = func(job) or job
+            except Exception as e:
+                ok = False
+                job.error = e
+                job.failed_stage = self._stages[idx][0]
+                print(f"[PIPELINE] ❌ Stage '{job.failed_stage}' error: {e}")
+            stats.record(started, time.time(), waited, ok)
+
+            if ok and not last and job.error is None:
+                job._enqueued_at = time.time()
+                self._queues[idx + 1].put(job)
+            else:
+                self._finish(job)
+
+    def _finish(self, job):
+        if job is not None and self.on_done:
+            try:
+                self.on_done(job)
+            except Exception as e:
+                print(f"[PIPELINE] ⚠️ on_done error: {e}")
+        with self._idle:
+            self._in_flight -= 1
+            self._idle.notify_all()
+
+    @property
+    def in_flight(self):
+        with self._idle:
+            return self._in_flight
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Chờ tới khi không còn job nào trong pipeline"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._idle:
+            while self._in_flight > 0:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+            return True
+
+    def stats(self) -> List[dict]:
+        """Throughput theo từng stage"""
+        return [s.snapshot(self._queues[i].qsize()) for i, s in enumerate(self._stats)]
+
+    def format_stats(self) -> str:
+        parts = []
+        for s in self.stats():
+            parts.append(
+                f"{s['stage']}: {s['processed']} ok/{s['failed']} err, "
+                f"{s['avg_seconds']:.1f}s/bài, {s['per_minute']:.1f}/phút, queue={s['queued']}"
+            )
+        return " | ".join(parts)
+
+    def close(self, wait: bool = True):
+        """Dừng workers (sau khi xử lý hết job đang chờ nếu wait=True)"""
+        if self._closed:
+            return
+        if wait:
+            self.wait_idle()
+        self._closed = True
+        for idx, (_, _, workers) in enumerate(self._stages):
+            for _ in range(max(1, workers)):
+                self._queues[idx].put(_STOP)
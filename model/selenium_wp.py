@@ -162,7 +162,12 @@ class SeleniumWPClient:
             # Silently ignore errors in popup detection
             pass
 
-    def init_driver(self, headless=False):
+    def init_driver(self, headless=False, profile_slot=0):
+        """
+        Args:
+            headless: Chạy Chrome ẩn
+            profile_slot: Slot trong WebDriverPool - slot > 0 dùng profile riêng (2 Chrome không mở chung 1 profile)
+        """
         import subprocess
         
         # 1. AGGRESSIVE CLEANUP (DISABLED per user request: "Sao cứ đăng nhập là đóng Chrome")
@@ -198,6 +203,8 @@ class SeleniumWPClient:
         
         # Profile
         safe_username = "".join([c for c in self.username if c.isalnum() or c in ('-','_')]) or "default_user"
+        if profile_slot:
+            safe_username = f"{safe_username}_{profile_slot}"
         profile_dir = os.path.join(os.getcwd(), "chrome_profiles", safe_username)
         os.makedirs(profile_dir, exist_ok=True)
         print(f"[SELENIUM] Using profile: {profile_dir}")
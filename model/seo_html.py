@@ -0,0 +1,148 @@
+"""
+SEO HTML - chuẩn hóa nội dung người dùng nhập thành HTML chuẩn SEO (H2/H3, ảnh xen kẽ, JSON-LD)
+Không phụ thuộc GUI: dùng chung cho tab "Web Chuẩn SEO" và bulk_renderer (renderer='seo')
+"""
+
+import re
+
+
+def wrap_seo_html(title: str, raw_content: str, featured_img: str = "",
+                  extra_imgs: list = None, meta_desc: str = "") -> dict:
+    """
+    Tự động chuẩn hóa content cho SEO:
+      - Tôn trọng hoàn toàn content của người dùng (không chèn text rác/intro/cta)
+      - Cho phép dùng ## cho H2, ### cho H3, **chữ in đậm**
+      - Xen kẽ ảnh tự động đều đặn vào giữa các đoạn văn
+      - Chỉ thêm JSON-LD và tiêu đề H1 ở đầu
+    """
+    title = title.strip()
+    extra_imgs = extra_imgs or []
+
+    # ---- Bóc tách Markdown đơn giản ----
+    # Vì Textbox của Tkinter chỉ nhập text thuần, 
+    # người dùng có thể xài Markdown để làm thẻ Heading:
+    # "## Tiêu đề con" -> <h2>Tiêu đề con</h2>
+    # "### Tiêu đề siêu con" -> <h3>Tiêu đề siêu con</h3>
+    content_html = raw_content.strip()
+    
+    if "<p" not in content_html.lower() and "<h2" not in content_html.lower():
+        lines = content_html.split('\n')
+        parsed = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('### '):
+                parsed.append(f"<h3>{line[4:].strip()}</h3>")
+            elif line.startswith('## '):
+                parsed.append(f"<h2>{line[3:].strip()}</h2>")
+            elif line.startswith('# '):
+                # Đề phòng user gõ 1 dấu #, coi như H2
+                parsed.append(f"<h2>{line[2:].strip()}</h2>")
+            else:
+                if not line.startswith('<'):
+                    # Đổi **in đậm** thành <strong>
+                    line = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', line)
+                    parsed.append(f"<p>{line}</p>")
+                else:
+                    parsed.append(line)
+        content_html = "\n".join(parsed)
+
+    # ---- Tự sinh meta desc nếu trống ----
+    if not meta_desc:
+        plain = re.sub(r"<[^>]+>", " ", content_html)
+        plain = re.sub(r"\s+", " ", plain).strip()
+        meta_desc = plain[:157].rsplit(" ", 1)[0] + "..." if len(plain) > 157 else plain
+
+    # ---- Phân bổ ảnh bổ sung xen kẽ vào bài viết ----
+    imgs = [img for img in extra_imgs if img.strip()]
+    if imgs:
+        # Tách theo </p> hoặc </h2> để chèn ảnh
+        parts = re.split(r"(</p>|</h2>)", content_html, flags=re.IGNORECASE)
+        if len(parts) > 1:
+            block_count = len(parts) // 2
+            spacing = max(1, block_count // (len(imgs) + 1))
+            insert_indices = [spacing * (i + 1) for i in range(len(imgs))]
+            
+            new_parts = []
+            b_idx = 0
+            for part in parts:
+                new_parts.append(part)
+                if part.lower() in ("</p>", "</h2>"):
+                    b_idx += 1
+                    if b_idx in insert_indices:
+                        img_idx = insert_indices.index(b_idx)
+                        img_url = imgs[img_idx]
+                        img_tag = (
+                            f'\n<figure style="text-align:center;margin:20px 0;">\n'
+                            f'<img src="{img_url}" alt="{title}" '
+                            f'style="max-width:100%;height:auto;border-radius:8px;" loading="lazy">\n'
+                            f'<figcaption style="font-size:13px;color:#666;margin-top:5px;">{title}</figcaption>\n'
+                            f'</figure>\n'
+                        )
+                        new_parts.append(img_tag)
+            content_html = "".join(new_parts)
+        else:
+            # Nếu chả có HTML gì, đè lên đỉnh
+            img_tags = ""
+            for img_url in imgs:
+                img_tags += (
+                    f'<figure style="text-align:center;margin:20px 0;">\n'
+                    f'<img src="{img_url}" alt="{title}" '
+                    f'style="max-width:100%;height:auto;border-radius:8px;" loading="lazy">\n'
+                    f'</figure>\n'
+                )
+            content_html = img_tags + content_html
+
+    # ---- Schema JSON-LD ----
+    import datetime as _dt
+    today = _dt.date.today().isoformat()
+    schema = f'''<script type="application/ld+json">
+{{
+  "@context": "https://schema.org",
+  "@type": "Article",
+  "headline": "{title}",
+  "description": "{meta_desc[:160]}",
+  "datePublished": "{today}",
+  "dateModified": "{today}",
+  "author": {{"@type": "Organization", "name": "Website"}},
+  "image": "{featured_img or ''}"
+}}
+</script>'''
+
+    # ---- Ảnh Featured trên đỉnh ----
+    feat_html = ""
+    if featured_img:
+        feat_html = (
+            f'<figure style="margin:0 0 25px 0;text-align:center;">\n'
+            f'<img src="{featured_img}" alt="{title}" '
+            f'style="max-width:100%;height:auto;border-radius:10px;box-shadow:0 4px 12px rgba(0,0,0,.15);" '
+            f'loading="lazy">\n'
+            f'</figure>\n'
+        )
+
+    # ---- Lọc bỏ H1 thừa trong AI content (WP tự thêm H1 từ title field) ----
+    import re as _re
+    # Xóa toàn bộ <h1>...</h1> trong content_html để tránh trùng với WP title
+    content_html = _re.sub(r'<h1[^>]*>.*?</h1>', '', content_html,
+                            flags=_re.DOTALL | _re.IGNORECASE).strip()
+
+    # ---- Ảnh Featured: KHÔNG chèn lại vào content (WP đã gán featured_image riêng) ----
+    # feat_html bỏ trống để tránh ảnh xuất hiện 2 lần
+
+    # ---- Lắp ráp: chỉ schema + content, KHÔNG có H1 và KHÔNG có ảnh lặp ----
+    full_html = f"""{schema}
+<article class="seo-post">
+{content_html}
+</article>"""
+
+    # Đếm từ
+    plain_all = _re.sub(r"<[^>]+>", " ", full_html)
+    wc = len(_re.sub(r"\s+", " ", plain_all).split())
+
+    return {
+        "title": title,
+        "meta_desc": meta_desc,
+        "content_html": full_html,
+        "word_count": wc,
+    }
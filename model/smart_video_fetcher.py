@@ -7,8 +7,20 @@ Priority: YouTube API > yt-dlp > requests > Selenium
 
 import os
 import re
-from typing import Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
 from model.enhanced_ytdlp import EnhancedYTDLP
+from model.url_canonicalizer import canonicalize
+from model.video_metadata_cache import get_video_metadata_cache
+
+
+def _youtube_concurrency():
+    """YOUTUBE_API_CONCURRENCY: số request videos.list chạy song song (mặc định 4)"""
+    try:
+        return max(1, int(os.environ.get("YOUTUBE_API_CONCURRENCY", "").strip() or "4"))
+    except ValueError:
+        return 4
 
 
 class SmartVideoFetcher:
@@ -22,6 +34,8 @@ class SmartVideoFetcher:
     - Selenium (slow, last resort)
     """
     
+    YOUTUBE_BATCH_SIZE = 50  # videos.list nhận tối đa 50 id / request
+    
     def __init__(self, youtube_api_key: Optional[str] = None, cookies_file: str = "facebook_cookies.txt"):
         """
         Args:
@@ -39,8 +53,12 @@ class SmartVideoFetcher:
             timeout=30
         )
         
-        # YouTube API client (lazy init)
+        # YouTube API client (lazy init; batch mode dùng 1 client / thread)
         self._youtube_client = None
+        self._local = threading.local()
+        
+        # Kho metadata dùng chung (cùng kho với EnhancedYTDLP / FacebookFastFetcher)
+        self.metadata_cache = get_video_metadata_cache()
     
     def detect_platform(self, url: str) -> str:
         """Detect video platform from URL"""
@@ -80,6 +98,17 @@ class SmartVideoFetcher:
         Requires API key: https://console.cloud.google.com/
         Free quota: 10,000 units/day (~3,000 videos)
         """
+        cached = self.metadata_cache.get(url, source='youtube_api')
+        if cached is not None:
+            return cached
+        result = self._fetch_youtube_api(url)
+        # Thiếu thư viện / URL sai không phải lỗi của video → không cache
+        if result.get('success') or result.get('error') == 'Video not found':
+            self.metadata_cache.put(url, result, source='youtube_api')
+        return result
+    
+    def _fetch_youtube_api(self, url: str) -> Dict:
+        """fetch_via_youtube_api không qua cache"""
         try:
             from googleapiclient.discovery import build
             
@@ -101,15 +130,7 @@ class SmartVideoFetcher:
             if not response.get('items'):
                 return {'success': False, 'error': 'Video not found'}
             
-            snippet = response['items'][0]['snippet']
-            
-            return {
-                'success': True,
-                'title': snippet['title'],
-                'thumbnail': snippet['thumbnails']['maxres']['url'] if 'maxres' in snippet['thumbnails'] else snippet['thumbnails']['high']['url'],
-                'url': url,
-                'method': 'youtube_api'
-            }
+            return self._youtube_result(url, response['items'][0]['snippet'])
             
         except ImportError:
             print("[API] google-api-python-client not installed. Run: pip install google-api-python-client")
@@ -118,6 +139,88 @@ class SmartVideoFetcher:
             print(f"[API] YouTube API error: {e}")
             return {'success': False, 'error': str(e)}
     
+    @staticmethod
+    def _youtube_result(url: str, snippet: Dict) -> Dict:
+        thumbnails = snippet.get('thumbnails', {})
+        best = thumbnails.get('maxres') or thumbnails.get('high') or thumbnails.get('default') or {}
+        return {
+            'success': True,
+            'title': snippet['title'],
+            'thumbnail': best.get('url'),
+            'url': url,
+            'method': 'youtube_api'
+        }
+    
+    def _thread_youtube_client(self):
+        """googleapiclient không thread-safe → mỗi thread 1 client"""
+        client = getattr(self._local, 'youtube', None)
+        if client is None:
+            from googleapiclient.discovery import build
+            client = build('youtube', 'v3', developerKey=self.youtube_api_key, cache_discovery=False)
+            self._local.youtube = client
+        return client
+    
+    def _youtube_videos_list(self, video_ids: List[str]) -> Optional[Dict]:
+        """
+        1 lần gọi videos.list cho tối đa 50 id (1 quota unit), chỉ lấy title + thumbnails.
+        
+        Returns:
+            dict: video_id -> snippet (id không có trong kết quả = video không tồn tại / private),
+            hoặc None nếu lần gọi lỗi (quota, mạng...)
+        """
+        try:
+            response = self._thread_youtube_client().videos().list(
+                part='snippet',
+                id=','.join(video_ids),
+                fields='items(id,snippet(title,thumbnails))',
+                maxResults=len(video_ids),
+            ).execute()
+            return {item['id']: item['snippet'] for item in response.get('items', [])}
+        except ImportError:
+            print("[API] google-api-python-client not installed. Run: pip install google-api-python-client")
+        except Exception as e:
+            print(f"[API] YouTube batch error ({len(video_ids)} ids): {e}")
+        return None
+    
+    def fetch_youtube_batch(self, urls: List[str]) -> Dict[str, Dict]:
+        """
+        YouTube Data API theo lô: gom id thành nhóm YOUTUBE_BATCH_SIZE (50) / request,
+        các nhóm chạy song song (YOUTUBE_API_CONCURRENCY, mặc định 4).
+        
+        Returns:
+            dict: url -> result. URL thuộc nhóm bị lỗi / không đọc được id thì không có trong dict
+            (caller tự fallback).
+        """
+        by_id = {}
+        for url in urls:
+            identity = canonicalize(url)
+            if identity and identity[0] == 'youtube':
+                by_id.setdefault(identity[1], []).append(url)
+        ids = list(by_id)
+        groups = [ids[i:i + self.YOUTUBE_BATCH_SIZE] for i in range(0, len(ids), self.YOUTUBE_BATCH_SIZE)]
+        if not groups:
+            return {}
+        
+        workers = min(len(groups), _youtube_concurrency())
+        print(f"[SMART] YouTube API: {len(ids)} ids → {len(groups)} requests ({workers} parallel)")
+        results = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._youtube_videos_list, group): group for group in groups}
+            for future in as_completed(futures):
+                snippets = future.result()
+                if snippets is None:
+                    continue
+                for video_id in futures[future]:
+                    for url in by_id[video_id]:
+                        snippet = snippets.get(video_id)
+                        if snippet:
+                            result = self._youtube_result(url, snippet)
+                        else:
+                            result = {'success': False, 'error': 'Video not found', 'url': url, 'method': 'youtube_api'}
+                        results[url] = result
+                        self.metadata_cache.put(url, result, source='youtube_api')
+        return results
+    
     def fetch_via_ytdlp(self, url: str) -> Dict:
         """Fetch via yt-dlp (RELIABLE, multi-platform)"""
         try:
@@ -186,6 +289,12 @@ class SmartVideoFetcher:
         """
         platform = self.detect_platform(url)
         
+        # Kết quả thành công của bất kỳ fetcher nào cho cùng video
+        if not force_method:
+            cached = self.metadata_cache.get(url, source='smart')
+            if cached is not None and cached.get('success'):
+                return cached
+        
         # Force specific method if requested
         if force_method:
             if force_method == 'youtube_api':
@@ -236,38 +345,46 @@ class SmartVideoFetcher:
             progress_callback: Optional callback(current, total, result)
         
         Returns:
-            list: List of result dicts
+            list: List of result dicts (cùng thứ tự với urls)
         """
-        results = []
         total = len(urls)
+        results = {}
         
-        # Group URLs by platform for optimization
-        youtube_urls = []
-        other_urls = []
+        def report(result):
+            if progress_callback:
+                progress_callback(len(results), total, result)
         
-        for url in urls:
-            if self.detect_platform(url) == 'youtube' and self.youtube_api_key:
-                youtube_urls.append(url)
-            else:
-                other_urls.append(url)
+        # Trả lời ngay các URL đã có trong cache (không gọi mạng)
+        cached = {url: r for url, r in self.metadata_cache.get_many(urls).items() if r.get('success')}
+        if cached:
+            print(f"[SMART] {len(cached)}/{total} URLs answered from cache")
+            for url, result in cached.items():
+                results[url] = result
+                report(result)
         
-        print(f"[SMART] Processing {len(youtube_urls)} YouTube URLs via API")
-        print(f"[SMART] Processing {len(other_urls)} other URLs via yt-dlp")
+        # Group URLs by platform for optimization
+        pending = [url for url in dict.fromkeys(urls) if url not in results]
+        youtube_urls = [url for url in pending if self.youtube_api_key and self.detect_platform(url) == 'youtube']
         
-        # Process YouTube URLs via API (fast)
-        for i, url in enumerate(youtube_urls, 1):
-            result = self.fetch_via_youtube_api(url)
-            results.append(result)
-            
-            if progress_callback:
-                progress_callback(i, total, result)
+        # Process YouTube URLs via API (50 ids / request)
+        if youtube_urls:
+            print(f"[SMART] Processing {len(youtube_urls)} YouTube URLs via API")
+            for url, result in self.fetch_youtube_batch(youtube_urls).items():
+                results[url] = result
+                report(result)
         
-        # Process other URLs via yt-dlp (batch)
+        # Process other URLs via yt-dlp (batch) - gồm cả YouTube URL mà API không trả lời được
+        other_urls = [url for url in pending if url not in results]
         if other_urls:
-            ytdlp_results = self.ytdlp.batch_get_videos(other_urls, use_cache=True)
-            results.extend(ytdlp_results)
+            print(f"[SMART] Processing {len(other_urls)} other URLs via yt-dlp")
+            for result in self.ytdlp.batch_get_videos(other_urls, use_cache=True):
+                results[result.get('url')] = result
+                report(result)
         
-        return results
+        return [
+            results.get(url) or {'success': False, 'error': 'No result', 'url': url, 'method': 'none'}
+            for url in urls
+        ]
 
 
 # ============= DEMO USAGE =============
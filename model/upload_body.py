@@ -0,0 +1,190 @@
+"""
+Upload Bodies - stream media từ file thay vì f.read() toàn bộ vào RAM
+- FileUploadBody: raw body cho REST /media (Content-Length biết trước, rewind được khi retry)
+- MultipartFileBody: multipart/form-data cho wp-admin async-upload.php, cũng stream từ file
+- Chế độ chunked (Transfer-Encoding: chunked) cho file lớn
+Cả 2 đều dùng được với requests (sync) và httpx (async).
+"""
+
+import os
+import uuid
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+def guess_mime_type(filename):
+    """MIME type theo đuôi file (giống logic cũ của upload_image_fast)"""
+    lower = filename.lower()
+    if lower.endswith('.png'):
+        return 'image/png'
+    if lower.endswith('.gif'):
+        return 'image/gif'
+    if lower.endswith('.webp'):
+        return 'image/webp'
+    return 'image/jpeg'
+
+
+def chunked_threshold():
+    """
+    File >= ngưỡng này (bytes) sẽ gửi dạng chunked.
+    WP_UPLOAD_CHUNKED_MIN_BYTES=0 (mặc định) = tắt, vì một số server cũ trả 411 cho chunked.
+    """
+    try:
+        return max(0, int(os.environ.get("WP_UPLOAD_CHUNKED_MIN_BYTES", "").strip() or "0"))
+    except Exception:
+        return 0
+
+
+class FileUploadBody:
+    """
+    File-backed request body: chỉ giữ 1 file handle, đọc từng block khi socket cần.
+    rewind() trước mỗi lần retry thay vì giữ bytes trong RAM.
+    """
+
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.size = os.path.getsize(path)
+        self._fh = open(path, 'rb')
+
+    def __len__(self):
+        # requests uses len() for Content-Length
+        return self.size
+
+    def read(self, size=-1):
+        return self._fh.read(size)
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def rewind(self):
+        self._fh.seek(0)
+        return self
+
+    def iter_chunks(self):
+        """Sync generator (requests gửi chunked nếu data là generator)"""
+        self.rewind()
+        while True:
+            chunk = self._fh.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    async def aiter_chunks(self):
+        """Async generator cho httpx.AsyncClient(content=...)"""
+        self.rewind()
+        while True:
+            chunk = self._fh.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        if not self._fh.closed:
+            self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class MultipartFileBody:
+    """
+    multipart/form-data body = preamble (form fields + file header) + file stream + epilogue.
+    Tổng độ dài biết trước nên vẫn gửi Content-Length, không cần encode cả file trong RAM.
+    """
+
+    def __init__(self, fields, file_field, path, filename=None, mime_type=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Args:
+            fields: dict các form field thường (action, _wpnonce, ...)
+            file_field: tên field chứa file (vd: "async-upload")
+            path: đường dẫn file
+            filename: tên file gửi lên (mặc định basename)
+            mime_type: MIME type (mặc định đoán theo đuôi)
+        """
+        self.boundary = uuid.uuid4().hex
+        filename = filename or os.path.basename(path)
+        mime_type = mime_type or guess_mime_type(filename)
+
+        parts = []
+        for name, value in (fields or {}).items():
+            parts.append(
+                f'--{self.boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"\r\n\r\n'
+                f'{value}\r\n'
+            )
+        parts.append(
+            f'--{self.boundary}\r\n'
+            f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+            f'Content-Type: {mime_type}\r\n\r\n'
+        )
+        self._preamble = ''.join(parts).encode('utf-8')
+        self._epilogue = f'\r\n--{self.boundary}--\r\n'.encode('utf-8')
+        self._file = FileUploadBody(path, chunk_size=chunk_size)
+        self.size = len(self._preamble) + self._file.size + len(self._epilogue)
+        self._stage = 0  # 0 = preamble, 1 = file, 2 = epilogue, 3 = done
+        self._offset = 0
+
+    @property
+    def content_type(self):
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return self.iter_chunks()
+
+    def rewind(self):
+        self._stage = 0
+        self._offset = 0
+        self._file.rewind()
+        return self
+
+    def read(self, size=-1):
+        """File-like read qua 3 đoạn preamble → file → epilogue"""
+        if size is None or size < 0:
+            size = self.size
+        out = []
+        remaining = size
+        while remaining > 0 and self._stage < 3:
+            if self._stage == 1:
+                data = self._file.read(remaining)
+                if not data:
+                    self._stage, self._offset = 2, 0
+                    continue
+            else:
+                block = self._preamble if self._stage == 0 else self._epilogue
+                data = block[self._offset:self._offset + remaining]
+                self._offset += len(data)
+                if self._offset >= len(block):
+                    self._stage, self._offset = self._stage + 1, 0
+            out.append(data)
+            remaining -= len(data)
+        return b''.join(out)
+
+    def iter_chunks(self):
+        self.rewind()
+        while True:
+            chunk = self.read(self._file.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    async def aiter_chunks(self):
+        for chunk in self.iter_chunks():
+            yield chunk
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,86 @@
+"""
+URL Canonicalizer - 1 video = 1 danh tính (platform, id), bất kể dạng link
+- YouTube: youtu.be/X, watch?v=X&t=10, embed/X, shorts/X, live/X, m./music./nocookie
+- Vimeo: vimeo.com/123, vimeo.com/channels/x/123, player.vimeo.com/video/123
+- Facebook: /videos/123, watch/?v=123, video.php?v=123, reel/123 (www/m/web/mbasic)
+- fb.watch/<code>, facebook.com/share/v/<code>, TikTok /video/123, vm./vt.tiktok.com/<code>
+Dùng để gộp link trùng trước khi scan/đăng và làm key cho video metadata cache.
+"""
+
+import re
+from urllib.parse import urlparse
+
+_PATTERNS = [
+    ('youtube', re.compile(
+        r'(?:youtube(?:-nocookie)?\.com/(?:watch\?(?:[^#]*&)?v=|embed/|shorts/|live/|v/)|youtu\.be/)([\w-]{11})', re.I)),
+    ('vimeo', re.compile(r'(?:player\.vimeo\.com/video/|vimeo\.com/(?:[^?#]*/)?)(\d+)', re.I)),
+    ('facebook', re.compile(
+        r'facebook\.com/(?:[^?#]*?/videos/(?:[^/?#]*/)?|reel/|(?:watch/?|video\.php)\?(?:[^#]*&)?v=)(\d+)', re.I)),
+    ('fbwatch', re.compile(r'fb\.watch/([\w-]+)', re.I)),
+    ('fbshare', re.compile(r'facebook\.com/share/(?:v|r)/([\w-]+)', re.I)),
+    ('tiktok', re.compile(r'tiktok\.com/(?:[^?#]*?/video/|v/)(\d+)', re.I)),
+    ('tiktok_short', re.compile(r'(?:vm|vt)\.tiktok\.com/([\w-]+)', re.I)),
+]
+
+PLATFORMS = tuple(name for name, _ in _PATTERNS)
+
+
+def canonicalize(url):
+    """
+    Args:
+        url: Link video (dạng bất kỳ)
+
+    Returns:
+        tuple (platform, id) hoặc None nếu không nhận dạng được
+    """
+    url = (url or '').strip()
+    for platform, pattern in _PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return platform, match.group(1)
+    return None
+
+
+def video_identity(url):
+    """
+    Như canonicalize(), nhưng luôn trả về 1 danh tính:
+    link lạ → ('url', host + path đã chuẩn hoá, bỏ www./m., bỏ / cuối và #fragment)
+    """
+    identity = canonicalize(url)
+    if identity:
+        return identity
+    url = (url or '').strip()
+    parsed = urlparse(url if '://' in url else f"https://{url}")
+    host = re.sub(r'^(www|m|web|mobile)\.', '', (parsed.netloc or '').lower())
+    path = parsed.path.rstrip('/')
+    return 'url', f"{host}{path}" + (f"?{parsed.query}" if parsed.query else '')
+
+
+def canonical_key(url):
+    """'platform:id' - key ổn định để so trùng / cache"""
+    platform, video_id = video_identity(url)
+    return f"{platform}:{video_id}"
+
+
+def dedupe(items, key=None):
+    """
+    Gộp các item trỏ tới cùng 1 video, giữ item xuất hiện đầu tiên (và thứ tự).
+
+    Args:
+        items: list URL, hoặc list bất kỳ kèm key(item) -> URL
+        key: Hàm lấy URL từ item (mặc định: chính item)
+
+    Returns:
+        tuple (unique_items, duplicate_count)
+    """
+    seen = set()
+    unique = []
+    for item in items:
+        url = key(item) if key else item
+        # Embed code / text không phải link: so nguyên văn
+        ident = canonical_key(url) if url and not str(url).lstrip().startswith('<') else f"raw:{url}"
+        if ident in seen:
+            continue
+        seen.add(ident)
+        unique.append(item)
+    return unique, len(items) - len(unique)
@@ -0,0 +1,240 @@
+"""
+Video Frame Extractor - dịch vụ lấy frame ứng viên dùng chung (thumbnail Vimeo + thumbnail Facebook)
+- 1 process ffmpeg / video: chỉ decode keyframe (-skip_frame nokey), select lấy mẫu đều theo thời gian
+  trong cửa sổ [start_percent, end_percent], frame chảy qua pipe (BMP) → numpy, không ghi file tạm
+- Mỗi frame được chấm điểm độ nét ngay khi tới (Laplacian var + Tenengrad trên ảnh xám thu nhỏ),
+  chỉ giữ N frame tốt nhất trong RAM
+- Độ dài video đọc từ metadata (cv2, trong process) thay cho 1 lần gọi ffprobe
+- Kết quả nhớ tạm cho vài video gần nhất: Vimeo + Facebook cùng 1 video chỉ decode 1 lần
+  (giới hạn theo dung lượng frame: FRAME_MEMO_MB)
+"""
+
+import functools
+import heapq
+import os
+import re
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict, namedtuple
+
+import cv2
+import numpy as np
+
+FrameCandidate = namedtuple('FrameCandidate', ['time', 'score', 'frame'])  # frame: ndarray BGR (H, W, 3)
+
+SCORE_WIDTH = 320  # chấm điểm độ nét trên ảnh xám thu nhỏ
+_PTS_TIME = re.compile(r'pts_time:\s*([-\d.]+)')
+
+_memo = OrderedDict()
+_memo_lock = threading.Lock()
+MEMO_SIZE = 2    # số video gần nhất được nhớ kết quả
+MEMO_TOP = 3     # luôn giữ ít nhất 3 ứng viên để caller gọi với n khác nhau vẫn dùng chung 1 lần decode
+PASS_TIMEOUT = 60  # giây tối thiểu cho 1 lần ffmpeg (cộng thêm theo độ dài cửa sổ / số frame), quá hạn → kill
+RW_TIMEOUT_US = 15_000_000  # URL: ffmpeg tự bỏ khi 15s không nhận được dữ liệu
+
+
+def _memo_max_bytes():
+    """Tổng dung lượng frame BGR được nhớ (FRAME_MEMO_MB, mặc định 64MB; 1 frame 4K ≈ 25MB)"""
+    try:
+        return max(0.0, float(os.environ.get("FRAME_MEMO_MB", "64"))) * 1024 * 1024
+    except ValueError:
+        return 64 * 1024 * 1024
+
+
+def _candidates_bytes(candidates):
+    return sum(c.frame.nbytes for c in candidates)
+
+
+@functools.lru_cache(maxsize=1)
+def _passthrough_args():
+    """-fps_mode chỉ có từ ffmpeg 5.1; bản cũ hơn dùng -vsync passthrough"""
+    try:
+        out = subprocess.run(['ffmpeg', '-hide_banner', '-h', 'long'], capture_output=True, timeout=10).stdout
+        if b'-fps_mode' in out:
+            return ['-fps_mode', 'passthrough']
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return ['-vsync', 'passthrough']
+
+
+def sharpness_scores(grays):
+    """
+    Laplacian var * 0.7 + Tenengrad * 0.3, thưởng/phạt độ sáng - tính 1 lần cho cả lô (N, H, W) bằng numpy.
+    """
+    g = grays.astype(np.float32)
+    n = len(g)
+    lap = g[:, :-2, 1:-1] + g[:, 2:, 1:-1] + g[:, 1:-1, :-2] + g[:, 1:-1, 2:] - 4 * g[:, 1:-1, 1:-1]
+    laplacian_var = lap.reshape(n, -1).var(axis=1)
+    sobelx = (g[:, :-2, 2:] + 2 * g[:, 1:-1, 2:] + g[:, 2:, 2:]) - (g[:, :-2, :-2] + 2 * g[:, 1:-1, :-2] + g[:, 2:, :-2])
+    sobely = (g[:, 2:, :-2] + 2 * g[:, 2:, 1:-1] + g[:, 2:, 2:]) - (g[:, :-2, :-2] + 2 * g[:, :-2, 1:-1] + g[:, :-2, 2:])
+    tenengrad = (sobelx ** 2 + sobely ** 2).reshape(n, -1).mean(axis=1)
+    score = laplacian_var * 0.7 + tenengrad * 0.3
+    brightness = g.reshape(n, -1).mean(axis=1)
+    return score * np.where((brightness > 40) & (brightness < 215), 1.2, 0.8)
+
+
+def score_gray(frame, width=SCORE_WIDTH):
+    """Frame BGR → ảnh xám rộng `width` để chấm điểm"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    if w > width:
+        gray = cv2.resize(gray, (width, max(3, round(h * width / w))), interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def video_duration(video):
+    """Độ dài (giây) từ metadata container (không decode); 0 nếu không đọc được"""
+    cap = cv2.VideoCapture(video)
+    try:
+        if not cap.isOpened():
+            return 0.0
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        return float(frames / fps) if frames > 0 and fps > 0 else 0.0
+    finally:
+        cap.release()
+
+
+def _read_exact(stream, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = stream.read(n - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _run_pass(video, start, span, samples, n, max_width, keyframes_only):
+    """1 lần chạy ffmpeg → list FrameCandidate (tốt nhất trước)"""
+    interval = span / max(1, samples) if span else 0
+    chain = [f"select='isnan(prev_selected_t)+gte(t-prev_selected_t\\,{interval:.3f})'"]
+    if max_width:
+        chain.append(f"scale='min({max_width},iw)':-2")
+    chain.append("showinfo")
+
+    cmd = ['ffmpeg', '-hide_banner', '-nostdin', '-loglevel', 'info']
+    if keyframes_only:
+        cmd += ['-skip_frame', 'nokey']
+    if start:
+        cmd += ['-ss', f"{start:.3f}"]
+    if re.match(r'^[a-z]+://', str(video)):
+        cmd += ['-rw_timeout', str(RW_TIMEOUT_US)]
+    cmd += ['-i', video]
+    if span:
+        cmd += ['-t', f"{span:.3f}"]
+    cmd += ['-an', '-vf', ','.join(chain), *_passthrough_args(), '-f', 'image2pipe', '-c:v', 'bmp', 'pipe:1']
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    times = []
+
+    def _drain():
+        for raw in iter(proc.stderr.readline, b''):
+            line = raw.decode('utf-8', 'replace')
+            m = _PTS_TIME.search(line)
+            if m and 'Parsed_showinfo' in line:
+                times.append(float(m.group(1)))
+
+    drain = threading.Thread(target=_drain, daemon=True)
+    drain.start()
+
+    # Input đứng giữa chừng (HTTP chậm, pipe không có dữ liệu) → _read_exact chờ mãi: kill theo hạn
+    timed_out = threading.Event()
+
+    def _kill():
+        timed_out.set()
+        proc.kill()
+
+    watchdog = threading.Timer(PASS_TIMEOUT + span * 0.5 + samples, _kill)
+    watchdog.daemon = True
+    watchdog.start()
+
+    best = []  # min-heap (score, index, frame) - giữ N frame tốt nhất
+    index = 0
+    try:
+        while True:
+            header = _read_exact(proc.stdout, 14)
+            if header is None or header[:2] != b'BM':
+                break
+            body = _read_exact(proc.stdout, int.from_bytes(header[2:6], 'little') - 14)
+            if body is None:
+                break
+            frame = cv2.imdecode(np.frombuffer(header + body, np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                score = float(sharpness_scores(score_gray(frame)[None])[0])
+                item = (score, index, frame)
+                if len(best) < n:
+                    heapq.heappush(best, item)
+                elif score > best[0][0]:
+                    heapq.heapreplace(best, item)
+            index += 1
+    finally:
+        watchdog.cancel()
+        if timed_out.is_set():
+            print(f"[FRAMES] ⚠️ ffmpeg stalled, killed after {watchdog.interval:.0f}s ({os.path.basename(str(video))})")
+        proc.stdout.close()
+        try:
+            proc.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            print(f"[FRAMES] ⚠️ ffmpeg did not exit, killing ({os.path.basename(str(video))})")
+            proc.kill()
+            proc.wait()
+        drain.join(timeout=5)
+
+    ranked = sorted(best, key=lambda item: item[0], reverse=True)
+    return [FrameCandidate(time=start + (times[i] if i < len(times) else 0.0), score=s, frame=f)
+            for s, i, f in ranked]
+
+
+def extract_best_frames(video, n=3, start_percent=0.1, end_percent=0.6, samples=30, max_width=None):
+    """
+    N frame nét nhất trong cửa sổ [start_percent, end_percent] của video, sau 1 lần ffmpeg.
+
+    Args:
+        video: File hoặc URL video
+        n: Số ứng viên trả về
+        start_percent, end_percent: Cửa sổ tìm (theo độ dài video)
+        samples: Số frame lấy mẫu tối đa (đều theo thời gian)
+        max_width: Thu nhỏ frame trả về (None = độ phân giải gốc)
+
+    Returns:
+        list FrameCandidate(time, score, frame BGR), tốt nhất trước; [] nếu không có ffmpeg / lỗi
+    """
+    if not shutil.which('ffmpeg'):
+        return []
+    params = (start_percent, end_percent, samples, max_width)
+    try:
+        st = os.stat(video)
+        memo_key = (os.path.abspath(video), st.st_size, st.st_mtime_ns, params)
+    except (OSError, TypeError):
+        memo_key = (video, params)  # URL
+    with _memo_lock:
+        if memo_key in _memo:
+            _memo.move_to_end(memo_key)
+            cached, exhausted = _memo[memo_key]
+            if len(cached) >= n or exhausted:
+                return list(cached[:n])
+
+    duration = video_duration(video)
+    start = duration * start_percent if duration else 0.0
+    span = duration * (end_percent - start_percent) if duration else 0.0
+    keep = max(n, MEMO_TOP)
+    try:
+        candidates = _run_pass(video, start, span, samples, keep, max_width, keyframes_only=True)
+        if not candidates:
+            # Cửa sổ không chứa keyframe nào (video ngắn, GOP dài) → decode đầy đủ
+            candidates = _run_pass(video, start, span, samples, keep, max_width, keyframes_only=False)
+    except Exception as e:
+        print(f"[FRAMES] ⚠️ ffmpeg frame extraction failed: {e}")
+        return []
+
+    max_bytes = _memo_max_bytes()
+    with _memo_lock:
+        if _candidates_bytes(candidates) <= max_bytes:
+            # (ứng viên, đã lấy hết frame có thể có - không cần chạy lại khi n lớn hơn)
+            _memo[memo_key] = (candidates, len(candidates) < keep)
+        while _memo and (len(_memo) > MEMO_SIZE or
+                         sum(_candidates_bytes(c) for c, _ in _memo.values()) > max_bytes):
+            _memo.popitem(last=False)
+    return list(candidates[:n])
@@ -0,0 +1,259 @@
+"""
+Video Metadata Cache - 1 kho SQLite dùng chung cho mọi fetcher (yt-dlp, FB fast/REST, YouTube API, oEmbed)
+- Key = danh tính video (url_canonicalizer, platform:id), không phải URL thô:
+  youtu.be/X và youtube.com/watch?v=X&t=10 là 1 entry
+- TTL theo platform; lỗi cũng được cache (negative) trong thời gian ngắn
+- get_many(): trả lời các URL đã có trong cache mà không gọi mạng
+- Lưu trong .cache/video_metadata.sqlite3 (thay cho .cache/ytdlp/<md5>.json - được import 1 lần)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from model.url_canonicalizer import canonical_key, video_identity
+
+# TTL (giây) cho kết quả thành công, theo platform
+PLATFORM_TTLS = {
+    'youtube': 7 * 24 * 3600,
+    'vimeo': 7 * 24 * 3600,
+    'facebook': 24 * 3600,
+    'tiktok': 24 * 3600,
+}
+DEFAULT_TTL = 24 * 3600
+
+
+def _negative_ttl():
+    """VIDEO_META_NEGATIVE_TTL (giây), mặc định 15 phút"""
+    try:
+        return max(0, int(os.environ.get("VIDEO_META_NEGATIVE_TTL", "").strip() or "900"))
+    except ValueError:
+        return 900
+
+
+def _ttl_for(platform):
+    platform = {'fbwatch': 'facebook', 'fbshare': 'facebook', 'tiktok_short': 'tiktok'}.get(platform, platform)
+    return PLATFORM_TTLS.get(platform, DEFAULT_TTL)
+
+
+class VideoMetadataCache:
+    """
+    Kho metadata video. Thread-safe (1 connection + lock); dùng chung qua get_video_metadata_cache().
+    Kết quả lưu nguyên dict của fetcher ({'success', 'title', 'thumbnail', 'method', ...}).
+    """
+
+    def __init__(self, db_path=".cache/video_metadata.sqlite3", negative_ttl=None, legacy_dir=".cache/ytdlp"):
+        """
+        Args:
+            db_path: File SQLite
+            negative_ttl: Thời gian (giây) cache kết quả lỗi (mặc định VIDEO_META_NEGATIVE_TTL)
+            legacy_dir: Thư mục cache JSON cũ của EnhancedYTDLP (import khi tạo DB mới)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.negative_ttl = _negative_ttl() if negative_ttl is None else negative_ttl
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        fresh = not self.db_path.exists()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " key TEXT PRIMARY KEY, platform TEXT, video_id TEXT, url TEXT,"
+            " success INTEGER, source TEXT, data TEXT, fetched_at REAL, expires_at REAL)"
+        )
+        self._conn.commit()
+        if fresh and legacy_dir and os.path.isdir(legacy_dir):
+            self._import_legacy(legacy_dir)
+
+    @staticmethod
+    def key_for(url):
+        return canonical_key(url)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _row_to_result(self, row, url, source, now):
+        success, row_source, data, expires_at = row
+        if expires_at < now:
+            return None
+        # Lỗi của fetcher khác không chặn fetcher này (mỗi fetcher có strategy riêng)
+        if not success and source is not None and row_source != source:
+            return None
+        result = json.loads(data)
+        result['url'] = url
+        result['cached'] = True
+        return result
+
+    def get(self, url, source=None, max_age=None):
+        """
+        Args:
+            url: URL video (dạng bất kỳ)
+            source: Tên fetcher đang hỏi - entry lỗi chỉ có hiệu lực với chính fetcher đã ghi nó
+            max_age: Giới hạn tuổi entry (giây), thêm vào TTL platform
+
+        Returns:
+            dict (bản copy, có 'cached': True) hoặc None
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT success, source, data, expires_at, fetched_at FROM videos WHERE key = ?",
+                (self.key_for(url),),
+            ).fetchone()
+        result = None
+        if row and (max_age is None or now - row[4] <= max_age):
+            result = self._row_to_result(row[:4], url, source, now)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def get_many(self, urls, source=None):
+        """
+        Bulk lookup, không gọi mạng.
+
+        Returns:
+            dict: url -> result cho các URL có trong cache (URL thiếu = cần fetch)
+        """
+        keys = {url: self.key_for(url) for url in urls}
+        unique = list(set(keys.values()))
+        rows = {}
+        with self._lock:
+            for i in range(0, len(unique), 500):
+                chunk = unique[i:i + 500]
+                cursor = self._conn.execute(
+                    f"SELECT key, success, source, data, expires_at FROM videos WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                rows.update((r[0], r[1:]) for r in cursor)
+        now = time.time()
+        found = {}
+        for url, key in keys.items():
+            result = self._row_to_result(rows[key], url, source, now) if key in rows else None
+            if result is not None:
+                found[url] = result
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    # ------------------------------------------------------------------
+    # Store
+    # ------------------------------------------------------------------
+
+    def put(self, url, result, source=None, fetched_at=None):
+        """
+        Ghi kết quả của 1 fetcher. Kết quả lỗi không ghi đè kết quả thành công còn hạn.
+        """
+        if not url or not isinstance(result, dict):
+            return
+        platform, video_id = video_identity(url)
+        success = bool(result.get('success') and result.get('title'))
+        fetched_at = fetched_at or time.time()
+        ttl = _ttl_for(platform) if success else self.negative_ttl
+        if not success and ttl <= 0:
+            return
+        data = {k: v for k, v in result.items() if k not in ('url', 'cached')}
+        key = f"{platform}:{video_id}"
+        with self._lock:
+            if not success:
+                row = self._conn.execute("SELECT success, expires_at FROM videos WHERE key = ?", (key,)).fetchone()
+                if row and row[0] and row[1] >= time.time():
+                    return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO videos (key, platform, video_id, url, success, source, data, fetched_at, expires_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, platform, video_id, url, int(success), source, json.dumps(data, ensure_ascii=False),
+                 fetched_at, fetched_at + ttl),
+            )
+            self._conn.commit()
+
+    def invalidate(self, url):
+        with self._lock:
+            self._conn.execute("DELETE FROM videos WHERE key = ?", (self.key_for(url),))
+            self._conn.commit()
+
+    def purge_expired(self):
+        """Xoá entry hết hạn. Returns: số entry đã xoá"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM videos WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _import_legacy(self, legacy_dir):
+        """Import cache JSON cũ (.cache/ytdlp/<md5>.json) - giữ mtime làm thời điểm fetch"""
+        imported = 0
+        for path in Path(legacy_dir).glob("*.json"):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('url') and data.get('success') and data.get('title'):
+                    self.put(data['url'], data, source='ytdlp', fetched_at=path.stat().st_mtime)
+                    imported += 1
+            except Exception:
+                continue
+        if imported:
+            print(f"[VIDEO_CACHE] 📥 Imported {imported} entries from {legacy_dir}")
+
+    def stats(self):
+        with self._lock:
+            entries, negative = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(1 - success), 0) FROM videos WHERE expires_at >= ?", (time.time(),)
+            ).fetchone()
+        return {'entries': entries, 'negative': negative, 'hits': self.hits, 'misses': self.misses}
+
+
+# Chỉ các câu trả lời dứt khoát (video không tồn tại / riêng tư) mới được cache lỗi
+OEMBED_DEFINITIVE_STATUSES = (401, 403, 404)
+
+
+def cached_oembed(video_url, oembed_url, timeout=5, source='oembed'):
+    """
+    oEmbed JSON qua metadata cache (dùng cho YouTube/Vimeo/TikTok oEmbed của GUI scanner).
+
+    Returns:
+        dict {'success', 'title', 'thumbnail', 'method'}
+    """
+    cache = get_video_metadata_cache()
+    cached = cache.get(video_url, source=source)
+    if cached is not None:
+        return cached
+    import requests
+    try:
+        res = requests.get(oembed_url, timeout=timeout)
+        if res.status_code == 200:
+            data = res.json()
+            result = {'success': bool(data.get('title')), 'title': data.get('title'),
+                      'thumbnail': data.get('thumbnail_url'), 'method': 'oembed'}
+        else:
+            result = {'success': False, 'error': f'oEmbed HTTP {res.status_code}', 'method': 'oembed'}
+            if res.status_code not in OEMBED_DEFINITIVE_STATUSES:
+                # 429 / 5xx: site đang quá tải hoặc lỗi tạm thời → không cache, lần sau hỏi lại
+                return result
+    except Exception as e:
+        # Lỗi mạng: không cache (có thể chỉ là timeout thoáng qua)
+        return {'success': False, 'error': str(e), 'method': 'oembed'}
+    cache.put(video_url, result, source=source)
+    return result
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_video_metadata_cache():
+    """Kho dùng chung cho cả process"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = VideoMetadataCache()
+    return _cache
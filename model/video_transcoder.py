@@ -0,0 +1,396 @@
+"""
+Video Transcoder - bước xử lý tùy chọn trước khi upload video lên Vimeo (ffmpeg, chỉ dùng CPU)
+- Video đã gọn (H.264, bitrate + độ phân giải trong giới hạn): chỉ remux +faststart (-c copy, rất nhanh)
+- Video phone bitrate cao: libx264 (VIDEO_TRANSCODE_PRESET) giới hạn bitrate + cạnh ngắn,
+  hoặc bitrate tính theo dung lượng mục tiêu (VIDEO_TRANSCODE_TARGET_MB)
+- Thumbnail (frame giữa video) được xuất trong CÙNG lần chạy ffmpeg
+- Chạy trên process pool (VIDEO_TRANSCODE_WORKERS); kết quả cache theo SHA-256 nội dung + settings
+- Đo được: bytes tiết kiệm vs CPU-giây (TranscodeStats + .cache/transcoded/metrics.jsonl)
+Bật cho VimeoAPIUploader bằng VIMEO_PRETRANSCODE=1 (mặc định tắt: upload file gốc như cũ)
+"""
+
+import concurrent.futures
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+from model.derived_image_cache import DerivedImageCache
+
+MB = 1024 * 1024
+CACHE_DIR = ".cache/transcoded"
+
+
+def _env_number(name, default, cast=int):
+    try:
+        return max(0, cast(os.environ.get(name, "").strip() or default))
+    except ValueError:
+        return default
+
+
+def pretranscode_enabled():
+    return os.environ.get("VIMEO_PRETRANSCODE", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def transcode_settings():
+    """
+    Settings từ env (cũng là 1 phần của cache key):
+        VIDEO_TRANSCODE_MAX_SIDE: cạnh ngắn tối đa (mặc định 1080 → 1080p, cả video dọc)
+        VIDEO_TRANSCODE_MAX_KBPS: bitrate video tối đa (mặc định 5000)
+        VIDEO_TRANSCODE_TARGET_MB: dung lượng mục tiêu (0 = không dùng)
+        VIDEO_TRANSCODE_PRESET / VIDEO_TRANSCODE_CRF: preset + CRF của libx264
+    """
+    return {
+        'max_side': _env_number("VIDEO_TRANSCODE_MAX_SIDE", 1080),
+        'max_kbps': _env_number("VIDEO_TRANSCODE_MAX_KBPS", 5000),
+        'target_mb': _env_number("VIDEO_TRANSCODE_TARGET_MB", 0, float),
+        'audio_kbps': 128,
+        'preset': os.environ.get("VIDEO_TRANSCODE_PRESET", "").strip() or "veryfast",
+        'crf': _env_number("VIDEO_TRANSCODE_CRF", 23),
+    }
+
+
+# ----------------------------------------------------------------------
+# Probe + plan
+# ----------------------------------------------------------------------
+
+def probe_video(path):
+    """
+    Returns:
+        dict {duration, width, height, vcodec, acodec, kbps} (ffprobe, hoặc stderr của `ffmpeg -i`)
+    """
+    info = {'duration': 0.0, 'width': 0, 'height': 0, 'vcodec': None, 'acodec': None, 'kbps': 0}
+    if shutil.which('ffprobe'):
+        res = subprocess.run(['ffprobe', '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+                             capture_output=True, text=True, timeout=60)
+        data = json.loads(res.stdout or '{}')
+        streams = data.get('streams', [])
+        video = next((s for s in streams if s.get('codec_type') == 'video'), {})
+        audio = next((s for s in streams if s.get('codec_type') == 'audio'), {})
+        fmt = data.get('format', {})
+        info.update(duration=float(fmt.get('duration') or 0), width=int(video.get('width') or 0),
+                    height=int(video.get('height') or 0), vcodec=video.get('codec_name'),
+                    acodec=audio.get('codec_name'), kbps=int(fmt.get('bit_rate') or 0) // 1000)
+        return info
+
+    res = subprocess.run(['ffmpeg', '-hide_banner', '-i', path], capture_output=True, text=True, timeout=60)
+    err = res.stderr
+    m = re.search(r'Duration: (\d+):(\d+):([\d.]+)', err)
+    if m:
+        info['duration'] = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3))
+    m = re.search(r'bitrate: (\d+) kb/s', err)
+    if m:
+        info['kbps'] = int(m.group(1))
+    m = re.search(r'Stream #.*?Video: (\w+).*?, (\d{2,5})x(\d{2,5})', err)
+    if m:
+        info.update(vcodec=m.group(1), width=int(m.group(2)), height=int(m.group(3)))
+    m = re.search(r'Stream #.*?Audio: (\w+)', err)
+    if m:
+        info['acodec'] = m.group(1)
+    return info
+
+
+def plan_transcode(info, settings):
+    """
+    Returns:
+        tuple (mode, video_kbps): mode = 'remux' (chỉ faststart) hoặc 'transcode'
+    """
+    video_kbps = settings['max_kbps']
+    if settings['target_mb'] and info['duration']:
+        budget = int(settings['target_mb'] * 8 * 1024 / info['duration']) - settings['audio_kbps']
+        video_kbps = max(300, min(video_kbps, budget))
+    short_side = min(info['width'], info['height'])
+    if info['vcodec'] != 'h264' or short_side > settings['max_side']:
+        return 'transcode', video_kbps
+    # Cho phép vượt 15% trước khi encode lại (encode lại video đã gọn chỉ tốn CPU)
+    if info['kbps'] > (video_kbps + settings['audio_kbps']) * 1.15:
+        return 'transcode', video_kbps
+    return 'remux', video_kbps
+
+
+def _scale_filter(max_side):
+    """Giới hạn cạnh ngắn (video ngang lẫn dọc), giữ tỉ lệ, kích thước chẵn cho yuv420p"""
+    return (f"scale='if(gt(iw,ih),-2,min(iw,{max_side}))':'if(gt(iw,ih),min(ih,{max_side}),-2)'")
+
+
+def _fallback_thumb(out_thumb):
+    return os.path.splitext(out_thumb)[0] + ".first.jpg"
+
+
+def build_command(src, out_video, out_thumb, info, settings, mode, video_kbps):
+    """
+    1 lệnh ffmpeg → video (remux/transcode, +faststart) + thumbnail JPEG ở giữa video.
+    Kèm frame đầu (_fallback_thumb) phòng khi không có frame nào sau điểm giữa
+    (remux chỉ decode keyframe; video ít keyframe).
+    """
+    mid = info['duration'] / 2 if info['duration'] >= 2 else 0
+    scale = "scale='min(1280,iw)':-2"
+    thumbs = f"[t]split=2[tm][tf];[tm]select='gte(t,{mid:.3f})',{scale}[tout];[tf]select='eq(n,0)',{scale}[tfirst]"
+    cmd = ['ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-nostdin']
+    if mode == 'remux':
+        # Stream copy không decode; chỉ nhánh thumbnail decode (và chỉ keyframe)
+        cmd += ['-skip_frame', 'nokey', '-i', src,
+                '-filter_complex', f"[0:v:0]null[t];{thumbs}",
+                '-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy']
+    else:
+        cmd += ['-i', src,
+                '-filter_complex', f"[0:v:0]split=2[v][t];[v]{_scale_filter(settings['max_side'])}[vout];{thumbs}",
+                '-map', '[vout]', '-map', '0:a:0?',
+                '-c:v', 'libx264', '-preset', settings['preset'], '-crf', str(settings['crf']),
+                '-maxrate', f"{video_kbps}k", '-bufsize', f"{video_kbps * 2}k", '-pix_fmt', 'yuv420p']
+        if info['acodec'] == 'aac':
+            cmd += ['-c:a', 'copy']
+        else:
+            cmd += ['-c:a', 'aac', '-b:a', f"{settings['audio_kbps']}k"]
+    cmd += ['-movflags', '+faststart', out_video,
+            '-map', '[tout]', '-frames:v', '1', '-q:v', '1', out_thumb,
+            '-map', '[tfirst]', '-frames:v', '1', '-q:v', '1', _fallback_thumb(out_thumb)]
+    return cmd
+
+
+# ----------------------------------------------------------------------
+# Worker (process pool)
+# ----------------------------------------------------------------------
+
+def _child_cpu_seconds():
+    """CPU (user+sys) của các process con đã kết thúc; None nếu OS không hỗ trợ (Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _run_ffmpeg(cmd, timeout):
+    res = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    return res.returncode == 0, (res.stderr or '').strip()[-300:]
+
+
+def transcode_file(src, settings, work_dir=None):
+    """
+    Chạy trong worker process: probe → remux/transcode + thumbnail trong 1 lần ffmpeg.
+
+    Returns:
+        dict {output, thumbnail, mode, bytes_in, bytes_out, cpu_seconds, wall_seconds, error}
+        output = None nếu file gốc đã tốt hơn (upload file gốc)
+    """
+    started = time.time()
+    cpu_before = _child_cpu_seconds()
+    bytes_in = os.path.getsize(src)
+    result = {'output': None, 'thumbnail': None, 'mode': 'original', 'bytes_in': bytes_in,
+              'bytes_out': bytes_in, 'cpu_seconds': 0.0, 'wall_seconds': 0.0, 'error': None, 'work_dir': None}
+    try:
+        info = probe_video(src)
+        if not info['vcodec']:
+            result['error'] = 'no video stream'
+            return result
+        mode, video_kbps = plan_transcode(info, settings)
+        work_dir = work_dir or tempfile.mkdtemp(prefix="transcode_")
+        result['work_dir'] = work_dir
+        base = os.path.join(work_dir, os.path.splitext(os.path.basename(src))[0])
+        out_video, out_thumb = f"{base}.upload.mp4", f"{base}.thumb.jpg"
+        timeout = max(600, int(info['duration'] * 10))
+
+        ok, err = _run_ffmpeg(build_command(src, out_video, out_thumb, info, settings, mode, video_kbps), timeout)
+        if not ok and mode == 'remux':
+            # Vd: audio PCM trong .mov không copy được sang mp4 → encode lại
+            mode = 'transcode'
+            ok, err = _run_ffmpeg(build_command(src, out_video, out_thumb, info, settings, mode, video_kbps), timeout)
+        if not ok:
+            result['error'] = err or 'ffmpeg failed'
+            return result
+
+        for thumb in (out_thumb, _fallback_thumb(out_thumb)):
+            if os.path.exists(thumb) and os.path.getsize(thumb) > 0:
+                result['thumbnail'] = thumb
+                break
+        bytes_out = os.path.getsize(out_video)
+        if mode == 'transcode' and bytes_out >= bytes_in:
+            os.remove(out_video)  # encode lại còn to hơn: upload file gốc
+        else:
+            result.update(output=out_video, mode=mode, bytes_out=bytes_out)
+        return result
+    except Exception as e:
+        result['error'] = str(e)
+        return result
+    finally:
+        result['wall_seconds'] = time.time() - started
+        cpu_after = _child_cpu_seconds()
+        # Không đo được CPU (Windows) → dùng wall time làm cận trên
+        result['cpu_seconds'] = (cpu_after - cpu_before) if cpu_before is not None else result['wall_seconds']
+
+
+# ----------------------------------------------------------------------
+# Metrics
+# ----------------------------------------------------------------------
+
+class TranscodeStats:
+    """Tổng hợp bytes tiết kiệm vs CPU-giây (thread-safe)"""
+
+    def __init__(self, metrics_file=None):
+        self.metrics_file = metrics_file
+        self.files = 0
+        self.cache_hits = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_in - self.bytes_out
+
+    def record(self, src, result, cached=False):
+        with self._lock:
+            self.files += 1
+            self.cache_hits += int(cached)
+            self.bytes_in += result['bytes_in']
+            self.bytes_out += result['bytes_out']
+            if not cached:
+                self.cpu_seconds += result['cpu_seconds']
+                self.wall_seconds += result['wall_seconds']
+            if self.metrics_file:
+                try:
+                    with open(self.metrics_file, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps({
+                            'ts': time.time(), 'file': os.path.basename(src), 'mode': result['mode'], 'cached': cached,
+                            'bytes_in': result['bytes_in'], 'bytes_out': result['bytes_out'],
+                            'cpu_seconds': 0 if cached else round(result['cpu_seconds'], 2),
+                        }) + "\n")
+                except OSError:
+                    pass
+
+    def summary(self):
+        saved_mb = self.bytes_saved / MB
+        rate = f", {saved_mb / self.cpu_seconds:.1f} MB/CPU-s" if self.cpu_seconds else ""
+        return (f"{self.files} files ({self.cache_hits} cached): {self.bytes_in / MB:.1f} → {self.bytes_out / MB:.1f} MB, "
+                f"saved {saved_mb:.1f} MB for {self.cpu_seconds:.1f} CPU-s{rate}")
+
+
+# ----------------------------------------------------------------------
+# Pool + cache (process chính)
+# ----------------------------------------------------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+_cache = None
+_stats = None
+
+
+def _pool_workers():
+    """VIDEO_TRANSCODE_WORKERS, mặc định min(2, số CPU) - libx264 đã tự chạy đa luồng"""
+    return max(1, _env_number("VIDEO_TRANSCODE_WORKERS", min(2, os.cpu_count() or 1)))
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=_pool_workers())
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def transcode_cache():
+    """Cache LRU riêng cho video (VIDEO_TRANSCODE_CACHE_MB, mặc định 4096MB)"""
+    global _cache
+    with _pool_lock:
+        if _cache is None:
+            # Upload video lâu hơn ảnh nhiều → giữ file vừa dùng 6 giờ trước khi cho evict
+            _cache = DerivedImageCache(cache_dir=CACHE_DIR,
+                                       max_bytes=_env_number("VIDEO_TRANSCODE_CACHE_MB", 4096) * MB or None,
+                                       protect_seconds=6 * 3600)
+        return _cache
+
+
+def transcode_stats():
+    """Số liệu cộng dồn của cả phiên"""
+    global _stats
+    with _pool_lock:
+        if _stats is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _stats = TranscodeStats(metrics_file=os.path.join(CACHE_DIR, "metrics.jsonl"))
+        return _stats
+
+
+def prepare_for_upload(paths, settings=None):
+    """
+    Chuẩn bị nhiều video để upload (song song trên process pool, cache theo nội dung).
+
+    Args:
+        paths: List đường dẫn video
+        settings: Mặc định transcode_settings()
+
+    Returns:
+        list dict {path, thumbnail, mode, bytes_saved}, cùng thứ tự với paths.
+        path = file nên upload (trong cache, caller không được xoá) hoặc chính file gốc.
+    """
+    paths = list(paths)
+    if not paths:
+        return []
+    settings = settings or transcode_settings()
+    if not shutil.which('ffmpeg'):
+        print("[TRANSCODE] ⚠️ ffmpeg not found, uploading original files")
+        return [{'path': p, 'thumbnail': None, 'mode': 'original', 'bytes_saved': 0} for p in paths]
+
+    cache = transcode_cache()
+    stats = transcode_stats()
+    results = [None] * len(paths)
+    keys = [cache.key_for(p, 'vimeo_upload', **settings) for p in paths]
+    todo = []
+    for i, (path, key) in enumerate(zip(paths, keys)):
+        video = cache.get(key)
+        if video:
+            thumb = cache.get(f"{key}_thumb")
+            size_in, size_out = os.path.getsize(path), os.path.getsize(video)
+            stats.record(path, {'mode': 'cached', 'bytes_in': size_in, 'bytes_out': size_out}, cached=True)
+            results[i] = {'path': video, 'thumbnail': thumb, 'mode': 'cached', 'bytes_saved': size_in - size_out}
+            print(f"[TRANSCODE] ♻️ {os.path.basename(path)} from cache")
+        else:
+            todo.append(i)
+    if not todo:
+        return results
+
+    try:
+        pool = _get_pool()
+        produced = [f.result() for f in [pool.submit(transcode_file, paths[i], settings) for i in todo]]
+    except concurrent.futures.process.BrokenProcessPool as e:
+        print(f"[TRANSCODE] ⚠️ Process pool broken ({e}), transcoding in-process")
+        _reset_pool()
+        produced = [transcode_file(paths[i], settings) for i in todo]
+
+    for i, res in zip(todo, produced):
+        src = paths[i]
+        stats.record(src, res)
+        if res['error']:
+            print(f"[TRANSCODE] ⚠️ {os.path.basename(src)}: {res['error']}")
+        thumb = cache.put(f"{keys[i]}_thumb", res['thumbnail']) if keys[i] else res['thumbnail']
+        video = (cache.put(keys[i], res['output']) if keys[i] else res['output']) if res['output'] else src
+        mode, saved = res['mode'], res['bytes_in'] - res['bytes_out']
+        if keys[i]:
+            # work_dir bị xoá bên dưới: file không vào được cache (lớn hơn VIDEO_TRANSCODE_CACHE_MB) → upload file gốc
+            if video != src and not cache.owns(video):
+                print(f"[TRANSCODE] ℹ️ {os.path.basename(src)}: output does not fit in cache, uploading original")
+                video, mode, saved = src, 'original', 0
+            if thumb and not cache.owns(thumb):
+                thumb = None
+        print(f"[TRANSCODE] 📉 {os.path.basename(src)} [{res['mode']}]: {res['bytes_in'] / MB:.1f} → "
+              f"{res['bytes_out'] / MB:.1f} MB in {res['cpu_seconds']:.1f} CPU-s")
+        results[i] = {'path': video, 'thumbnail': thumb, 'mode': mode, 'bytes_saved': saved}
+        if res.get('work_dir') and keys[i]:
+            shutil.rmtree(res['work_dir'], ignore_errors=True)
+    print(f"[TRANSCODE] 📊 {stats.summary()}")
+    return results
@@ -18,6 +18,11 @@ import json
 import vimeo
 from typing import Optional, Tuple, Dict, Callable
 
+from model.video_frame_extractor import extract_best_frames
+from model.video_transcoder import prepare_for_upload, pretranscode_enabled
+from model.vimeo_processing_poller import get_processing_poller
+from model.vimeo_tus_upload import TusUploader, TusUploadError
+
 
 class VimeoAPIUploader:
     """Fast Vimeo upload using official API"""
@@ -31,8 +36,15 @@ class VimeoAPIUploader:
         """
         self.config_file = config_file
         self.client = None
+        # tus resumable upload (session + bandwidth cap dùng chung mọi uploader)
+        self.tus = TusUploader()
         self.load_config()
     
+    @property
+    def processing_poller(self):
+        """Poller transcode dùng chung cho tài khoản này (xem vimeo_processing_poller)"""
+        return get_processing_poller(self.client)
+    
     def load_config(self):
         """Load API credentials from config file"""
         try:
@@ -95,7 +107,10 @@ class VimeoAPIUploader:
         title: Optional[str] = None,
         description: Optional[str] = None,
         privacy: str = "anybody",
-        log_callback: Optional[Callable] = None
+        log_callback: Optional[Callable] = None,
+        wait: bool = False,
+        on_ready: Optional[Callable] = None,
+        pretranscode: Optional[bool] = None
     ) -> Tuple[bool, str, Optional[Dict], bool]:
         """
         Upload video to Vimeo using API (FAST!)
@@ -106,10 +121,15 @@ class VimeoAPIUploader:
             description: Video description (optional)
             privacy: Privacy setting - "anybody", "nobody", "password", "unlisted"
             log_callback: Callback function for progress updates
+            wait: False (mặc định) = trả về ngay khi upload xong bytes (thumbnail = None),
+                  poller chung gọi on_ready(ready, video_data) khi transcode xong;
+                  True = đợi Vimeo xử lý xong rồi mới trả về (giữ worker tới khi có thumbnail)
+            on_ready: Callback(ready, video_data) khi wait=False
+            pretranscode: Remux/transcode bằng ffmpeg trước khi upload (mặc định: VIMEO_PRETRANSCODE)
             
         Returns:
             Tuple of (success, message, video_data, quota_exceeded)
-            video_data contains: video_link, embed_code, video_id, title
+            video_data contains: video_link, embed_code, video_id, title, thumbnail
         """
         if not self.client:
             return False, "API client not initialized. Please check config file.", None, False
@@ -118,15 +138,25 @@ class VimeoAPIUploader:
             return False, f"File not found: {file_path}", None, False
         
         try:
-            # Get file info
-            file_size = os.path.getsize(file_path)
-            file_size_mb = file_size / (1024 * 1024)
             filename = os.path.basename(file_path)
             
             # Use filename as title if not provided
             if not title:
                 title = os.path.splitext(filename)[0]
             
+            # Bước tùy chọn: remux faststart / giảm bitrate trước khi upload (thumbnail ra cùng lượt ffmpeg)
+            upload_path = file_path
+            prepared_thumbnail = None
+            if pretranscode if pretranscode is not None else pretranscode_enabled():
+                if log_callback:
+                    log_callback("[API] 🎞️ Đang tối ưu video trước khi upload...")
+                prepared = prepare_for_upload([file_path])[0]
+                upload_path, prepared_thumbnail = prepared['path'], prepared['thumbnail']
+            
+            # Get file info
+            file_size = os.path.getsize(upload_path)
+            file_size_mb = file_size / (1024 * 1024)
+            
             print(f"[VIMEO_API] 📤 Uploading: {filename} ({file_size_mb:.1f} MB)")
             if log_callback:
                 log_callback(f"[API] 📤 Uploading {filename} ({file_size_mb:.1f} MB)...")
@@ -159,9 +189,9 @@ class VimeoAPIUploader:
                 log_callback("[API] ⏳ Đang upload video...")
             
             try:
-                # Upload with metadata
-                video_uri = self.client.upload(
-                    file_path,
+                # Upload with metadata (tus theo chunk, resume được nếu lần trước bị ngắt)
+                video_uri = self.upload_resumable(
+                    upload_path,
                     data={
                         'name': title,
                         'description': description or '',
@@ -169,7 +199,8 @@ class VimeoAPIUploader:
                             'view': privacy,
                             'embed': 'public'  # Allow embedding
                         }
-                    }
+                    },
+                    log_callback=log_callback
                 )
                 
                 upload_time = time.time() - start_time
@@ -177,7 +208,7 @@ class VimeoAPIUploader:
                 if log_callback:
                     log_callback(f"[API] ✅ Upload xong ({upload_time:.1f}s)")
                 
-            except vimeo.exceptions.VideoUploadFailure as e:
+            except (vimeo.exceptions.VideoUploadFailure, vimeo.exceptions.UploadAttemptCreationFailure, TusUploadError) as e:
                 error_msg = str(e)
                 if 'quota' in error_msg.lower() or 'storage' in error_msg.lower():
                     return False, "QUOTA_EXCEEDED", None, True
@@ -187,12 +218,26 @@ class VimeoAPIUploader:
             video_id = video_uri.split('/')[-1]
             print(f"[VIMEO_API] 🎬 Video ID: {video_id}")
             
+            if not wait:
+                # Worker được giải phóng ngay khi gửi xong bytes; poller chung theo dõi transcode
+                def _ready(ready, video_data):
+                    final = self._build_result(video_uri, video_id, title, file_path, video_data,
+                                               prepared_thumbnail=prepared_thumbnail)
+                    if on_ready:
+                        on_ready(ready, final)
+                
+                self.processing_poller.watch(video_uri, log_callback=log_callback, on_done=_ready)
+                result_data = self._build_result(video_uri, video_id, title, file_path, {}, with_thumbnail=False)
+                print(f"[VIMEO_API] 🎉 Upload time: {time.time() - start_time:.1f}s (Vimeo đang xử lý)")
+                return True, "Upload thành công! (Vimeo đang xử lý)", result_data, False
+            
             # Wait for video to be processed
             print(f"[VIMEO_API] ⏳ Đợi Vimeo xử lý video...")
             if log_callback:
                 log_callback("[API] ⏳ Đang đợi Vimeo xử lý video...")
             
-            processing_done = self.wait_for_processing(video_uri, log_callback=log_callback)
+            processing_done, video_data = self.processing_poller.watch(
+                video_uri, log_callback=log_callback).result()
             
             if processing_done:
                 print(f"[VIMEO_API] ✅ Video đã xử lý xong!")
@@ -203,56 +248,98 @@ class VimeoAPIUploader:
                 if log_callback:
                     log_callback("[API] ⚠️ Video vẫn đang xử lý")
             
-            # Get video details
-            video_data = self.client.get(video_uri).json()
+            result_data = self._build_result(video_uri, video_id, title, file_path, video_data,
+                                             prepared_thumbnail=prepared_thumbnail)
             
-            # Get embed code
-            embed_html = video_data.get('embed', {}).get('html', '')
-            
-            # If no embed HTML, construct it
-            if not embed_html:
-                embed_html = (
-                    f'<div style="padding:56.25% 0 0 0;position:relative;">'
-                    f'<iframe src="https://player.vimeo.com/video/{video_id}?badge=0&amp;autopause=0&amp;player_id=0&amp;app_id=58479" '
-                    f'frameborder="0" allow="autoplay; fullscreen; picture-in-picture; clipboard-write; encrypted-media" '
-                    f'style="position:absolute;top:0;left:0;width:100%;height:100%;" title="{title}"></iframe>'
-                    f'</div><script src="https://player.vimeo.com/api/player.js"></script>'
-                )
+            total_time = time.time() - start_time
+            print(f"[VIMEO_API] 🎉 Total time: {total_time:.1f}s")
             
-            video_link = video_data.get('link', f"https://vimeo.com/{video_id}")
+            return True, "Upload thành công!", result_data, False
             
-            # Generate thumbnail - try Vimeo API first (highest quality)
-            thumbnail_path = None
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            return False, f"Lỗi upload: {e}", None, False
+    
+    def _build_result(self, video_uri: str, video_id: str, title: str, file_path: str,
+                      video_data: Dict, with_thumbnail: bool = True,
+                      prepared_thumbnail: Optional[str] = None) -> Dict:
+        """
+        video_data (từ poller: link, embed, pictures) -> result dict của upload_video
+        prepared_thumbnail: Frame đã xuất sẵn lúc transcode (dùng thay cho generate_thumbnail chụp lại)
+        """
+        # Get embed code
+        embed_html = (video_data.get('embed') or {}).get('html', '')
+        
+        # If no embed HTML, construct it
+        if not embed_html:
+            embed_html = (
+                f'<div style="padding:56.25% 0 0 0;position:relative;">'
+                f'<iframe src="https://player.vimeo.com/video/{video_id}?badge=0&amp;autopause=0&amp;player_id=0&amp;app_id=58479" '
+                f'frameborder="0" allow="autoplay; fullscreen; picture-in-picture; clipboard-write; encrypted-media" '
+                f'style="position:absolute;top:0;left:0;width:100%;height:100%;" title="{title}"></iframe>'
+                f'</div><script src="https://player.vimeo.com/api/player.js"></script>'
+            )
+        
+        video_link = video_data.get('link', f"https://vimeo.com/{video_id}")
+        
+        # Generate thumbnail - try Vimeo API first (highest quality)
+        thumbnail_path = None
+        if with_thumbnail:
             try:
                 print(f"[VIMEO_API] 📸 Lấy thumbnail từ Vimeo API...")
-                thumbnail_path = self.fetch_vimeo_thumbnail(video_uri, video_id)
+                thumbnail_path = self.fetch_vimeo_thumbnail(video_uri, video_id, video_data=video_data)
                 if thumbnail_path:
                     print(f"[VIMEO_API] ✅ Thumbnail từ Vimeo: {os.path.basename(thumbnail_path)}")
                 else:
                     print(f"[VIMEO_API] ⚠️ Không lấy được từ Vimeo, thử chụp từ file video...")
-                    thumbnail_path = self.generate_thumbnail(file_path, video_id)
+                    thumbnail_path = self.generate_thumbnail(file_path, video_id, prepared_thumbnail=prepared_thumbnail)
                     if thumbnail_path:
                         print(f"[VIMEO_API] ✅ Thumbnail từ video: {os.path.basename(thumbnail_path)}")
             except Exception as e:
                 print(f"[VIMEO_API] ⚠️ Thumbnail generation failed: {e}")
+        
+        return {
+            "video_link": video_link,
+            "embed_code": embed_html,
+            "video_id": video_id,
+            "title": title,
+            "thumbnail": thumbnail_path
+        }
+    
+    def upload_resumable(self, file_path: str, data: Dict, log_callback: Optional[Callable] = None) -> str:
+        """
+        Upload file qua tus theo chunk: retry từng chunk, resume sau crash/restart
+        (session lưu ở .cache/vimeo_upload_sessions.json).
+        
+        Args:
+            file_path: Path to video file
+            data: Metadata của video (name, description, privacy)
+            log_callback: Callback for progress updates
             
-            result_data = {
-                "video_link": video_link,
-                "embed_code": embed_html,
-                "video_id": video_id,
-                "title": title,
-                "thumbnail": thumbnail_path
-            }
-            
-            total_time = time.time() - start_time
-            print(f"[VIMEO_API] 🎉 Total time: {total_time:.1f}s")
-            
-            return True, "Upload thành công!", result_data, False
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            return False, f"Lỗi upload: {e}", None, False
+        Returns:
+            video_uri (e.g., /videos/123456)
+        """
+        def create_upload(size):
+            body = dict(data)
+            body['upload'] = {'approach': 'tus', 'size': size}
+            attempt = self.client.post('/me/videos', data=body, params={'fields': 'uri,upload'})
+            if attempt.status_code not in (200, 201):
+                raise vimeo.exceptions.UploadAttemptCreationFailure(attempt, "Unable to initiate an upload attempt.")
+            attempt = attempt.json()
+            return attempt['uri'], attempt['upload']['upload_link']
+        
+        last_step = [-1]
+        
+        def on_progress(sent, total):
+            step = int(sent * 10 / total) if total else 10
+            if step != last_step[0]:
+                last_step[0] = step
+                print(f"[VIMEO_API] 📤 {sent / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB ({step * 10}%)")
+                if log_callback:
+                    log_callback(f"[API] 📤 Đã upload {step * 10}%")
+        
+        return self.tus.upload(file_path, create_upload, progress_callback=on_progress)
     
     def wait_for_processing(
         self, 
@@ -261,7 +348,7 @@ class VimeoAPIUploader:
         log_callback: Optional[Callable] = None
     ) -> bool:
         """
-        Wait for video to finish processing
+        Wait for video to finish processing (qua poller chung - 1 request / tick cho mọi video)
         
         Args:
             video_uri: Video URI from upload (e.g., /videos/123456)
@@ -271,45 +358,14 @@ class VimeoAPIUploader:
         Returns:
             True if video is ready, False if timeout
         """
-        start_time = time.time()
-        check_interval = 10  # Check every 10 seconds
-        last_log_time = 0
-        
-        while time.time() - start_time < max_wait:
-            try:
-                video_data = self.client.get(video_uri).json()
-                status = video_data.get('status', 'unknown')
-                transcode_status = video_data.get('transcode', {}).get('status', 'unknown')
-                
-                elapsed = int(time.time() - start_time)
-                
-                # Check if video is available
-                if status == 'available' and transcode_status == 'complete':
-                    print(f"[VIMEO_API] ✅ Video sẵn sàng sau {elapsed}s!")
-                    return True
-                
-                # Log progress every 30 seconds
-                if time.time() - last_log_time > 30:
-                    print(f"[VIMEO_API] ⏳ Status: {status}, Transcode: {transcode_status} ({elapsed}s)")
-                    if log_callback:
-                        log_callback(f"[API] ⏳ Đang xử lý... ({elapsed//60} phút)")
-                    last_log_time = time.time()
-                
-                time.sleep(check_interval)
-                
-            except Exception as e:
-                print(f"[VIMEO_API] ⚠️ Error checking status: {e}")
-                time.sleep(check_interval)
-        
-        # Timeout
-        elapsed = int(time.time() - start_time)
-        print(f"[VIMEO_API] ⏱️ Timeout sau {elapsed}s")
-        return False
+        ready, _ = self.processing_poller.watch(video_uri, max_wait=max_wait, log_callback=log_callback).result()
+        return ready
     
-    def fetch_vimeo_thumbnail(self, video_uri: str, video_id: str) -> Optional[str]:
+    def fetch_vimeo_thumbnail(self, video_uri: str, video_id: str, video_data: Optional[Dict] = None) -> Optional[str]:
         """
         Lấy thumbnail chất lượng cao nhất từ Vimeo API.
         Vimeo cung cấp nhiều size, ta chọn size lớn nhất.
+        video_data có sẵn pictures (từ poller) thì không gọi /pictures nữa.
         """
         try:
             import urllib.request
@@ -318,17 +374,20 @@ class VimeoAPIUploader:
             os.makedirs(thumb_dir, exist_ok=True)
             save_path = os.path.join(thumb_dir, f"thumb_{video_id}.jpg")
 
-            # Gọi Vimeo API lấy danh sách pictures
-            pictures_uri = f"{video_uri}/pictures"
-            resp = self.client.get(pictures_uri)
-            data = resp.json()
-
             sizes = []
-            # Có thể trả về list hoặc single object
-            if isinstance(data, dict):
-                items = data.get('data', [data])
+            if video_data and (video_data.get('pictures') or {}).get('sizes'):
+                items = [video_data['pictures']]
             else:
-                items = data
+                # Gọi Vimeo API lấy danh sách pictures
+                pictures_uri = f"{video_uri}/pictures"
+                resp = self.client.get(pictures_uri)
+                data = resp.json()
+
+                # Có thể trả về list hoặc single object
+                if isinstance(data, dict):
+                    items = data.get('data', [data])
+                else:
+                    items = data
 
             for item in items:
                 for sz in item.get('sizes', []):
@@ -371,44 +430,33 @@ class VimeoAPIUploader:
             print(f"[VIMEO_API] fetch_vimeo_thumbnail error: {e}")
             return None
 
-    def generate_thumbnail(self, video_path: str, video_id: str) -> Optional[str]:
+    def generate_thumbnail(self, video_path: str, video_id: str, prepared_thumbnail: Optional[str] = None) -> Optional[str]:
         """Fallback: chụp frame từ file video với chất lượng cao"""
         try:
             thumb_dir = os.path.join(os.getcwd(), "thumbnails")
             os.makedirs(thumb_dir, exist_ok=True)
             save_path = os.path.join(thumb_dir, f"thumb_{video_id}.jpg")
 
-            # Thử dùng ffmpeg trước (chất lượng tốt nhất)
-            import subprocess, shutil
-            if shutil.which('ffmpeg'):
-                try:
-                    # Lấy duration rồi chụp frame ở giữa
-                    probe = subprocess.run(
-                        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                         '-of', 'default=noprint_wrappers=1:nokey=1', video_path],
-                        capture_output=True, text=True, timeout=30
-                    )
-                    duration = float(probe.stdout.strip() or '0')
-                    seek_time = max(duration / 2, 1)
-
-                    result = subprocess.run([
-                        'ffmpeg', '-y',
-                        '-ss', str(seek_time),
-                        '-i', video_path,
-                        '-frames:v', '1',
-                        '-q:v', '1',      # Chất lượng JPEG cao nhất (1-31, 1=tốt nhất)
-                        '-vf', 'scale=1280:-1',  # Scale lên 1280px nếu cần
-                        save_path
-                    ], capture_output=True, timeout=60)
-
-                    if result.returncode == 0 and os.path.exists(save_path):
-                        print(f"[VIMEO_API] 📸 Thumbnail ffmpeg OK ({os.path.getsize(save_path)//1024} KB)")
-                        return save_path
-                except Exception as fe:
-                    print(f"[VIMEO_API] ffmpeg error: {fe}")
+            # Frame đã xuất cùng lượt ffmpeg transcode → không mở lại file video
+            if prepared_thumbnail and os.path.exists(prepared_thumbnail):
+                import shutil
+                shutil.copyfile(prepared_thumbnail, save_path)
+                return save_path
 
-            # Fallback: dùng OpenCV với chất lượng JPEG cao
+            # Dịch vụ frame dùng chung (1 lần ffmpeg, chỉ decode keyframe): frame nét nhất quanh giữa video
             import cv2
+            candidates = extract_best_frames(video_path, n=1)
+            if candidates:
+                frame = candidates[0].frame
+                h, w = frame.shape[:2]
+                if w != 1280:  # Scale về 1280px như trước
+                    interp = cv2.INTER_AREA if w > 1280 else cv2.INTER_CUBIC
+                    frame = cv2.resize(frame, (1280, max(2, round(h * 1280 / w))), interpolation=interp)
+                cv2.imwrite(save_path, frame, [cv2.IMWRITE_JPEG_QUALITY, 97])
+                print(f"[VIMEO_API] 📸 Thumbnail ffmpeg OK @{candidates[0].time:.1f}s ({os.path.getsize(save_path)//1024} KB)")
+                return save_path
+
+            # Fallback (không có ffmpeg): dùng OpenCV với chất lượng JPEG cao
             cap = cv2.VideoCapture(video_path)
             if not cap.isOpened():
                 return None
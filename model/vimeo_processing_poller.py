@@ -0,0 +1,198 @@
+"""
+Vimeo Processing Poller - 1 thread theo dõi mọi video đang transcode
+Thay cho mỗi upload worker tự sleep/poll wait_for_processing (10 upload = 10 thread đứng chờ):
+- Mỗi tick: 1 request GET /videos?uris=... cho mọi video tới hạn kiểm tra (tối đa 50 / request)
+- Interval mỗi video tăng dần (5s → x1.5 → tối đa 60s); X-RateLimit-Remaining thấp / 429 → giãn ra
+- Response đã kèm link, embed, pictures → không cần GET video_uri và /pictures riêng
+- Xong (hoặc lỗi / hết max_wait): Future được set + callback chạy trên thread pool riêng
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# Trạng thái kết thúc (không cần poll tiếp)
+FAILED_STATUSES = ('uploading_error', 'transcoding_error', 'quota_exceeded', 'total_cap_exceeded')
+
+
+def is_ready(video_data: Dict) -> bool:
+    return video_data.get('status') == 'available' and \
+        (video_data.get('transcode') or {}).get('status') == 'complete'
+
+
+def is_failed(video_data: Dict) -> bool:
+    return video_data.get('status') in FAILED_STATUSES or \
+        (video_data.get('transcode') or {}).get('status') == 'error'
+
+
+class _Watch:
+    def __init__(self, video_uri, max_wait, min_interval, log_callback, on_done):
+        self.video_uri = video_uri
+        self.started = time.time()
+        self.deadline = self.started + max_wait
+        self.interval = min_interval
+        self.next_check = self.started + min_interval
+        self.last_log = self.started
+        self.log_callback = log_callback
+        self.callbacks = [on_done] if on_done else []
+        self.data = {}
+        self.future = Future()
+
+
+class VimeoProcessingPoller:
+    """
+    Poller dùng chung cho 1 tài khoản Vimeo (xem get_processing_poller()).
+    Thread poll chỉ chạy khi có video đang chờ.
+    """
+
+    BATCH_SIZE = 50
+    FIELDS = 'uri,name,link,status,transcode.status,embed.html,pictures.sizes'
+
+    def __init__(self, client, min_interval=5.0, max_interval=60.0, backoff=1.5, callback_workers=4):
+        """
+        Args:
+            client: vimeo.VimeoClient
+            min_interval: Lần kiểm tra đầu tiên sau upload (giây)
+            max_interval: Interval lớn nhất giữa 2 lần kiểm tra 1 video
+            backoff: Hệ số tăng interval sau mỗi lần video chưa xong
+            callback_workers: Số thread chạy on_done (tải thumbnail...)
+        """
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.requests = 0
+
+        self._watches: Dict[str, _Watch] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._callbacks = ThreadPoolExecutor(max_workers=callback_workers, thread_name_prefix="vimeo-ready")
+
+    def watch(self, video_uri: str, max_wait: int = 900, log_callback: Optional[Callable] = None,
+              on_done: Optional[Callable] = None) -> Future:
+        """
+        Đăng ký 1 video đang transcode.
+
+        Args:
+            video_uri: /videos/123456
+            max_wait: Hết thời gian này thì kết thúc với ready=False
+            log_callback: Callback log tiến độ (mỗi ~30s)
+            on_done: Optional callback(ready, video_data), chạy trên thread pool của poller
+                     (watch lại cùng URI: mọi on_done đều được gọi)
+
+        Returns:
+            Future -> (ready, video_data)
+        """
+        with self._cond:
+            watch = self._watches.get(video_uri)
+            if watch is None:
+                watch = _Watch(video_uri, max_wait, self.min_interval, log_callback, on_done)
+                self._watches[video_uri] = watch
+            elif on_done:
+                watch.callbacks.append(on_done)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="vimeo-poller", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return watch.future
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._watches)
+
+    # ------------------------------------------------------------------
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._watches:
+                    self._thread = None
+                    return
+                now = time.time()
+                due = [w for w in self._watches.values() if w.next_check <= now]
+                if not due:
+                    wake = min(min(w.next_check, w.deadline) for w in self._watches.values())
+                    self._cond.wait(timeout=max(0.05, wake - now))
+                    continue
+            self._tick(due)
+
+    def _tick(self, due):
+        statuses = {}
+        slow_down = False
+        for i in range(0, len(due), self.BATCH_SIZE):
+            uris = [w.video_uri for w in due[i:i + self.BATCH_SIZE]]
+            try:
+                res = self.client.get('/videos', params={
+                    'uris': ','.join(uris), 'fields': self.FIELDS, 'per_page': len(uris)})
+                self.requests += 1
+                for item in res.json().get('data', []):
+                    statuses[item.get('uri')] = item
+                remaining = res.headers.get('X-RateLimit-Remaining')
+                if remaining is not None and remaining.isdigit() and int(remaining) < 10:
+                    slow_down = True
+            except Exception as e:
+                # 429 (APIRateLimitExceededFailure) / lỗi mạng: thử lại sau, giãn interval
+                print(f"[VIMEO_POLL] ⚠️ Error checking {len(uris)} videos: {e}")
+                slow_down = True
+
+        now = time.time()
+        for watch in due:
+            data = statuses.get(watch.video_uri)
+            if data:
+                watch.data = data
+                if is_ready(data):
+                    print(f"[VIMEO_API] ✅ Video sẵn sàng sau {int(now - watch.started)}s!")
+                    self._finish(watch, True)
+                    continue
+                if is_failed(data):
+                    print(f"[VIMEO_API] ❌ Vimeo xử lý lỗi: {data.get('status')}")
+                    self._finish(watch, False)
+                    continue
+            if now >= watch.deadline:
+                print(f"[VIMEO_API] ⏱️ Timeout sau {int(now - watch.started)}s")
+                self._finish(watch, False)
+                continue
+            self._log_progress(watch, now)
+            watch.interval = self.max_interval if slow_down else min(self.max_interval, watch.interval * self.backoff)
+            watch.next_check = min(now + watch.interval, watch.deadline)
+
+    def _log_progress(self, watch, now):
+        if now - watch.last_log <= 30:
+            return
+        elapsed = int(now - watch.started)
+        status = watch.data.get('status', 'unknown')
+        transcode_status = (watch.data.get('transcode') or {}).get('status', 'unknown')
+        print(f"[VIMEO_API] ⏳ {watch.video_uri} Status: {status}, Transcode: {transcode_status} ({elapsed}s)")
+        if watch.log_callback:
+            watch.log_callback(f"[API] ⏳ Đang xử lý... ({elapsed // 60} phút)")
+        watch.last_log = now
+
+    def _finish(self, watch, ready):
+        with self._cond:
+            self._watches.pop(watch.video_uri, None)
+        watch.future.set_result((ready, watch.data))
+        for on_done in watch.callbacks:
+            self._callbacks.submit(self._run_callback, watch, on_done, ready)
+
+    @staticmethod
+    def _run_callback(watch, on_done, ready):
+        try:
+            on_done(ready, watch.data)
+        except Exception as e:
+            print(f"[VIMEO_POLL] ⚠️ on_done error for {watch.video_uri}: {e}")
+
+
+_pollers = {}
+_pollers_lock = threading.Lock()
+
+
+def get_processing_poller(client) -> VimeoProcessingPoller:
+    """1 poller cho mỗi access token (process-wide)"""
+    key = getattr(client, 'token', None) or id(client)
+    with _pollers_lock:
+        poller = _pollers.get(key)
+        if poller is None:
+            poller = VimeoProcessingPoller(client)
+            _pollers[key] = poller
+        return poller
@@ -0,0 +1,310 @@
+"""
+Vimeo tus Upload - upload resumable theo chunk cho VimeoAPIUploader
+- Session (video_uri, upload_link, offset) lưu ở .cache/vimeo_upload_sessions.json:
+  app crash / restart → HEAD upload_link lấy Upload-Offset rồi upload tiếp, không làm lại từ 0
+- Mỗi chunk retry riêng với backoff (mất mạng giữa chừng chỉ gửi lại chunk đó)
+- Chunk size tự điều chỉnh theo throughput đo được (mục tiêu ~5s / chunk)
+- Giới hạn băng thông toàn cục cho mọi upload song song (VIMEO_UPLOAD_MAX_MBPS)
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+
+import requests
+
+TUS_HEADERS = {'Tus-Resumable': '1.0.0'}
+
+MB = 1024 * 1024
+SESSION_MAX_AGE = 24 * 3600  # upload_link của Vimeo hết hạn sau ~24h
+
+
+def _env_float(name, default):
+    try:
+        return max(0.0, float(os.environ.get(name, "").strip() or default))
+    except ValueError:
+        return default
+
+
+class TusUploadError(Exception):
+    """Upload thất bại sau khi đã retry hết; session vẫn được giữ để lần sau resume"""
+
+
+class BandwidthLimiter:
+    """
+    Token bucket theo byte, dùng chung cho mọi upload đang chạy.
+    rate <= 0 = không giới hạn.
+    """
+
+    def __init__(self, bytes_per_second=0, burst_seconds=1.0):
+        self.rate = float(bytes_per_second)
+        self.capacity = max(self.rate * burst_seconds, 256 * 1024)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes):
+        """Block tới khi được phép gửi nbytes"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                need = min(nbytes, self.capacity)
+                if self._tokens >= need:
+                    self._tokens -= need
+                    nbytes -= need
+                    if nbytes <= 0:
+                        return
+                    continue
+                wait = (need - self._tokens) / self.rate
+            time.sleep(min(wait, 0.5))
+
+
+class AdaptiveChunkSizer:
+    """Chọn chunk size sao cho mỗi PATCH mất khoảng target_seconds"""
+
+    def __init__(self, initial=8 * MB, min_size=1 * MB, max_size=128 * MB, target_seconds=5.0):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.size = max(min_size, min(initial, max_size))
+        self.throughput = None  # bytes/s (EWMA)
+
+    def record(self, nbytes, seconds):
+        if nbytes <= 0 or seconds <= 0:
+            return
+        sample = nbytes / seconds
+        self.throughput = sample if self.throughput is None else 0.7 * self.throughput + 0.3 * sample
+        wanted = int(self.throughput * self.target_seconds)
+        # Tăng tối đa x2 mỗi bước để 1 mẫu nhanh bất thường không làm chunk quá lớn
+        self.size = max(self.min_size, min(wanted, self.size * 2, self.max_size))
+
+    def on_failure(self):
+        self.size = max(self.min_size, self.size // 2)
+
+
+class _ChunkBody:
+    """File-like: đọc [offset, offset+length) từ file, có giới hạn băng thông (không nạp cả chunk vào RAM)"""
+
+    def __init__(self, path, offset, length, limiter, block_size=256 * 1024):
+        self._fh = open(path, 'rb')
+        self._fh.seek(offset)
+        self._remaining = length
+        self._length = length
+        self._limiter = limiter
+        self._block_size = block_size
+
+    def __len__(self):
+        return self._length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        size = self._block_size if size is None or size < 0 else min(size, self._block_size)
+        data = self._fh.read(min(size, self._remaining))
+        self._remaining -= len(data)
+        if data and self._limiter:
+            self._limiter.consume(len(data))
+        return data
+
+    def close(self):
+        self._fh.close()
+
+
+class UploadSessionStore:
+    """Session upload đang dở, ghi atomic (tmp + os.replace) sau mỗi chunk"""
+
+    def __init__(self, path=".cache/vimeo_upload_sessions.json"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._sessions = json.load(f)
+        except (OSError, ValueError):
+            self._sessions = {}
+
+    @staticmethod
+    def key_for(file_path):
+        """Cùng file (path + size + mtime) → cùng session"""
+        st = os.stat(file_path)
+        raw = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, key):
+        with self._lock:
+            session = self._sessions.get(key)
+            if session and time.time() - session.get('created_at', 0) > SESSION_MAX_AGE:
+                self._sessions.pop(key, None)
+                self._save_locked()
+                return None
+            return dict(session) if session else None
+
+    def put(self, key, **fields):
+        with self._lock:
+            self._sessions.setdefault(key, {'created_at': time.time()}).update(fields)
+            self._save_locked()
+
+    def remove(self, key):
+        with self._lock:
+            if self._sessions.pop(key, None) is not None:
+                self._save_locked()
+
+    def _save_locked(self):
+        tmp = self.path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self._sessions, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+
+class TusUploader:
+    """
+    tus 1.0 client (PATCH theo chunk) cho upload_link của Vimeo.
+    1 instance dùng chung được cho nhiều thread (mỗi upload tự giữ offset/chunk sizer riêng).
+    """
+
+    def __init__(self, store=None, limiter=None, max_retries=5, backoff_base=1.0, timeout=(10, 120),
+                 initial_chunk=8 * MB, min_chunk=1 * MB):
+        """
+        Args:
+            store: UploadSessionStore (mặc định: shared_session_store())
+            limiter: BandwidthLimiter (mặc định: get_bandwidth_limiter())
+            initial_chunk: Chunk size ban đầu (sau đó tự điều chỉnh theo throughput)
+            min_chunk: Chunk size nhỏ nhất (khi mạng chậm / lỗi liên tiếp)
+            max_retries: Số lần retry liên tiếp cho 1 chunk
+            backoff_base: Backoff = base * 2^attempt (+ jitter), tối đa 60s
+            timeout: (connect, read) timeout của requests
+        """
+        self.store = store or shared_session_store()
+        self.limiter = limiter or get_bandwidth_limiter()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.initial_chunk = initial_chunk
+        self.min_chunk = min_chunk
+        self.http = requests.Session()
+
+    def _server_offset(self, upload_link):
+        """HEAD → Upload-Offset; None nếu upload_link không còn hợp lệ"""
+        res = self.http.head(upload_link, headers=dict(TUS_HEADERS), timeout=self.timeout)
+        if res.status_code in (403, 404, 410):
+            return None
+        res.raise_for_status()
+        return int(res.headers['Upload-Offset'])
+
+    def _backoff(self, attempt):
+        delay = min(60.0, self.backoff_base * (2 ** attempt))
+        time.sleep(delay * (0.5 + random.random() / 2))
+
+    def upload(self, file_path, create_upload, progress_callback=None):
+        """
+        Upload (hoặc resume) file.
+
+        Args:
+            file_path: File video
+            create_upload: Hàm (file_size) -> (video_uri, upload_link), chỉ gọi khi chưa có session
+            progress_callback: Optional callback(sent_bytes, total_bytes)
+
+        Returns:
+            str: video_uri
+
+        Raises:
+            TusUploadError: Chunk lỗi quá max_retries lần (session được giữ lại)
+        """
+        size = os.path.getsize(file_path)
+        key = self.store.key_for(file_path)
+        name = os.path.basename(file_path)
+
+        offset = None
+        session = self.store.get(key)
+        if session:
+            try:
+                offset = self._server_offset(session['upload_link'])
+            except Exception as e:
+                print(f"[TUS] ⚠️ Không kiểm tra được session cũ: {e}")
+            if offset is None:
+                self.store.remove(key)
+                session = None
+            else:
+                print(f"[TUS] ♻️ Resume {name} từ {offset / MB:.1f}/{size / MB:.1f} MB")
+
+        if not session:
+            video_uri, upload_link = create_upload(size)
+            session = {'video_uri': video_uri, 'upload_link': upload_link}
+            self.store.put(key, file=os.path.abspath(file_path), size=size, offset=0, **session)
+            offset = 0
+
+        upload_link = session['upload_link']
+        sizer = AdaptiveChunkSizer(initial=self.initial_chunk, min_size=self.min_chunk)
+        attempt = 0
+        while offset < size:
+            length = min(sizer.size, size - offset)
+            body = _ChunkBody(file_path, offset, length, self.limiter)
+            headers = dict(TUS_HEADERS)
+            headers.update({
+                'Upload-Offset': str(offset),
+                'Content-Type': 'application/offset+octet-stream',
+                'Content-Length': str(length),
+            })
+            started = time.time()
+            try:
+                res = self.http.patch(upload_link, data=body, headers=headers, timeout=self.timeout)
+                # 409 = offset lệch (chunk trước đã tới server nhưng mất response) → đồng bộ lại bên dưới
+                res.raise_for_status()
+                new_offset = int(res.headers.get('Upload-Offset', offset + length))
+            except Exception as e:
+                attempt += 1
+                sizer.on_failure()
+                if attempt > self.max_retries:
+                    raise TusUploadError(f"{name}: chunk @{offset} lỗi sau {self.max_retries} lần retry: {e}")
+                print(f"[TUS] ⚠️ Chunk @{offset / MB:.1f} MB lỗi ({e}), retry {attempt}/{self.max_retries}")
+                self._backoff(attempt - 1)
+                try:
+                    server_offset = self._server_offset(upload_link)
+                    if server_offset is not None:
+                        offset = server_offset
+                except Exception:
+                    pass
+                continue
+            finally:
+                body.close()
+
+            sizer.record(new_offset - offset, time.time() - started)
+            attempt = 0
+            offset = new_offset
+            self.store.put(key, offset=offset)
+            if progress_callback:
+                progress_callback(offset, size)
+
+        self.store.remove(key)
+        return session['video_uri']
+
+
+_store = None
+_limiter = None
+_shared_lock = threading.Lock()
+
+
+def shared_session_store():
+    global _store
+    with _shared_lock:
+        if _store is None:
+            _store = UploadSessionStore()
+        return _store
+
+
+def get_bandwidth_limiter():
+    """Limiter toàn cục: VIMEO_UPLOAD_MAX_MBPS (megabit/s, 0 = không giới hạn)"""
+    global _limiter
+    with _shared_lock:
+        if _limiter is None:
+            _limiter = BandwidthLimiter(_env_float("VIMEO_UPLOAD_MAX_MBPS", 0) * 1_000_000 / 8)
+        return _limiter
@@ -0,0 +1,400 @@
+"""
+WebDriver Pool - giữ sẵn vài Chrome (đã login) thay cho 1 driver dùng chung sau client_lock
+- checkout()/checkin() (hoặc `with pool.lease() as obj:`): mỗi thread mượn 1 driver riêng,
+  Selenium fallback upload / đăng bài / quét FB-TikTok chạy song song được
+- Kiểm tra sống (current_url + window_handles) lúc mượn: driver chết / Chrome bị đóng → tạo lại
+- Driver được thay mới sau N lần dùng hoặc khi RAM (chromedriver + Chrome) phình quá ngưỡng
+- Mỗi driver có 1 slot cố định → profile Chrome riêng (2 Chrome không mở chung 1 user_data_dir)
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+try:
+    import psutil  # optional: đo RAM để recycle driver
+except ImportError:
+    psutil = None
+
+
+def _env_int(name, default, minimum=1):
+    try:
+        return max(minimum, int(os.environ.get(name, "").strip() or default))
+    except ValueError:
+        return default
+
+
+def wp_pool_size():
+    """WEBDRIVER_POOL_SIZE: số Chrome đăng nhập WordPress giữ sẵn, mặc định 2"""
+    return _env_int("WEBDRIVER_POOL_SIZE", 2)
+
+
+def scanner_pool_size():
+    """SCANNER_POOL_SIZE: số Chrome quét Facebook/TikTok giữ sẵn, mặc định 2"""
+    return _env_int("SCANNER_POOL_SIZE", 2)
+
+
+class DriverPoolTimeout(Exception):
+    """Không mượn được driver trong thời gian chờ"""
+
+
+def is_driver_alive(driver):
+    """Driver còn phản hồi không (thay cho _is_driver_alive rải rác ở controller)"""
+    if driver is None:
+        return False
+    try:
+        _ = driver.current_url
+        return bool(driver.window_handles)
+    except Exception:
+        return False
+
+
+def driver_rss_mb(driver):
+    """
+    RAM (MB) của chromedriver + Chrome (kèm process con: renderer, GPU...).
+
+    Returns:
+        float hoặc None nếu không đo được (không có psutil / không lấy được pid)
+    """
+    if psutil is None or driver is None:
+        return None
+    pids = set()
+    service = getattr(driver, 'service', None)
+    process = getattr(service, 'process', None)
+    if getattr(process, 'pid', None):
+        pids.add(process.pid)
+    if getattr(driver, 'browser_pid', None):  # undetected_chromedriver (use_subprocess=True)
+        pids.add(driver.browser_pid)
+    if not pids:
+        return None
+    seen, total = set(), 0
+    for pid in pids:
+        try:
+            root = psutil.Process(pid)
+            for proc in [root] + root.children(recursive=True):
+                if proc.pid in seen:
+                    continue
+                seen.add(proc.pid)
+                total += proc.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total / (1024 * 1024) if seen else None
+
+
+class _Entry:
+    __slots__ = ('obj', 'slot', 'uses', 'created', 'base_rss')
+
+    def __init__(self, obj, slot, base_rss):
+        self.obj = obj
+        self.slot = slot
+        self.uses = 0
+        self.created = time.time()
+        self.base_rss = base_rss
+
+
+class WebDriverPool:
+    """
+    Pool giới hạn `size` driver. Object trong pool có thể là driver hoặc wrapper chứa driver
+    (vd. SeleniumWPClient) - `driver_of` lấy WebDriver ra để health check / đo RAM.
+
+    Args:
+        factory: factory(slot) -> object đã sẵn sàng dùng (đã login nếu cần)
+        size: Số driver tối đa
+        max_uses: Thay driver mới sau N lần mượn (WEBDRIVER_MAX_USES)
+        max_rss_growth_mb: Thay driver khi RAM tăng quá ngưỡng so với lúc tạo (WEBDRIVER_MAX_RSS_GROWTH_MB)
+        driver_of: object -> WebDriver (mặc định chính object)
+        closer: Đóng object (mặc định obj.quit())
+    """
+
+    def __init__(self, factory, size=2, max_uses=None, max_rss_growth_mb=None,
+                 driver_of=None, closer=None, name="webdriver"):
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.max_uses = max_uses or _env_int("WEBDRIVER_MAX_USES", 40)
+        self.max_rss_growth_mb = max_rss_growth_mb or _env_int("WEBDRIVER_MAX_RSS_GROWTH_MB", 800)
+        self.driver_of = driver_of or (lambda obj: obj)
+        self.closer = closer or (lambda obj: obj.quit())
+        self.name = name
+
+        self._idle = []        # _Entry sẵn sàng (LIFO: driver vừa dùng còn "nóng")
+        self._busy = {}        # id(obj) -> _Entry đang cho mượn
+        self._free_slots = list(range(self.size - 1, -1, -1))
+        self._launching = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.created = 0
+        self.recycled = 0
+
+    # ---------- mượn / trả ----------
+
+    def checkout(self, timeout=None, create=True):
+        """
+        Mượn 1 driver còn sống (chờ nếu pool đầy).
+
+        Args:
+            timeout: Giây chờ tối đa (None = chờ mãi)
+            create: False = chỉ mượn driver đã có, không khởi động Chrome mới
+
+        Returns:
+            object do factory tạo
+
+        Raises:
+            DriverPoolTimeout: Hết thời gian chờ / pool trống khi create=False
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            slot = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise DriverPoolTimeout(f"{self.name} pool closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if create and self._free_slots:
+                        slot = self._free_slots.pop()
+                        self._launching += 1
+                        entry = None
+                        break
+                    if not create and not self._busy and not self._launching:
+                        raise DriverPoolTimeout(f"{self.name} pool has no live driver")
+                    remaining = None if deadline is None else deadline - time.time()
+                    if remaining is not None and remaining <= 0:
+                        raise DriverPoolTimeout(f"{self.name} pool: no driver free after {timeout}s")
+                    self._cond.wait(remaining)
+
+            if entry is None:
+                entry = self._launch(slot)
+            elif not is_driver_alive(self.driver_of(entry.obj)):
+                print(f"[DRIVER_POOL] ⚠️ {self.name}#{entry.slot} not responding, replacing")
+                self._retire(entry)
+                continue
+
+            with self._cond:
+                self._busy[id(entry.obj)] = entry
+            return entry.obj
+
+    def checkin(self, obj, broken=False):
+        """
+        Trả driver về pool.
+
+        Args:
+            broken: True = driver hỏng (lỗi WebDriver) → đóng luôn, lần mượn sau tạo mới
+        """
+        with self._cond:
+            entry = self._busy.pop(id(obj), None)
+        if entry is None:
+            return
+        entry.uses += 1
+        reason = self._recycle_reason(entry, broken)
+        if reason:
+            print(f"[DRIVER_POOL] ♻️ Recycling {self.name}#{entry.slot}: {reason}")
+            with self._cond:
+                self.recycled += 1
+            self._retire(entry)
+            return
+        with self._cond:
+            if self._closed:
+                closing = True
+            else:
+                closing = False
+                self._idle.append(entry)
+                self._cond.notify()
+        if closing:
+            self._retire(entry)
+
+    @contextmanager
+    def lease(self, timeout=None, create=True):
+        """`with pool.lease() as obj:` - tự trả về, driver chết sau lỗi thì bị loại"""
+        obj = self.checkout(timeout=timeout, create=create)
+        broken = False
+        try:
+            yield obj
+        except Exception:
+            broken = not is_driver_alive(self.driver_of(obj))
+            raise
+        finally:
+            self.checkin(obj, broken=broken)
+
+    # ---------- vòng đời ----------
+
+    def adopt(self, obj, slot=0):
+        """Đưa 1 object đã tạo sẵn (vd. driver của màn hình login) vào pool ở `slot`"""
+        with self._cond:
+            if slot not in self._free_slots:
+                return False
+            self._free_slots.remove(slot)
+            self._idle.append(_Entry(obj, slot, driver_rss_mb(self.driver_of(obj))))
+            self.created += 1
+            self._cond.notify()
+        return True
+
+    def prewarm(self, count=None, background=True):
+        """Khởi động trước driver cho các slot còn trống (mặc định: tới đủ size)"""
+        def _warm():
+            for _ in range(count if count is not None else self.size):
+                with self._cond:
+                    if self._closed or not self._free_slots:
+                        return
+                    slot = self._free_slots.pop()
+                    self._launching += 1
+                try:
+                    entry = self._launch(slot)
+                except Exception as e:
+                    print(f"[DRIVER_POOL] ⚠️ {self.name} prewarm failed: {e}")
+                    return
+                with self._cond:
+                    self._idle.insert(0, entry)
+                    self._cond.notify()
+
+        if background:
+            threading.Thread(target=_warm, daemon=True, name=f"{self.name}-prewarm").start()
+        else:
+            _warm()
+
+    def close(self):
+        """Đóng mọi driver rảnh; driver đang cho mượn sẽ đóng khi được trả"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._retire(entry)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'name': self.name,
+                'size': self.size,
+                'idle': len(self._idle),
+                'busy': len(self._busy),
+                'launching': self._launching,
+                'created': self.created,
+                'recycled': self.recycled,
+            }
+
+    # ---------- nội bộ ----------
+
+    def _launch(self, slot):
+        """Gọi factory ngoài lock (khởi động Chrome mất vài giây)"""
+        started = time.time()
+        try:
+            obj = self.factory(slot)
+        except Exception:
+            with self._cond:
+                self._launching -= 1
+                self._free_slots.append(slot)
+                self._cond.notify()
+            raise
+        entry = _Entry(obj, slot, driver_rss_mb(self.driver_of(obj)))
+        with self._cond:
+            self._launching -= 1
+            self.created += 1
+        print(f"[DRIVER_POOL] 🚀 {self.name}#{slot} ready in {time.time() - started:.1f}s")
+        return entry
+
+    def _recycle_reason(self, entry, broken):
+        if broken:
+            return "driver error"
+        if entry.uses >= self.max_uses:
+            return f"{entry.uses} uses"
+        if entry.base_rss is not None:
+            rss = driver_rss_mb(self.driver_of(entry.obj))
+            if rss is not None and rss - entry.base_rss > self.max_rss_growth_mb:
+                return f"memory {entry.base_rss:.0f}MB → {rss:.0f}MB"
+        return None
+
+    def _retire(self, entry):
+        try:
+            self.closer(entry.obj)
+        except Exception as e:
+            print(f"[DRIVER_POOL] Close warning ({self.name}#{entry.slot}): {e}")
+        with self._cond:
+            self._free_slots.append(entry.slot)
+            self._cond.notify()
+
+
+# ========================================
+# Pool dùng chung trong app
+# ========================================
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _account_key(site_url, username):
+    parsed = urlparse(site_url if '://' in (site_url or '') else f"https://{site_url}")
+    return f"{(parsed.netloc or '').lower()}{parsed.path.rstrip('/')}|{(username or '').lower()}"
+
+
+def get_wp_driver_pool(site_url, username, password, headless=False, fresh=False):
+    """
+    Pool SeleniumWPClient đã login cho 1 tài khoản WordPress (slot 0 = profile gốc,
+    slot khác = profile riêng, login nhanh nhờ cookie đã lưu).
+
+    Args:
+        fresh: True = đóng pool cũ của tài khoản (đăng nhập lại) và tạo pool mới
+    """
+    key = ('wp', _account_key(site_url, username))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None and (fresh or pool.password != password):
+            pool.close()  # Mật khẩu đổi → driver cũ login bằng mật khẩu cũ
+            pool = None
+        if pool is None:
+            def _factory(slot):
+                from model.selenium_wp import SeleniumWPClient
+                client = SeleniumWPClient(site_url, username, password)
+                client.init_driver(headless=headless, profile_slot=slot)
+                if not client.login():
+                    client.close()
+                    raise RuntimeError("Selenium login failed")
+                return client
+
+            pool = WebDriverPool(_factory, size=wp_pool_size(), driver_of=lambda c: c.driver,
+                                 closer=lambda c: c.close(), name="wp")
+            pool.password = password
+            _pools[key] = pool
+        return pool
+
+
+def create_scanner_driver(headless=True, page_load_timeout=30):
+    """Chrome mobile UA dùng để quét Facebook/TikTok (giống cấu hình cũ trong GUI)"""
+    import undetected_chromedriver as uc
+    options = uc.ChromeOptions()
+    options.add_argument('--user-agent=Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1')
+    options.add_argument("--disable-gpu")
+    options.add_argument("--mute-audio")
+    options.add_argument("--window-size=375,812")  # Mobile dimensions
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+
+    chrome_path = os.path.join(os.getcwd(), "chrome_portable", "chrome.exe")
+    if os.path.exists(chrome_path):
+        options.binary_location = chrome_path
+
+    driver = uc.Chrome(options=options, version_main=144, headless=headless)
+    driver.set_page_load_timeout(page_load_timeout)
+    return driver
+
+
+def get_scanner_pool(headless=True):
+    """Pool Chrome quét FB/TikTok (profile tạm, không cần slot riêng)"""
+    key = ('scanner', bool(headless))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = WebDriverPool(lambda slot: create_scanner_driver(headless=headless),
+                                 size=scanner_pool_size(), name="scanner-headless" if headless else "scanner")
+            _pools[key] = pool
+        return pool
+
+
+def shutdown_pools():
+    """Đóng mọi Chrome trong các pool (gọi khi thoát app)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
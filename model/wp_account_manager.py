@@ -123,3 +123,15 @@ class WPAccountManager:
             from datetime import datetime
             self.accounts[index]['last_used'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             self.save_accounts()
+    
+    def prewarm_clients(self, registry=None):
+        """
+        Login sẵn REST client cho mọi tài khoản đã lưu (background), để bài đầu tiên
+        / đổi tài khoản không phải chờ DNS + TLS + login + nonce
+        """
+        if registry is None:
+            from model.wp_client_registry import get_client_registry
+            registry = get_client_registry()
+        accounts = [self.get_account(i) for i in range(len(self.accounts))]
+        registry.prewarm([acc for acc in accounts if acc and acc.get('password')])
+        return registry
@@ -0,0 +1,179 @@
+"""
+WP Client Registry - 1 WordPressRESTClientFast đã đăng nhập, keep-alive cho mỗi tài khoản
+- Prewarm ở background lúc khởi động: DNS + TLS + login_fast + nonce làm trước,
+  bài đầu tiên / đổi tài khoản không phải chờ
+- Nonce (cookie auth) được làm mới trước khi hết hạn (WP nonce sống 12-24h)
+"""
+
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from model.wp_rest_api_fast import WordPressRESTClientFast
+
+
+def _nonce_refresh_seconds():
+    """WP_NONCE_REFRESH_SECONDS, mặc định 10 giờ (nonce WP hết hạn sau 12-24h)"""
+    try:
+        return max(60, int(os.environ.get("WP_NONCE_REFRESH_SECONDS", "").strip() or str(10 * 3600)))
+    except ValueError:
+        return 10 * 3600
+
+
+def _account_key(site_url, username):
+    parsed = urlparse(site_url if '://' in (site_url or '') else f"https://{site_url}")
+    return f"{(parsed.netloc or '').lower()}{parsed.path.rstrip('/')}|{(username or '').lower()}"
+
+
+class WPClientRegistry:
+    """
+    Registry thread-safe: (site, username) -> client đã đăng nhập.
+    Mỗi key có lock riêng để 2 thread không login cùng 1 tài khoản 2 lần.
+    """
+
+    def __init__(self, refresh_interval=None):
+        self.refresh_interval = refresh_interval or _nonce_refresh_seconds()
+        self._clients = {}
+        self._auth_at = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self._refresher = None
+        self._stop = threading.Event()
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def peek(self, site_url, username):
+        """Client đã có sẵn (có thể chưa login) hoặc None"""
+        with self._lock:
+            return self._clients.get(_account_key(site_url, username))
+
+    def get(self, site_url, username, password, app_password=None, login=True):
+        """
+        Lấy client của tài khoản (tạo + login nếu chưa có).
+
+        Args:
+            login: False = chỉ tạo client (caller tự lo auth, vd. copy cookies từ Selenium)
+
+        Returns:
+            WordPressRESTClientFast
+        """
+        key = _account_key(site_url, username)
+        with self._key_lock(key):
+            with self._lock:
+                client = self._clients.get(key)
+            if client is not None and (password != client.password or app_password != client.app_password):
+                # Mật khẩu đổi → client cũ không dùng được nữa
+                self._discard(key)
+                client = None
+            if client is None:
+                client = WordPressRESTClientFast(site_url, username, password, app_password=app_password)
+                with self._lock:
+                    self._clients[key] = client
+            if login and not client.cookies_loaded:
+                self._authenticate(key, client)
+        return client
+
+    def _authenticate(self, key, client):
+        if client.login_fast():
+            with self._lock:
+                self._auth_at[key] = time.time()
+            return True
+        return False
+
+    def prewarm(self, accounts):
+        """
+        Login song song tất cả tài khoản ở background (không chặn GUI).
+
+        Args:
+            accounts: list of dict {'site_url', 'username', 'password', 'app_password'?}
+        """
+        def _warm(acc):
+            try:
+                start = time.time()
+                client = self.get(acc['site_url'], acc['username'], acc['password'],
+                                  app_password=acc.get('app_password') or None)
+                state = "✅" if client.cookies_loaded else "⚠️ login failed"
+                print(f"[CLIENT_REGISTRY] {state} Prewarmed {acc['site_url']} ({time.time() - start:.2f}s)")
+            except Exception as e:
+                print(f"[CLIENT_REGISTRY] ⚠️ Prewarm error for {acc.get('site_url')}: {e}")
+
+        for acc in accounts:
+            if acc.get('site_url') and acc.get('username') and acc.get('password'):
+                threading.Thread(target=_warm, args=(acc,), daemon=True).start()
+        self._start_refresher()
+
+    def _start_refresher(self):
+        with self._lock:
+            if self._refresher is not None:
+                return
+            self._refresher = threading.Thread(target=self._refresh_loop, name="wp-nonce-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        check_every = min(300, self.refresh_interval)
+        while not self._stop.wait(check_every):
+            self.refresh_due()
+
+    def _auth_started(self, key, client, now):
+        """
+        Mốc tính tuổi auth: lần registry login/refresh, hoặc - với client tạo bằng login=False
+        (cookie + nonce copy từ Selenium) - lúc nonce được gán
+        """
+        return self._auth_at.get(key) or getattr(client, 'nonce_at', None) or now
+
+    def refresh_due(self, now=None):
+        """Làm mới auth của các client sắp hết hạn nonce. Returns: số client đã refresh"""
+        now = now or time.time()
+        with self._lock:
+            due = [(k, c) for k, c in self._clients.items()
+                   if (c.cookies_loaded or c.nonce) and now - self._auth_started(k, c, now) >= self.refresh_interval]
+        refreshed = 0
+        for key, client in due:
+            with self._key_lock(key):
+                # Basic auth (application password) không cần nonce, chỉ cookie auth mới cần
+                if client.session.auth is None:
+                    client.nonce = None
+                    ok = client._extract_nonce() or client._refresh_auth()
+                else:
+                    ok = True
+                if ok:
+                    with self._lock:
+                        self._auth_at[key] = time.time()
+                    refreshed += 1
+        if due:
+            print(f"[CLIENT_REGISTRY] 🔄 Refreshed auth for {refreshed}/{len(due)} clients")
+        return refreshed
+
+    def _discard(self, key):
+        with self._lock:
+            client = self._clients.pop(key, None)
+            self._auth_at.pop(key, None)
+        if client is not None:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        self._stop.set()
+        with self._lock:
+            keys = list(self._clients)
+        for key in keys:
+            self._discard(key)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry():
+    """Registry dùng chung cho cả process"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = WPClientRegistry()
+    return _registry
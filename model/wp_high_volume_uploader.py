@@ -49,13 +49,6 @@ class WordPressHighVolumeUploader:
         else:
             raise ValueError(f"Invalid mode: {mode}. Use: conservative/balanced/aggressive")
         
-        # Create batch manager
-        self.batch_manager = BatchUploadManager(
-            batch_size=batch_size,
-            max_parallel_batches=max_parallel_batches,
-            max_workers_per_batch=max_workers_per_batch
-        )
-        
         # Create WordPress client (reusable)
         self.wp_client = WordPressRESTClientFast(
             site_url=site_url,
@@ -66,6 +59,14 @@ class WordPressHighVolumeUploader:
             verbose=False  # Disable verbose for speed
         )
         
+        # Create batch manager (workers/batch follow this site's adaptive upload window)
+        self.batch_manager = BatchUploadManager(
+            batch_size=batch_size,
+            max_parallel_batches=max_parallel_batches,
+            max_workers_per_batch=max_workers_per_batch,
+            limiter=self.wp_client.upload_limiter
+        )
+        
         # Login once
         print(f"[HIGH_VOLUME] 🔐 Logging in to WordPress...")
         if not self.wp_client.login_fast():
@@ -109,27 +110,10 @@ class WordPressHighVolumeUploader:
                 'title': post.title if hasattr(post, 'title') else 'Untitled'
             })
         
-        # Upload function wrapper
-        def upload_single_post(post_data):
-            """Upload a single post"""
-            blog_post = post_data['blog_post']
-            
-            try:
-                # Upload using WordPress client
-                success, result = self.wp_client.post_article_fast(blog_post)
-                
-                if success:
-                    return True, result  # result = post_url
-                else:
-                    return False, result  # result = error message
-                    
-            except Exception as e:
-                return False, str(e)
-        
         # Process with batch manager
         success_count, failed_count, failed_posts = self.batch_manager.process_posts_batch(
             posts=posts_data,
-            upload_func=upload_single_post,
+            upload_func=self._upload_single_post,
             progress_callback=progress_callback
         )
         
@@ -157,8 +141,49 @@ class WordPressHighVolumeUploader:
         
         return result
     
+    def _upload_single_post(self, post_data):
+        """Upload a single post (resumes from the journal state if any)"""
+        blog_post = post_data['blog_post']
+        job_state = post_data.get('_job_state') or {}
+        state_data = job_state.get('data') or {}
+        
+        try:
+            # RESUME: draft already exists from a previous run -> only flip it to publish
+            if job_state.get('state') == 'draft_created' and state_data.get('post_id'):
+                state, detail = self.wp_client.publish_post(state_data['post_id'])
+                if state in ('published', 'no_reply'):
+                    return True, detail or state_data.get('post_url')
+                if state == 'failed':
+                    return False, f"Publish draft {state_data['post_id']} failed: {detail}"
+                # 'missing': draft bị xoá ngoài app -> tạo lại bài từ đầu
+                print(f"[HIGH_VOLUME] ⚠️ Draft {state_data['post_id']} không còn ({detail}), tạo lại bài")
+            
+            # RESUME: featured image already uploaded -> don't upload it again
+            if state_data.get('media_id') and not getattr(blog_post, 'featured_media_id', None):
+                blog_post.featured_media_id = state_data['media_id']
+            
+            # IDEMPOTENCY: journal fingerprint doubles as the post's idempotency key,
+            # so a retried/resumed POST finds its own draft instead of duplicating it
+            if post_data.get('_job_fp') and not getattr(blog_post, 'idempotency_key', None):
+                blog_post.idempotency_key = post_data['_job_fp']
+            
+            def on_stage(stage, info):
+                self.batch_manager.mark_stage(post_data, stage, **info)
+            
+            # Upload using WordPress client
+            success, result = self.wp_client.post_article_fast(blog_post, on_stage=on_stage)
+            
+            if success:
+                return True, result  # result = post_url
+            else:
+                return False, result  # result = error message
+                
+        except Exception as e:
+            return False, str(e)
+    
     def close(self):
-        """Close WordPress client"""
+        """Close WordPress client and the batch journal"""
+        self.batch_manager.close()
         self.wp_client.close()
 
 
@@ -17,6 +17,7 @@ class BlogPost:
         self.content = ""
         self.theme = "none"  # Default theme: no theme (use WordPress default)
         self.featured_media_id = featured_media_id  # NEW: Media ID for REST API
+        self.idempotency_key = None  # Optional stable key so REST retries never double-post
     
     def generate_seo_content(self):
         """
@@ -572,7 +573,7 @@ class WordPressClient:
 # AUTO-SELECT BEST POSTING METHOD
 # ============================================================================
 
-from model.selenium_wp import SeleniumWPClient
+# SeleniumWPClient được import lúc cần (fallback) - BlogPost / render offline không kéo theo selenium + undetected_chromedriver
 # from model.wp_rest_api import WordPressRESTClient
 from model.wp_rest_api_fast import WordPressRESTClientFast as WordPressRESTClient
 from model.wp_rest_api_fast import WordPressRESTClientFast
@@ -590,8 +591,10 @@ class WPAutoClient:
         self.password = password
         self.client = None
         self.method = None  # 'rest_api' or 'selenium'
+        self._shared_rest_client = False  # registry/reused client: không close
+        self._leased_selenium_client = False  # driver mượn từ pool: trả về pool, không close
     
-    def post_article(self, blog_post, reuse_selenium_client=None, reuse_fast_client=None):
+    def post_article(self, blog_post, reuse_selenium_client=None, reuse_fast_client=None, selenium_lease=None):
         """
         Post article to WordPress - automatically selects best method
         
@@ -603,6 +606,8 @@ class WPAutoClient:
             blog_post: BlogPost object with title, content, image_url
             reuse_selenium_client: Existing SeleniumWPClient to reuse (optional)
             reuse_fast_client: Existing WordPressRESTClientFast to reuse (optional)
+            selenium_lease: Callable trả về context manager (vd. WebDriverPool.lease) - chỉ được gọi
+                            khi phải fallback Selenium, REST thành công thì không chiếm driver nào (optional)
             
         Returns:
             tuple: (success: bool, result: str)
@@ -618,7 +623,10 @@ class WPAutoClient:
                 print("[WP_AUTO] Reusing existing FAST client")
                 rest_client = reuse_fast_client
             else:
-                rest_client = WordPressRESTClient(self.site_url, self.username, self.password)
+                # Client dùng chung theo tài khoản (keep-alive, có thể đã login sẵn)
+                from model.wp_client_registry import get_client_registry
+                rest_client = get_client_registry().get(self.site_url, self.username, self.password)
+            self._shared_rest_client = True
 
             # If REST is blocked (HTML responses), use wp-admin form posting via requests (fast, no Selenium UI).
             if getattr(rest_client, "rest_blocked", False):
@@ -668,25 +676,12 @@ class WPAutoClient:
             
             self.method = 'selenium'
             
-            # Reuse existing selenium client if provided (avoid re-login)
-            if reuse_selenium_client and reuse_selenium_client.driver:
-                print("[WP_AUTO] Reusing existing Selenium client (already logged in)")
-                self.client = reuse_selenium_client
-            else:
-                print("[WP_AUTO] Creating new Selenium client")
-                self.client = SeleniumWPClient(self.site_url, self.username, self.password)
-                self.client.init_driver(headless=False)
-            
-            # Use Classic Editor method (most reliable for Selenium)
-            success, result = self.client.post_article(blog_post, force_fresh_login=False, use_classic_editor=True)
-            
-            if success:
-                print(f"[WP_AUTO] ✅ Selenium method successful!")
-                print(f"[WP_AUTO] Post URL: {result}")
-            else:
-                print(f"[WP_AUTO] ❌ Selenium method failed: {result}")
-            
-            return success, result
+            if selenium_lease is not None:
+                print("[WP_AUTO] Leasing Selenium client from pool")
+                with selenium_lease() as leased_client:
+                    self._leased_selenium_client = True
+                    return self._post_with_selenium(blog_post, leased_client)
+            return self._post_with_selenium(blog_post, reuse_selenium_client)
             
         except Exception as e:
             print(f"[WP_AUTO] ❌ Critical error: {e}")
@@ -694,8 +689,35 @@ class WPAutoClient:
             traceback.print_exc()
             return False, str(e)
     
+    def _post_with_selenium(self, blog_post, reuse_selenium_client=None):
+        """Selenium + Classic Editor (fallback của post_article)"""
+        # Reuse existing selenium client if provided (avoid re-login)
+        if reuse_selenium_client and reuse_selenium_client.driver:
+            print("[WP_AUTO] Reusing existing Selenium client (already logged in)")
+            self.client = reuse_selenium_client
+        else:
+            print("[WP_AUTO] Creating new Selenium client")
+            from model.selenium_wp import SeleniumWPClient
+            self.client = SeleniumWPClient(self.site_url, self.username, self.password)
+            self.client.init_driver(headless=False)
+        
+        # Use Classic Editor method (most reliable for Selenium)
+        success, result = self.client.post_article(blog_post, force_fresh_login=False, use_classic_editor=True)
+        
+        if success:
+            print(f"[WP_AUTO] ✅ Selenium method successful!")
+            print(f"[WP_AUTO] Post URL: {result}")
+        else:
+            print(f"[WP_AUTO] ❌ Selenium method failed: {result}")
+        
+        return success, result
+    
     def close(self):
         """Close the active client"""
+        if self.method == 'rest_api' and self._shared_rest_client:
+            return  # owned by the client registry / caller
+        if self.method == 'selenium' and self._leased_selenium_client:
+            return  # đã trả về WebDriver pool
         if self.client:
             self.client.close()
             print(f"[WP_AUTO] Closed {self.method} client")
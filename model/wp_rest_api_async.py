@@ -0,0 +1,483 @@
+"""
+WordPress REST API Async Engine - asyncio-native client for WordPressRESTClientFast
+Goal: hàng trăm uploads/posts đồng thời mà KHÔNG cần hàng trăm threads
+Design:
+- 1 event loop chạy nền cho mỗi site (SiteEventLoop)
+- httpx.AsyncClient với keep-alive pool, giới hạn concurrency theo site
+- Cùng contract với bản sync: upload_image_fast / create_post_fast / post_article_fast
+  nhưng là coroutines
+- WordPressRESTClientFast vẫn là facade sync (controller + WPAutoClient không đổi)
+"""
+
+import asyncio
+import os
+import threading
+import time
+
+from model.adaptive_limiter import get_host_limiter, parse_retry_after
+from model.upload_body import FileUploadBody, guess_mime_type, chunked_threshold
+from model.post_idempotency import make_idempotency_key, idempotent_slug, idempotent_slugs_enabled
+
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+
+class SiteEventLoop:
+    """
+    Một event loop chạy trong 1 daemon thread, dùng chung cho mọi request tới 1 site.
+    Code sync gọi run(coro) để chờ kết quả từ bất kỳ thread nào.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name="wp-async"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_forever, name=name, daemon=True)
+        self._thread.start()
+
+    def _run_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @classmethod
+    def for_site(cls, site_url):
+        """Lấy (hoặc tạo) event loop dùng chung cho site_url"""
+        key = (site_url or "").rstrip('/').lower()
+        with cls._registry_lock:
+            site_loop = cls._registry.get(key)
+            if site_loop is None or not site_loop.is_running():
+                site_loop = cls(name=f"wp-async:{key[:40]}")
+                cls._registry[key] = site_loop
+            return site_loop
+
+    def is_running(self):
+        return self._thread.is_alive() and not self.loop.is_closed()
+
+    def submit(self, coro):
+        """Đưa coroutine vào loop, trả về concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Chạy coroutine trên loop của site và chờ kết quả (blocking)"""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("SiteEventLoop.run() cannot be called from its own loop thread")
+        return self.submit(coro).result(timeout=timeout)
+
+    def stop(self):
+        if self.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+class AsyncWordPressRESTClient:
+    """
+    Asyncio-native WordPress REST client.
+    Auth (Basic app password / cookies / nonce) được copy từ WordPressRESTClientFast.
+    """
+
+    def __init__(self, site_url, max_concurrency=5, timeout=60, verbose=True):
+        """
+        Args:
+            site_url: WordPress site URL (đã chuẩn hóa)
+            max_concurrency: Số request đồng thời tối đa tới site này
+            timeout: Timeout mặc định (giây) cho upload
+            verbose: In log chi tiết
+        """
+        if not HAS_HTTPX:
+            raise ImportError("httpx not installed. Run: pip install httpx")
+
+        self.site_url = site_url.rstrip('/')
+        self.api_base = f"{self.site_url}/wp-json/wp/v2"
+        self.posts_endpoint = f"{self.api_base}/posts"
+        self.media_endpoint = f"{self.api_base}/media"
+
+        self.max_concurrency = max(1, int(max_concurrency))
+        # Uploads share the per-host AIMD window with the sync client
+        self.limiter = get_host_limiter(self.site_url)
+        self.timeout = timeout
+        self.verbose = verbose
+
+        self.auth = None
+        self.nonce = None
+        self.cookies = httpx.Cookies()
+        self.headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            'Accept': 'application/json',
+        }
+
+        # Set when a response looks like REST is blocked (HTML instead of JSON)
+        self.rest_blocked = False
+        self.rest_blocked_reason = None
+
+        # Created lazily inside the owning event loop
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+
+    @classmethod
+    def from_sync_client(cls, sync_client, max_concurrency=5):
+        """Tạo async engine với cùng site + auth như WordPressRESTClientFast"""
+        engine = cls(sync_client.site_url, max_concurrency=max_concurrency, verbose=sync_client.verbose)
+        engine.sync_auth_from(sync_client)
+        return engine
+
+    def sync_auth_from(self, sync_client):
+        """Copy Basic auth, cookies và nonce từ requests.Session của client sync"""
+        session_auth = getattr(sync_client.session, 'auth', None)
+        if session_auth is not None and hasattr(session_auth, 'username'):
+            self.auth = (session_auth.username, session_auth.password)
+        else:
+            self.auth = None
+
+        cookies = httpx.Cookies()
+        for c in sync_client.session.cookies:
+            cookies.set(c.name, c.value, domain=c.domain or "", path=c.path or "/")
+        self.cookies = cookies
+        self.nonce = sync_client.nonce
+
+        # Cookie jar changed: the live client must pick it up
+        if self._client is not None:
+            self._client.cookies = self.cookies
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    async def _ensure_client(self):
+        """Tạo httpx.AsyncClient + semaphore gắn với event loop hiện tại"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._client = httpx.AsyncClient(
+                auth=self.auth,
+                cookies=self.cookies,
+                headers=self.headers,
+                verify=False,  # Giống bản sync: nhiều site dùng cert tự ký
+                timeout=httpx.Timeout(self.timeout, connect=10),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency * 2,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                follow_redirects=True,
+            )
+        return self._client
+
+    async def _request(self, method, url, **kwargs):
+        """1 HTTP call giữ 1 slot của semaphore (backoff / sleep giữa các lần thử không chiếm slot)"""
+        async with self._semaphore:
+            return await self._client.request(method, url, **kwargs)
+
+    def _auth_headers(self, headers=None):
+        headers = dict(headers or {})
+        if self.nonce:
+            headers['X-WP-Nonce'] = self.nonce
+        return headers
+
+    def _parse_json(self, response, what):
+        """JSON body hoặc None nếu WAF/plugin trả HTML (đánh dấu rest_blocked)"""
+        try:
+            return response.json()
+        except ValueError:
+            ct = (response.headers.get("Content-Type") or "").strip()
+            print(f"[ASYNC_API] ❌ {what} got non-JSON response (status={response.status_code}, content-type={ct})")
+            self.rest_blocked = True
+            self.rest_blocked_reason = f"{what} returned non-JSON ({ct})"
+            return None
+
+    async def upload_image_fast(self, image_path, chunked=None):
+        """
+        ASYNC IMAGE UPLOAD (streamed from disk)
+
+        Args:
+            image_path: Path to image file
+            chunked: Transfer-Encoding: chunked. None = auto (WP_UPLOAD_CHUNKED_MIN_BYTES)
+
+        Returns:
+            tuple: (success: bool, media_id: int or None, media_url: str or None)
+        """
+        if not os.path.exists(image_path):
+            print(f"[ASYNC_API] ❌ Image not found: {image_path}")
+            return False, None, None
+
+        client = await self._ensure_client()
+        filename = os.path.basename(image_path)
+        headers = self._auth_headers({
+            'Content-Disposition': f'attachment; filename="{filename}"',
+            'Content-Type': guess_mime_type(filename),
+        })
+
+        if chunked is None:
+            threshold = chunked_threshold()
+            chunked = bool(threshold) and os.path.getsize(image_path) >= threshold
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                # Stream from disk: only one chunk per upload is in memory at a time
+                async with self.limiter.async_slot():
+                    with FileUploadBody(image_path) as body:
+                        request_headers = dict(headers)
+                        if not chunked:
+                            # Known length: httpx sends Content-Length instead of chunked encoding
+                            request_headers['Content-Length'] = str(body.size)
+                        request_start = time.time()
+                        response = await client.post(
+                            self.media_endpoint,
+                            headers=request_headers,
+                            content=body.aiter_chunks(),
+                        )
+                    self.limiter.record_response(
+                        response.status_code,
+                        time.time() - request_start,
+                        response.headers.get("Retry-After"),
+                    )
+
+                if response.status_code in (200, 201):
+                    data = self._parse_json(response, "media")
+                    if data is None:
+                        return False, None, None
+                    media_id = data.get('id')
+                    media_url = data.get('source_url')
+                    if not media_id or not media_url:
+                        print(f"[ASYNC_API] ❌ Upload response missing fields (id/source_url)")
+                        return False, None, None
+                    self._log(f"[ASYNC_API] ✅ Upload done! ID: {media_id}")
+                    return True, media_id, media_url
+                elif response.status_code == 429 and attempt < max_retries - 1:
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    wait_time = max(1.0, retry_after) if retry_after is not None else (2 ** attempt) * 2
+                    print(f"[ASYNC_API] ⚠️ Rate limited (429), waiting {wait_time}s... (attempt {attempt+1}/{max_retries})")
+                    await asyncio.sleep(wait_time)
+                    continue
+                elif response.status_code in (401, 403):
+                    # Auth refresh is owned by the sync facade; report failure so it can retry
+                    print(f"[ASYNC_API] 🛡️ {response.status_code} on upload, needs auth refresh")
+                    return False, None, None
+                else:
+                    print(f"[ASYNC_API] ❌ Upload failed: {response.status_code}")
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(1)
+                        continue
+                    return False, None, None
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if isinstance(e, httpx.TimeoutException):
+                    self.limiter.record_timeout()
+                if attempt < max_retries - 1:
+                    print(f"[ASYNC_API] ⚠️ {type(e).__name__}, retrying... (attempt {attempt+1}/{max_retries})")
+                    await asyncio.sleep(2)
+                    continue
+                print(f"[ASYNC_API] ❌ Upload error after {max_retries} attempts: {e}")
+                return False, None, None
+            except Exception as e:
+                print(f"[ASYNC_API] ❌ Upload error: {e}")
+                return False, None, None
+        return False, None, None
+
+    async def upload_images_parallel(self, image_paths):
+        """
+        Upload nhiều ảnh cùng lúc trên 1 event loop (concurrency do semaphore giới hạn)
+
+        Returns:
+            list: (success, media_id, media_url) theo ĐÚNG thứ tự image_paths
+        """
+        if not image_paths:
+            return []
+        results = await asyncio.gather(
+            *(self.upload_image_fast(p) for p in image_paths),
+            return_exceptions=True,
+        )
+        return [r if isinstance(r, tuple) else (False, None, None) for r in results]
+
+    async def create_post_fast(self, title, content, featured_media_id=None, featured_image_url=None, status='publish', idempotency_key=None):
+        """
+        ASYNC POST CREATION (draft trước, publish sau - giống bản sync)
+        Slug chứa idempotency key → ReadTimeout được kiểm tra bằng slug thay vì bỏ bài
+
+        Returns:
+            tuple: (success: bool, post_id: int or None, post_url: str or None)
+        """
+        await self._ensure_client()
+        post_data = {
+            'title': title,
+            'content': content,
+            'status': 'draft' if status == 'publish' else status,
+        }
+        if featured_media_id:
+            post_data['featured_media'] = featured_media_id
+        if featured_image_url:
+            post_data['meta'] = {
+                '_yoast_wpseo_opengraph-image': featured_image_url,
+                '_yoast_wpseo_twitter-image': featured_image_url,
+            }
+        slug = None
+        if idempotent_slugs_enabled():
+            slug = idempotent_slug(title, idempotency_key or make_idempotency_key(title, content))
+            post_data['slug'] = slug
+        headers = self._auth_headers({'Content-Type': 'application/json'})
+
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = await self._request('POST', self.posts_endpoint, json=post_data, headers=headers, timeout=15)
+            except httpx.ReadTimeout:
+                # TRÁNH TRÙNG LẶP: request đã tới WP, chỉ gửi lại khi chắc chắn bài chưa được tạo
+                if not slug:
+                    print(f"[ASYNC_API] ⚠️ ReadTimeout (WP quá tải). Không retry để tránh trùng lặp bài viết!")
+                    return False, None, None
+                existing = await self._find_post_by_slug(slug, headers)
+                if existing:
+                    return await self._finalize_created_post(existing, featured_media_id, status, headers)
+                if attempt < max_retries - 1:
+                    print(f"[ASYNC_API] 🔁 Chưa có bài với slug '{slug}', gửi lại an toàn...")
+                    continue
+                return False, None, None
+            except (httpx.ConnectTimeout, httpx.ConnectError) as e:
+                if attempt < max_retries - 1:
+                    print(f"[ASYNC_API] ⚠️ Connection error ({e}), retrying... (attempt {attempt+1}/{max_retries})")
+                    await asyncio.sleep(2)
+                    continue
+                return False, None, None
+
+            if response.status_code in (200, 201):
+                data = self._parse_json(response, "posts")
+                if data is None:
+                    return False, None, None
+                return await self._finalize_created_post(data, featured_media_id, status, headers)
+            elif response.status_code == 429 and attempt < max_retries - 1:
+                wait_time = (2 ** attempt) * 2
+                print(f"[ASYNC_API] ⚠️ Rate limited (429), waiting {wait_time}s... (attempt {attempt+1}/{max_retries})")
+                await asyncio.sleep(wait_time)
+                continue
+            elif response.status_code in (401, 403):
+                print(f"[ASYNC_API] 🛡️ {response.status_code} on create_post, needs auth refresh")
+                return False, None, None
+            else:
+                print(f"[ASYNC_API] ❌ Post failed: {response.status_code}")
+                if attempt < max_retries - 1:
+                    await asyncio.sleep(1)
+                    continue
+                return False, None, None
+        return False, None, None
+
+    async def _finalize_created_post(self, data, featured_media_id, status, headers):
+        """Draft đã tồn tại: sửa featured media nếu cần, publish, trả (True, post_id, post_url)"""
+        post_id = data.get('id')
+        post_url = data.get('link')
+
+        if featured_media_id and data.get('featured_media') != featured_media_id:
+            await self._force_set_featured_media(post_id, featured_media_id, headers)
+
+        if status == 'publish':
+            try:
+                publish_resp = await self._request(
+                    'POST', f"{self.posts_endpoint}/{post_id}",
+                    json={"status": "publish"},
+                    headers=headers,
+                    timeout=3,
+                )
+                if publish_resp.status_code in (200, 201):
+                    post_url = publish_resp.json().get('link', post_url)
+            except httpx.ReadTimeout:
+                self._log(f"[ASYNC_API] ⚡ Publish đã gửi (WP đang lưu ngầm)")
+            except Exception as publish_err:
+                print(f"[ASYNC_API] ⚠️ Lỗi khi đẩy publish: {publish_err}")
+
+        self._log(f"[ASYNC_API] ✅ Đăng thành công! Mở: {post_url}")
+        return True, post_id, post_url
+
+    async def _find_post_by_slug(self, slug, headers, attempts=3, delay=2.0):
+        """Tìm bản nháp theo slug idempotent (chỉ draft/pending); bản trùng chỉ được log, không xoá"""
+        for attempt in range(attempts):
+            try:
+                r = await self._request(
+                    'GET', self.posts_endpoint,
+                    params={
+                        'slug': slug,
+                        'status': 'draft,pending',
+                        '_fields': 'id,link,status,featured_media',
+                    },
+                    headers=headers,
+                    timeout=10,
+                )
+                if r.status_code == 200:
+                    found = sorted(r.json() or [], key=lambda p: p.get('id') or 0)
+                    if found:
+                        if len(found) > 1:
+                            dup_ids = ", ".join(str(p.get('id')) for p in found[1:])
+                            print(f"[ASYNC_API] ⚠️ Duplicate drafts with slug {slug}: {dup_ids} (keeping ID {found[0].get('id')}, please remove the rest manually)")
+                        return found[0]
+            except Exception as e:
+                print(f"[ASYNC_API] ⚠️ Slug lookup error: {e}")
+            if attempt < attempts - 1:
+                await asyncio.sleep(delay)
+        return None
+
+    async def _force_set_featured_media(self, post_id, featured_media_id, headers):
+        """Force update featured_media on an existing post"""
+        try:
+            response = await self._request(
+                'POST', f"{self.posts_endpoint}/{post_id}",
+                json={"featured_media": featured_media_id},
+                headers=headers,
+                timeout=10,
+            )
+            if response.status_code not in (200, 201):
+                print(f"[ASYNC_API] ⚠️ Force-set failed: {response.status_code}")
+        except Exception as e:
+            print(f"[ASYNC_API] ⚠️ Force-set error: {e}")
+
+    async def post_article_fast(self, blog_post):
+        """
+        ASYNC WORKFLOW: upload featured image (nếu là file local) + tạo bài
+
+        Returns:
+            tuple: (success: bool, post_url: str or error_message)
+        """
+        start_time = time.time()
+        try:
+            featured_media_id = getattr(blog_post, 'featured_media_id', None)
+            image_url = getattr(blog_post, 'image_url', None)
+            if not featured_media_id and image_url and isinstance(image_url, str) and not image_url.startswith('http'):
+                success, media_id, _ = await self.upload_image_fast(image_url)
+                if success:
+                    featured_media_id = media_id
+
+            featured_image_url = image_url if isinstance(image_url, str) else None
+            success, post_id, post_url = await self.create_post_fast(
+                title=blog_post.title,
+                content=blog_post.content,
+                featured_media_id=featured_media_id,
+                featured_image_url=featured_image_url,
+                status='publish',
+                idempotency_key=getattr(blog_post, 'idempotency_key', None),
+            )
+            self._log(f"[ASYNC_API] ⏱️ TOTAL TIME: {time.time() - start_time:.2f}s")
+            if success:
+                return True, post_url
+            return False, "Post creation failed"
+        except Exception as e:
+            print(f"[ASYNC_API] ❌ Error: {e}")
+            return False, str(e)
+
+    async def post_articles_parallel(self, blog_posts):
+        """
+        Đăng nhiều bài cùng lúc trên 1 event loop
+
+        Returns:
+            list: (success, result) theo ĐÚNG thứ tự blog_posts
+        """
+        results = await asyncio.gather(
+            *(self.post_article_fast(p) for p in blog_posts),
+            return_exceptions=True,
+        )
+        return [r if isinstance(r, tuple) else (False, str(r)) for r in results]
+
+    async def aclose(self):
+        """Đóng httpx client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
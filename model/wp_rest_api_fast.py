@@ -21,11 +21,17 @@ from urllib.parse import urlparse, urljoin
 import time
 import concurrent.futures
 import threading
+from model.wp_rest_api_async import AsyncWordPressRESTClient, SiteEventLoop, HAS_HTTPX
+from model.adaptive_limiter import get_host_limiter, parse_retry_after
+from model.upload_body import FileUploadBody, MultipartFileBody, guess_mime_type, chunked_threshold
+from model.media_dedup_cache import MediaDedupCache
+from model.post_idempotency import make_idempotency_key, idempotent_slug, idempotent_slugs_enabled
 
-# GLOBAL UPLOAD LIMITER:
-# Concurrency that is too high often triggers WAF/rate-limit (429) or per-user throttles,
-# making uploads appear "stuck" for some accounts while others look normal.
-# Keep a safer default, and allow overriding via env var for controlled environments.
+# PER-HOST UPLOAD LIMITER:
+# Concurrency that is too high often triggers WAF/rate-limit (429) or per-user throttles.
+# Each host gets its own AIMD window (model/adaptive_limiter.py): it grows while the site
+# is healthy and halves on 429/503/timeouts, so one throttled site no longer stalls the others.
+# WP_MAX_CONCURRENT_UPLOADS still sets the starting window.
 def _get_max_concurrent_uploads() -> int:
     try:
         v = int(os.environ.get("WP_MAX_CONCURRENT_UPLOADS", "").strip() or "5")
@@ -33,7 +39,28 @@ def _get_max_concurrent_uploads() -> int:
     except Exception:
         return 5
 
-_upload_semaphore = threading.Semaphore(_get_max_concurrent_uploads())
+
+BATCH_MAX_ITEMS = 25  # WordPress default maxItems for /batch/v1
+# _batch_call: lô đã gửi đi nhưng không có trả lời dùng được (ReadTimeout, 5xx từ proxy,
+# mất kết nối, thiếu responses...) - WP có thể đã tạo bài
+BATCH_NO_REPLY = ('no-reply', None)
+BATCH_UNKNOWN_MESSAGE = "Batch request got no usable reply: post may already exist, verify manually"
+
+
+def _never_sent(exc) -> bool:
+    """Lỗi xảy ra trước khi request tới server (ConnectTimeout / không mở được kết nối) → gửi lại an toàn"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        reason = exc.args[0] if exc.args else None
+        reason = getattr(reason, 'reason', reason)  # MaxRetryError → lỗi gốc
+        return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    return False
+
+
+def _batch_api_enabled() -> bool:
+    """WP_BATCH_API=0 để tắt /batch/v1 (luôn dùng đường đăng từng bài)"""
+    return os.environ.get("WP_BATCH_API", "1").strip().lower() not in ("0", "false", "no", "off")
 
 
 class WordPressRESTClientFast:
@@ -42,6 +69,8 @@ class WordPressRESTClientFast:
     Optimized for speed - target 1 second per request
     """
     
+    SLUG_LOOKUP_DELAY = 2.0  # giây giữa các lần tìm draft theo slug sau timeout
+    
     def __init__(self, site_url, username, password, app_password=None, enable_rate_limiting=False, verbose=True):
         """
         Initialize WordPress REST API client with speed optimizations
@@ -70,7 +99,7 @@ class WordPressRESTClientFast:
         # SPEED OPTIMIZATION: Create session with connection pooling
         self.session = self._create_optimized_session()
         
-        self.nonce = None
+        self.nonce = None  # setter ghi lại nonce_at (registry làm mới theo tuổi nonce)
         self.cookies_loaded = False
         # If a site returns HTML for REST endpoints (security plugin/WAF),
         # we mark REST as blocked and let callers bypass REST immediately.
@@ -87,6 +116,20 @@ class WordPressRESTClientFast:
         self.api_base = f"{self.site_url}/wp-json/wp/v2"
         self.posts_endpoint = f"{self.api_base}/posts"
         self.media_endpoint = f"{self.api_base}/media"
+        # WP 5.6+: /batch/v1 gộp tối đa 25 sub-requests vào 1 round trip (None = chưa kiểm tra)
+        self.batch_endpoint = f"{self.site_url}/wp-json/batch/v1"
+        self._batch_supported = None
+        self.batch_max_items = BATCH_MAX_ITEMS
+        
+        # Adaptive per-host upload window (shared by every client of this host)
+        self.upload_limiter = get_host_limiter(self.site_url)
+        
+        # DEDUP: content hash -> media already uploaded to this site
+        self.media_cache = MediaDedupCache.for_site(self.site_url)
+        
+        # ASYNC ENGINE (lazy): 1 event loop/site thay cho hàng trăm threads chờ socket
+        self._async_engine = None
+        self._async_engine_lock = threading.Lock()
         
         if verbose:
             if enable_rate_limiting:
@@ -252,6 +295,16 @@ class WordPressRESTClientFast:
             print(f"[FAST_API] ❌ Login error: {e}")
             return False
 
+    @property
+    def nonce(self):
+        return self._nonce
+    
+    @nonce.setter
+    def nonce(self, value):
+        # Mọi nơi gán nonce (login, copy từ Selenium, refresh) đều đóng dấu thời gian
+        self._nonce = value
+        self.nonce_at = time.time() if value else None
+    
     def _extract_nonce(self):
         """Extract WordPress nonce from dashboard - Critical for Cookie Auth"""
         try:
@@ -313,13 +366,7 @@ class WordPressRESTClientFast:
                 return False, None, None
 
             filename = os.path.basename(image_path)
-            mime_type = 'image/jpeg'
-            if filename.lower().endswith('.png'):
-                mime_type = 'image/png'
-            elif filename.lower().endswith('.gif'):
-                mime_type = 'image/gif'
-            elif filename.lower().endswith('.webp'):
-                mime_type = 'image/webp'
+            mime_type = guess_mime_type(filename)
 
             # 1) Get nonce from media upload page (wp-admin), via existing cookies
             media_new_url = f"{self.site_url}/wp-admin/media-new.php"
@@ -348,11 +395,14 @@ class WordPressRESTClientFast:
                 "_wpnonce": nonce,
             }
 
-            with open(image_path, "rb") as f:
-                files = {
-                    "async-upload": (filename, f, mime_type),
-                }
-                r = self.session.post(upload_url, data=data, files=files, timeout=60)
+            # Stream the multipart body from disk (requests' files= encodes the whole file in RAM)
+            with MultipartFileBody(data, "async-upload", image_path, filename, mime_type) as body:
+                r = self.session.post(
+                    upload_url,
+                    data=body,
+                    headers={"Content-Type": body.content_type},
+                    timeout=60,
+                )
 
             # WP sometimes returns JSON; sometimes returns just the attachment ID.
             attachment_id = None
@@ -626,12 +676,39 @@ class WordPressRESTClientFast:
             print(f"[FAST_API] ❌ Admin post form error: {e}")
             return False, None, None
     
-    def upload_image_fast(self, image_path):
+    def media_exists(self, media_id, source_url=None):
+        """
+        Cheap check that a cached media item still exists on the site
+        (used by MediaDedupCache when an entry is older than its TTL).
+        
+        Returns:
+            bool: False only when the site clearly says it is gone (404/410)
+        """
+        try:
+            if media_id:
+                headers = {'X-WP-Nonce': self.nonce} if self.nonce else {}
+                r = self.session.get(
+                    f"{self.media_endpoint}/{media_id}",
+                    params={'_fields': 'id'},
+                    headers=headers,
+                    timeout=5
+                )
+            elif source_url:
+                r = self.session.head(source_url, timeout=5, allow_redirects=True)
+            else:
+                return False
+            return r.status_code not in (404, 410)
+        except Exception:
+            return True
+    
+    def upload_image_fast(self, image_path, chunked=None):
         """
         FAST IMAGE UPLOAD with reduced timeout
         
         Args:
             image_path: Path to image file
+            chunked: Send with Transfer-Encoding: chunked. None = auto
+                (files >= WP_UPLOAD_CHUNKED_MIN_BYTES; disabled by default)
             
         Returns:
             tuple: (success: bool, media_id: int or None, media_url: str or None)
@@ -641,18 +718,20 @@ class WordPressRESTClientFast:
                 print(f"[FAST_API] ❌ Image not found: {image_path}")
                 return False, None, None
             
+            # DEDUP: identical bytes were already uploaded to this site -> reuse that media
+            digest, cached = self.media_cache.lookup_file(image_path, self.media_exists)
+            if cached:
+                media_id, media_url = cached
+                if media_id:
+                    print(f"[FAST_API] ♻️ Reusing uploaded media ID {media_id} for {os.path.basename(image_path)}")
+                    return True, media_id, media_url
+            
             print(f"[FAST_API] ⚡ Fast uploading: {os.path.basename(image_path)}")
             
             filename = os.path.basename(image_path)
             
             # Detect MIME type
-            mime_type = 'image/jpeg'
-            if filename.lower().endswith('.png'):
-                mime_type = 'image/png'
-            elif filename.lower().endswith('.gif'):
-                mime_type = 'image/gif'
-            elif filename.lower().endswith('.webp'):
-                mime_type = 'image/webp'
+            mime_type = guess_mime_type(filename)
             
             headers = {
                 'Content-Disposition': f'attachment; filename="{filename}"',
@@ -662,28 +741,40 @@ class WordPressRESTClientFast:
             if self.nonce:
                 headers['X-WP-Nonce'] = self.nonce
             
-            with open(image_path, 'rb') as f:
-                file_data = f.read()
+            # LOW MEMORY: Stream from the file instead of f.read() into RAM.
+            # The body is rewound before every attempt, so retries never hold a copy.
+            if chunked is None:
+                threshold = chunked_threshold()
+                chunked = bool(threshold) and os.path.getsize(image_path) >= threshold
             
             # Rate limiting: Wait if needed
             self._wait_for_rate_limit()
             
-            # GLOBAL RATE LIMIT: Acquire semaphore (max 5 uploads system-wide)
+            # PER-HOST RATE LIMIT: Acquire a slot in this host's adaptive window
             # This prevents overwhelming WordPress when running multiple posts in parallel
-            with _upload_semaphore:
-                self._log(f"[FAST_API] 🔒 Acquired upload slot (max {_get_max_concurrent_uploads()} concurrent)")
+            limiter = self.upload_limiter
+            with limiter.slot(), FileUploadBody(image_path) as body:
+                self._log(f"[FAST_API] 🔒 Acquired upload slot (window {limiter.window}, in flight {limiter.in_flight})")
                 
                 # HIGH VOLUME: Retry logic with exponential backoff
                 max_retries = 3
                 for attempt in range(max_retries):
                     try:
                         # HIGH VOLUME: Increased timeout to 60s (was 30s) for parallel stability
+                        request_start = time.time()
+                        body.rewind()
                         response = self.session.post(
                             self.media_endpoint,
                             headers=headers,
-                            data=file_data,
+                            # Generator = Transfer-Encoding: chunked; file object = Content-Length stream
+                            data=body.iter_chunks() if chunked else body,
                             timeout=60  # Increased from 30s for parallel posts
                         )
+                        limiter.record_response(
+                            response.status_code,
+                            time.time() - request_start,
+                            response.headers.get("Retry-After"),
+                        )
                         
                         if response.status_code in [200, 201]:
                             # Some WAF/plugins return HTML (or an empty body) with 200/201,
@@ -742,6 +833,7 @@ class WordPressRESTClientFast:
                                 return False, None, None
 
                             print(f"[FAST_API] ✅ Upload done! ID: {media_id}")
+                            self.media_cache.store(digest, media_id, media_url)
                             return True, media_id, media_url
                         elif response.status_code == 403: # Forbidden
                             print(f"[FAST_API] 🛡️ 403 Forbidden on upload. Refreshing auth... (attempt {attempt+1})")
@@ -749,17 +841,14 @@ class WordPressRESTClientFast:
                                 # IMPORTANT: Headers are just a dictionary copy in the loop context in Python? 
                                 # No, 'headers' was defined outside. Modifying it is fine.
                                 if self.nonce: headers['X-WP-Nonce'] = self.nonce
-                                # IMPORTANT: 'file_data' is in memory, so we can just retry post
+                                # Body is rewound at the top of the next attempt
                                 continue
                             return False, None, None
                         elif response.status_code == 429:  # Too Many Requests
                             if attempt < max_retries - 1:
-                                retry_after = response.headers.get("Retry-After")
-                                if retry_after:
-                                    try:
-                                        wait_time = max(1.0, float(retry_after))
-                                    except Exception:
-                                        wait_time = (2 ** attempt) * 2
+                                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                                if retry_after is not None:
+                                    wait_time = max(1.0, retry_after)
                                 else:
                                     wait_time = (2 ** attempt) * 2  # Exponential backoff: 2s, 4s, 8s
                                 print(f"[FAST_API] ⚠️ Rate limited (429), waiting {wait_time}s... (attempt {attempt+1}/{max_retries})")
@@ -784,6 +873,7 @@ class WordPressRESTClientFast:
                             return False, None, None
                             
                     except requests.exceptions.Timeout:
+                        limiter.record_timeout()
                         if attempt < max_retries - 1:
                             print(f"[FAST_API] ⚠️ Timeout, retrying... (attempt {attempt+1}/{max_retries})")
                             time.sleep(2)
@@ -802,7 +892,6 @@ class WordPressRESTClientFast:
                                  self.login_fast()
                                  if self.nonce: headers['X-WP-Nonce'] = self.nonce
                              
-                             f.seek(0)
                              continue
                          return False, None, None
                     except Exception as e:
@@ -822,42 +911,87 @@ class WordPressRESTClientFast:
             print(f"[FAST_API] ❌ Upload error: {e}")
             return False, None, None
     
+    def get_async_engine(self):
+        """
+        Lấy async engine (httpx) dùng chung auth với client này.
+        
+        Returns:
+            AsyncWordPressRESTClient or None: None nếu chưa cài httpx hoặc REST bị chặn
+        """
+        if not HAS_HTTPX or self.rest_blocked:
+            return None
+        with self._async_engine_lock:
+            if self._async_engine is None:
+                self._async_engine = AsyncWordPressRESTClient.from_sync_client(
+                    self, max_concurrency=_get_max_concurrent_uploads()
+                )
+            else:
+                # Cookies/nonce may have been refreshed (Selenium sync, _refresh_auth)
+                self._async_engine.sync_auth_from(self)
+        return self._async_engine
+    
+    def run_async(self, coro, timeout=None):
+        """Chạy coroutine trên event loop dùng chung của site này (blocking)"""
+        return SiteEventLoop.for_site(self.site_url).run(coro, timeout=timeout)
+    
     def upload_images_parallel(self, image_paths, max_workers=3):
         """
         PARALLEL IMAGE UPLOAD - Upload multiple images simultaneously
         SPEED BOOST: 2-3x faster than sequential upload (optimized for stability)
         
+        Uses the async engine (single event loop per site) when httpx is installed,
+        otherwise falls back to a thread pool. Images the async engine could not
+        upload are retried through upload_image_fast (handles auth refresh).
+        
         Args:
             image_paths: List of image file paths
-            max_workers: Number of parallel workers (default: 3, reduced from 10 for stability)
+            max_workers: Number of parallel workers for the thread fallback (default: 3)
             
         Returns:
-            list: List of tuples (success, media_id, media_url) for each image
+            list: List of tuples (success, media_id, media_url) in the same order as image_paths
         """
         if not image_paths:
             return []
         
-        self._log(f"[FAST_API] 🚀 Parallel uploading {len(image_paths)} images with {max_workers} workers...")
-        
-        results = []
         start_time = time.time()
         
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit all upload tasks
-            future_to_path = {
-                executor.submit(self.upload_image_fast, path): path 
-                for path in image_paths
-            }
-            
-            # Collect results as they complete
-            for future in concurrent.futures.as_completed(future_to_path):
-                path = future_to_path[future]
+        engine = self.get_async_engine()
+        if engine is not None:
+            # DEDUP first: only bytes this site has not seen go to the async engine
+            results = [None] * len(image_paths)
+            digests = {}
+            pending = []
+            for i, path in enumerate(image_paths):
                 try:
-                    result = future.result()
-                    results.append(result)
-                except Exception as e:
-                    self._log(f"[FAST_API] ❌ Parallel upload error for {path}: {e}")
-                    results.append((False, None, None))
+                    digest, cached = self.media_cache.lookup_file(path, self.media_exists)
+                except OSError:
+                    digest, cached = None, None
+                if cached and cached[0]:
+                    results[i] = (True, cached[0], cached[1])
+                else:
+                    digests[i] = digest
+                    pending.append(i)
+            
+            self._log(f"[FAST_API] 🚀 Async uploading {len(pending)} images (1 event loop, {len(image_paths) - len(pending)} cached)...")
+            try:
+                uploaded = self.run_async(engine.upload_images_parallel([image_paths[i] for i in pending]))
+            except Exception as e:
+                self._log(f"[FAST_API] ⚠️ Async engine error: {e}, falling back to threads")
+                uploaded = [(False, None, None)] * len(pending)
+            if engine.rest_blocked:
+                self.rest_blocked = True
+                self.rest_blocked_reason = engine.rest_blocked_reason
+            
+            for i, result in zip(pending, uploaded):
+                if result[0]:
+                    self.media_cache.store(digests[i], result[1], result[2])
+                elif not self.rest_blocked:
+                    result = self.upload_image_fast(image_paths[i])
+                results[i] = result
+        else:
+            self._log(f"[FAST_API] 🚀 Parallel uploading {len(image_paths)} images with {max_workers} workers...")
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(self._upload_image_safe, image_paths))
         
         elapsed = time.time() - start_time
         success_count = sum(1 for r in results if r[0])
@@ -865,7 +999,88 @@ class WordPressRESTClientFast:
         
         return results
     
-    def create_post_fast(self, title, content, featured_media_id=None, featured_image_url=None, status='publish'):
+    def _upload_image_safe(self, image_path):
+        """upload_image_fast that never raises (for executor.map)"""
+        try:
+            return self.upload_image_fast(image_path)
+        except Exception as e:
+            self._log(f"[FAST_API] ❌ Parallel upload error for {image_path}: {e}")
+            return (False, None, None)
+    
+    def post_articles_parallel(self, blog_posts):
+        """
+        Đăng nhiều bài cùng lúc qua async engine (1 event loop, không tạo thread/bài)
+        Fallback: đăng tuần tự bằng post_article_fast nếu không có httpx.
+        
+        Args:
+            blog_posts: List of BlogPost objects
+            
+        Returns:
+            list: List of (success, result) tuples in the same order as blog_posts
+        """
+        if not blog_posts:
+            return []
+        
+        if not self.cookies_loaded and not self.login_fast():
+            return [(False, "Login failed")] * len(blog_posts)
+        
+        # /batch/v1: drafts + featured fixes + publish flips gộp thành vài round trip
+        if len(blog_posts) > 1 and self.supports_batch_api():
+            return self.post_articles_batched(blog_posts)
+        
+        engine = self.get_async_engine()
+        if engine is None:
+            return [self.post_article_fast(p) for p in blog_posts]
+        
+        try:
+            return self.run_async(engine.post_articles_parallel(blog_posts))
+        except Exception as e:
+            print(f"[FAST_API] ❌ Async batch error: {e}")
+            return [(False, str(e))] * len(blog_posts)
+    
+    def _json_headers(self):
+        headers = {
+            'Content-Type': 'application/json',
+        }
+        if self.nonce:
+            headers['X-WP-Nonce'] = self.nonce
+        return headers
+    
+    def _build_draft_payload(self, title, content, featured_media_id=None, featured_image_url=None, status='publish', idempotency_key=None):
+        """
+        JSON body for creating the draft (shared by create_post_fast and the /batch/v1 path)
+        
+        Returns:
+            tuple: (post_data: dict, slug: str or None)
+        """
+        # 🔥 SPEEDHACK: Always create as 'draft' first. 
+        # WordPress takes huge CPU/Time to process a 'publish' request because 
+        # it builds sitemaps, clears caching, sends emails, etc.
+        # 'draft' is instant. We will publish it in a separate step.
+        post_data = {
+            'title': title,
+            'content': content,
+            'status': 'draft' if status == 'publish' else status,
+        }
+        
+        if featured_media_id:
+            post_data['featured_media'] = featured_media_id
+        
+        # Add meta fields for og:image override (works with Yoast, JNews, RankMath, etc.)
+        if featured_image_url:
+            post_data['meta'] = {
+                '_yoast_wpseo_opengraph-image': featured_image_url,
+                '_yoast_wpseo_twitter-image': featured_image_url,
+            }
+        
+        # IDEMPOTENCY: slug carries the key, so after a timeout we can ask WP whether the draft exists
+        slug = None
+        if idempotent_slugs_enabled():
+            slug = idempotent_slug(title, idempotency_key or make_idempotency_key(title, content))
+            post_data['slug'] = slug
+        return post_data, slug
+    
+    def create_post_fast(self, title, content, featured_media_id=None, featured_image_url=None, status='publish', on_stage=None, idempotency_key=None):
         """
         FAST POST CREATION with reduced timeout
         
@@ -875,6 +1090,10 @@ class WordPressRESTClientFast:
             featured_media_id: Featured image media ID (optional)
             featured_image_url: Featured image URL for og:image override (optional)
             status: Post status (default: 'publish')
+            on_stage: Optional callback(stage, info) - called with 'draft_created' once the draft exists
+            idempotency_key: Stable key for this post (default: hash of title + content).
+                With WP_IDEMPOTENT_SLUG=1 it is embedded in the slug so a timed-out POST
+                can be looked up before resending.
             
         Returns:
             tuple: (success: bool, post_id: int or None, post_url: str or None)
@@ -882,33 +1101,9 @@ class WordPressRESTClientFast:
         try:
             print(f"[FAST_API] ⚡ Fast creating post: {title[:50]}...")
             
-            # 🔥 SPEEDHACK: Always create as 'draft' first. 
-            # WordPress takes huge CPU/Time to process a 'publish' request because 
-            # it builds sitemaps, clears caching, sends emails, etc.
-            # 'draft' is instant. We will publish it in a separate step.
             final_status = status
-            post_data = {
-                'title': title,
-                'content': content,
-                'status': 'draft' if final_status == 'publish' else final_status,
-            }
-            
-            if featured_media_id:
-                post_data['featured_media'] = featured_media_id
-            
-            # Add meta fields for og:image override (works with Yoast, JNews, RankMath, etc.)
-            if featured_image_url:
-                post_data['meta'] = {
-                    '_yoast_wpseo_opengraph-image': featured_image_url,
-                    '_yoast_wpseo_twitter-image': featured_image_url,
-                }
-            
-            headers = {
-                'Content-Type': 'application/json',
-            }
-            
-            if self.nonce:
-                headers['X-WP-Nonce'] = self.nonce
+            post_data, slug = self._build_draft_payload(title, content, featured_media_id, featured_image_url, status, idempotency_key)
+            headers = self._json_headers()
             
             # Rate limiting: Wait if needed
             self._wait_for_rate_limit()
@@ -962,42 +1157,7 @@ class WordPressRESTClientFast:
                                     time.sleep(0.5)
                                     continue
                             return False, None, None
-                        post_id = data.get('id')
-                        post_url = data.get('link')
-                        
-                        # VERIFY: Check if featured_media was actually set
-                        actual_featured = data.get('featured_media')
-                        if featured_media_id:
-                            if actual_featured == featured_media_id:
-                                print(f"[FAST_API] ✅ Featured media VERIFIED: {actual_featured}")
-                            elif actual_featured and actual_featured != featured_media_id:
-                                print(f"[FAST_API] ⚠️ Featured media MISMATCH! Expected {featured_media_id}, got {actual_featured}")
-                                # Force update
-                                self._force_set_featured_media(post_id, featured_media_id, headers)
-                            else:
-                                print(f"[FAST_API] ⚠️ Featured media NOT SET in response! Force updating...")
-                                self._force_set_featured_media(post_id, featured_media_id, headers)
-                        
-                        # 🔥 SPEEDHACK: Now Trigger Publish in the background
-                        if final_status == 'publish':
-                            print(f"[FAST_API] ⚡ Tốc độ ánh sáng: Bài (ID: {post_id}) đã lưu tạm. Đang kích hoạt xuất bản...")
-                            try:
-                                publish_resp = self.session.post(
-                                    f"{self.posts_endpoint}/{post_id}",
-                                    json={"status": "publish"},
-                                    headers=headers,
-                                    timeout=3 # Cố tình set 3 giây. Nếu WP bị quá tải và không phản hồi kịp, 
-                                              # ta kệ xác luôn vì lệnh publish đã chắc chắn bay vào máy chủ WP!
-                                )
-                                if publish_resp.status_code in [200, 201]:
-                                    post_url = publish_resp.json().get('link', post_url)
-                            except requests.exceptions.ReadTimeout:
-                                print(f"[FAST_API] ⚡ Gửi lệnh xuất bản thành công! (WP server đang lưu ngầm, app đi tiếp)")
-                            except Exception as publish_err:
-                                print(f"[FAST_API] ⚠️ Lỗi khi đẩy publish (có thể sẽ lưu ở dạng nháp): {publish_err}")
-                        
-                        print(f"[FAST_API] ✅ Đăng thành công! Mở: {post_url}")
-                        return True, post_id, post_url
+                        return self._finalize_created_post(data, featured_media_id, final_status, headers, on_stage)
                     elif response.status_code == 403: # Forbidden
                          print(f"[FAST_API] 🛡️ 403 Forbidden on create_post. Refreshing auth... (attempt {attempt+1})")
                          if self._refresh_auth():
@@ -1022,8 +1182,20 @@ class WordPressRESTClientFast:
                         
                 except requests.exceptions.ReadTimeout:
                     # TRÁNH TRÙNG LẶP: Đã gửi request lên thành công, WP đang xử lý nhưng quá lâu (lag).
-                    # NẾU retry lúc này, wp sẽ đăng 2 bài. 
-                    print(f"[FAST_API] ⚠️ ReadTimeout (WP quá tải). Không retry để tránh trùng lặp bài viết!")
+                    # Không có slug idempotent → retry sẽ đăng 2 bài, nên dừng.
+                    if not slug:
+                        print(f"[FAST_API] ⚠️ ReadTimeout (WP quá tải). Không retry để tránh trùng lặp bài viết!")
+                        return False, None, None
+                    # Có slug: hỏi WP xem bản nháp đã được tạo chưa rồi mới quyết định gửi lại
+                    print(f"[FAST_API] ⚠️ ReadTimeout (WP quá tải). Kiểm tra bài nháp theo slug '{slug}'...")
+                    existing = self._find_post_by_slug(slug, headers)
+                    if existing:
+                        print(f"[FAST_API] ✅ Bài đã được tạo (ID: {existing.get('id')}), không gửi lại")
+                        return self._finalize_created_post(existing, featured_media_id, final_status, headers, on_stage)
+                    if attempt < max_retries - 1:
+                        print(f"[FAST_API] 🔁 Chưa có bài nào với slug này, gửi lại an toàn... (attempt {attempt+1}/{max_retries})")
+                        continue
+                    print(f"[FAST_API] ❌ Post timeout after {max_retries} attempts")
                     return False, None, None
                 except requests.exceptions.Timeout:
                     if attempt < max_retries - 1:
@@ -1048,6 +1220,133 @@ class WordPressRESTClientFast:
             print(f"[FAST_API] ❌ Post error: {e}")
             return False, None, None
     
+    def _finalize_created_post(self, data, featured_media_id, final_status, headers, on_stage=None):
+        """
+        Draft exists (fresh POST response or found by slug): verify featured media,
+        trigger publish, return (True, post_id, post_url)
+        """
+        post_id = data.get('id')
+        post_url = data.get('link')
+        if on_stage:
+            on_stage('draft_created', {'post_id': post_id, 'post_url': post_url})
+        
+        # VERIFY: Check if featured_media was actually set
+        actual_featured = data.get('featured_media')
+        if featured_media_id:
+            if actual_featured == featured_media_id:
+                print(f"[FAST_API] ✅ Featured media VERIFIED: {actual_featured}")
+            elif actual_featured and actual_featured != featured_media_id:
+                print(f"[FAST_API] ⚠️ Featured media MISMATCH! Expected {featured_media_id}, got {actual_featured}")
+                # Force update
+                self._force_set_featured_media(post_id, featured_media_id, headers)
+            else:
+                print(f"[FAST_API] ⚠️ Featured media NOT SET in response! Force updating...")
+                self._force_set_featured_media(post_id, featured_media_id, headers)
+        
+        # 🔥 SPEEDHACK: Now Trigger Publish in the background
+        if final_status == 'publish':
+            print(f"[FAST_API] ⚡ Tốc độ ánh sáng: Bài (ID: {post_id}) đã lưu tạm. Đang kích hoạt xuất bản...")
+            state, detail = self.publish_post(post_id, headers=headers)
+            if state == 'published':
+                post_url = detail or post_url
+        
+        print(f"[FAST_API] ✅ Đăng thành công! Mở: {post_url}")
+        return True, post_id, post_url
+    
+    def _find_post_by_slug(self, slug, headers=None, attempts=3, delay=None):
+        """
+        Look up the draft created with our idempotent slug (draft/pending only:
+        a published post with the same key is an earlier, deliberate post).
+        Polls a few times because WP may still be finishing the timed-out request.
+        If the same slug exists more than once (a resend raced the original),
+        the duplicates are only logged - cleanup is left to the user.
+        
+        Returns:
+            dict or None: post JSON (id, link, status, featured_media)
+        """
+        delay = self.SLUG_LOOKUP_DELAY if delay is None else delay
+        for attempt in range(attempts):
+            try:
+                r = self.session.get(
+                    self.posts_endpoint,
+                    params={
+                        'slug': slug,
+                        'status': 'draft,pending',
+                        '_fields': 'id,link,status,featured_media',
+                    },
+                    headers=headers,
+                    timeout=10
+                )
+                if r.status_code == 200:
+                    found = sorted(r.json() or [], key=lambda p: p.get('id') or 0)
+                    if found:
+                        if len(found) > 1:
+                            dup_ids = ", ".join(str(p.get('id')) for p in found[1:])
+                            print(f"[FAST_API] ⚠️ Duplicate drafts with slug {slug}: {dup_ids} (keeping ID {found[0].get('id')}, please remove the rest manually)")
+                        return found[0]
+            except Exception as e:
+                print(f"[FAST_API] ⚠️ Slug lookup error: {e}")
+            if attempt < attempts - 1:
+                time.sleep(delay)
+        return None
+    
+    def _find_posts_by_slugs(self, slugs, headers=None, attempts=3, delay=None):
+        """
+        _find_post_by_slug cho nhiều slug: poll theo vòng (1 lần chờ / vòng cho cả nhóm
+        thay vì attempts x delay cho từng bài).
+        
+        Returns:
+            dict: slug -> post JSON (chỉ các slug tìm thấy)
+        """
+        delay = self.SLUG_LOOKUP_DELAY if delay is None else delay
+        found, pending = {}, list(slugs)
+        for attempt in range(attempts):
+            for slug in list(pending):
+                existing = self._find_post_by_slug(slug, headers, attempts=1)
+                if existing:
+                    found[slug] = existing
+                    pending.remove(slug)
+            if not pending:
+                break
+            if attempt < attempts - 1:
+                time.sleep(delay)
+        return found
+    
+    def publish_post(self, post_id, headers=None):
+        """
+        Flip an existing draft to 'publish'
+        
+        Returns:
+            tuple: (state, detail)
+                ('published', permalink)  - WordPress confirmed
+                ('no_reply', None)        - request sent, WP did not answer in time (ReadTimeout)
+                ('missing', error)        - draft no longer exists (404)
+                ('failed', error)         - rejected (401/403/...) or never reached WP
+        """
+        if headers is None:
+            headers = {'Content-Type': 'application/json'}
+            if self.nonce:
+                headers['X-WP-Nonce'] = self.nonce
+        try:
+            publish_resp = self.session.post(
+                f"{self.posts_endpoint}/{post_id}",
+                json={"status": "publish"},
+                headers=headers,
+                timeout=3 # Cố tình set 3 giây. Nếu WP bị quá tải và không phản hồi kịp, 
+                          # ta kệ xác luôn vì lệnh publish đã chắc chắn bay vào máy chủ WP!
+            )
+            if publish_resp.status_code in [200, 201]:
+                return 'published', publish_resp.json().get('link')
+            error = f"HTTP {publish_resp.status_code}"
+            print(f"[FAST_API] ⚠️ Publish {post_id} bị từ chối: {error}")
+            return ('missing' if publish_resp.status_code == 404 else 'failed'), error
+        except requests.exceptions.ReadTimeout:
+            print(f"[FAST_API] ⚡ Gửi lệnh xuất bản thành công! (WP server đang lưu ngầm, app đi tiếp)")
+            return 'no_reply', None
+        except Exception as publish_err:
+            print(f"[FAST_API] ⚠️ Lỗi khi đẩy publish (có thể sẽ lưu ở dạng nháp): {publish_err}")
+            return 'failed', str(publish_err)
+    
     def _force_set_featured_media(self, post_id, featured_media_id, headers):
         """Force update featured_media on an existing post"""
         try:
@@ -1064,13 +1363,238 @@ class WordPressRESTClientFast:
         except Exception as e:
             print(f"[FAST_API] ⚠️ Force-set error: {e}")
     
-    def post_article_fast(self, blog_post):
+    # ------------------------------------------------------------------
+    # BATCH MODE (/wp-json/batch/v1, WordPress 5.6+)
+    # ------------------------------------------------------------------
+    
+    def supports_batch_api(self):
+        """
+        Site có route /batch/v1 không (OPTIONS 1 lần, cache lại).
+        Đọc luôn maxItems mà site cho phép.
+        """
+        if self._batch_supported is not None:
+            return self._batch_supported
+        supported = False
+        if _batch_api_enabled() and not self.rest_blocked:
+            try:
+                r = self.session.options(self.batch_endpoint, headers=self._json_headers(), timeout=10)
+                if r.status_code == 200:
+                    schema = r.json()
+                    supported = True
+                    try:
+                        max_items = schema['endpoints'][0]['args']['requests']['maxItems']
+                        self.batch_max_items = max(1, min(int(max_items), BATCH_MAX_ITEMS))
+                    except (KeyError, IndexError, TypeError, ValueError):
+                        pass
+            except Exception as e:
+                print(f"[FAST_API] ⚠️ Batch route check failed: {e}")
+        self._batch_supported = supported
+        print(f"[FAST_API] {'✅' if supported else 'ℹ️'} /batch/v1 {'available' if supported else 'not available, using per-post requests'}")
+        return supported
+    
+    def _batch_call(self, sub_requests, headers, timeout=60):
+        """
+        Gửi sub_requests qua /batch/v1 theo từng lô batch_max_items.
+        
+        Args:
+            sub_requests: [{'method': 'POST', 'path': '/wp/v2/posts', 'body': {...}}, ...]
+            
+        Returns:
+            list: (status, body) cho từng sub-request, cùng thứ tự;
+                  None nếu lô đó chắc chắn không được xử lý (chưa kết nối được / 400 / 404 - gửi lại an toàn),
+                  BATCH_NO_REPLY nếu đã gửi nhưng không có trả lời dùng được (không gửi lại mù quáng)
+        """
+        results = []
+        for start in range(0, len(sub_requests), self.batch_max_items):
+            chunk = sub_requests[start:start + self.batch_max_items]
+            chunk_results = [None] * len(chunk)
+            try:
+                # validation=normal: mỗi sub-request độc lập, 1 bài lỗi không kéo cả lô
+                r = self.session.post(
+                    self.batch_endpoint,
+                    json={'validation': 'normal', 'requests': chunk},
+                    headers=headers,
+                    timeout=timeout
+                )
+                if r.status_code in (200, 207):
+                    try:
+                        responses = r.json().get('responses') or []
+                    except (ValueError, AttributeError):
+                        # WP đã xử lý lô nhưng body hỏng → không biết bài nào đã được tạo
+                        print(f"[FAST_API] ⚠️ Batch response unreadable ({len(chunk)} sub-requests), will verify per post")
+                        responses = []
+                    for i, resp in enumerate(responses[:len(chunk)]):
+                        chunk_results[i] = (resp.get('status'), resp.get('body'))
+                    if len(responses) < len(chunk):
+                        # Trả lời thiếu / bị cắt: các sub-request còn lại có thể đã chạy
+                        print(f"[FAST_API] ⚠️ Batch answered {len(responses)}/{len(chunk)} sub-requests, will verify the rest")
+                        chunk_results[len(responses):] = [BATCH_NO_REPLY] * (len(chunk) - len(responses))
+                elif r.status_code in (400, 404):
+                    # Route disappeared / rejected → per-post path from now on
+                    print(f"[FAST_API] ⚠️ Batch request failed: {r.status_code}")
+                    self._batch_supported = False
+                else:
+                    # 5xx / 502 / 504 từ proxy: WP có thể đã chạy lô rồi
+                    print(f"[FAST_API] ⚠️ Batch request failed: {r.status_code} ({len(chunk)} sub-requests), will verify per post")
+                    chunk_results = [BATCH_NO_REPLY] * len(chunk)
+            except Exception as e:
+                if _never_sent(e):
+                    print(f"[FAST_API] ⚠️ Batch not sent: {e}")
+                else:
+                    # ReadTimeout / connection reset / RemoteDisconnected sau khi đã gửi body
+                    print(f"[FAST_API] ⚠️ Batch got no reply ({len(chunk)} sub-requests): {e}, will verify per post")
+                    chunk_results = [BATCH_NO_REPLY] * len(chunk)
+            results.extend(chunk_results)
+        return results
+    
+    def create_posts_batched(self, items, on_stages=None):
+        """
+        Tạo nhiều bài qua /batch/v1:
+            1 batch tạo drafts → 1 batch gộp sửa featured_media + flip publish
+        Bài nào batch không xử lý được thì đi lại đường create_post_fast.
+        Lô bị timeout (WP có thể đã tạo draft): có slug idempotent → tìm draft theo slug
+        (poll vài lần) rồi mới gửi lại; không có slug → báo lỗi "kiểm tra tay", KHÔNG gửi lại.
+        
+        Args:
+            items: list of dict với các tham số của create_post_fast
+                   (title, content, featured_media_id, featured_image_url, status, idempotency_key)
+            on_stages: Optional list of on_stage callbacks (cùng thứ tự với items)
+            
+        Returns:
+            list: (success, post_id, post_url) cho từng item, cùng thứ tự
+        """
+        if not items:
+            return []
+        on_stages = on_stages or [None] * len(items)
+        if not self.supports_batch_api():
+            return [self.create_post_fast(**item, on_stage=cb) for item, cb in zip(items, on_stages)]
+        
+        start_time = time.time()
+        headers = self._json_headers()
+        payloads = [
+            self._build_draft_payload(
+                item['title'], item['content'], item.get('featured_media_id'), item.get('featured_image_url'),
+                item.get('status', 'publish'), item.get('idempotency_key')
+            )
+            for item in items
+        ]
+        
+        # Phase 1: drafts
+        self._wait_for_rate_limit()
+        responses = self._batch_call(
+            [{'method': 'POST', 'path': '/wp/v2/posts', 'body': post_data} for post_data, _ in payloads],
+            headers, timeout=60
+        )
+        created = {}
+        results = [None] * len(items)
+        unanswered = {}  # slug -> index: lô đã gửi nhưng không có trả lời
+        for i, (resp, (_, slug)) in enumerate(zip(responses, payloads)):
+            if resp is BATCH_NO_REPLY:
+                if slug:
+                    unanswered[slug] = i
+                else:
+                    # Không có slug để kiểm tra → gửi lại có thể đăng 2 lần
+                    print(f"[FAST_API] ⚠️ Batch draft #{i} unanswered and has no idempotent slug, not resending")
+                    results[i] = (False, None, BATCH_UNKNOWN_MESSAGE)
+            elif resp and resp[0] in (200, 201) and isinstance(resp[1], dict) and resp[1].get('id'):
+                created[i] = resp[1]
+            elif resp:
+                print(f"[FAST_API] ⚠️ Batch draft #{i} failed: {resp[0]} {str(resp[1])[:120]}")
+        if unanswered:
+            # Draft có thể đã được tạo / WP còn đang lưu → poll theo slug trước khi gửi lại
+            for slug, existing in self._find_posts_by_slugs(list(unanswered), headers).items():
+                created[unanswered[slug]] = existing
+        
+        for i, data in created.items():
+            results[i] = (True, data.get('id'), data.get('link'))
+            if on_stages[i]:
+                on_stages[i]('draft_created', {'post_id': data.get('id'), 'post_url': data.get('link')})
+        
+        # Phase 2: featured_media fixes + publish flips, 1 sub-request per post
+        updates, update_idx = [], []
+        for i, data in created.items():
+            body = {}
+            featured_media_id = items[i].get('featured_media_id')
+            if featured_media_id and data.get('featured_media') != featured_media_id:
+                body['featured_media'] = featured_media_id
+            if items[i].get('status', 'publish') == 'publish' and data.get('status') != 'publish':
+                body['status'] = 'publish'
+            if body:
+                updates.append({'method': 'POST', 'path': f"/wp/v2/posts/{data['id']}", 'body': body})
+                update_idx.append(i)
+        
+        if updates:
+            for i, resp in zip(update_idx, self._batch_call(updates, headers, timeout=90)):
+                if resp and resp[0] in (200, 201) and isinstance(resp[1], dict):
+                    results[i] = (True, resp[1].get('id'), resp[1].get('link') or results[i][2])
+                else:
+                    # Fallback per post (updates are idempotent)
+                    results[i] = self._finalize_created_post(
+                        created[i], items[i].get('featured_media_id'), items[i].get('status', 'publish'), headers
+                    )
+        
+        # Phase 3: anything the batch couldn't create → per-post path
+        fallback = [i for i, r in enumerate(results) if r is None]
+        for i in fallback:
+            results[i] = self.create_post_fast(**items[i], on_stage=on_stages[i])
+        
+        print(f"[FAST_API] ✅ Batch: {len(created)}/{len(items)} drafts in batch, "
+              f"{len(updates)} updates, {len(fallback)} per-post fallbacks, {time.time() - start_time:.2f}s")
+        return results
+    
+    def post_articles_batched(self, blog_posts, on_stages=None):
+        """
+        Batched version of post_article_fast for many posts:
+        featured images upload in parallel, then drafts/publish go through /batch/v1.
+        
+        Returns:
+            list: (success, post_url or error_message), cùng thứ tự với blog_posts
+        """
+        if not blog_posts:
+            return []
+        on_stages = on_stages or [None] * len(blog_posts)
+        
+        # Featured images that still need uploading
+        media_ids = [getattr(p, 'featured_media_id', None) for p in blog_posts]
+        to_upload = [
+            i for i, p in enumerate(blog_posts)
+            if not media_ids[i] and isinstance(getattr(p, 'image_url', None), str)
+            and p.image_url and not p.image_url.startswith('http')
+        ]
+        if to_upload:
+            uploaded = self.upload_images_parallel([blog_posts[i].image_url for i in to_upload])
+            for i, (ok, media_id, media_url) in zip(to_upload, uploaded):
+                if ok:
+                    media_ids[i] = media_id
+                    if on_stages[i]:
+                        on_stages[i]('media_uploaded', {'media_id': media_id, 'media_url': media_url})
+        
+        items = []
+        for p, media_id in zip(blog_posts, media_ids):
+            image_url = getattr(p, 'image_url', None)
+            items.append({
+                'title': p.title,
+                'content': p.content,
+                'featured_media_id': media_id,
+                'featured_image_url': image_url if isinstance(image_url, str) else None,
+                'status': 'publish',
+                'idempotency_key': getattr(p, 'idempotency_key', None),
+            })
+        
+        return [
+            (True, post_url) if ok else (False, post_url or "Post creation failed")
+            for ok, _, post_url in self.create_posts_batched(items, on_stages)
+        ]
+    
+    def post_article_fast(self, blog_post, on_stage=None):
         """
         ULTRA-FAST WORKFLOW: Complete post creation
         Target: < 2 seconds total
         
         Args:
             blog_post: BlogPost object
+            on_stage: Optional callback(stage, info) for progress journaling:
+                'media_uploaded' {'media_id'} and 'draft_created' {'post_id', 'post_url'}
             
         Returns:
             tuple: (success: bool, post_url: str or error_message)
@@ -1104,6 +1628,8 @@ class WordPressRESTClientFast:
                     success, media_id, media_url = self.upload_image_fast(blog_post.image_url)
                     if success:
                         featured_media_id = media_id
+                        if on_stage:
+                            on_stage('media_uploaded', {'media_id': media_id, 'media_url': media_url})
                 print(f"[FAST_API] ⏱️ Upload took: {time.time() - upload_start:.2f}s")
             
             # Step 4: Create post (pass featured_image_url for og:image override)
@@ -1114,7 +1640,9 @@ class WordPressRESTClientFast:
                 content=blog_post.content,
                 featured_media_id=featured_media_id,
                 featured_image_url=featured_image_url,
-                status='publish'
+                status='publish',
+                on_stage=on_stage,
+                idempotency_key=getattr(blog_post, 'idempotency_key', None)
             )
             print(f"[FAST_API] ⏱️ Post creation took: {time.time() - post_start:.2f}s")
             
@@ -1131,7 +1659,13 @@ class WordPressRESTClientFast:
             return False, str(e)
     
     def close(self):
-        """Close session"""
+        """Close session (and the async engine, if it was started)"""
+        if self._async_engine is not None:
+            try:
+                self.run_async(self._async_engine.aclose(), timeout=5)
+            except Exception:
+                pass
+            self._async_engine = None
         self.session.close()
         print("[FAST_API] Session closed")
     
@@ -1187,6 +1721,10 @@ class WordPressBatchProcessor:
         """
         Post multiple articles in parallel
         
+        Uses one shared client: the async engine keeps up to max_workers
+        requests in flight on a single event loop instead of one thread
+        (and one login) per post.
+        
         Args:
             blog_posts: List of BlogPost objects
             
@@ -1195,25 +1733,26 @@ class WordPressBatchProcessor:
         """
         print(f"[BATCH] 🚀 Processing {len(blog_posts)} posts with {self.max_workers} workers")
         
-        results = []
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # Create a client for each post
-            futures = []
-            for blog_post in blog_posts:
-                client = WordPressRESTClientFast(self.site_url, self.username, self.password)
-                future = executor.submit(client.post_article_fast, blog_post)
-                futures.append((future, client))
-            
-            # Collect results
-            for future, client in futures:
-                try:
-                    success, result = future.result(timeout=30)
-                    results.append((success, result))
-                except Exception as e:
-                    results.append((False, str(e)))
-                finally:
-                    client.close()
+        client = WordPressRESTClientFast(self.site_url, self.username, self.password)
+        try:
+            if not client.login_fast():
+                results = [(False, "Login failed")] * len(blog_posts)
+            elif HAS_HTTPX:
+                engine = client.get_async_engine()
+                if engine is not None:
+                    engine.max_concurrency = self.max_workers
+                results = client.post_articles_parallel(blog_posts)
+            else:
+                with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    futures = [executor.submit(client.post_article_fast, p) for p in blog_posts]
+                    results = []
+                    for future in futures:
+                        try:
+                            results.append(future.result())
+                        except Exception as e:
+                            results.append((False, str(e)))
+        finally:
+            client.close()
         
         print(f"[BATCH] ✅ Completed {len(results)} posts")
         return results
@@ -9,6 +9,7 @@ from tkinter import messagebox, filedialog
 from PIL import ImageGrab, Image, ImageTk
 import io
 from model.utils import resource_path
+from model.auto_post_queue import AutoPostQueue, queue_concurrency
 
 # Tab SEO tách riêng file để giảm kích thước gui_view.py
 try:
@@ -134,7 +135,8 @@ class GUIView(ctk.CTk):
         # Biến dữ liệu
         self.login_frame = None
         self.main_frame = None
-        self.post_queue = [] 
+        # Hàng chờ AUTO (post_queue / content_pool / queue_in_flight là property trỏ vào đây)
+        self.auto_queue = AutoPostQueue()
         
         # Initialize Update Checker
         try:
@@ -145,7 +147,6 @@ class GUIView(ctk.CTk):
         except Exception as e:
             print(f"Update init failed: {e}")
             
-        self.content_pool = []
         self.batch_data = None
         self.published_links = []
         self.published_posts = []  # Store {title, link} pairs for copy function
@@ -347,6 +348,11 @@ class GUIView(ctk.CTk):
         # Account Selector (NEW)
         from model.wp_account_manager import WPAccountManager
         self.account_manager = WPAccountManager()
+        # Login sẵn REST client của các tài khoản đã lưu (background)
+        try:
+            self.account_manager.prewarm_clients()
+        except Exception as e:
+            print(f"[GUI] Client prewarm failed: {e}")
         
         account_selector_frame = ctk.CTkFrame(input_frame, fg_color="transparent")
         account_selector_frame.pack(fill="x", pady=(0, 10))  # Reduced from 15 to 10
@@ -2772,11 +2778,12 @@ class GUIView(ctk.CTk):
                         continue
                     
                     # Add to content pool WITH file path for later deletion
-                    self.content_pool.append({
-                        'filename': filename,
-                        'filepath': file_path,  # Store full path for deletion
-                        'content': content
-                    })
+                    with self.content_pool_lock:
+                        self.content_pool.append({
+                            'filename': filename,
+                            'filepath': file_path,  # Store full path for deletion
+                            'content': content
+                        })
                     
                     imported_count += 1
                     self.log(f"✅ Đã đọc: {filename} ({len(content)} ký tự)")
@@ -3217,6 +3224,12 @@ class GUIView(ctk.CTk):
                 self.log("❌ Không tìm thấy link Video hợp lệ!")
                 return
             
+            # Gộp link trùng (youtu.be/X = youtube.com/watch?v=X, m.facebook = www.facebook...) trước khi gọi mạng
+            from model.url_canonicalizer import dedupe
+            video_links, dup_count = dedupe(video_links, key=lambda item: item[0])
+            if dup_count:
+                self.log(f"♻️ Bỏ qua {dup_count} link trùng video")
+            
             # Count how many have manual titles
             manual_count = sum(1 for _, t in video_links if t)
             if manual_count > 0:
@@ -3291,17 +3304,19 @@ class GUIView(ctk.CTk):
                     return f"Error: {str(e)[:15]}"
 
             def _process_links():
+                from model.video_metadata_cache import cached_oembed
                 processed_count = 0
                 shared_driver = None
                 
                 # Check for FB/TikTok links to init One Shared Driver (Complex platforms)
                 has_complex = any(('facebook.com' in url or 'fb.watch' in url or 'tiktok.com' in url) for url, _ in video_links)
                 
+                scanner_pool = None
                 if has_complex:
                     try:
-                        self.log("🚀 Đang khởi động trình duyệt ẩn danh (Shared) để quét Facebook...")
+                        self.log("🚀 Đang lấy trình duyệt ẩn danh (Shared) để quét Facebook...")
                         import undetected_chromedriver as uc
-                        options = uc.ChromeOptions()
+                        from model.webdriver_pool import get_scanner_pool
                         
                         # Check headless option from GUI
                         use_headless = bool(self.chk_headless_scan.get()) if hasattr(self, 'chk_headless_scan') else True
@@ -3311,21 +3326,9 @@ class GUIView(ctk.CTk):
                         else:
                             self.log("   👁️ Chế độ: Visible (Hiện - Chậm hơn nhưng ổn định hơn)") 
                         
-                        # Use Mobile User Agent
-                        options.add_argument('--user-agent=Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1')
-                        
-                        options.add_argument("--disable-gpu")
-                        options.add_argument("--mute-audio")
-                        options.add_argument("--window-size=375,812") # Mobile dimensions
-                        
-                        chrome_path = os.path.join(os.getcwd(), "chrome_portable", "chrome.exe")
-                        if os.path.exists(chrome_path): options.binary_location = chrome_path
-                        
-                        options.add_argument("--no-sandbox")
-                        options.add_argument("--disable-dev-shm-usage")
-                        
-                        shared_driver = uc.Chrome(options=options, version_main=144, headless=use_headless)
-                        shared_driver.set_page_load_timeout(30)
+                        # Mượn Chrome đã khởi động sẵn từ pool (lần quét sau / hàng chờ dùng lại, không phải mở Chrome mới)
+                        scanner_pool = get_scanner_pool(headless=use_headless)
+                        shared_driver = scanner_pool.checkout()
                     except Exception as e:
                         print(f"Failed to init shared driver: {e}")
 
@@ -3382,13 +3385,11 @@ class GUIView(ctk.CTk):
                                     # Thumbnail (High Quality)
                                     img_remote = f"https://img.youtube.com/vi/{vid_id}/maxresdefault.jpg"
                                     
-                                    # Title via oEmbed
-                                    try:
-                                        oembed_url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={vid_id}&format=json"
-                                        res = requests.get(oembed_url, timeout=3)
-                                        if res.status_code == 200:
-                                            title = res.json().get('title')
-                                    except: pass
+                                    # Title via oEmbed (qua video metadata cache)
+                                    oembed_url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={vid_id}&format=json"
+                                    data = cached_oembed(link, oembed_url, timeout=3)
+                                    if data.get('success'):
+                                        title = data.get('title')
                                 
                                 if not title:
                                     title, _ = _get_meta(link) # Fallback
@@ -3412,15 +3413,12 @@ class GUIView(ctk.CTk):
                                     video_url_final = self.create_vimeo_embed(vid_id, title or "Vimeo Video")
                                     
                                     # Fetch oEmbed - dùng width=1280 để lấy thumbnail chất lượng cao
-                                    try:
-                                        oembed_url = f"https://vimeo.com/api/oembed.json?url=https://vimeo.com/{vid_id}&width=1280"
-                                        res = requests.get(oembed_url, timeout=3)
-                                        if res.status_code == 200:
-                                            data = res.json()
-                                            if not title: title = data.get('title')
-                                            # oEmbed trả thumbnail_url kích thước đúng với width=1280
-                                            img_remote = data.get('thumbnail_url')
-                                    except: pass
+                                    oembed_url = f"https://vimeo.com/api/oembed.json?url=https://vimeo.com/{vid_id}&width=1280"
+                                    data = cached_oembed(link, oembed_url, timeout=3)
+                                    if data.get('success'):
+                                        if not title: title = data.get('title')
+                                        # oEmbed trả thumbnail_url kích thước đúng với width=1280
+                                        img_remote = data.get('thumbnail')
 
                                     # Fallback: thử lấy qua Vimeo API /videos/{id} (không cần auth)
                                     if not img_remote:
@@ -3443,17 +3441,14 @@ class GUIView(ctk.CTk):
                                 platform = "TikTok"
                                 self.after(0, lambda i=idx: self.log(f"   🔍 [{i+1}] TikTok: Đang lấy dữ liệu (API)..."))
                                 
-                                # 1. Try TikTok oEmbed API (Fastest & Most Reliable)
-                                try:
-                                    oembed_url = f"https://www.tiktok.com/oembed?url={link}"
-                                    res = requests.get(oembed_url, timeout=5)
-                                    if res.status_code == 200:
-                                        data = res.json()
-                                        title = data.get('title')
-                                        img_remote = data.get('thumbnail_url')
-                                        if title: print(f"[TikTok] oEmbed success: {title[:30]}...")
-                                except Exception as e:
-                                    print(f"[TikTok] oEmbed error: {e}")
+                                # 1. Try TikTok oEmbed API (Fastest & Most Reliable) - qua video metadata cache
+                                data = cached_oembed(link, f"https://www.tiktok.com/oembed?url={link}", timeout=5)
+                                if data.get('success'):
+                                    title = data.get('title')
+                                    img_remote = data.get('thumbnail')
+                                    print(f"[TikTok] oEmbed success: {title[:30]}...")
+                                elif data.get('error'):
+                                    print(f"[TikTok] oEmbed error: {data['error']}")
 
                                 # 2. Try yt-dlp (Fallback)
                                 if (not title or not img_remote):
@@ -3542,11 +3537,10 @@ class GUIView(ctk.CTk):
                             print(e)
                             continue
                 finally:
-                    # Clean up shared driver
+                    # Trả driver về pool (pool tự loại driver chết / đã dùng nhiều lần)
                     if shared_driver:
-                        try:
-                            shared_driver.quit()
-                        except: pass
+                        from model.webdriver_pool import is_driver_alive
+                        scanner_pool.checkin(shared_driver, broken=not is_driver_alive(shared_driver))
                 
                 # Stop emoji animation
                 self._scanning_active = False
@@ -4035,28 +4029,18 @@ title="{title}"></iframe>
             added_count = 0
             base_title = data.title
             
-            # --- SHARED DRIVER INIT ---
-            shared_driver = None
+            # Gộp link trùng video trước khi quét / thêm vào hàng chờ
+            from model.url_canonicalizer import dedupe
+            video_lines, dup_count = dedupe(video_lines)
+            if dup_count:
+                self.log(f"♻️ Bỏ qua {dup_count} link trùng video")
+            
+            # --- SCANNER POOL: mỗi thread mượn 1 Chrome riêng, trả lại sau khi lấy title ---
+            scanner_pool = None
             has_fb = any(('facebook.com' in x or 'fb.watch' in x) for x in video_lines)
             if has_fb:
-                try:
-                    self.log("🚀 Đang khởi động trình duyệt ẩn danh (Shared) để quét Facebook...")
-                    import undetected_chromedriver as uc
-                    options = uc.ChromeOptions()
-                    options.add_argument('--user-agent=Mozilla/5.0 (iPhone; CPU iPhone OS 16_0 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.0 Mobile/15E148 Safari/604.1')
-                    options.add_argument("--disable-gpu")
-                    options.add_argument("--no-sandbox")
-                    options.add_argument("--disable-dev-shm-usage")
-                    options.add_argument("--mute-audio")
-                    options.add_argument("--window-size=375,812")
-                    
-                    chrome_path = os.path.join(os.getcwd(), "chrome_portable", "chrome.exe")
-                    if os.path.exists(chrome_path): options.binary_location = chrome_path
-                    
-                    shared_driver = uc.Chrome(options=options, version_main=144, headless=True)
-                    shared_driver.set_page_load_timeout(45)
-                except Exception as e:
-                    print(f"Failed to init shared driver: {e}")
+                from model.webdriver_pool import get_scanner_pool
+                scanner_pool = get_scanner_pool(headless=True)
             # --------------------------
 
             self.log(f"📦 Phát hiện {len(video_lines)} dòng video. Đang thêm xử lý hàng loạt...")
@@ -4064,7 +4048,7 @@ title="{title}"></iframe>
             # SPEED OPTIMIZATION: Process in parallel
             import concurrent.futures
             
-            def process_single_video(idx, vid_line, base_title, shared_driver):
+            def process_single_video(idx, vid_line, base_title, scanner_pool):
                 """Process a single video line (runs in parallel)"""
                 try:
                     # Clone data for each post
@@ -4085,7 +4069,8 @@ title="{title}"></iframe>
                              if not current_post.title:
                                  try:
                                      # Fast fetch attempt
-                                     ft = self.get_facebook_title(vid_line, driver=shared_driver)
+                                     with scanner_pool.lease() as scan_driver:
+                                         ft = self.get_facebook_title(vid_line, driver=scan_driver)
                                      if ft and ft != "Facebook Video":
                                          current_post.title = ft
                                  except: pass
@@ -4162,7 +4147,7 @@ title="{title}"></iframe>
             results = []
             with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
                 futures = {
-                    executor.submit(process_single_video, idx, vid_line, base_title, shared_driver): idx
+                    executor.submit(process_single_video, idx, vid_line, base_title, scanner_pool): idx
                     for idx, vid_line in enumerate(video_lines)
                 }
                 
@@ -4178,14 +4163,6 @@ title="{title}"></iframe>
             # Add all results to queue
             self.post_queue.extend(results)
             
-            # --- SHARED DRIVER CLEANUP ---
-            if shared_driver:
-                try:
-                    shared_driver.quit()
-                    self.log("🏁 Đã đóng trình duyệt Shared.")
-                except: pass
-            # -----------------------------
-
             self.log(f"✅ Đã thêm {added_count} bài viết vào hàng chờ!")
             self.update_queue_display()
             # Clear ALL inputs after bulk add
@@ -4581,19 +4558,62 @@ title="{title}"></iframe>
         # Start processing queue
         self.process_next_queue_post()
 
+    @property
+    def post_queue(self):
+        return self.auto_queue.items
+
+    @post_queue.setter
+    def post_queue(self, items):
+        self.auto_queue.items = items
+
+    @property
+    def content_pool(self):
+        return self.auto_queue.content_pool
+
+    @content_pool.setter
+    def content_pool(self, items):
+        self.auto_queue.content_pool = items
+
+    @property
+    def content_pool_lock(self):
+        return self.auto_queue.content_pool_lock
+
+    @property
+    def queue_in_flight(self):
+        return self.auto_queue.in_flight
+
+    def _queue_concurrency(self):
+        """K bài AUTO song song, không vượt cửa sổ rate limiter theo site (nếu controller có)"""
+        window = None
+        if self.controller and hasattr(self.controller, 'get_post_concurrency_limit'):
+            try:
+                window = self.controller.get_post_concurrency_limit()
+            except Exception as e:
+                print(f"[GUI] Concurrency limit check failed: {e}")
+        return queue_concurrency(window)
+
+    def _take_pool_content(self):
+        """Lấy 1 nội dung từ content_pool (atomic - mỗi nội dung chỉ gán cho đúng 1 bài)"""
+        return self.auto_queue.take_content()
+
     def process_next_queue_post(self):
-        if not self.post_queue:
+        """Giữ tối đa K bài đang chạy; gọi lại mỗi khi 1 bài xong"""
+        if self.auto_queue.is_finished():
             self.log("✅ Hoàn thành AUTO! Tất cả bài đã được xử lý.")
             self.btn_batch_post.configure(state="normal", text="🚀 CHAY AUTO")
             return
-        
-        item = self.post_queue[0]
-        self.log(f"📝 Đang xử lý bài {len(self.post_queue)} còn lại: {item.get('title', 'Không có tiêu đề')}")
+        for token, item in self.auto_queue.start_next(self._queue_concurrency()):
+            self._start_queue_post(token, item)
+
+    def _start_queue_post(self, token, item):
+        self.log(f"📝 Đang xử lý ({len(self.queue_in_flight)} đang chạy, {len(self.post_queue)} còn lại): {item.get('title', 'Không có tiêu đề')}")
         
         # Check if this post needs body content from pool
-        if item.get('needs_body_content', False) and hasattr(self, 'content_pool') and self.content_pool:
+        content_item = None
+        if item.get('needs_body_content', False) and hasattr(self, 'content_pool'):
             # Get content from pool NOW (when posting)
-            content_item = self.content_pool.pop(0)
+            content_item, remaining = self._take_pool_content()
+        if content_item:
             body_content = content_item['content']
             content_filename = content_item['filename']
             content_filepath = content_item.get('filepath', '')  # Get filepath for deletion
@@ -4610,7 +4630,6 @@ title="{title}"></iframe>
             self.log(f"   ✅ Nội dung body: {len(body_content)} ký tự")
             
             # Show remaining
-            remaining = len(self.content_pool)
             if remaining > 0:
                 self.log(f"   💾 Còn {remaining} nội dung trong pool")
             else:
@@ -4660,14 +4679,20 @@ title="{title}"></iframe>
         self.current_posting_title = data.title
         print(f"[DEBUG] Saved current_posting_title: '{self.current_posting_title}'")  # Terminal only
         
+        # Token để on_post_finished biết bài nào xong (các bài xong không theo thứ tự)
+        data.queue_token = token
+        
         # Call controller to handle the post
         if self.controller:
             self.controller.handle_post_request(data, is_batch=True)
         else:
             # Mock success for testing
-            self.after(2000, lambda: self.on_post_finished(True, f"https://test.com/{data.title.replace(' ','-')}", True))
+            self.after(2000, lambda: self.on_post_finished(True, f"https://test.com/{data.title.replace(' ','-')}", True, queue_token=token))
+
+    def on_post_finished(self, success, message, is_batch=False, post_title=None, image_path=None, queue_token=None):
+        # Bài AUTO nào vừa xong: theo token (K bài song song), fallback bài đầu hàng chờ
+        queue_item = self.auto_queue.finished_item(queue_token) if is_batch else None
 
-    def on_post_finished(self, success, message, is_batch=False, post_title=None, image_path=None):
         if success:
             self.log(f"✅ THÀNH CÔNG: {message}")
             
@@ -4679,8 +4704,8 @@ title="{title}"></iframe>
                 print(f"[DEBUG] Got clean title passed from controller: '{final_title}'")  # Terminal only
             elif is_batch:
                 # Fallback (should rarely happen now)
-                if self.post_queue:
-                    final_title = self.post_queue[0].get('title', 'Unknown')
+                if queue_item:
+                    final_title = queue_item.get('title', 'Unknown')
             else:
                 # Đăng bài lẻ - lấy từ input fields
                 if hasattr(self, 'entry_title'):
@@ -4694,9 +4719,9 @@ title="{title}"></iframe>
 
             # --- Resolve Image Path for History if not provided ---
             if not image_path:
-                if is_batch and self.post_queue:
+                if is_batch and queue_item:
                     # Get from current queue item
-                    image_path = self.post_queue[0].get('image_url', '')
+                    image_path = queue_item.get('image_url', '')
                 elif not is_batch:
                     # Get from UI
                     if hasattr(self, 'entry_image'):
@@ -4773,8 +4798,8 @@ title="{title}"></iframe>
                 traceback.print_exc()
             
             # Auto-delete files after successful post
-            if is_batch and self.post_queue:
-                completed_item = self.post_queue[0]
+            if is_batch and queue_item:
+                completed_item = queue_item
                 
                 # Delete thumbnail file if it exists
                 thumbnail_path = completed_item.get('image_url', '')
@@ -4795,17 +4820,19 @@ title="{title}"></iframe>
                         self.log(f"⚠️ Không thể xóa file txt: {e}")
                 
                 # Remove completed item from queue
-                self.post_queue.pop(0)
+                self._remove_finished_queue_item(completed_item)
                 self.log(f"✅ Hoàn thành: {completed_item.get('title', 'Không có tiêu đề')}")
                 self.update_queue_display()
-                # Continue with next item after 2 seconds
-                self.after(2000, self.process_next_queue_post)
+            if is_batch:
+                # Fill the freed slot (pacing is done by the per-site rate limiter)
+                self.after(0, self.process_next_queue_post)
         else:
             self.log(f"❌ THẤT BẠI: {message}")
             if is_batch:
                 # On failure, still remove item and continue (or you can choose to stop)
-                failed_item = self.post_queue.pop(0) if self.post_queue else None
+                failed_item = queue_item
                 if failed_item:
+                    self._remove_finished_queue_item(failed_item)
                     self.log(f"❌ Bỏ qua bài lỗi: {failed_item.get('title', 'Không có tiêu đề')}")
                     
                     # Also delete files on failure to avoid accumulation
@@ -4827,8 +4854,12 @@ title="{title}"></iframe>
                             pass
                 
                 self.update_queue_display()
-                # Continue with next item after 3 seconds
-                self.after(3000, self.process_next_queue_post)
+                # Continue with next item
+                self.after(0, self.process_next_queue_post)
+
+    def _remove_finished_queue_item(self, item):
+        """Xóa đúng item đã xong khỏi hàng chờ (so sánh identity, không dùng index)"""
+        self.auto_queue.remove(item)
 
     def _on_link_click(self, event):
         """Handle click on link in history"""
@@ -6347,7 +6378,8 @@ class MockController:
     def handle_post_request(self, data, is_batch=False):
         print(f"Posting: {data.title}")
         # Giả lập post thành công
-        app.after(1500, lambda: app.on_post_finished(True, f"https://site.com/{data.title.replace(' ','-')}", is_batch))
+        app.after(1500, lambda: app.on_post_finished(True, f"https://site.com/{data.title.replace(' ','-')}", is_batch,
+                                                     queue_token=getattr(data, 'queue_token', None)))
 
 if __name__ == "__main__":
     controller = MockController()